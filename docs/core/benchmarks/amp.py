@@ -0,0 +1,144 @@
+# Copyright (c) Twisted Matrix Laboratories.
+# See LICENSE for details.
+
+"""
+See how fast AMP boxes are serialized and parsed, how fast commands' arguments
+are converted to and from boxes, and how many small AMP calls per second can be
+made over the loopback interface, on one connection and on a pool of them.
+
+Usage: python amp.py [calls]
+"""
+
+from __future__ import print_function
+
+import sys
+import time
+
+from timer import timeit
+from twisted.internet import reactor, defer
+from twisted.internet.endpoints import TCP4ClientEndpoint
+from twisted.internet.protocol import Factory, ClientCreator
+from twisted.protocols import amp, amppool
+
+ITERATIONS = 100000
+
+
+class Sum(amp.Command):
+    arguments = [(b'a', amp.Integer()), (b'b', amp.Integer())]
+    response = [(b'total', amp.Integer())]
+
+
+
+class Store(amp.Command):
+    arguments = [(b'records', amp.AmpList([(b'id', amp.Integer()),
+                                          (b'name', amp.Unicode()),
+                                          (b'score', amp.Float()),
+                                          (b'active', amp.Boolean())]))]
+    response = [(b'stored', amp.Integer())]
+
+
+
+class Summer(amp.AMP):
+    @Sum.responder
+    def sum(self, a, b):
+        return {'total': a + b}
+
+
+
+class Discard(object):
+    """
+    A box receiver which discards the boxes it receives.
+    """
+    def startReceivingBoxes(self, sender):
+        pass
+
+
+    def ampBoxReceived(self, box):
+        pass
+
+
+    def stopReceivingBoxes(self, reason):
+        pass
+
+
+
+def codec():
+    box = amp.AmpBox({b'_command': b'Sum', b'_ask': b'1234', b'a': b'12',
+                      b'b': b'34'})
+    print("serialize: %10d boxes/s" % (
+        ITERATIONS / timeit(box.serialize, ITERATIONS),))
+    data = box.serialize() * 100
+    protocol = amp.BinaryBoxProtocol(Discard())
+    print("parse in 100 box chunks: %10d boxes/s" % (
+        ITERATIONS / timeit(protocol.dataReceived, ITERATIONS // 100, data),))
+    protocol = amp.BinaryBoxProtocol(Discard())
+    data = box.serialize()
+    print("parse one box at a time: %10d boxes/s" % (
+        ITERATIONS / timeit(protocol.dataReceived, ITERATIONS, data),))
+
+
+
+def schemas():
+    records = [{'id': i, 'name': u'name', 'score': 0.5, 'active': True}
+               for i in range(100)]
+    for command, objects, iterations in [
+            (Sum, {'a': 12, 'b': 34}, ITERATIONS),
+            (Store, {'records': records}, ITERATIONS // 100)]:
+        box = command.makeArguments(objects, None)
+        print("%s.makeArguments: %10d calls/s" % (
+            command.__name__, iterations / timeit(
+                command.makeArguments, iterations, objects, None)))
+        print("%s.parseArguments: %10d calls/s" % (
+            command.__name__, iterations / timeit(
+                command.parseArguments, iterations, box, None)))
+
+
+
+@defer.inlineCallbacks
+def calls(count, concurrency=100):
+    port = reactor.listenTCP(0, Factory.forProtocol(Summer),
+                             interface="127.0.0.1")
+    client = yield ClientCreator(reactor, amp.AMP).connectTCP(
+        "127.0.0.1", port.getHost().port)
+    yield call(client, "one connection", count, concurrency)
+    client.transport.loseConnection()
+
+    for size in (2, 4):
+        pool = amppool.AMPConnectionPool(
+            TCP4ClientEndpoint(reactor, "127.0.0.1", port.getHost().port),
+            Factory.forProtocol(amp.AMP), size=size)
+        pool.startService()
+        yield call(pool, "pool of %d" % (size,), count, concurrency)
+        yield pool.stopService()
+    yield port.stopListening()
+
+
+
+@defer.inlineCallbacks
+def call(client, name, count, concurrency):
+    start = time.time()
+    remaining = [count]
+
+    @defer.inlineCallbacks
+    def caller():
+        while remaining[0]:
+            remaining[0] -= 1
+            yield client.callRemote(Sum, a=1, b=2)
+
+    yield defer.gatherResults([caller() for i in range(concurrency)])
+    print("calls on %s: %10d calls/s" % (name, count / (time.time() - start)))
+
+
+
+def main():
+    codec()
+    schemas()
+    d = calls(int(sys.argv[1]) if len(sys.argv) > 1 else 50000)
+    d.addErrback(lambda f: f.printTraceback())
+    d.addBoth(lambda ignored: reactor.stop())
+    reactor.run()
+
+
+
+if __name__ == '__main__':
+    main()
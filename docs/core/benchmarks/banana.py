@@ -1,11 +1,54 @@
 #!/usr/bin/python
 from __future__ import print_function
 
+from io import BytesIO
+
 from timer import timeit
-from twisted.spread.banana import b1282int
+from twisted.internet.protocol import FileWrapper
+from twisted.spread.banana import b1282int, Banana, SIZE_LIMIT
 
 ITERATIONS = 100000
 
 for length in (1, 5, 10, 50, 100):
     elapsed = timeit(b1282int, ITERATIONS, "\xff" * length)
     print("b1282int %3d byte string: %10d cps" % (length, ITERATIONS / elapsed))
+
+
+def connect():
+    """
+    Make a L{Banana} writing to a L{BytesIO} and discarding what it receives.
+    """
+    io = BytesIO()
+    b = Banana()
+    b.makeConnection(FileWrapper(io))
+    b._selectDialect(b"none")
+    b.expressionReceived = lambda result: None
+    return b, io
+
+
+def encode(obj):
+    b, io = connect()
+    b.sendEncoded(obj)
+    return io.getvalue()
+
+
+def decode(data, chunkSize):
+    b, io = connect()
+    for i in range(0, len(data), chunkSize):
+        b.dataReceived(data[i:i + chunkSize])
+
+
+objects = [
+    ("list of 60000 ints", list(range(60000))),
+    ("list of 600 lists", [[i, b"x" * 10, i * 0.5] * 20 for i in range(600)]),
+    ("4MB in 64KB strings", [b"x" * 65536] * 64),
+    ("40MB in strings of SIZE_LIMIT bytes", [b"x" * SIZE_LIMIT] * 64),
+]
+
+for name, obj in objects:
+    print("encode %s: %.3f s" % (name, timeit(encode, 10, obj)))
+    data = encode(obj)
+    for chunkSize in (1024, 65536):
+        elapsed = timeit(decode, 10, data, chunkSize)
+        print("decode %s in %d byte chunks: %.3f s" % (
+            name, chunkSize, elapsed))
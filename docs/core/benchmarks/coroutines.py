@@ -0,0 +1,78 @@
+# Copyright (c) Twisted Matrix Laboratories.
+# See LICENSE for details.
+
+"""
+See how fast coroutines awaiting Deferreds can be run.
+
+This compares L{defer.ensureDeferred}, which runs coroutines with a dedicated
+task, with driving them with the machinery behind L{defer.inlineCallbacks}, as
+L{defer.ensureDeferred} used to.
+
+Usage: python coroutines.py
+"""
+
+from __future__ import print_function
+
+from twisted.internet import defer
+from timer import timeit
+
+drivers = [
+    ('ensureDeferred', defer.ensureDeferred),
+    ('inlineCallbacks', defer._cancellableInlineCallbacks),
+]
+
+
+async def awaitChain(drive, depth, leaf):
+    """
+    Await a chain of C{depth} coroutines, the innermost of which awaits
+    C{leaf}.
+    """
+    if depth:
+        return await drive(awaitChain(drive, depth - 1, leaf))
+    return await leaf
+
+
+async def awaitMany(n):
+    """
+    Await C{n} L{Deferred}s which are fired while the coroutine is suspended.
+    """
+    for i in range(n):
+        d = defer.Deferred()
+        waiting.append(d)
+        await d
+
+
+waiting = []
+
+def deepChain(drive, depth):
+    """
+    Start a chain of C{depth} coroutines waiting on one L{Deferred}, then
+    fire it.
+    """
+    leaf = defer.Deferred()
+    drive(awaitChain(drive, depth, leaf))
+    leaf.callback(None)
+
+
+def suspensions(drive, n):
+    """
+    Run a coroutine which suspends C{n} times.
+    """
+    drive(awaitMany(n))
+    while waiting:
+        waiting.pop().callback(None)
+
+
+def benchmark():
+    for depth in (1, 10, 100):
+        for name, drive in drivers:
+            print('deepChain', name, depth,
+                  timeit(deepChain, 100000 // depth, drive, depth))
+    for n in (1, 10, 100):
+        for name, drive in drivers:
+            print('suspensions', name, n,
+                  timeit(suspensions, 100000 // n, drive, n))
+
+
+if __name__ == '__main__':
+    benchmark()
@@ -0,0 +1,63 @@
+"""
+Measure the round-trip throughput of L{threads.deferToThread}: how many calls
+per second can be handed to the reactor threadpool and have their results
+handed back to the reactor thread, with a number of calls in flight at once.
+
+Each result is handed back with C{callFromThread}, which wakes up the reactor;
+the number of times the reactor's waker was written to shows how well those
+wake-ups are coalesced.
+
+Usage: python deferToThread.py [calls] [concurrency]
+"""
+
+from __future__ import division, print_function
+
+import sys
+import time
+
+from twisted.internet import defer, task, threads
+
+
+
+def work():
+    pass
+
+
+
+@defer.inlineCallbacks
+def benchmark(reactor, calls, concurrency):
+    waker = reactor.waker
+    wakeUp = waker.wakeUp
+    writes = [0]
+    def countingWakeUp():
+        writes[0] += 1
+        return wakeUp()
+    waker.wakeUp = countingWakeUp
+
+    semaphore = defer.DeferredSemaphore(concurrency)
+    before = time.time()
+    yield defer.gatherResults([
+        semaphore.run(threads.deferToThread, work) for i in range(calls)])
+    elapsed = time.time() - before
+    del waker.wakeUp
+    print('%7d calls %4d concurrent: %8.1f calls/sec, %6.2f writes/call' % (
+        calls, concurrency, calls / elapsed, writes[0] / calls))
+
+
+
+@defer.inlineCallbacks
+def main(reactor, calls=20000, concurrency=None):
+    calls = int(calls)
+    if concurrency is None:
+        levels = [1, 10, 100]
+    else:
+        levels = [int(concurrency)]
+    # Warm up, so that the threadpool has started its threads.
+    yield benchmark(reactor, 100, max(levels))
+    for concurrency in levels:
+        yield benchmark(reactor, calls, concurrency)
+
+
+
+if __name__ == '__main__':
+    task.react(main, sys.argv[1:])
@@ -10,6 +10,7 @@ This is mainly useful to compare cdefer.Deferred to defer.Deferred
 from __future__ import print_function
 
 from twisted.internet import defer
+from twisted.internet.defer import passthru
 from twisted.python.compat import range
 from timer import timeit
 
@@ -135,6 +136,48 @@ def pauseUnpause(n):
     d.unpause()
 pauseUnpause = benchmarkNFunc(20, ns)(pauseUnpause)
 
+def succeedAddCallback():
+    """
+    Add a single callback to an already fired deferred, the most common use of
+    a deferred.
+    """
+    defer.succeed(1).addCallback(passthru)
+succeedAddCallback = benchmarkFunc(100000)(succeedAddCallback)
+
+def chained(n):
+    """
+    Fire a deferred whose callbacks each return another deferred, half of them
+    already fired and half of them fired later.
+    """
+    d = defer.Deferred()
+    later = []
+    def returnDeferred(result):
+        if len(later) % 2:
+            return defer.succeed(result)
+        waiting = defer.Deferred()
+        later.append(waiting)
+        return waiting
+    for i in range(n):
+        d.addCallback(returnDeferred)
+    d.callback(1)
+    while later:
+        later.pop(0).callback(1)
+chained = benchmarkNFunc(20, ns)(chained)
+
+@defer.inlineCallbacks
+def _yieldMany(n):
+    for i in range(n):
+        yield defer.succeed(i)
+    defer.returnValue(n)
+
+def inlineCallbacks(n):
+    """
+    Run an inlineCallbacks generator yielding the given number of already
+    fired deferreds.
+    """
+    _yieldMany(n)
+inlineCallbacks = benchmarkNFunc(20, ns)(inlineCallbacks)
+
 def benchmark():
     """
     Run all of the benchmarks registered in the benchmarkFuncs list
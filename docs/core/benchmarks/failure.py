@@ -45,6 +45,27 @@ def fail_str(n):
         except:
             str(failure.Failure())
 
+def fail_vars(n):
+    for i in R:
+        try:
+            eval('deepFailure%d_0' % n)()
+        except:
+            failure.Failure(captureVars=True)
+
+def fail_clean(n):
+    for i in R:
+        try:
+            eval('deepFailure%d_0' % n)()
+        except:
+            failure.Failure().cleanFailure()
+
+def fail_without_traceback(n):
+    for i in R:
+        try:
+            eval('deepFailure%d_0' % n)()
+        except Exception as e:
+            failure.Failure.withoutTraceback(e)
+
 class PythonException(Exception): pass
 
 def fail_easy(n):
@@ -64,5 +85,14 @@ from timer import timeit
 for i in O:
     print('failing', i, timeit(fail, 1, i))
 
+for i in O:
+    print('failing with vars', i, timeit(fail_vars, 1, i))
+
+for i in O:
+    print('failing and cleaning', i, timeit(fail_clean, 1, i))
+
+for i in O:
+    print('failing without traceback', i, timeit(fail_without_traceback, 1, i))
+
 # for i in O:
 #     print('string failing', i, timeit(fail_str, 1, i))
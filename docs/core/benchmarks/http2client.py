@@ -0,0 +1,80 @@
+"""
+Compare fetching many resources from one HTTPS server with L{Agent} speaking
+HTTP/1.1 over a persistent L{HTTPConnectionPool} and speaking HTTP/2, which
+multiplexes the concurrent requests over a single connection.
+
+Usage: python http2client.py [requests] [concurrency]
+"""
+
+from __future__ import division, print_function
+
+import sys
+import time
+
+from twisted.internet import defer, ssl, task
+from twisted.test.test_sslverify import certificatesForAuthorityAndServer
+from twisted.web import client, resource, server, static
+
+BODY = b'x' * 1024
+
+
+
+def fetchAll(reactor, agent, url, requests, concurrency):
+    """
+    Fetch C{url} C{requests} times, at most C{concurrency} at once.
+    """
+    semaphore = defer.DeferredSemaphore(concurrency)
+    def fetch():
+        return agent.request(b'GET', url).addCallback(client.readBody)
+    return defer.gatherResults(
+        [semaphore.run(fetch) for i in range(requests)])
+
+
+
+@defer.inlineCallbacks
+def benchmark(reactor, requests, concurrency, port, authority,
+              acceptableProtocols):
+    pool = client.HTTPConnectionPool(reactor)
+    pool.maxPersistentPerHost = concurrency
+    policy = client.BrowserLikePolicyForHTTPS(
+        trustRoot=authority, acceptableProtocols=acceptableProtocols)
+    agent = client.Agent(reactor, policy, pool=pool)
+    url = ('https://localhost:%d/' % (port,)).encode('ascii')
+
+    # Warm up, so that both runs start with one established connection.
+    yield fetchAll(reactor, agent, url, 1, 1)
+    before = time.time()
+    yield fetchAll(reactor, agent, url, requests, concurrency)
+    elapsed = time.time() - before
+    statistics = pool.statistics()
+    print('%-8s %6d requests %4d concurrent: %8.1f requests/sec, '
+          '%d connections' % (
+              acceptableProtocols[0].decode('ascii'), requests, concurrency,
+              requests / elapsed, statistics.newConnections))
+    yield pool.closeCachedConnections()
+
+
+
+@defer.inlineCallbacks
+def main(reactor, requests=2000, concurrency=50):
+    requests, concurrency = int(requests), int(concurrency)
+    authority, serverCertificate = certificatesForAuthorityAndServer(
+        u'localhost')
+    root = resource.Resource()
+    root.putChild(b'', static.Data(BODY, 'text/plain'))
+    options = ssl.CertificateOptions(
+        privateKey=serverCertificate.privateKey.original,
+        certificate=serverCertificate.original,
+        acceptableProtocols=[b'h2', b'http/1.1'])
+    port = reactor.listenSSL(0, server.Site(root), options,
+                             interface='127.0.0.1')
+
+    for acceptableProtocols in ([b'http/1.1'], [b'h2', b'http/1.1']):
+        yield benchmark(reactor, requests, concurrency,
+                        port.getHost().port, authority, acceptableProtocols)
+    yield port.stopListening()
+
+
+
+if __name__ == '__main__':
+    task.react(main, sys.argv[1:])
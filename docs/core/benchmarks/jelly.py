@@ -0,0 +1,32 @@
+# Copyright (c) Twisted Matrix Laboratories.
+# See LICENSE for details.
+
+"""
+See how fast large nested structures can be jellied and unjellied, with the
+security options L{twisted.spread.pb} uses by default.
+"""
+
+from __future__ import print_function
+
+from timer import timeit
+from twisted.spread.jelly import jelly, unjelly, globalSecurity
+
+ITERATIONS = 10
+
+structures = [
+    ("list of 100000 ints", list(range(100000))),
+    ("list of 10000 lists of ints and strings",
+     [[i, b"x" * 10, i * 0.5, b"y"] for i in range(10000)]),
+    ("list of 10000 dicts",
+     [{b"id": i, b"name": b"x" * 10, b"scores": [i, i + 1, i + 2]}
+      for i in range(10000)]),
+    ("list of 10000 dicts with unicode",
+     [{u"id": i, u"name": u"x" * 10} for i in range(10000)]),
+]
+
+for name, obj in structures:
+    elapsed = timeit(jelly, ITERATIONS, obj, globalSecurity)
+    print("jelly %s: %.3f s" % (name, elapsed))
+    sexp = jelly(obj, globalSecurity)
+    elapsed = timeit(unjelly, ITERATIONS, sexp, globalSecurity)
+    print("unjelly %s: %.3f s" % (name, elapsed))
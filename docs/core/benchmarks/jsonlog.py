@@ -0,0 +1,79 @@
+# Copyright (c) Twisted Matrix Laboratories.
+# See LICENSE for details.
+
+"""
+See how fast log events can be written as JSON with
+L{twisted.logger.jsonFileLogObserver} and read back with
+L{twisted.logger.eventsFromJSONLogFile}, and how fast an hour of them can be
+read back with and without a time index.
+
+Usage: python jsonlog.py [events]
+"""
+
+from __future__ import print_function
+
+import io
+import os
+import sys
+import tempfile
+
+from twisted.logger import (
+    LogLevel, jsonFileLogObserver, eventsFromJSONLogFile, indexJSONLogFile)
+from timer import timeit
+
+
+def write(path, count):
+    """
+    Write C{count} events, a second apart.
+    """
+    with io.open(path, "w", encoding="utf-8") as f:
+        observer = jsonFileLogObserver(f)
+        for i in range(count):
+            observer(dict(
+                log_format="GET {uri} from {peer}: {status}",
+                log_level=LogLevel.info, log_namespace="twisted.benchmark",
+                log_time=i, uri="/index.html", peer="127.0.0.1",
+                status=200))
+
+
+def read(path, **kwargs):
+    """
+    Read the events back.
+    """
+    with io.open(path, "rb") as f:
+        for event in eventsFromJSONLogFile(f, **kwargs):
+            pass
+
+
+def index(path, indexPath):
+    """
+    Index the events.
+    """
+    with io.open(path, "rb") as f:
+        with io.open(indexPath, "w+b") as indexFile:
+            indexJSONLogFile(f, indexFile)
+
+
+def benchmark(count):
+    fd, path = tempfile.mkstemp()
+    os.close(fd)
+    indexPath = path + ".index"
+    try:
+        print('write', count, timeit(write, 1, path, count))
+        print('read', count, timeit(read, 1, path))
+        print('index', count, timeit(index, 1, path, indexPath))
+        since = count // 2
+        print('read an hour', timeit(
+            read, 1, path, since=since, until=since + 3600))
+        with io.open(indexPath, "rb") as indexFile:
+            print('read an hour with index', timeit(
+                read, 1, path, since=since, until=since + 3600,
+                timeIndex=indexFile))
+    finally:
+        for p in (path, indexPath):
+            if os.path.exists(p):
+                os.remove(p)
+
+
+if __name__ == '__main__':
+    benchmark(int(sys.argv[1]) if len(sys.argv) > 1 else 200000)
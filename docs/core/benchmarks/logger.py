@@ -0,0 +1,33 @@
+# Copyright (c) Twisted Matrix Laboratories.
+# See LICENSE for details.
+
+"""
+See how much log statements cost with L{twisted.logger.Logger}, both those
+which an observer filters out by level and those which it takes.
+
+Usage: python logger.py
+"""
+
+from __future__ import print_function
+
+from twisted.logger import (
+    Logger, LogLevel, LogPublisher, FilteringLogObserver,
+    LogLevelFilterPredicate)
+from timer import timeit
+
+
+def discard(event):
+    pass
+
+
+def benchmark():
+    publisher = LogPublisher(FilteringLogObserver(
+        discard, [LogLevelFilterPredicate(LogLevel.info)]))
+    log = Logger(namespace="twisted.benchmark", observer=publisher)
+    for name, method in [('filtered debug', log.debug),
+                         ('logged info', log.info)]:
+        print(name, timeit(method, 100000, "Hello, {name}", name="world"))
+
+
+if __name__ == '__main__':
+    benchmark()
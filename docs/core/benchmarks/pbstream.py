@@ -0,0 +1,77 @@
+# Copyright (c) Twisted Matrix Laboratories.
+# See LICENSE for details.
+
+"""
+See how fast a large byte string can be moved over PB on the loopback
+interface with L{twisted.spread.util.StringPager} and with
+L{twisted.spread.util.StreamSender}.
+
+Usage: python pbstream.py [megabytes]
+"""
+
+from __future__ import print_function
+
+import sys
+import time
+from io import BytesIO
+
+from twisted.internet import reactor, defer
+from twisted.internet.protocol import FileWrapper
+from twisted.spread import pb, util
+
+
+class Root(pb.Root):
+    def __init__(self, data):
+        self.data = data
+
+
+    def remote_pages(self, collector):
+        util.StringPager(collector, self.data, 2 ** 16)
+
+
+    def remote_stream(self, receiver):
+        self.sent = util.StreamSender(receiver).sendBytes(self.data)
+
+
+
+@defer.inlineCallbacks
+def benchmark(size):
+    data = b"x" * size
+    server = Root(data)
+    port = reactor.listenTCP(0, pb.PBServerFactory(server),
+                             interface="127.0.0.1")
+    factory = pb.PBClientFactory()
+    reactor.connectTCP("127.0.0.1", port.getHost().port, factory)
+    root = yield factory.getRootObject()
+
+    start = time.time()
+    pages = yield util.getAllPages(root, "pages")
+    assert len(b"".join(pages)) == size
+    print("StringPager %d MB: %.3f s" % (size // 2 ** 20, time.time() - start))
+
+    start = time.time()
+    received = BytesIO()
+    receiver = util.StreamReceiver(FileWrapper(received))
+    root.callRemote("stream", receiver)
+    count = yield receiver.deferred
+    assert count == size
+    yield server.sent
+    print("StreamSender %d MB: %.3f s" % (size // 2 ** 20,
+                                          time.time() - start))
+
+    factory.disconnect()
+    yield port.stopListening()
+
+
+
+def main():
+    size = int(sys.argv[1]) if len(sys.argv) > 1 else 64
+    d = benchmark(size * 2 ** 20)
+    d.addErrback(lambda f: f.printTraceback())
+    d.addBoth(lambda ignored: reactor.stop())
+    reactor.run()
+
+
+
+if __name__ == '__main__':
+    main()
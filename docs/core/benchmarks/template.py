@@ -0,0 +1,94 @@
+"""
+Measure how many pages a typical L{twisted.web.template} L{Element} can be
+rendered per second: a page of mostly static markup, with a table filled in by
+a renderer.
+
+Usage: python template.py [rows] [seconds]
+"""
+
+from __future__ import division, print_function
+
+import sys
+import time
+
+from twisted.web.template import Element, XMLString, renderer, flatten
+
+TEMPLATE = u"""\
+<html xmlns:t="http://twistedmatrix.com/ns/twisted.web.template/0.1">
+  <head>
+    <title>Benchmark</title>
+    <link rel="stylesheet" href="/style.css" />
+    <script src="/script.js"></script>
+  </head>
+  <body>
+    <div class="header">
+      <h1>A benchmark page</h1>
+      <ul class="menu">
+        <li><a href="/one">One</a></li>
+        <li><a href="/two">Two</a></li>
+        <li><a href="/three">Three</a></li>
+      </ul>
+    </div>
+    <p>Some text &amp; some more text, <em>emphasised</em>.</p>
+    <table>
+      <tr><th>Name</th><th>Value</th></tr>
+      <tr t:render="rows">
+        <td class="name"><t:slot name="name" /></td>
+        <td class="value"><t:slot name="value" /></td>
+      </tr>
+    </table>
+    <div class="footer"><p>Copyright &amp; so on.</p></div>
+  </body>
+</html>
+"""
+
+
+
+class Page(Element):
+    """
+    A page with a table of C{rows} rows.
+    """
+    loader = XMLString(TEMPLATE)
+
+    def __init__(self, rows):
+        Element.__init__(self)
+        self._rows = rows
+
+
+    @renderer
+    def rows(self, request, tag):
+        for i in range(self._rows):
+            yield tag.clone().fillSlots(
+                name=u'row %d' % (i,), value=u'<%d>' % (i * i,))
+
+
+
+def benchmark(rows, duration):
+    """
+    Render pages for C{duration} seconds and report the throughput and the
+    number of writes each page took.
+    """
+    writes = []
+    size = [0]
+    def write(data):
+        writes.append(len(data))
+        size[0] += len(data)
+
+    pages = 0
+    start = time.time()
+    while time.time() - start < duration:
+        flatten(None, Page(rows), write)
+        pages += 1
+    elapsed = time.time() - start
+    print('%5d rows: %8.1f pages/sec, %7d bytes/page, %5.1f writes/page' % (
+        rows, pages / elapsed, size[0] // pages, len(writes) / pages))
+
+
+
+def main(rows=50, duration=5):
+    benchmark(int(rows), float(duration))
+
+
+
+if __name__ == '__main__':
+    main(*sys.argv[1:])
@@ -8,6 +8,9 @@ An asynchronous mapping to U{DB-API
 """
 
 import sys
+import threading
+from collections import deque, OrderedDict
+from time import time
 
 from twisted.internet import threads
 from twisted.python import reflect, log, compat
@@ -21,6 +24,86 @@ class ConnectionLost(Exception):
 
 
 
+class CheckoutTimeout(Exception):
+    """
+    No connection became available within the C{checkout_timeout} of a
+    L{ConnectionPool}.
+    """
+
+
+
+class ConnectionPoolStatistics(object):
+    """
+    Statistics about the connections of a L{ConnectionPool}.
+
+    @ivar name: The name of the pool.
+
+    @ivar openConnectionCount: The number of open connections.
+
+    @ivar idleConnectionCount: The number of open connections not checked
+        out.
+
+    @ivar waitingCount: The number of threads waiting for a connection.
+
+    @ivar checkoutCount: The number of times a connection was checked out.
+
+    @ivar checkoutTimeoutCount: The number of times no connection became
+        available within the C{checkout_timeout}.
+
+    @ivar totalCheckoutWaitTime: The total number of seconds threads have
+        waited for a connection.
+
+    @ivar openedCount: The number of connections opened.
+
+    @ivar closedCount: The number of connections closed, because they were
+        lost, idle for too long or failed validation, or because the pool was
+        closed.
+
+    @ivar statementCacheHits: The number of statements run with a cursor
+        from the statement cache.
+
+    @ivar statementCacheMisses: The number of statements for which a cursor
+        was created and added to the statement cache.
+    """
+
+    def __init__(self, name, openConnectionCount, idleConnectionCount,
+                 waitingCount, checkoutCount, checkoutTimeoutCount,
+                 totalCheckoutWaitTime, openedCount, closedCount,
+                 statementCacheHits, statementCacheMisses):
+        self.name = name
+        self.openConnectionCount = openConnectionCount
+        self.idleConnectionCount = idleConnectionCount
+        self.waitingCount = waitingCount
+        self.checkoutCount = checkoutCount
+        self.checkoutTimeoutCount = checkoutTimeoutCount
+        self.totalCheckoutWaitTime = totalCheckoutWaitTime
+        self.openedCount = openedCount
+        self.closedCount = closedCount
+        self.statementCacheHits = statementCacheHits
+        self.statementCacheMisses = statementCacheMisses
+
+
+
+class _ConnectionRecord(object):
+    """
+    What a L{ConnectionPool} knows about one of its connections.
+
+    @ivar connection: The DB-API connection.
+
+    @ivar lastUsed: When the connection was last checked in.
+
+    @ivar statements: Cursors for the statements last run on the connection
+        by statement, least recently used first.
+    @type statements: L{OrderedDict}
+    """
+
+    def __init__(self, connection, now):
+        self.connection = connection
+        self.lastUsed = now
+        self.statements = OrderedDict()
+
+
+
 class Connection(object):
     """
     A wrapper for a DB-API connection instance.
@@ -142,19 +225,44 @@ class ConnectionPool:
     @type connectionFactory: any callable.
 
     @ivar transactionFactory: factory for transactions, default to
-        L{Transaction}.
+        L{Transaction}.  The statement cache is only used while this is
+        L{Transaction}, so that a custom one sees every statement run.
     @type transactionFactory: any callable
 
     @ivar shutdownID: L{None} or a handle on the shutdown event trigger which
         will be used to stop the connection pool workers when the reactor
         stops.
 
+    @ivar connections: All the open connections, keyed by their C{id}.
+        Connections are not tied to threads: a thread checks one out when it
+        needs one, and checks it in again when it is done with it.
+
     @ivar _reactor: The reactor which will be used to schedule startup and
         shutdown events.
     @type _reactor: L{IReactorCore} provider
+
+    @ivar _condition: A L{threading.Condition} protecting the connection
+        bookkeeping, notified when a connection is checked in or closed.
+
+    @ivar _records: The L{_ConnectionRecord}s of the open connections, keyed
+        by the C{id} of the connections.
+
+    @ivar _idle: The connections not checked out, least recently used first.
+
+    @ivar _checkedOut: The connections checked out, keyed by thread id.
+
+    @ivar _connecting: The number of connections being opened.
+
+    @ivar _checker: The L{task.LoopingCall} checking idle connections, or
+        L{None}.
+
+    @ivar _clock: A hook for testing: a 0-argument callable returning the
+        current time in seconds.
     """
 
-    CP_ARGS = "min max name noisy openfun reconnect good_sql".split()
+    CP_ARGS = ("min max name noisy openfun reconnect good_sql "
+               "checkout_timeout check_interval max_idle "
+               "statement_cache").split()
 
     noisy = False # If true, generate informational log messages
     min = 3 # Minimum number of connections in pool
@@ -163,6 +271,10 @@ class ConnectionPool:
     openfun = None # A function to call on new connections
     reconnect = False # Reconnect when connections fail
     good_sql = 'select 1' # A query which should always succeed
+    checkout_timeout = None # Seconds to wait for a connection, or forever
+    check_interval = None # Seconds between idle connection checks, or never
+    max_idle = None # Seconds an extra connection may stay idle, or forever
+    statement_cache = 0 # Cursors per connection kept for reuse by statement
 
     running = False # True when the pool is operating
     connectionFactory = Connection
@@ -171,6 +283,8 @@ class ConnectionPool:
     # Initialize this to None so it's available in close() even if start()
     # never runs.
     shutdownID = None
+    _checker = None
+    _clock = staticmethod(time)
 
     def __init__(self, dbapiName, *connargs, **connkw):
         """
@@ -206,6 +320,30 @@ class ConnectionPool:
         @param cp_reactor: use this reactor instead of the global reactor
             (added in Twisted 10.2).
         @type cp_reactor: L{IReactorCore} provider
+
+        @param cp_checkout_timeout: how many seconds a thread waits for a
+            connection when all C{cp_max} are checked out, before
+            L{CheckoutTimeout} is raised (default: wait for as long as it
+            takes)
+
+        @param cp_check_interval: how many seconds apart to check the idle
+            connections: each is validated with C{cp_good_sql}, and closed if
+            that fails or, while there are more than C{cp_min} connections,
+            if it has been idle for longer than C{cp_max_idle} (default: do
+            not check)
+
+        @param cp_max_idle: how many seconds a connection may be idle before
+            the check closes it (default: forever)
+
+        @param cp_statement_cache: how many cursors to keep for each
+            connection, each for the statement it last ran, so that
+            L{runQuery}, L{runOperation}, L{runQueryMany} and
+            L{runOperationMany} run the same statement again with the same
+            cursor and drivers can reuse what they prepared for it (default
+            0: do not keep any).  Statements are run on those cursors
+            directly rather than in a C{transactionFactory} transaction, so
+            the cache is not used if C{transactionFactory} is not
+            L{Transaction}.
         """
         self.dbapiName = dbapiName
         self.dbapi = reflect.namedModule(dbapiName)
@@ -233,8 +371,7 @@ class ConnectionPool:
         self.min = min(self.min, self.max)
         self.max = max(self.min, self.max)
 
-        # All connections, hashed on thread id
-        self.connections = {}
+        self._initConnections()
 
         # These are optional so import them here
         from twisted.python import threadpool
@@ -245,6 +382,26 @@ class ConnectionPool:
         self.startID = self._reactor.callWhenRunning(self._start)
 
 
+    def _initConnections(self):
+        """
+        Set up the bookkeeping of the connections of the pool.
+        """
+        self.connections = {}
+        self._condition = threading.Condition()
+        self._records = {}
+        self._idle = deque()
+        self._checkedOut = {}
+        self._connecting = 0
+        self._waiting = 0
+        self._checkoutCount = 0
+        self._checkoutTimeoutCount = 0
+        self._totalCheckoutWaitTime = 0.0
+        self._openedCount = 0
+        self._closedCount = 0
+        self._statementCacheHits = 0
+        self._statementCacheMisses = 0
+
+
     def _start(self):
         self.startID = None
         return self.start()
@@ -262,6 +419,27 @@ class ConnectionPool:
             self.shutdownID = self._reactor.addSystemEventTrigger(
                 'during', 'shutdown', self.finalClose)
             self.running = True
+            if self.check_interval:
+                from twisted.internet import task
+                self._checker = task.LoopingCall(self._checkConnections)
+                self._checker.clock = self._reactor
+                self._checker.start(self.check_interval, now=False)
+
+
+    def statistics(self):
+        """
+        Gather statistics about the connections of this pool.
+
+        @return: The statistics.
+        @rtype: L{ConnectionPoolStatistics}
+        """
+        with self._condition:
+            return ConnectionPoolStatistics(
+                self.name, len(self.connections), len(self._idle),
+                self._waiting, self._checkoutCount,
+                self._checkoutTimeoutCount, self._totalCheckoutWaitTime,
+                self._openedCount, self._closedCount,
+                self._statementCacheHits, self._statementCacheMisses)
 
 
     def runWithConnection(self, func, *args, **kw):
@@ -304,6 +482,8 @@ class ConnectionPool:
             except:
                 log.err(None, "Rollback failed")
             compat.reraise(excValue, excTraceback)
+        finally:
+            self._checkin()
 
 
     def runInteraction(self, interaction, *args, **kw):
@@ -357,7 +537,125 @@ class ConnectionPool:
         @return: a L{Deferred} which will fire the return value of a DB-API
             cursor's 'fetchall' method, or a L{twisted.python.failure.Failure}.
         """
-        return self.runInteraction(self._runQuery, *args, **kw)
+        return self._runStatement(self._runQuery, *args, **kw)
+
+
+    def runQueryMany(self, query, argsList):
+        """
+        Execute an SQL query once for each set of arguments, in a single
+        transaction, and return the results.
+
+        @param query: The SQL query.
+
+        @param argsList: The sets of arguments to pass to the DB-API cursor's
+            C{execute} method with C{query}, each a sequence or mapping
+            according to the C{paramstyle} of the DB-API module.
+
+        @return: a L{Deferred} which will fire with a L{list} of the return
+            values of a DB-API cursor's C{fetchall} method after each query,
+            or a L{twisted.python.failure.Failure}.
+        """
+        return self._runStatement(self._runQueryMany, query, argsList)
+
+
+    def runOperationMany(self, operation, argsList):
+        """
+        Execute an SQL statement with each set of arguments, in a single
+        transaction, with the DB-API cursor's C{executemany} method, and
+        return L{None}.
+
+        @param operation: The SQL statement.
+
+        @param argsList: The sets of arguments, each a sequence or mapping
+            according to the C{paramstyle} of the DB-API module.
+
+        @return: a L{Deferred} which will fire with L{None} or a
+            L{twisted.python.failure.Failure}.
+        """
+        return self._runStatement(self._runOperationMany, operation, argsList)
+
+
+    def _runStatement(self, f, *args, **kw):
+        """
+        Run C{f}, one of the functions running a single statement, with a
+        cursor from the statement cache if it is enabled and
+        C{transactionFactory} is L{Transaction}, or in a transaction made by
+        C{transactionFactory} otherwise.
+
+        @param f: A callable taking a cursor, the statement and further
+            arguments.
+
+        @return: a L{Deferred} which will fire with the result of C{f}.
+        """
+        if (self.statement_cache and args and
+                self.transactionFactory is Transaction):
+            return self.runWithConnection(
+                self._runWithCachedCursor, f, *args, **kw)
+        return self.runInteraction(f, *args, **kw)
+
+
+    def _runWithCachedCursor(self, conn, f, statement, *args, **kw):
+        """
+        Run C{f} with the cursor from the statement cache of C{conn} for
+        C{statement}.
+
+        @param conn: The connection, as made by C{connectionFactory}.
+
+        @param f: A callable taking a cursor, C{statement} and further
+            arguments.
+
+        @param statement: The SQL statement C{f} runs.
+        """
+        connection = getattr(conn, '_connection', conn)
+        cursor = self._cachedCursor(connection, statement)
+        try:
+            return f(cursor, statement, *args, **kw)
+        except:
+            # The cursor may not be usable any more.
+            self._uncacheCursor(connection, statement)
+            raise
+
+
+    def _cachedCursor(self, connection, statement):
+        """
+        Get the cursor for C{statement} from the statement cache of
+        C{connection}, creating it if needed.
+
+        This is called only by the thread which checked out C{connection}.
+
+        @return: The cursor.
+        """
+        record = self._records.get(id(connection))
+        if record is None:
+            return connection.cursor()
+        statements = record.statements
+        cursor = statements.pop(statement, None)
+        with self._condition:
+            if cursor is None:
+                self._statementCacheMisses += 1
+            else:
+                self._statementCacheHits += 1
+        if cursor is None:
+            cursor = connection.cursor()
+            while len(statements) >= self.statement_cache:
+                statements.popitem(last=False)[1].close()
+        statements[statement] = cursor
+        return cursor
+
+
+    def _uncacheCursor(self, connection, statement):
+        """
+        Drop the cursor for C{statement} from the statement cache of
+        C{connection}.
+        """
+        record = self._records.get(id(connection))
+        if record is not None:
+            cursor = record.statements.pop(statement, None)
+            if cursor is not None:
+                try:
+                    cursor.close()
+                except:
+                    pass
 
 
     def runOperation(self, *args, **kw):
@@ -379,7 +677,7 @@ class ConnectionPool:
         @return: a L{Deferred} which will fire with L{None} or a
             L{twisted.python.failure.Failure}.
         """
-        return self.runInteraction(self._runOperation, *args, **kw)
+        return self._runStatement(self._runOperation, *args, **kw)
 
 
     def close(self):
@@ -400,37 +698,139 @@ class ConnectionPool:
         This should only be called by the shutdown trigger.
         """
         self.shutdownID = None
+        if self._checker is not None:
+            if self._checker.running:
+                self._checker.stop()
+            self._checker = None
         self.threadpool.stop()
         self.running = False
-        for conn in self.connections.values():
+        with self._condition:
+            connections = list(self.connections.values())
+            self.connections.clear()
+            self._records.clear()
+            self._idle.clear()
+            self._checkedOut.clear()
+            self._closedCount += len(connections)
+            self._condition.notifyAll()
+        for conn in connections:
             self._close(conn)
-        self.connections.clear()
 
 
     def connect(self):
         """
-        Return a database connection when one becomes available.
+        Check out a database connection, waiting for one to become available
+        if needed.
+
+        Each thread has at most one connection checked out at a time: calling
+        this again before the connection is checked in returns the same
+        connection.  Connections run with L{runWithConnection} and
+        L{runInteraction} are checked in when they are done.
 
         This method blocks and should be run in a thread from the internal
         threadpool. Don't call this method directly from non-threaded code.
-        Using this method outside the external threadpool may exceed the
-        maximum number of connections in the pool.
+
+        @raise CheckoutTimeout: if no connection became available within
+            C{checkout_timeout} seconds.
 
         @return: a database connection from the pool.
         """
-
         tid = self.threadID()
-        conn = self.connections.get(tid)
+        with self._condition:
+            conn = self._checkedOut.get(tid)
+            if conn is not None:
+                return conn
+            conn = self._waitForConnection()
         if conn is None:
-            if self.noisy:
-                log.msg('adbapi connecting: %s' % (self.dbapiName,))
-            conn = self.dbapi.connect(*self.connargs, **self.connkw)
-            if self.openfun is not None:
-                self.openfun(conn)
-            self.connections[tid] = conn
+            try:
+                conn = self._open()
+            except:
+                with self._condition:
+                    self._connecting -= 1
+                    self._condition.notify()
+                raise
+            with self._condition:
+                self._connecting -= 1
+                self.connections[id(conn)] = conn
+                self._records[id(conn)] = _ConnectionRecord(
+                    conn, self._clock())
+                self._openedCount += 1
+                self._checkedOut[tid] = conn
+        return conn
+
+
+    def _waitForConnection(self):
+        """
+        Take an idle connection, or make room for a new one, waiting until
+        either is possible.  Call this with C{_condition} held.
+
+        @raise CheckoutTimeout: if neither became possible within
+            C{checkout_timeout} seconds.
+
+        @return: The connection, checked out by the calling thread, or
+            L{None} if the caller should open a new one.
+        """
+        started = None
+        while True:
+            if self._idle:
+                conn = self._idle.pop()
+                break
+            if len(self.connections) + self._connecting < self.max:
+                self._connecting += 1
+                conn = None
+                break
+            now = self._clock()
+            if started is None:
+                started = now
+            remaining = None
+            if self.checkout_timeout is not None:
+                remaining = started + self.checkout_timeout - now
+                if remaining <= 0:
+                    self._checkoutTimeoutCount += 1
+                    self._totalCheckoutWaitTime += now - started
+                    raise CheckoutTimeout(
+                        "No connection available within %s seconds" % (
+                            self.checkout_timeout,))
+            self._waiting += 1
+            try:
+                self._condition.wait(remaining)
+            finally:
+                self._waiting -= 1
+        self._checkoutCount += 1
+        if started is not None:
+            self._totalCheckoutWaitTime += self._clock() - started
+        if conn is not None:
+            self._checkedOut[self.threadID()] = conn
+        return conn
+
+
+    def _open(self):
+        """
+        Open a new DB-API connection.
+
+        @return: The connection.
+        """
+        if self.noisy:
+            log.msg('adbapi connecting: %s' % (self.dbapiName,))
+        conn = self.dbapi.connect(*self.connargs, **self.connkw)
+        if self.openfun is not None:
+            self.openfun(conn)
         return conn
 
 
+    def _checkin(self):
+        """
+        Check in the connection checked out by the calling thread, if any,
+        making it available to other threads.
+        """
+        with self._condition:
+            conn = self._checkedOut.pop(self.threadID(), None)
+            record = self._records.get(id(conn))
+            if record is not None:
+                record.lastUsed = self._clock()
+                self._idle.append(conn)
+                self._condition.notify()
+
+
     def disconnect(self, conn):
         """
         Disconnect a database connection associated with this pool.
@@ -440,11 +840,88 @@ class ConnectionPool:
         used in normal non-threaded Twisted code.
         """
         tid = self.threadID()
-        if conn is not self.connections.get(tid):
-            raise Exception("wrong connection for thread")
-        if conn is not None:
+        with self._condition:
+            if conn is not self._checkedOut.get(tid):
+                raise Exception("wrong connection for thread")
+            del self._checkedOut[tid]
+            self._forget(conn)
+        self._close(conn)
+
+
+    def _forget(self, conn):
+        """
+        Forget about a connection which is about to be closed.  Call this with
+        C{_condition} held.
+        """
+        self.connections.pop(id(conn), None)
+        self._records.pop(id(conn), None)
+        self._closedCount += 1
+        self._condition.notify()
+
+
+    def _checkConnections(self):
+        """
+        Check the idle connections in a thread of the pool.
+
+        @return: a L{Deferred} which fires when the check is done.
+        """
+        d = threads.deferToThreadPool(self._reactor, self.threadpool,
+                                      self._checkIdleConnections)
+        d.addErrback(log.err, "Checking idle connections failed")
+        return d
+
+
+    def _checkIdleConnections(self):
+        """
+        Close the idle connections which have been idle for longer than
+        C{max_idle} while there are more than C{min} connections, or which
+        fail validation with C{good_sql}.
+        """
+        now = self._clock()
+        with self._condition:
+            # Take the idle connections out of circulation while they are
+            # checked; they still count towards max.
+            idle = list(self._idle)
+            self._idle.clear()
+            spare = len(self.connections) - self.min
+        keep = []
+        for conn in idle:
+            record = self._records.get(id(conn))
+            if record is None:
+                continue
+            if (spare > 0 and self.max_idle is not None and
+                    now - record.lastUsed > self.max_idle):
+                spare -= 1
+                if self.noisy:
+                    log.msg("adbapi closing idle connection")
+            elif self._validate(conn):
+                keep.append(conn)
+                continue
+            with self._condition:
+                self._forget(conn)
             self._close(conn)
-            del self.connections[tid]
+        with self._condition:
+            self._idle.extendleft(reversed(keep))
+            self._condition.notifyAll()
+
+
+    def _validate(self, conn):
+        """
+        Check that C{conn} still works, by running C{good_sql} on it.
+
+        @return: Whether it works.
+        """
+        if self.good_sql is None:
+            return True
+        try:
+            curs = conn.cursor()
+            curs.execute(self.good_sql)
+            curs.close()
+            conn.rollback()
+        except:
+            log.err(None, "Connection validation failed")
+            return False
+        return True
 
 
     def _close(self, conn):
@@ -458,19 +935,22 @@ class ConnectionPool:
 
     def _runInteraction(self, interaction, *args, **kw):
         conn = self.connectionFactory(self)
-        trans = self.transactionFactory(self, conn)
         try:
-            result = interaction(trans, *args, **kw)
-            trans.close()
-            conn.commit()
-            return result
-        except:
-            excType, excValue, excTraceback = sys.exc_info()
+            trans = self.transactionFactory(self, conn)
             try:
-                conn.rollback()
+                result = interaction(trans, *args, **kw)
+                trans.close()
+                conn.commit()
+                return result
             except:
-                log.err(None, "Rollback failed")
-            compat.reraise(excValue, excTraceback)
+                excType, excValue, excTraceback = sys.exc_info()
+                try:
+                    conn.rollback()
+                except:
+                    log.err(None, "Rollback failed")
+                compat.reraise(excValue, excTraceback)
+        finally:
+            self._checkin()
 
 
     def _runQuery(self, trans, *args, **kw):
@@ -482,6 +962,18 @@ class ConnectionPool:
         trans.execute(*args, **kw)
 
 
+    def _runQueryMany(self, trans, query, argsList):
+        results = []
+        for args in argsList:
+            trans.execute(query, args)
+            results.append(trans.fetchall())
+        return results
+
+
+    def _runOperationMany(self, trans, operation, argsList):
+        trans.executemany(operation, argsList)
+
+
     def __getstate__(self):
         return {'dbapiName': self.dbapiName,
                 'min': self.min,
@@ -489,6 +981,10 @@ class ConnectionPool:
                 'noisy': self.noisy,
                 'reconnect': self.reconnect,
                 'good_sql': self.good_sql,
+                'checkout_timeout': self.checkout_timeout,
+                'check_interval': self.check_interval,
+                'max_idle': self.max_idle,
+                'statement_cache': self.statement_cache,
                 'connargs': self.connargs,
                 'connkw': self.connkw}
 
@@ -0,0 +1,109 @@
+# -*- test-case-name: twisted.internet.test.test_processpool -*-
+# Copyright (c) Twisted Matrix Laboratories.
+# See LICENSE for details.
+
+"""
+The main program of the worker processes of a
+L{twisted.internet.processpool.ProcessPool}.
+
+It writes an empty message to file descriptor 4 once it is ready, then reads
+pickled calls from file descriptor 3 and writes their pickled results to file
+descriptor 4, each prefixed with its length as a 32-bit big-endian integer,
+until file descriptor 3 is closed.
+"""
+
+from __future__ import division, absolute_import
+
+import os
+import signal
+import struct
+import traceback
+
+try:
+    import cPickle as pickle
+except ImportError:
+    import pickle
+
+from twisted.internet.processpool import (
+    RemoteError, _WORKER_TASKS, _WORKER_RESULTS)
+
+_prefix = struct.Struct('!I')
+
+
+
+def _readExactly(stream, n):
+    """
+    Read C{n} bytes from C{stream}.
+
+    @return: The bytes read, or L{None} if C{stream} ended first.
+    """
+    data = stream.read(n)
+    while len(data) < n:
+        more = stream.read(n - len(data))
+        if not more:
+            return None
+        data += more
+    return data
+
+
+
+def _runTask(payload):
+    """
+    Run a call.
+
+    @param payload: The pickled function and its positional and keyword
+        arguments.
+    @type payload: L{bytes}
+
+    @return: The pickled 2-tuple of whether the call succeeded, and its
+        result or the exception it raised.
+    @rtype: L{bytes}
+    """
+    try:
+        f, args, kwargs = pickle.loads(payload)
+        outcome = (True, f(*args, **kwargs))
+    except Exception as e:
+        outcome = (False, e)
+        try:
+            # The exception must survive the trip back.
+            pickle.loads(pickle.dumps(e, pickle.HIGHEST_PROTOCOL))
+        except Exception:
+            outcome = (False, RemoteError(repr(e), traceback.format_exc()))
+    try:
+        return pickle.dumps(outcome, pickle.HIGHEST_PROTOCOL)
+    except Exception:
+        return pickle.dumps(
+            (False, RemoteError("The result could not be pickled",
+                                traceback.format_exc())),
+            pickle.HIGHEST_PROTOCOL)
+
+
+
+def main(_fdopen=os.fdopen):
+    """
+    Run calls until there are no more.
+
+    @param _fdopen: If specified, the function to use in place of
+        C{os.fdopen}.
+    """
+    # Interrupting the process group is for the parent to deal with.
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    tasks = _fdopen(_WORKER_TASKS, 'rb')
+    results = _fdopen(_WORKER_RESULTS, 'wb')
+    results.write(_prefix.pack(0))
+    results.flush()
+    while True:
+        header = _readExactly(tasks, _prefix.size)
+        if header is None:
+            break
+        payload = _readExactly(tasks, _prefix.unpack(header)[0])
+        if payload is None:
+            break
+        result = _runTask(payload)
+        results.write(_prefix.pack(len(result)) + result)
+        results.flush()
+
+
+
+if __name__ == '__main__':
+    main()
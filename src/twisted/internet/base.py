@@ -579,10 +579,22 @@ class ReactorBase(PluggableResolverMixin):
             reflect.qual(self.__class__) + " did not implement installWaker")
 
 
+    # Whether wakeUp has been called since runUntilCurrent last started.
+    _wakeUpPending = False
+
     def wakeUp(self):
         """
         Wake up the event loop.
+
+        Wake-ups are coalesced: once the event loop has been woken up, further
+        calls do nothing until it has started to run L{runUntilCurrent}, which
+        runs every call queued with C{callFromThread} so far.  A thread which
+        hands the reactor many calls in quick succession thus costs one wake-up
+        rather than one for each call.
         """
+        if self._wakeUpPending:
+            return
+        self._wakeUpPending = True
         if self.waker:
             self.waker.wakeUp()
         # if the waker isn't installed, the reactor isn't running, and
@@ -875,6 +887,9 @@ class ReactorBase(PluggableResolverMixin):
         """
         Run all pending timed calls.
         """
+        # Clear this before looking at the queue, so that calls queued from
+        # now on wake up the event loop again.
+        self._wakeUpPending = False
         if self.threadCallQueue:
             # Keep track of how many calls we actually make, as we're
             # making them, in case another call is added to the queue
@@ -1013,6 +1028,9 @@ class ReactorBase(PluggableResolverMixin):
         _threadpoolStartupID = None
         # ID of the trigger stopping the threadpool
         threadpoolShutdownID = None
+        # Named threadpools created by getThreadPool, keyed by name, with the
+        # IDs of the triggers starting and stopping them.
+        _namedThreadPools = None
 
         def _initThreads(self):
             self.installNameResolver(_GAIResolver(self, self.getThreadPool))
@@ -1065,10 +1083,54 @@ class ReactorBase(PluggableResolverMixin):
             self.threadpool = None
 
 
-        def getThreadPool(self):
+        def _initNamedThreadPool(self, name):
+            """
+            Create an adaptive threadpool called C{name}, started when the
+            reactor runs and stopped when it shuts down.
+
+            @param name: The name of the threadpool.
+            @type name: native L{str}
+
+            @return: The threadpool.
+            @rtype: L{twisted.python.threadpool.ThreadPool}
+            """
+            from twisted.python import threadpool
+            pool = threadpool.ThreadPool(0, 10, name, adaptive=True)
+            startupID = self.callWhenRunning(pool.start)
+            shutdownID = self.addSystemEventTrigger(
+                'during', 'shutdown', self._stopNamedThreadPool, name)
+            self._namedThreadPools[name] = (pool, startupID, shutdownID)
+            return pool
+
+
+        def _stopNamedThreadPool(self, name):
+            """
+            Stop the threadpool called C{name} created by
+            L{_initNamedThreadPool}, remove its triggers and forget about it.
+
+            @param name: The name of the threadpool.
+            @type name: native L{str}
+            """
+            pool, startupID, shutdownID = self._namedThreadPools.pop(name)
+            for trigger in filter(None, [startupID, shutdownID]):
+                try:
+                    self.removeSystemEventTrigger(trigger)
+                except ValueError:
+                    pass
+            pool.stop()
+
+
+        def getThreadPool(self, name=None):
             """
             See L{twisted.internet.interfaces.IReactorThreads.getThreadPool}.
             """
+            if name is not None:
+                if self._namedThreadPools is None:
+                    self._namedThreadPools = {}
+                entry = self._namedThreadPools.get(name)
+                if entry is None:
+                    return self._initNamedThreadPool(name)
+                return entry[0]
             if self.threadpool is None:
                 self._initThreadPool()
             return self.threadpool
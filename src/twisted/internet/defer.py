@@ -33,6 +33,21 @@ from twisted.logger import Logger
 from twisted.python.deprecate import warnAboutFunction, deprecated
 from twisted.python._oldstyle import _oldStyle
 
+try:
+    from contextvars import copy_context as _copyContext
+except ImportError:
+    class _NoContext(object):
+        """
+        A stand-in for a C{contextvars.Context} on Pythons without
+        C{contextvars}, which runs functions in the current context.
+        """
+        @staticmethod
+        def run(f, *args):
+            return f(*args)
+
+    def _copyContext():
+        return _NoContext
+
 log = Logger()
 
 
@@ -241,24 +256,26 @@ class Deferred:
     @ivar _chainedTo: If this L{Deferred} is waiting for the result of another
         L{Deferred}, this is a reference to the other Deferred.  Otherwise,
         L{None}.
-    """
 
-    called = False
-    paused = False
-    _debugInfo = None
-    _suppressAlreadyCalled = False
+    @ivar callbacks: The callbacks and errbacks not yet run, each as a
+        6-tuple of the callback, its positional and keyword arguments, and the
+        errback, its positional and keyword arguments.  The arguments may be
+        L{None} rather than empty.
+    @type callbacks: L{list} of L{tuple}
+    """
 
-    # Are we currently running a user-installed callback?  Meant to prevent
-    # recursive running of callbacks when a reentrant call to add a callback is
-    # used.
-    _runningCallbacks = False
+    # The attributes every Deferred has get slots, so that they are quick to
+    # access.  Other attributes may still be set, for compatibility, so there
+    # is a __dict__ slot too, but the dictionary itself is only created when
+    # it is first needed.
+    __slots__ = ('callbacks', 'result', 'called', 'paused', '_canceller',
+                 '_debugInfo', '_suppressAlreadyCalled', '_runningCallbacks',
+                 '_chainedTo', '__dict__', '__weakref__')
 
     # Keep this class attribute for now, for compatibility with code that
     # sets it directly.
     debug = False
 
-    _chainedTo = None
-
     def __init__(self, canceller=None):
         """
         Initialize a L{Deferred}.
@@ -285,6 +302,15 @@ class Deferred:
         """
         self.callbacks = []
         self._canceller = canceller
+        self.called = False
+        self.paused = 0
+        self._debugInfo = None
+        self._suppressAlreadyCalled = False
+        # Are we currently running a user-installed callback?  Meant to
+        # prevent recursive running of callbacks when a reentrant call to add a
+        # callback is used.
+        self._runningCallbacks = False
+        self._chainedTo = None
         if self.debug:
             self._debugInfo = DebugInfo()
             self._debugInfo.creator = traceback.format_stack()[:-1]
@@ -303,9 +329,9 @@ class Deferred:
         """
         assert callable(callback)
         assert errback is None or callable(errback)
-        cbs = ((callback, callbackArgs, callbackKeywords),
-               (errback or (passthru), errbackArgs, errbackKeywords))
-        self.callbacks.append(cbs)
+        self.callbacks.append(
+            (callback, callbackArgs, callbackKeywords,
+             errback or passthru, errbackArgs, errbackKeywords))
 
         if self.called:
             self._runCallbacks()
@@ -318,8 +344,11 @@ class Deferred:
 
         See L{addCallbacks}.
         """
-        return self.addCallbacks(callback, callbackArgs=args,
-                                 callbackKeywords=kw)
+        assert callable(callback)
+        self.callbacks.append((callback, args, kw, passthru, None, None))
+        if self.called:
+            self._runCallbacks()
+        return self
 
 
     def addErrback(self, errback, *args, **kw):
@@ -328,9 +357,11 @@ class Deferred:
 
         See L{addCallbacks}.
         """
-        return self.addCallbacks(passthru, errback,
-                                 errbackArgs=args,
-                                 errbackKeywords=kw)
+        assert callable(errback)
+        self.callbacks.append((passthru, None, None, errback, args, kw))
+        if self.called:
+            self._runCallbacks()
+        return self
 
 
     def addBoth(self, callback, *args, **kw):
@@ -340,9 +371,11 @@ class Deferred:
 
         See L{addCallbacks}.
         """
-        return self.addCallbacks(callback, callback,
-                                 callbackArgs=args, errbackArgs=args,
-                                 callbackKeywords=kw, errbackKeywords=kw)
+        assert callable(callback)
+        self.callbacks.append((callback, args, kw, callback, args, kw))
+        if self.called:
+            self._runCallbacks()
+        return self
 
 
     def addTimeout(self, timeout, clock, onTimeoutCancel=None):
@@ -542,7 +575,7 @@ class Deferred:
             if not self.called:
                 # There was no canceller, or the canceller didn't call
                 # callback or errback.
-                self.errback(failure.Failure(CancelledError()))
+                self.errback(failure.Failure.withoutTraceback(CancelledError()))
         elif isinstance(self.result, Deferred):
             # Waiting for another deferred -- cancel it instead.
             self.result.cancel()
@@ -570,10 +603,9 @@ class Deferred:
 
     def _continuation(self):
         """
-        Build a tuple of callback and errback with L{_CONTINUE}.
+        Build a callbacks entry with L{_CONTINUE} as callback and errback.
         """
-        return ((_CONTINUE, (self,), None),
-                (_CONTINUE, (self,), None))
+        return (_CONTINUE, (self,), None, _CONTINUE, (self,), None)
 
 
     def _runCallbacks(self):
@@ -606,6 +638,18 @@ class Deferred:
             # Don't recursively run callbacks
             return
 
+        # The common cases of a result and a single callback, or of no
+        # callbacks at all, can often be handled without the bookkeeping needed
+        # for chained Deferreds.
+        resumed = False
+        if len(self.callbacks) < 2 and not self.paused:
+            ran = self._runOneCallback()
+            if ran is None:
+                return
+            # If the callback ran, the callbacks added meanwhile are run next,
+            # as they would have been had this Deferred been paused meanwhile.
+            resumed = ran
+
         # Keep track of all the Deferreds encountered while propagating results
         # up a chain.  The way a Deferred gets onto this stack is by having
         # added its _continuation() to the callbacks list of a second Deferred
@@ -616,18 +660,31 @@ class Deferred:
         while chain:
             current = chain[-1]
 
-            if current.paused:
+            if current.paused and not resumed:
                 # This Deferred isn't going to produce a result at all.  All the
                 # Deferreds up the chain waiting on it will just have to...
                 # wait.
                 return
 
+            resumed = False
             finished = True
             current._chainedTo = None
-            while current.callbacks:
-                item = current.callbacks.pop(0)
-                callback, args, kw = item[
-                    isinstance(current.result, failure.Failure)]
+            callbacks = current.callbacks
+            # Callbacks are consumed by index, and removed from the list once
+            # this loop stops, rather than popped one at a time from the front
+            # of the list.  Callbacks may be added to the list while running.
+            index = 0
+            while index < len(callbacks):
+                item = callbacks[index]
+                index += 1
+                if isinstance(current.result, failure.Failure):
+                    callback = item[3]
+                    args = item[4]
+                    kw = item[5]
+                else:
+                    callback = item[0]
+                    args = item[1]
+                    kw = item[2]
                 args = args or ()
                 kw = kw or {}
 
@@ -687,30 +744,104 @@ class Deferred:
                             if current.result._debugInfo is not None:
                                 current.result._debugInfo.failResult = None
                             current.result = resultResult
+            del callbacks[:index]
 
             if finished:
                 # As much of the callback chain - perhaps all of it - as can be
                 # processed right now has been.  The current Deferred is waiting on
                 # another Deferred or for more callbacks.  Before finishing with it,
                 # make sure its _debugInfo is in the proper state.
-                if isinstance(current.result, failure.Failure):
-                    # Stash the Failure in the _debugInfo for unhandled error
-                    # reporting.
-                    current.result.cleanFailure()
-                    if current._debugInfo is None:
-                        current._debugInfo = DebugInfo()
-                    current._debugInfo.failResult = current.result
-                else:
-                    # Clear out any Failure in the _debugInfo, since the result
-                    # is no longer a Failure.
-                    if current._debugInfo is not None:
-                        current._debugInfo.failResult = None
+                current._updateDebugInfo()
 
                 # This Deferred is done, pop it from the chain and move back up
                 # to the Deferred which supplied us with our result.
                 chain.pop()
 
 
+    def _runOneCallback(self):
+        """
+        Run the only callback of this L{Deferred}, if any, as L{_runCallbacks}
+        would, but without keeping track of a chain of L{Deferred}s.
+
+        @return: L{None} if all the callbacks have been run, or this
+            L{Deferred} is now waiting on another one.  Otherwise,
+            L{_runCallbacks} has more to do: C{True} if callbacks were added
+            while the callback ran, C{False} if it did not run because it is
+            the continuation of another L{Deferred}.
+        @rtype: L{bool} or L{None}
+        """
+        self._chainedTo = None
+        callbacks = self.callbacks
+        if callbacks:
+            result = self.result
+            item = callbacks[0]
+            if isinstance(result, failure.Failure):
+                callback = item[3]
+                args = item[4]
+                kw = item[5]
+            else:
+                callback = item[0]
+                args = item[1]
+                kw = item[2]
+            if callback is _CONTINUE:
+                return False
+            del callbacks[0]
+            self._runningCallbacks = True
+            try:
+                result = callback(result, *(args or ()), **(kw or {}))
+                if result is self:
+                    warnAboutFunction(
+                        callback,
+                        "Callback returned the Deferred "
+                        "it was attached to; this breaks the "
+                        "callback chain and will raise an "
+                        "exception in the future.")
+            except:
+                result = failure.Failure(captureVars=self.debug)
+            finally:
+                self._runningCallbacks = False
+            self.result = result
+            if isinstance(result, Deferred):
+                resultResult = getattr(result, 'result', _NO_RESULT)
+                if (resultResult is _NO_RESULT or
+                        isinstance(resultResult, Deferred) or result.paused):
+                    # Wait for its result, as in _runCallbacks.
+                    self.pause()
+                    self._chainedTo = result
+                    result.callbacks.append(self._continuation())
+                    self._updateDebugInfo()
+                    return None
+                # Take its result.
+                result.result = None
+                if result._debugInfo is not None:
+                    result._debugInfo.failResult = None
+                self.result = resultResult
+            if callbacks:
+                return True
+        self._updateDebugInfo()
+        return None
+
+
+    def _updateDebugInfo(self):
+        """
+        Record a L{Failure} left as the result of this L{Deferred} once its
+        callbacks have run, so that it is reported if it is never handled, or
+        forget about it if the result is no longer a L{Failure}.
+        """
+        result = self.result
+        if isinstance(result, failure.Failure):
+            # Stash the Failure in the _debugInfo for unhandled error
+            # reporting.
+            result.cleanFailure()
+            if self._debugInfo is None:
+                self._debugInfo = DebugInfo()
+            self._debugInfo.failResult = result
+        elif self._debugInfo is not None:
+            # Clear out any Failure in the _debugInfo, since the result is no
+            # longer a Failure.
+            self._debugInfo.failResult = None
+
+
     def __str__(self):
         """
         Return a string representation of this C{Deferred}.
@@ -865,6 +996,123 @@ def _cancelledToTimedOutError(value, timeout):
 
 
 
+# The type of "async def" coroutines; nothing is an instance of an empty tuple
+# of types, on Pythons which do not have them.
+_CoroutineType = getattr(types, "CoroutineType", ())
+
+
+
+class _CoroutineTask(object):
+    """
+    Drive a coroutine which awaits L{Deferred}s, and fire a L{Deferred} with
+    its result.
+
+    Each time the coroutine awaits a L{Deferred} which has no result yet,
+    L{_CoroutineTask._run} is added to that L{Deferred} as both its callback
+    and errback, and the coroutine is resumed with the result it is called
+    with; no other L{Deferred} or callback is created to wait on it.
+
+    Like an C{asyncio} task, every step of the coroutine runs in a copy of the
+    C{contextvars} context current when the task was created, so that context
+    variables set by the coroutine are seen by the rest of it but not by the
+    code which happens to resume it.
+
+    @ivar deferred: The L{Deferred} fired with the result of the coroutine.
+        Cancelling it cancels the L{Deferred} the coroutine is awaiting,
+        which raises L{CancelledError} in the coroutine, unless the awaited
+        L{Deferred} handles its cancellation differently.
+    @type deferred: L{Deferred}
+
+    @ivar _coro: The coroutine.
+
+    @ivar _context: The context the coroutine runs in.
+
+    @ivar _waitingOn: The L{Deferred} the coroutine last awaited, or L{None}.
+    """
+
+    __slots__ = ('deferred', '_coro', '_context', '_waitingOn')
+
+    def __init__(self, coro):
+        """
+        Start running C{coro}.
+
+        @param coro: The coroutine.
+        """
+        self._coro = coro
+        self._context = _copyContext()
+        self._waitingOn = None
+        self.deferred = Deferred(self._cancel)
+        self._run(None)
+
+
+    @failure._extraneous
+    def _run(self, result):
+        """
+        Resume the coroutine with a result until it awaits a L{Deferred} which
+        has no result yet, or finishes.  This is also the callback and errback
+        added to the awaited L{Deferred}s.
+
+        @param result: The result to resume the coroutine with: a
+            L{failure.Failure} is raised in it.
+        """
+        coro = self._coro
+        run = self._context.run
+        while 1:
+            try:
+                if isinstance(result, failure.Failure):
+                    result = run(result.throwExceptionIntoGenerator, coro)
+                else:
+                    result = run(coro.send, result)
+            except StopIteration as e:
+                self.deferred.callback(e.value)
+                return
+            except:
+                self.deferred.errback()
+                return
+
+            if isinstance(result, Deferred):
+                self._waitingOn = result
+                result.addCallbacks(self._run, self._run)
+                return
+
+
+    def _cancel(self, deferred):
+        """
+        Cancel the L{Deferred} the coroutine is awaiting, letting the
+        coroutine decide what its own result is.
+
+        @param deferred: L{_CoroutineTask.deferred}.
+        """
+        # Deferred.cancel would fire the deferred with a CancelledError right
+        # after this returns, so give it a new Deferred to wait on instead.
+        deferred.callbacks, callbacks = [], deferred.callbacks
+        deferred.addErrback(self._handleCancel)
+        deferred.callbacks.extend(callbacks)
+        deferred.errback(failure.Failure.withoutTraceback(
+            _InternalInlineCallbacksCancelledError()))
+
+
+    def _handleCancel(self, result):
+        """
+        Chain L{_CoroutineTask.deferred} to a new L{Deferred} which will be
+        fired with the result of the coroutine, and cancel the L{Deferred} the
+        coroutine is awaiting.
+
+        @param result: An L{_InternalInlineCallbacksCancelledError} from
+            L{_CoroutineTask._cancel}.
+
+        @return: The new L{Deferred}.
+        """
+        result.trap(_InternalInlineCallbacksCancelledError)
+        self.deferred = Deferred(self._cancel)
+        # If the coroutine is running rather than awaiting, this Deferred has
+        # already fired, and cancelling it does nothing.
+        if self._waitingOn is not None:
+            self._waitingOn.cancel()
+        return self.deferred
+
+
+
 def ensureDeferred(coro):
     """
     Schedule the execution of a coroutine that awaits/yields from L{Deferred}s,
@@ -902,13 +1150,18 @@ def ensureDeferred(coro):
 
     @rtype: L{Deferred}
     """
+    if isinstance(coro, _CoroutineType):
+        return _CoroutineTask(coro).deferred
+
     from types import GeneratorType
 
     if version_info >= (3, 4, 0):
         from asyncio import iscoroutine
 
-        if iscoroutine(coro) or isinstance(coro, GeneratorType):
+        if isinstance(coro, GeneratorType):
             return _cancellableInlineCallbacks(coro)
+        if iscoroutine(coro):
+            return _CoroutineTask(coro).deferred
 
     if not isinstance(coro, Deferred):
         raise ValueError("%r is not a coroutine or a Deferred" % (coro,))
@@ -1897,6 +2150,303 @@ class DeferredQueue(object):
 
 
 
+class ParallelExhausted(Exception):
+    """
+    Every result of a L{parallel} map has been retrieved.
+    """
+
+
+
+class ParallelResults(object):
+    """
+    The results of a L{parallel} map, in the order they are to be retrieved
+    in.
+
+    A token of a L{DeferredSemaphore} is held for every item from the time
+    it is taken from the iterable until its result is retrieved, so that at
+    most C{limit} items are running or waiting to be retrieved at any time.
+    Items are taken from the iterable by a L{task.Cooperator
+    <twisted.internet.task.Cooperator>} task, which waits for a token before
+    taking each one.
+
+    @ivar _fn: The function applied to each item.
+
+    @ivar _ordered: Whether results are retrieved in the order of their items,
+        rather than in the order they are ready in.
+
+    @ivar _semaphore: The L{DeferredSemaphore} limiting the number of items
+        being worked on.
+
+    @ivar _running: A L{dict} mapping the index of each item being worked on
+        to the L{Deferred} for its result.
+
+    @ivar _ready: A L{dict} mapping the position in which results which are
+        ready are to be retrieved to the results.
+
+    @ivar _readyCount: The number of results which have been ready so far.
+
+    @ivar _nextIndex: The position of the next result to be retrieved.
+
+    @ivar _waiting: The L{Deferred}s returned by L{get} which have not fired
+        yet, in the order L{get} returned them in.
+
+    @ivar _finished: L{None} while items are still being taken from the
+        iterable, C{True} once they have all been taken, or a
+        L{failure.Failure} if taking them failed or if this map was
+        cancelled.
+
+    @ivar _cancelled: Whether this map has been cancelled.
+
+    @ivar _task: The L{CooperativeTask
+        <twisted.internet.task.CooperativeTask>} taking items from the
+        iterable.
+    """
+
+    def __init__(self, iterable, limit, fn, ordered, cooperate):
+        """
+        Start the map.  See L{parallel}.
+
+        @param cooperate: The C{cooperate} method of the
+            L{task.Cooperator <twisted.internet.task.Cooperator>} to take
+            items from the iterable with.
+        """
+        self._fn = fn
+        self._ordered = ordered
+        self._semaphore = DeferredSemaphore(limit)
+        self._running = {}
+        self._ready = {}
+        self._readyCount = 0
+        self._nextIndex = 0
+        self._waiting = []
+        self._finished = None
+        self._cancelled = False
+        self._task = cooperate(self._work(iter(iterable)))
+        self._task.whenDone().addCallbacks(
+            self._iterableExhausted, self._iterableFailed)
+
+
+    def _work(self, iterator):
+        """
+        Take items from an iterator and start working on them, waiting for a
+        token of the semaphore before taking each one.
+
+        @param iterator: The iterator.
+
+        @return: An iterator, yielding once for each item it starts working
+            on, and yielding L{Deferred}s firing when it can take another one.
+        """
+        index = 0
+        while True:
+            acquired = self._semaphore.acquire()
+            if not acquired.called:
+                yield acquired
+            try:
+                item = next(iterator)
+            except StopIteration:
+                self._semaphore.release()
+                return
+            result = maybeDeferred(self._fn, item)
+            self._running[index] = result
+            result.addBoth(self._itemDone, index)
+            index += 1
+            yield None
+
+
+    def _itemDone(self, result, index):
+        """
+        Keep the result of an item until it is retrieved.
+
+        @param result: The result of the item.
+
+        @param index: The index of the item.
+        """
+        del self._running[index]
+        if not self._ordered:
+            index = self._readyCount
+        self._readyCount += 1
+        if not self._cancelled:
+            self._ready[index] = result
+            self._deliver()
+
+
+    def _iterableExhausted(self, ignored):
+        """
+        All of the items have been taken from the iterable.
+        """
+        self._finished = True
+        self._deliver()
+
+
+    def _iterableFailed(self, reason):
+        """
+        Taking an item from the iterable failed, or this map was cancelled.
+
+        @param reason: The L{failure.Failure}.
+        """
+        if self._finished is None:
+            self._finished = reason
+            self._deliver()
+
+
+    def _deliver(self):
+        """
+        Fire the L{Deferred}s returned by L{get} with the results that are
+        ready for them.
+        """
+        waiting = self._waiting
+        ready = self._ready
+        while waiting and self._nextIndex in ready:
+            result = ready.pop(self._nextIndex)
+            self._nextIndex += 1
+            self._semaphore.release()
+            d = waiting.pop(0)
+            if isinstance(result, failure.Failure):
+                d.errback(result)
+            else:
+                d.callback(result)
+        if (waiting and self._finished is not None and
+                not self._running and not ready):
+            finished = self._finished
+            if isinstance(finished, failure.Failure):
+                if not self._cancelled:
+                    # The failure of the iterable is only reported once.
+                    self._finished = True
+                waiting.pop(0).errback(finished)
+                self._deliver()
+            else:
+                while waiting:
+                    waiting.pop(0).errback(ParallelExhausted())
+
+
+    def _cancelGet(self, d):
+        """
+        Forget about a L{Deferred} returned by L{get}, as it has been
+        cancelled.
+
+        @param d: The L{Deferred}.
+        """
+        self._waiting.remove(d)
+
+
+    def get(self):
+        """
+        Retrieve the next result.
+
+        @return: A L{Deferred} which fires with the next result, or fails with
+            the L{failure.Failure} the function failed with for that item.
+            If taking an item from the iterable failed, it fails with that
+            failure once the results of all the previous items have been
+            retrieved.  Once every result has been retrieved, it fails with
+            L{ParallelExhausted}, or L{CancelledError} if this map was
+            cancelled.
+        """
+        d = Deferred(self._cancelGet)
+        self._waiting.append(d)
+        self._deliver()
+        return d
+
+
+    def cancel(self):
+        """
+        Stop taking items from the iterable, cancel the L{Deferred}s for the
+        items being worked on, discard the results which have not been
+        retrieved, and fail every L{Deferred} returned by L{get}, now and
+        later, with L{CancelledError}.
+        """
+        finished = self._finished
+        self._cancelled = True
+        self._finished = failure.Failure.withoutTraceback(CancelledError())
+        if finished is None:
+            self._task.stop()
+        self._ready.clear()
+        for d in list(self._running.values()):
+            d.cancel()
+        self._deliver()
+
+
+    def __aiter__(self):
+        """
+        Iterate over the results with C{async for}.
+        """
+        return self
+
+
+    def __anext__(self):
+        """
+        Retrieve the next result with C{async for}.
+
+        @return: A L{Deferred}, as from L{get}, which fails with
+            C{StopAsyncIteration} instead of L{ParallelExhausted}.
+        """
+        return self.get().addErrback(self._stopAsyncIteration)
+
+
+    def _stopAsyncIteration(self, reason):
+        """
+        Turn L{ParallelExhausted} into C{StopAsyncIteration}.
+        """
+        reason.trap(ParallelExhausted)
+        raise StopAsyncIteration()
+
+
+
+def parallel(iterable, limit, fn, ordered=True, cooperator=None):
+    """
+    Apply C{fn} to every item of C{iterable}, working on at most C{limit} of
+    them at once.
+
+    Unlike L{DeferredList} or L{gatherResults} with a L{DeferredSemaphore},
+    this does not create a L{Deferred} for every item up front: items are
+    only taken from C{iterable} as there is room for them, and the results
+    are retrieved one at a time from the returned L{ParallelResults}, so
+    that memory use depends on C{limit} rather than on the number of items::
+
+        @inlineCallbacks
+        def fetchAll(urls):
+            results = parallel(urls, 20, fetch)
+            while True:
+                try:
+                    page = yield results.get()
+                except ParallelExhausted:
+                    break
+                process(page)
+
+    On Python 3, C{async for page in parallel(urls, 20, fetch)} works too.
+
+    An item counts towards C{limit} until its result is retrieved, so a slow
+    consumer slows down the map rather than letting results pile up.
+
+    @param iterable: The items.  They are taken from it in a
+        L{task.Cooperator <twisted.internet.task.Cooperator>} task, so a
+        large or slow iterable does not hold up the reactor.
+
+    @param limit: The maximum number of items being worked on or with results
+        waiting to be retrieved.
+    @type limit: L{int}
+
+    @param fn: A one-argument callable, called with each item, which may
+        return a L{Deferred}.
+
+    @param ordered: If C{True}, results are retrieved in the order of the
+        items they are for.  If C{False}, they are retrieved in the order they
+        are ready in.
+    @type ordered: L{bool}
+
+    @param cooperator: The L{task.Cooperator
+        <twisted.internet.task.Cooperator>} to take items with, or L{None}
+        for the global one.
+
+    @return: The results.
+    @rtype: L{ParallelResults}
+    """
+    if cooperator is None:
+        from twisted.internet.task import cooperate
+    else:
+        cooperate = cooperator.cooperate
+    return ParallelResults(iterable, limit, fn, ordered, cooperate)
+
+
+
 class AlreadyTryingToLockError(Exception):
     """
     Raised when L{DeferredFilesystemLock.deferUntilLocked} is called twice on a
@@ -2014,6 +2564,7 @@ __all__ = ["Deferred", "DeferredList", "succeed", "fail", "FAILURE", "SUCCESS",
            "returnValue",
            "DeferredLock", "DeferredSemaphore", "DeferredQueue",
            "DeferredFilesystemLock", "AlreadyTryingToLockError",
-           "CancelledError",
+           "CancelledError", "parallel", "ParallelResults",
+           "ParallelExhausted",
           ]
 
@@ -1379,11 +1379,21 @@ class IReactorThreads(IReactorFromThreads, IReactorInThreads):
     Internally, this should use a thread pool and dispatch methods to them.
     """
 
-    def getThreadPool():
+    def getThreadPool(name=None):
         """
         Return the threadpool used by L{IReactorInThreads.callInThread}.
         Create it first if necessary.
 
+        @param name: If not L{None}, return the threadpool with this name
+            instead, creating it first if necessary.  Named threadpools are
+            separate from the one used by L{IReactorInThreads.callInThread},
+            so that work of one kind, such as blocking database queries,
+            cannot hold up work of another.  They are adaptive (see
+            L{twisted.python.threadpool.ThreadPool.adaptive}), and like the
+            default threadpool they are started when the reactor runs and
+            stopped when it shuts down.
+        @type name: native L{str}
+
         @rtype: L{twisted.python.threadpool.ThreadPool}
         """
 
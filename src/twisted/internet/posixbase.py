@@ -11,6 +11,7 @@ from __future__ import division, absolute_import
 import socket
 import errno
 import os
+import struct
 import sys
 
 from zope.interface import implementer, classImplements
@@ -164,7 +165,10 @@ class _UnixWaker(_FDWaker):
     This class provides a simple interface to wake up the event loop.
 
     This is used by threads or signals to wake up the event loop.
+
+    @ivar _wakeUpData: What to write to wake up the event loop.
     """
+    _wakeUpData = b'x'
 
     def wakeUp(self):
         """Write one byte to the pipe, and flush it.
@@ -173,7 +177,7 @@ class _UnixWaker(_FDWaker):
         # between EINTR (try again) and EAGAIN (do nothing).
         if self.o is not None:
             try:
-                util.untilConcludes(os.write, self.o, b'x')
+                util.untilConcludes(os.write, self.o, self._wakeUpData)
             except OSError as e:
                 # XXX There is no unit test for raising the exception
                 # for other errnos. See #4285.
@@ -182,7 +186,37 @@ class _UnixWaker(_FDWaker):
 
 
 
-if platformType == 'posix':
+class _EventFDWaker(_UnixWaker):
+    """
+    A L{_UnixWaker} using an I{eventfd} instead of a pipe: a single file
+    descriptor, which is cheaper to create, write and read.
+    """
+    _wakeUpData = struct.pack('=Q', 1)
+
+    def __init__(self, reactor):
+        """Initialize.
+        """
+        self.reactor = reactor
+        self.i = self.o = os.eventfd(0, os.EFD_NONBLOCK | os.EFD_CLOEXEC)
+        self.fileno = lambda: self.i
+
+
+    def connectionLost(self, reason):
+        """Close my eventfd.
+        """
+        if self.i is None:
+            return
+        try:
+            os.close(self.i)
+        except IOError:
+            pass
+        del self.i, self.o
+
+
+
+if platformType == 'posix' and platform.isLinux() and hasattr(os, 'eventfd'):
+    _Waker = _EventFDWaker
+elif platformType == 'posix':
     _Waker = _UnixWaker
 else:
     # Primarily Windows and Jython.
@@ -0,0 +1,628 @@
+# -*- test-case-name: twisted.internet.test.test_processpool -*-
+# Copyright (c) Twisted Matrix Laboratories.
+# See LICENSE for details.
+
+"""
+A pool of worker processes to run CPU-bound functions in, without blocking
+the reactor or contending for the GIL.
+
+    from twisted.internet.processpool import ProcessPool
+
+    pool = ProcessPool(reactor, size=4, maxTasksPerWorker=1000, timeout=30)
+    pool.start()
+    d = pool.deferToProcess(resizeImage, data, (640, 480))
+
+Functions, their arguments and their results are passed between processes
+with L{pickle}, so functions must be defined at the top level of a module
+the workers can import, and arguments and results must be picklable.
+"""
+
+from __future__ import division, absolute_import
+
+import os
+import sys
+from collections import deque
+
+try:
+    import cPickle as pickle
+except ImportError:
+    import pickle
+
+from twisted.internet import defer, error
+from twisted.internet.protocol import ProcessProtocol
+from twisted.logger import Logger
+from twisted.protocols.basic import Int32StringReceiver
+from twisted.python.failure import Failure
+
+__all__ = [
+    'ProcessPool', 'RemoteError', 'WorkerLost', 'PoolStopped',
+]
+
+
+
+# File descriptors of the pipes carrying tasks to a worker and results back.
+_WORKER_TASKS = 3
+
+_WORKER_RESULTS = 4
+
+
+
+class RemoteError(Exception):
+    """
+    A function run by a L{ProcessPool} raised an exception, or returned a
+    result, which could not be passed back from the worker.
+
+    @ivar remoteTraceback: The traceback of the exception, formatted by the
+        worker.
+    @type remoteTraceback: native L{str}
+    """
+
+    def __init__(self, message, remoteTraceback):
+        Exception.__init__(self, message, remoteTraceback)
+        self.remoteTraceback = remoteTraceback
+
+
+
+class WorkerLost(Exception):
+    """
+    The worker process running a task exited before it finished the task.
+    """
+
+
+
+class PoolStopped(Exception):
+    """
+    A task was given to a L{ProcessPool} which has been stopped.
+    """
+
+
+
+def _cpuCount():
+    """
+    @return: The number of CPUs, or 1 if that cannot be found out.
+    """
+    try:
+        import multiprocessing
+        return multiprocessing.cpu_count()
+    except (ImportError, NotImplementedError):
+        return 1
+
+
+
+class _Task(object):
+    """
+    A call of a function waiting for, or running in, a worker.
+
+    @ivar payload: The pickled function and its arguments.
+
+    @ivar deferred: The L{defer.Deferred} to fire with the result.
+
+    @ivar worker: The L{_Worker} running the task, or L{None}.
+
+    @ivar timeoutCall: The L{IDelayedCall} timing the task out, or L{None}.
+    """
+    worker = None
+    timeoutCall = None
+
+    def __init__(self, payload, canceller):
+        """
+        @param payload: The initial value of C{payload}.
+
+        @param canceller: A 1-argument callable to call with the task when
+            its L{defer.Deferred} is cancelled.
+        """
+        self.payload = payload
+        self.deferred = defer.Deferred(lambda d: canceller(self))
+
+
+
+class _Channel(Int32StringReceiver):
+    """
+    Length-prefixed framing of the messages exchanged with a worker.
+
+    @ivar _worker: The L{_Worker} the messages come from.
+    """
+    MAX_LENGTH = 2 ** 32 - 1
+
+    def __init__(self, worker):
+        self._worker = worker
+
+
+    def stringReceived(self, data):
+        self._worker.resultReceived(data)
+
+
+
+class _ChildTransport(object):
+    """
+    The transport of a L{_Channel}, writing to the pipe carrying tasks to a
+    worker.
+
+    @ivar _process: The L{IProcessTransport} of the worker.
+    """
+
+    def __init__(self, process):
+        self._process = process
+
+
+    def write(self, data):
+        self._process.writeToChild(_WORKER_TASKS, data)
+
+
+    def writeSequence(self, seq):
+        self._process.writeToChild(_WORKER_TASKS, b''.join(seq))
+
+
+    def loseConnection(self):
+        self._process.loseConnection()
+
+
+
+class _Worker(ProcessProtocol):
+    """
+    The protocol of one worker process of a L{ProcessPool}.
+
+    @ivar pool: The L{ProcessPool}.
+
+    @ivar task: The L{_Task} being run, or L{None}.
+
+    @ivar tasksDone: The number of tasks this worker has finished.
+
+    @ivar retired: Whether the worker has been told to exit.
+
+    @ivar killed: Whether the worker has been killed.
+
+    @ivar ready: Whether the worker process has started, and said it is ready
+        for tasks.
+    """
+    task = None
+    tasksDone = 0
+    ready = False
+    retired = False
+    killed = False
+
+    def __init__(self, pool):
+        self.pool = pool
+        self._channel = _Channel(self)
+
+
+    def connectionMade(self):
+        self._channel.makeConnection(_ChildTransport(self.transport))
+
+
+    def run(self, task):
+        """
+        Give a task to the worker.
+
+        @param task: The task.
+        @type task: L{_Task}
+        """
+        self.task = task
+        task.worker = self
+        self._channel.sendString(task.payload)
+
+
+    def resultReceived(self, data):
+        """
+        The worker finished its task.
+
+        @param data: The pickled result.
+        @type data: L{bytes}
+        """
+        if not self.ready:
+            # The first message, which is empty, says the worker process has
+            # started.
+            self.ready = True
+            self.pool._workerReady(self)
+            return
+        task, self.task = self.task, None
+        if task is None:
+            # The task was cancelled or timed out; the worker is being
+            # killed.
+            return
+        task.worker = None
+        self.tasksDone += 1
+        self.pool._taskDone(self, task, data)
+
+
+    def retire(self):
+        """
+        Let the worker exit, by closing the pipe it reads tasks from.
+        """
+        self.retired = True
+        self.transport.closeChildFD(_WORKER_TASKS)
+
+
+    def kill(self):
+        """
+        Kill the worker.
+        """
+        self.killed = True
+        try:
+            self.transport.signalProcess('KILL')
+        except error.ProcessExitedAlready:
+            pass
+
+
+    def childDataReceived(self, childFD, data):
+        if childFD == _WORKER_RESULTS:
+            self._channel.dataReceived(data)
+
+
+    def processEnded(self, reason):
+        self.pool._workerEnded(self, reason)
+
+
+
+class ProcessPool(object):
+    """
+    A pool of worker processes to run functions in.
+
+    The workers are started by L{ProcessPool.start}, each running one task at
+    a time once it is ready; tasks given to the pool when all workers are busy
+    or starting wait for one.  L{ProcessPool.timeout} only counts the time a
+    task spends in a worker which is ready, not the time it takes to start
+    one.
+    Once started, the pool is stopped before the reactor shuts down.
+
+    @ivar size: The number of worker processes.
+    @type size: L{int}
+
+    @ivar maxTasksPerWorker: The number of tasks after which a worker process
+        is replaced with a new one, or L{None} to keep workers for as long as
+        the pool runs.
+    @type maxTasksPerWorker: L{int} or L{None}
+
+    @ivar timeout: The number of seconds after which a task which has not
+        finished fails with L{defer.TimeoutError}, and the worker process
+        running it is killed and replaced; or L{None} to let tasks run for
+        as long as they take.
+    @type timeout: L{float} or L{None}
+
+    @ivar maxPending: The number of tasks which may wait for a worker, beyond
+        which further tasks fail at once with L{defer.QueueOverflow}; or
+        L{None} to let any number of tasks wait.
+    @type maxPending: L{int} or L{None}
+
+    @ivar minRestartDelay: The delay before replacing the first of a series of
+        workers which failed to start, in seconds.  A worker process which
+        exits unexpectedly before it is ready is replaced after this delay,
+        doubled each time a replacement fails in turn, up to
+        L{ProcessPool.maxRestartDelay}; once the pool is stopped, such a
+        worker is not replaced, and the tasks left waiting fail with
+        L{WorkerLost}.
+    @type minRestartDelay: L{float}
+
+    @ivar maxRestartDelay: The longest delay before replacing a worker which
+        failed to start, in seconds.
+    @type maxRestartDelay: L{float}
+
+    @ivar started: Whether the pool has been started.
+
+    @ivar stopped: Whether the pool has been stopped.
+
+    @ivar _workers: All the running L{_Worker}s.
+
+    @ivar _idle: The L{_Worker}s waiting for a task.
+
+    @ivar _pending: The L{_Task}s waiting for a worker.
+
+    @ivar _stopDeferreds: The L{defer.Deferred}s returned by
+        L{ProcessPool.stop}, to fire when all workers have exited.
+
+    @ivar _restarts: The L{IDelayedCall}s which will replace workers which
+        failed to start.
+
+    @ivar _restartDelay: The delay before replacing the next worker which
+        fails to start, or L{None} if the last worker started successfully.
+
+    @ivar _shutdownID: The ID of the trigger stopping the pool before the
+        reactor shuts down.
+    """
+    started = False
+    stopped = False
+    minRestartDelay = 1
+    maxRestartDelay = 60
+    _shutdownID = None
+    _restartDelay = None
+    _log = Logger()
+
+    def __init__(self, reactor, size=None, maxTasksPerWorker=None,
+                 timeout=None, maxPending=None):
+        """
+        @param reactor: The reactor to spawn the worker processes with.
+        @type reactor: L{IReactorProcess} and L{IReactorTime} provider
+
+        @param size: The initial value of L{ProcessPool.size}; by default,
+            the number of CPUs.
+
+        @param maxTasksPerWorker: The initial value of
+            L{ProcessPool.maxTasksPerWorker}.
+
+        @param timeout: The initial value of L{ProcessPool.timeout}.
+
+        @param maxPending: The initial value of L{ProcessPool.maxPending}.
+        """
+        if size is None:
+            size = _cpuCount()
+        self._reactor = reactor
+        self.size = size
+        self.maxTasksPerWorker = maxTasksPerWorker
+        self.timeout = timeout
+        self.maxPending = maxPending
+        self._workers = set()
+        self._idle = deque()
+        self._pending = deque()
+        self._stopDeferreds = []
+        self._restarts = set()
+
+
+    def start(self):
+        """
+        Start the worker processes.
+        """
+        self.started = True
+        self._shutdownID = self._reactor.addSystemEventTrigger(
+            'before', 'shutdown', self.stop)
+        for i in range(self.size):
+            self._spawnWorker()
+
+
+    def stop(self):
+        """
+        Stop the pool: let the workers finish the tasks already given to the
+        pool, then let them exit.
+
+        @return: A L{defer.Deferred} firing with L{None} when all the worker
+            processes have exited.
+        """
+        if self._shutdownID is not None:
+            try:
+                self._reactor.removeSystemEventTrigger(self._shutdownID)
+            except ValueError:
+                pass
+            self._shutdownID = None
+        self.stopped = True
+        if not self.started:
+            while self._pending:
+                self._pending.popleft().deferred.errback(PoolStopped())
+        while self._idle:
+            self._idle.popleft().retire()
+        if not self._pending:
+            while self._restarts:
+                self._restarts.pop().cancel()
+        if not (self._workers or self._restarts):
+            return defer.succeed(None)
+        d = defer.Deferred()
+        self._stopDeferreds.append(d)
+        return d
+
+
+    def deferToProcess(self, f, *args, **kwargs):
+        """
+        Call C{f} with the given arguments in a worker process.
+
+        @param f: The function to call, which must be picklable.
+
+        @return: A L{defer.Deferred} firing with the result of C{f}, or
+            failing with the exception it raised, L{RemoteError} if that
+            cannot be passed back, L{defer.TimeoutError} if it took longer
+            than L{ProcessPool.timeout}, L{WorkerLost} if the worker exited
+            before it finished, L{defer.QueueOverflow} if too many tasks are
+            waiting already, or L{PoolStopped} if the pool has been stopped.
+            Cancelling it before it fires kills the worker running C{f}, if
+            it is running.
+        """
+        if self.stopped:
+            return defer.fail(PoolStopped())
+        if (self.maxPending is not None and not self._idle and
+                len(self._pending) >= self.maxPending):
+            return defer.fail(defer.QueueOverflow())
+        payload = pickle.dumps((f, args, kwargs), pickle.HIGHEST_PROTOCOL)
+        task = _Task(payload, self._cancel)
+        if self._idle:
+            self._run(self._idle.popleft(), task)
+        else:
+            self._pending.append(task)
+        return task.deferred
+
+
+    def _cancel(self, task):
+        """
+        Cancel a task: forget about it if it is waiting, kill its worker if
+        it is running.
+
+        @type task: L{_Task}
+        """
+        if task.worker is None:
+            self._pending.remove(task)
+        else:
+            self._abandon(task)
+
+
+    def _abandon(self, task):
+        """
+        Kill the worker running C{task} without waiting for its result.
+
+        @param task: The task.
+        @type task: L{_Task}
+        """
+        worker = task.worker
+        worker.task = task.worker = None
+        if task.timeoutCall is not None and task.timeoutCall.active():
+            task.timeoutCall.cancel()
+        worker.kill()
+
+
+    def _timedOut(self, task):
+        """
+        A task ran for longer than L{ProcessPool.timeout}.
+
+        @param task: The task.
+        @type task: L{_Task}
+        """
+        task.timeoutCall = None
+        self._abandon(task)
+        task.deferred.errback(defer.TimeoutError(
+            "Task did not finish within %s seconds" % (self.timeout,)))
+
+
+    def _run(self, worker, task):
+        """
+        Run a task in a worker.
+
+        @type worker: L{_Worker}
+
+        @type task: L{_Task}
+        """
+        if self.timeout is not None:
+            task.timeoutCall = self._reactor.callLater(
+                self.timeout, self._timedOut, task)
+        worker.run(task)
+
+
+    def _spawnWorker(self):
+        """
+        Start a worker process, which is given tasks once it is ready.
+        """
+        worker = _Worker(self)
+        self._workers.add(worker)
+        env = os.environ.copy()
+        env['PYTHONPATH'] = os.pathsep.join(sys.path)
+        args = [sys.executable, '-m', 'twisted.internet._processworker']
+        self._reactor.spawnProcess(
+            worker, sys.executable, args, env=env,
+            childFDs={0: 'w', 1: 1, 2: 2,
+                      _WORKER_TASKS: 'w', _WORKER_RESULTS: 'r'})
+
+
+    def _workerReady(self, worker):
+        """
+        A worker process has started.
+
+        @type worker: L{_Worker}
+        """
+        self._restartDelay = None
+        self._workerIdle(worker)
+
+
+    def _workerIdle(self, worker):
+        """
+        Give a worker which is not busy the next task waiting, if there is
+        one, or let it exit if it is no longer wanted.
+
+        @type worker: L{_Worker}
+        """
+        if self._pending:
+            self._run(worker, self._pending.popleft())
+        elif self.stopped:
+            worker.retire()
+        else:
+            self._idle.append(worker)
+
+
+    def _taskDone(self, worker, task, data):
+        """
+        A worker finished a task.
+
+        @type worker: L{_Worker}
+
+        @type task: L{_Task}
+
+        @param data: The pickled result: a 2-tuple of whether the task
+            succeeded, and its result or the exception it raised.
+        @type data: L{bytes}
+        """
+        if task.timeoutCall is not None:
+            task.timeoutCall.cancel()
+            task.timeoutCall = None
+        if (self.maxTasksPerWorker is not None and
+                worker.tasksDone >= self.maxTasksPerWorker):
+            worker.retire()
+            if not self.stopped:
+                self._spawnWorker()
+        else:
+            self._workerIdle(worker)
+        try:
+            succeeded, result = pickle.loads(data)
+        except Exception:
+            task.deferred.errback(RemoteError(
+                "The result could not be unpickled", Failure().getTraceback()))
+            return
+        if succeeded:
+            task.deferred.callback(result)
+        else:
+            task.deferred.errback(result)
+
+
+    def _workerEnded(self, worker, reason):
+        """
+        A worker process exited.
+
+        @type worker: L{_Worker}
+
+        @param reason: Why it exited.
+        @type reason: L{Failure}
+        """
+        self._workers.discard(worker)
+        if worker in self._idle:
+            self._idle.remove(worker)
+        if not (worker.retired or worker.killed):
+            self._log.failure("Worker process exited unexpectedly", reason)
+        task, worker.task = worker.task, None
+        if task is not None:
+            if task.timeoutCall is not None:
+                task.timeoutCall.cancel()
+            task.deferred.errback(WorkerLost(reason.value))
+        failed = not (worker.ready or worker.retired or worker.killed)
+        # Replace workers which did not exit because they were asked to, and
+        # keep at least one while there are tasks to run.
+        if self._pending and not (self._workers or self._restarts):
+            if failed and self.stopped:
+                # Workers cannot be started; do not keep the pool from
+                # stopping.
+                while self._pending:
+                    self._pending.popleft().deferred.errback(
+                        WorkerLost(reason.value))
+            else:
+                self._replaceWorker(failed)
+        elif not worker.retired and not self.stopped:
+            self._replaceWorker(failed)
+        self._checkStopped()
+
+
+    def _replaceWorker(self, failed):
+        """
+        Start a worker process in place of one which exited, after a delay if
+        it failed to start.
+
+        @param failed: Whether the worker which exited failed to start.
+        @type failed: L{bool}
+        """
+        if not failed:
+            self._spawnWorker()
+            return
+        delay = self._restartDelay
+        if delay is None:
+            delay = self.minRestartDelay
+        self._restartDelay = min(delay * 2, self.maxRestartDelay)
+
+        def restart():
+            self._restarts.remove(call)
+            if self.stopped and not self._pending:
+                self._checkStopped()
+            else:
+                self._spawnWorker()
+        call = self._reactor.callLater(delay, restart)
+        self._restarts.add(call)
+
+
+    def _checkStopped(self):
+        """
+        Fire the L{defer.Deferred}s returned by L{ProcessPool.stop} if the
+        pool is stopped and all the workers have exited.
+        """
+        if self.stopped and not (self._workers or self._restarts):
+            stopDeferreds, self._stopDeferreds = self._stopDeferreds, []
+            for d in stopDeferreds:
+                d.callback(None)
@@ -382,6 +382,86 @@ class DelayedCallDebugTests(DelayedCallMixin, TestCase):
 
 
 
+class CountingWaker(object):
+    """
+    A waker which counts how often it is asked to wake up the reactor.
+
+    @ivar wakeUps: The number of calls to L{CountingWaker.wakeUp}.
+    """
+    wakeUps = 0
+
+    def wakeUp(self):
+        self.wakeUps += 1
+
+
+
+class WakeUpReactor(ReactorBase):
+    """
+    A L{ReactorBase} with a L{CountingWaker}.
+    """
+
+    def installWaker(self):
+        self.waker = CountingWaker()
+
+
+
+class WakeUpTests(TestCase):
+    """
+    Tests for L{ReactorBase.wakeUp}.
+    """
+
+    def test_coalesced(self):
+        """
+        L{ReactorBase.callFromThread} wakes up the reactor once for any number
+        of calls queued before L{ReactorBase.runUntilCurrent} starts, and
+        again for calls queued after.
+        """
+        reactor = WakeUpReactor()
+        calls = []
+        for i in range(3):
+            reactor.callFromThread(calls.append, i)
+        self.assertEqual(reactor.waker.wakeUps, 1)
+        reactor.runUntilCurrent()
+        self.assertEqual(calls, [0, 1, 2])
+        reactor.callFromThread(calls.append, 3)
+        self.assertEqual(reactor.waker.wakeUps, 2)
+        reactor.runUntilCurrent()
+        self.assertEqual(calls, [0, 1, 2, 3])
+
+
+    def test_queuedWhileRunning(self):
+        """
+        A call queued with L{ReactorBase.callFromThread} by a call being run
+        from the queue wakes up the reactor again, so that it is run by the
+        next L{ReactorBase.runUntilCurrent}.
+        """
+        reactor = WakeUpReactor()
+        calls = []
+        def first():
+            calls.append(1)
+            reactor.callFromThread(calls.append, 2)
+        reactor.callFromThread(first)
+        reactor.runUntilCurrent()
+        self.assertEqual(calls, [1])
+        self.assertEqual(reactor.waker.wakeUps, 2)
+        reactor.runUntilCurrent()
+        self.assertEqual(calls, [1, 2])
+
+
+    def test_wakeUpWithoutCalls(self):
+        """
+        A wake-up for which no call was queued does not stop a later call
+        from waking up the reactor, once L{ReactorBase.runUntilCurrent} has
+        run.
+        """
+        reactor = WakeUpReactor()
+        reactor.wakeUp()
+        reactor.runUntilCurrent()
+        reactor.callFromThread(lambda: None)
+        self.assertEqual(reactor.waker.wakeUps, 2)
+
+
+
 class TestSpySignalCapturingReactor(ReactorBase):
 
     """
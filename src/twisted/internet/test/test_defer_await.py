@@ -8,12 +8,17 @@ Tests for C{await} support in Deferreds.
 
 import types
 
+try:
+    import contextvars
+except ImportError:
+    contextvars = None
+
 from twisted.python.failure import Failure
 from twisted.internet.defer import (
-    Deferred, maybeDeferred, ensureDeferred, fail
+    Deferred, maybeDeferred, ensureDeferred, fail, CancelledError, parallel
 )
 from twisted.trial.unittest import TestCase
-from twisted.internet.task import Clock
+from twisted.internet.task import Clock, Cooperator
 
 class SampleException(Exception):
     """
@@ -217,3 +222,151 @@ class AwaitTests(TestCase):
 
         res = self.successResultOf(d)
         self.assertEqual(res, "bye")
+
+
+    def test_awaitNonDeferred(self):
+        """
+        A coroutine wrapped with L{ensureDeferred} that awaits something
+        yielding a value which is not a L{Deferred} is resumed with that
+        value.
+        """
+        @types.coroutine
+        def yieldValue(value):
+            return (yield value)
+
+        async def run():
+            return await yieldValue(3)
+
+        self.assertEqual(self.successResultOf(ensureDeferred(run())), 3)
+
+
+    def test_cancel(self):
+        """
+        Cancelling the L{Deferred} returned by L{ensureDeferred} cancels the
+        L{Deferred} the coroutine is awaiting, raising L{CancelledError} in
+        the coroutine.
+        """
+        awaited = Deferred()
+        raised = []
+
+        async def run():
+            try:
+                await awaited
+            except CancelledError as e:
+                raised.append(e)
+                raise
+
+        d = ensureDeferred(run())
+        d.cancel()
+        self.failureResultOf(d, CancelledError)
+        self.assertTrue(awaited.called)
+        self.assertEqual(len(raised), 1)
+
+
+    def test_cancelHandled(self):
+        """
+        A coroutine wrapped with L{ensureDeferred} can handle its cancellation
+        and carry on; the L{Deferred} returned by L{ensureDeferred} then fires
+        with its result.
+        """
+        second = Deferred()
+
+        async def run():
+            try:
+                await Deferred()
+            except CancelledError:
+                pass
+            return await second
+
+        d = ensureDeferred(run())
+        d.cancel()
+        self.assertNoResult(d)
+        second.callback("done")
+        self.assertEqual(self.successResultOf(d), "done")
+
+
+    def test_cancelCustomCanceller(self):
+        """
+        If the L{Deferred} a coroutine wrapped with L{ensureDeferred} is
+        awaiting fires with a result when it is cancelled, the coroutine is
+        resumed with that result.
+        """
+        awaited = Deferred(lambda d: d.callback("cancelled"))
+
+        async def run():
+            return await awaited
+
+        d = ensureDeferred(run())
+        d.cancel()
+        self.assertEqual(self.successResultOf(d), "cancelled")
+
+
+    def test_deepAwaitChain(self):
+        """
+        A chain of coroutines wrapped with L{ensureDeferred} awaiting each
+        other all finish, in order, when the innermost L{Deferred} fires.
+        """
+        leaf = Deferred()
+        finished = []
+
+        async def run(depth):
+            if depth:
+                result = await ensureDeferred(run(depth - 1)) + 1
+            else:
+                result = await leaf
+            finished.append(depth)
+            return result
+
+        d = ensureDeferred(run(50))
+        self.assertEqual(finished, [])
+        leaf.callback(0)
+        self.assertEqual(finished, list(range(51)))
+        self.assertEqual(self.successResultOf(d), 50)
+
+
+    def test_parallelAsyncFor(self):
+        """
+        The results of L{parallel} can be iterated over with C{async for}.
+        """
+        clock = Clock()
+        cooperator = Cooperator(scheduler=lambda f: clock.callLater(0, f))
+
+        async def run():
+            results = []
+            async for result in parallel(
+                    range(5), 2, lambda item: item * 2,
+                    cooperator=cooperator):
+                results.append(result)
+            return results
+
+        d = ensureDeferred(run())
+        clock.advance(0)
+        self.assertEqual(self.successResultOf(d), [0, 2, 4, 6, 8])
+
+
+    def test_contextvars(self):
+        """
+        A coroutine wrapped with L{ensureDeferred} runs in a copy of the
+        context it was started in: variables it sets are seen by the rest of
+        the coroutine, whoever resumes it, but not outside of it.
+        """
+        var = contextvars.ContextVar("var", default="unset")
+        var.set("outer")
+        awaited = Deferred()
+        seen = []
+
+        async def run():
+            seen.append(var.get())
+            var.set("inner")
+            await awaited
+            seen.append(var.get())
+
+        d = ensureDeferred(run())
+        self.assertEqual(var.get(), "outer")
+        contextvars.Context().run(awaited.callback, None)
+        self.successResultOf(d)
+        self.assertEqual(seen, ["outer", "inner"])
+        self.assertEqual(var.get(), "outer")
+
+    if contextvars is None:
+        test_contextvars.skip = "contextvars is not available."
@@ -7,9 +7,12 @@ Tests for L{twisted.internet.posixbase} and supporting code.
 
 from __future__ import division, absolute_import
 
+import os
+
 from twisted.trial.unittest import TestCase
 from twisted.internet.defer import Deferred
-from twisted.internet.posixbase import PosixReactorBase, _Waker
+from twisted.internet.posixbase import (
+    PosixReactorBase, _Waker, _EventFDWaker)
 from twisted.internet.protocol import ServerFactory
 
 skipSockets = None
@@ -102,6 +105,42 @@ class PosixReactorBaseTests(TestCase):
 
 
 
+class EventFDWakerTests(TestCase):
+    """
+    Tests for L{_EventFDWaker}.
+    """
+
+    if not hasattr(os, 'eventfd'):
+        skip = "eventfd is not available"
+
+    def test_wakeUp(self):
+        """
+        L{_EventFDWaker.wakeUp} makes its file descriptor readable, until
+        L{_EventFDWaker.doRead} is called.
+        """
+        waker = _EventFDWaker(None)
+        self.addCleanup(waker.connectionLost, None)
+        self.assertRaises(BlockingIOError, os.eventfd_read, waker.fileno())
+        waker.wakeUp()
+        waker.wakeUp()
+        self.assertEqual(os.eventfd_read(waker.fileno()), 2)
+        waker.wakeUp()
+        waker.doRead()
+        self.assertRaises(BlockingIOError, os.eventfd_read, waker.fileno())
+
+
+    def test_connectionLost(self):
+        """
+        L{_EventFDWaker.connectionLost} closes its file descriptor, once.
+        """
+        waker = _EventFDWaker(None)
+        fd = waker.fileno()
+        waker.connectionLost(None)
+        self.assertRaises(OSError, os.fstat, fd)
+        waker.connectionLost(None)
+
+
+
 class TCPPortTests(TestCase):
     """
     Tests for L{twisted.internet.tcp.Port}.
@@ -0,0 +1,457 @@
+# Copyright (c) Twisted Matrix Laboratories.
+# See LICENSE for details.
+
+"""
+Tests for L{twisted.internet.processpool}.
+"""
+
+from __future__ import division, absolute_import
+
+import os
+import time
+
+from twisted.internet import defer, reactor
+from twisted.internet.error import ProcessTerminated
+from twisted.internet.interfaces import IReactorProcess
+from twisted.internet.processpool import (
+    ProcessPool, RemoteError, WorkerLost, PoolStopped, _WORKER_RESULTS)
+from twisted.internet.testing import MemoryReactorClock
+from twisted.python.failure import Failure
+from twisted.python.runtime import platform
+from twisted.trial.unittest import TestCase
+
+
+
+def add(a, b=0):
+    """
+    Add two numbers, in a worker.
+    """
+    return a + b
+
+
+
+def getPID():
+    """
+    @return: The process ID of the worker.
+    """
+    return os.getpid()
+
+
+
+def raiseValueError(message):
+    """
+    Raise a L{ValueError}.
+    """
+    raise ValueError(message)
+
+
+
+class UnpicklableError(Exception):
+    """
+    An exception which cannot be unpickled.
+    """
+    def __init__(self, first, second):
+        Exception.__init__(self, first + second)
+
+
+
+def raiseUnpicklableError():
+    """
+    Raise an L{UnpicklableError}.
+    """
+    raise UnpicklableError("un", "picklable")
+
+
+
+def returnUnpicklable():
+    """
+    Return something which cannot be pickled.
+    """
+    return lambda: None
+
+
+
+def sleep(seconds):
+    """
+    Block for C{seconds} seconds.
+    """
+    time.sleep(seconds)
+    return seconds
+
+
+
+def exit():
+    """
+    Exit the worker.
+    """
+    os._exit(1)
+
+
+
+class ProcessPoolTests(TestCase):
+    """
+    Tests for L{ProcessPool}.
+    """
+
+    if IReactorProcess(reactor, None) is None:
+        skip = "Reactor does not support processes"
+    elif platform.isWindows():
+        skip = "ProcessPool needs childFDs, which Windows does not support"
+
+    def startPool(self, **kwargs):
+        """
+        Start a L{ProcessPool} of one worker which is stopped at the end of
+        the test.
+        """
+        kwargs.setdefault('size', 1)
+        pool = ProcessPool(reactor, **kwargs)
+        pool.start()
+        self.addCleanup(pool.stop)
+        return pool
+
+
+    @defer.inlineCallbacks
+    def test_deferToProcess(self):
+        """
+        L{ProcessPool.deferToProcess} calls the function with the given
+        arguments in another process, and fires with its result.
+        """
+        pool = self.startPool()
+        result = yield pool.deferToProcess(add, 1, b=2)
+        self.assertEqual(result, 3)
+        pid = yield pool.deferToProcess(getPID)
+        self.assertNotEqual(pid, os.getpid())
+
+
+    @defer.inlineCallbacks
+    def test_concurrency(self):
+        """
+        Tasks given to a L{ProcessPool} are spread over its workers.
+        """
+        pool = self.startPool(size=2)
+        pids = yield defer.gatherResults([
+            pool.deferToProcess(getPID),
+            pool.deferToProcess(getPID)])
+        self.assertEqual(len(set(pids)), 2)
+
+
+    @defer.inlineCallbacks
+    def test_exception(self):
+        """
+        The L{defer.Deferred} returned by L{ProcessPool.deferToProcess} fails
+        with the exception raised by the function.
+        """
+        pool = self.startPool()
+        e = yield self.assertFailure(
+            pool.deferToProcess(raiseValueError, "bad"), ValueError)
+        self.assertEqual(e.args, ("bad",))
+
+
+    @defer.inlineCallbacks
+    def test_unpicklableException(self):
+        """
+        If the exception raised by the function cannot be passed back, the
+        L{defer.Deferred} fails with L{RemoteError} instead, which has the
+        traceback of the exception.
+        """
+        pool = self.startPool()
+        e = yield self.assertFailure(
+            pool.deferToProcess(raiseUnpicklableError), RemoteError)
+        self.assertIn("UnpicklableError", e.remoteTraceback)
+
+
+    @defer.inlineCallbacks
+    def test_unpicklableResult(self):
+        """
+        If the result of the function cannot be passed back, the
+        L{defer.Deferred} fails with L{RemoteError}.
+        """
+        pool = self.startPool()
+        yield self.assertFailure(
+            pool.deferToProcess(returnUnpicklable), RemoteError)
+        result = yield pool.deferToProcess(add, 1)
+        self.assertEqual(result, 1)
+
+
+    @defer.inlineCallbacks
+    def test_maxTasksPerWorker(self):
+        """
+        A worker is replaced after it has run
+        L{ProcessPool.maxTasksPerWorker} tasks.
+        """
+        pool = self.startPool(maxTasksPerWorker=2)
+        pids = []
+        for i in range(3):
+            pids.append((yield pool.deferToProcess(getPID)))
+        self.assertEqual(pids[0], pids[1])
+        self.assertNotEqual(pids[1], pids[2])
+
+
+    @defer.inlineCallbacks
+    def test_timeout(self):
+        """
+        A task running for longer than L{ProcessPool.timeout} fails with
+        L{defer.TimeoutError}, and its worker is replaced.
+        """
+        pool = self.startPool(timeout=0.5)
+        pid = yield pool.deferToProcess(getPID)
+        yield self.assertFailure(
+            pool.deferToProcess(sleep, 30), defer.TimeoutError)
+        newPID = yield pool.deferToProcess(getPID)
+        self.assertNotEqual(pid, newPID)
+
+
+    @defer.inlineCallbacks
+    def test_maxPending(self):
+        """
+        When L{ProcessPool.maxPending} tasks are waiting for a worker,
+        L{ProcessPool.deferToProcess} fails at once with
+        L{defer.QueueOverflow}.
+        """
+        pool = self.startPool(maxPending=1)
+        # Wait for the worker to be ready, so the next task starts running.
+        yield pool.deferToProcess(add, 0)
+        running = pool.deferToProcess(add, 1)
+        waiting = pool.deferToProcess(add, 2)
+        self.failureResultOf(
+            pool.deferToProcess(add, 3), defer.QueueOverflow)
+        results = yield defer.gatherResults([running, waiting])
+        self.assertEqual(results, [1, 2])
+
+
+    @defer.inlineCallbacks
+    def test_cancelWaiting(self):
+        """
+        Cancelling a task waiting for a worker means it is not run.
+        """
+        pool = self.startPool()
+        running = pool.deferToProcess(getPID)
+        waiting = pool.deferToProcess(exit)
+        waiting.cancel()
+        self.failureResultOf(waiting, defer.CancelledError)
+        pid = yield running
+        self.assertEqual((yield pool.deferToProcess(getPID)), pid)
+
+
+    @defer.inlineCallbacks
+    def test_cancelRunning(self):
+        """
+        Cancelling a running task kills its worker, which is replaced.
+        """
+        pool = self.startPool()
+        pid = yield pool.deferToProcess(getPID)
+        d = pool.deferToProcess(sleep, 30)
+        d.cancel()
+        self.failureResultOf(d, defer.CancelledError)
+        newPID = yield pool.deferToProcess(getPID)
+        self.assertNotEqual(pid, newPID)
+
+
+    @defer.inlineCallbacks
+    def test_workerLost(self):
+        """
+        If a worker exits while running a task, the task fails with
+        L{WorkerLost}, the exit is logged, and the worker is replaced.
+        """
+        pool = self.startPool()
+        yield self.assertFailure(pool.deferToProcess(exit), WorkerLost)
+        self.assertEqual(len(self.flushLoggedErrors(ProcessTerminated)), 1)
+        result = yield pool.deferToProcess(add, 1)
+        self.assertEqual(result, 1)
+
+
+    @defer.inlineCallbacks
+    def test_stop(self):
+        """
+        L{ProcessPool.stop} lets the tasks given to the pool finish, and
+        returns a L{defer.Deferred} firing when all the workers have exited.
+        Tasks given to the pool afterwards fail with L{PoolStopped}.
+        """
+        pool = self.startPool(size=2)
+        tasks = [pool.deferToProcess(add, i) for i in range(4)]
+        yield pool.stop()
+        self.assertEqual([self.successResultOf(d) for d in tasks],
+                         [0, 1, 2, 3])
+        self.assertEqual(pool._workers, set())
+        self.failureResultOf(pool.deferToProcess(add, 1), PoolStopped)
+
+
+    def test_stopBeforeStart(self):
+        """
+        Stopping a pool which was never started fails the tasks given to it
+        with L{PoolStopped}.
+        """
+        pool = ProcessPool(reactor, size=1)
+        d = pool.deferToProcess(add, 1)
+        self.successResultOf(pool.stop())
+        self.failureResultOf(d, PoolStopped)
+
+
+    def test_stopBeforeShutdown(self):
+        """
+        L{ProcessPool.start} arranges for the pool to be stopped before the
+        reactor shuts down, and L{ProcessPool.stop} undoes that.
+        """
+        pool = self.startPool()
+        triggers = reactor._eventTriggers['shutdown'].before
+        self.assertIn((pool.stop, (), {}), triggers)
+        d = pool.stop()
+        self.assertNotIn((pool.stop, (), {}), triggers)
+        return d
+
+
+
+class FakeProcess(object):
+    """
+    A fake L{IProcessTransport} of a worker process.
+
+    @ivar written: The bytes written to the worker process.
+    """
+
+    def __init__(self):
+        self.written = []
+
+
+    def writeToChild(self, childFD, data):
+        self.written.append(data)
+
+
+    def closeChildFD(self, childFD):
+        pass
+
+
+    def signalProcess(self, signalID):
+        pass
+
+
+    def loseConnection(self):
+        pass
+
+
+
+class ProcessReactor(MemoryReactorClock):
+    """
+    A fake reactor which pretends to spawn processes.
+
+    @ivar workers: The process protocols of the processes spawned.
+    """
+
+    def __init__(self):
+        MemoryReactorClock.__init__(self)
+        self.workers = []
+
+
+    def spawnProcess(self, processProtocol, executable, args=(), env={},
+                     path=None, uid=None, gid=None, usePTY=0,
+                     childFDs=None):
+        processProtocol.makeConnection(FakeProcess())
+        self.workers.append(processProtocol)
+
+
+    def removeSystemEventTrigger(self, triggerID):
+        pass
+
+
+
+class RestartTests(TestCase):
+    """
+    Tests for the start of workers of a L{ProcessPool}, and the replacement
+    of those which fail to start, using a fake reactor.
+    """
+
+    def setUp(self):
+        self.reactor = ProcessReactor()
+        self.pool = ProcessPool(self.reactor, size=1)
+        self.pool.minRestartDelay = 2
+        self.pool.maxRestartDelay = 5
+        self.pool.start()
+
+
+    def readyWorker(self, worker):
+        """
+        Pretend C{worker} started, and said it is ready.
+        """
+        worker.childDataReceived(_WORKER_RESULTS, b"\0\0\0\0")
+
+
+    def test_tasksWaitForReady(self):
+        """
+        A worker is given no task, and L{ProcessPool.timeout} does not start
+        counting, until the worker process says it is ready.
+        """
+        self.pool.timeout = 10
+        d = self.pool.deferToProcess(add, 1)
+        worker = self.reactor.workers[-1]
+        self.reactor.advance(20)
+        self.assertNoResult(d)
+        self.assertEqual(worker.transport.written, [])
+        self.readyWorker(worker)
+        self.assertNotEqual(worker.transport.written, [])
+        self.assertEqual(len(self.reactor.getDelayedCalls()), 1)
+        self.reactor.advance(10)
+        self.failureResultOf(d, defer.TimeoutError)
+
+
+    def exitWorker(self, worker):
+        """
+        Pretend C{worker} exited with an error.
+        """
+        worker.processEnded(Failure(ProcessTerminated(1)))
+        self.flushLoggedErrors(ProcessTerminated)
+
+
+    def test_backoff(self):
+        """
+        A worker which exits before it is ready is replaced after
+        L{ProcessPool.minRestartDelay} seconds, and the delay doubles while its replacements fail too, up to
+        L{ProcessPool.maxRestartDelay}.
+        """
+        for delay in [2, 4, 5, 5]:
+            self.exitWorker(self.reactor.workers[-1])
+            count = len(self.reactor.workers)
+            self.reactor.advance(delay - 0.5)
+            self.assertEqual(len(self.reactor.workers), count)
+            self.reactor.advance(0.5)
+            self.assertEqual(len(self.reactor.workers), count + 1)
+
+
+    def test_startedWorkerReplacedAtOnce(self):
+        """
+        A worker which exits after it was ready is replaced at once, and the
+        next failure to start is delayed by L{ProcessPool.minRestartDelay}
+        seconds again.
+        """
+        self.exitWorker(self.reactor.workers[-1])
+        self.reactor.advance(2)
+        self.readyWorker(self.reactor.workers[-1])
+        self.exitWorker(self.reactor.workers[-1])
+        self.assertEqual(len(self.reactor.workers), 3)
+        self.exitWorker(self.reactor.workers[-1])
+        self.reactor.advance(2)
+        self.assertEqual(len(self.reactor.workers), 4)
+
+
+    def test_stopFailsPending(self):
+        """
+        Once the pool is stopped, a worker which fails to start is not
+        replaced, and the tasks left waiting for one fail with L{WorkerLost}.
+        """
+        running = self.pool.deferToProcess(add, 1)
+        waiting = self.pool.deferToProcess(add, 2)
+        stopped = self.pool.stop()
+        self.exitWorker(self.reactor.workers[-1])
+        self.failureResultOf(running, WorkerLost)
+        self.failureResultOf(waiting, WorkerLost)
+        self.successResultOf(stopped)
+        self.assertEqual(len(self.reactor.workers), 1)
+        self.assertEqual(self.reactor.getDelayedCalls(), [])
+
+
+    def test_stopCancelsRestart(self):
+        """
+        Stopping the pool cancels the replacement of a worker which failed to
+        start, if no task is waiting for it.
+        """
+        self.exitWorker(self.reactor.workers[-1])
+        self.successResultOf(self.pool.stop())
+        self.assertEqual(self.reactor.getDelayedCalls(), [])
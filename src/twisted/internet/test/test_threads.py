@@ -55,6 +55,54 @@ class ThreadTestsBuilder(ReactorBuilder):
             "Pool should be stopped after reactor.run returns")
 
 
+    def test_getNamedThreadPool(self):
+        """
+        C{reactor.getThreadPool(name)} returns an adaptive L{ThreadPool} with
+        that name, separate from the default threadpool and the same for each
+        call, which starts when C{reactor.run()} is called and stops before it
+        returns.
+        """
+        state = []
+        reactor = self.buildReactor()
+
+        pool = reactor.getThreadPool('database')
+        self.assertIsInstance(pool, ThreadPool)
+        self.assertEqual(pool.name, 'database')
+        self.assertTrue(pool.adaptive)
+        self.assertIs(reactor.getThreadPool('database'), pool)
+        self.assertIsNot(reactor.getThreadPool(), pool)
+        self.assertIsNot(reactor.getThreadPool('other'), pool)
+        self.assertFalse(pool.started)
+
+        def f():
+            state.append(pool.started)
+            reactor.stop()
+
+        reactor.callWhenRunning(f)
+        self.runReactor(reactor, 2)
+
+        self.assertEqual(state, [True])
+        self.assertTrue(pool.joined)
+
+
+    def test_stopNamedThreadPoolWhenStartedAfterReactorRan(self):
+        """
+        A named threadpool created while the reactor is running is started
+        immediately, and is stopped and forgotten when the reactor stops.
+        """
+        reactor = self.buildReactor()
+        threadPoolRefs = []
+        def acquireThreadPool():
+            pool = reactor.getThreadPool('database')
+            self.assertTrue(pool.started)
+            threadPoolRefs.append(ref(pool))
+            reactor.stop()
+        reactor.callWhenRunning(acquireThreadPool)
+        self.runReactor(reactor)
+        gc.collect()
+        self.assertIsNone(threadPoolRefs[0]())
+
+
     def test_suggestThreadPoolSize(self):
         """
         C{reactor.suggestThreadPoolSize()} sets the maximum size of the reactor
@@ -66,6 +66,9 @@ __all__ = [
     # From ._file
     "FileLogObserver", "textFileLogObserver",
 
+    # From ._threaded
+    "ThreadedLogObserver",
+
     # From ._filter
     "PredicateResult", "ILogFilterPredicate",
     "FilteringLogObserver", "LogLevelFilterPredicate",
@@ -84,7 +87,7 @@ __all__ = [
 
     # From ._json
     "eventAsJSON", "eventFromJSON",
-    "jsonFileLogObserver", "eventsFromJSONLogFile",
+    "jsonFileLogObserver", "eventsFromJSONLogFile", "indexJSONLogFile",
 
     # From ._capture
     "capturedLogs",
@@ -107,6 +110,8 @@ from ._buffer import LimitedHistoryLogObserver
 
 from ._file import FileLogObserver, textFileLogObserver
 
+from ._threaded import ThreadedLogObserver
+
 from ._filter import (
     PredicateResult, ILogFilterPredicate, FilteringLogObserver,
     LogLevelFilterPredicate
@@ -124,7 +129,7 @@ from ._global import (
 
 from ._json import (
     eventAsJSON, eventFromJSON,
-    jsonFileLogObserver, eventsFromJSONLogFile
+    jsonFileLogObserver, eventsFromJSONLogFile, indexJSONLogFile
 )
 
 from ._capture import capturedLogs
@@ -6,6 +6,8 @@
 File log observer.
 """
 
+import os
+
 from zope.interface import implementer
 
 from twisted.python.compat import ioType, unicode
@@ -47,10 +49,17 @@ class FileLogObserver(object):
         @param event: An event.
         @type event: L{dict}
         """
-        text = self.formatEvent(event)
+        self.writeEvents((event,))
+
 
-        if text is None:
-            text = u""
+    def writeEvents(self, events):
+        """
+        Write events to file, with a single write and flush.
+
+        @param events: Events.
+        @type events: iterable of L{dict}
+        """
+        text = u"".join(self.formatEvent(event) or u"" for event in events)
 
         if self._encoding is not None:
             text = text.encode(self._encoding)
@@ -60,6 +69,19 @@ class FileLogObserver(object):
             self._outFile.flush()
 
 
+    def sync(self):
+        """
+        Flush the file and, if it is backed by a file descriptor, have the
+        operating system write it to disk.
+        """
+        self._outFile.flush()
+        try:
+            fileno = self._outFile.fileno()
+        except (AttributeError, ValueError, IOError, OSError):
+            return
+        os.fsync(fileno)
+
+
 
 def textFileLogObserver(outFile, timeFormat=timeFormatRFC3339):
     """
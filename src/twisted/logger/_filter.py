@@ -13,7 +13,8 @@ from zope.interface import Interface, implementer
 from constantly import NamedConstant, Names
 
 from ._levels import InvalidLogLevelError, LogLevel
-from ._observer import ILogObserver
+from ._observer import (
+    ILogObserver, _PRIORITY_NONE, _invalidateGates, _observerMinimumPriority)
 
 
 
@@ -93,6 +94,16 @@ def shouldLogEvent(predicates, event):
 
 
 
+def _discard(event):
+    """
+    Discard an event.
+
+    @param event: An event.
+    @type event: L{dict}
+    """
+
+
+
 @implementer(ILogObserver)
 class FilteringLogObserver(object):
     """
@@ -102,7 +113,7 @@ class FilteringLogObserver(object):
 
     def __init__(
         self, observer, predicates,
-        negativeObserver=lambda event: None
+        negativeObserver=_discard
     ):
         """
         @param observer: An observer to which this observer will forward
@@ -118,7 +129,8 @@ class FilteringLogObserver(object):
         @type negativeObserver: L{ILogObserver}
         """
         self._observer = observer
-        self._shouldLogEvent = partial(shouldLogEvent, list(predicates))
+        self._predicates = list(predicates)
+        self._shouldLogEvent = partial(shouldLogEvent, self._predicates)
         self._negativeObserver = negativeObserver
 
 
@@ -134,6 +146,31 @@ class FilteringLogObserver(object):
             self._negativeObserver(event)
 
 
+    def _minimumPriorityFor(self, namespace):
+        """
+        Determine the lowest priority of the events from a namespace that are
+        forwarded anywhere.
+
+        Predicates declare the lowest priority of the events they do not
+        reject with a C{_minimumPriorityFor} method, as
+        L{LogLevelFilterPredicate} does; after the first predicate without
+        one, which might accept anything, the rest do not count.
+
+        @see: L{twisted.logger._observer._observerMinimumPriority}
+        """
+        priority = _observerMinimumPriority(self._observer, namespace)
+        for predicate in self._predicates:
+            gate = getattr(predicate, "_minimumPriorityFor", None)
+            if gate is None:
+                break
+            priority = max(priority, gate(namespace))
+        if self._negativeObserver is not _discard:
+            priority = min(
+                priority,
+                _observerMinimumPriority(self._negativeObserver, namespace))
+        return priority
+
+
 
 @implementer(ILogFilterPredicate)
 class LogLevelFilterPredicate(object):
@@ -205,6 +242,7 @@ class LogLevelFilterPredicate(object):
             self._logLevelsByNamespace[namespace] = level
         else:
             self._logLevelsByNamespace[None] = level
+        _invalidateGates()
 
 
     def clearLogLevels(self):
@@ -213,6 +251,19 @@ class LogLevelFilterPredicate(object):
         """
         self._logLevelsByNamespace.clear()
         self._logLevelsByNamespace[None] = self.defaultLogLevel
+        _invalidateGates()
+
+
+    def _minimumPriorityFor(self, namespace):
+        """
+        Determine the lowest priority of the events from a namespace that are
+        not rejected.
+
+        @see: L{FilteringLogObserver._minimumPriorityFor}
+        """
+        if namespace is None:
+            return _PRIORITY_NONE
+        return LogLevel._priorityForLevel(self.logLevelForNamespace(namespace))
 
 
     def __call__(self, event):
@@ -64,27 +64,36 @@ class KeyFlattener(object):
 
 
 
-def flattenEvent(event):
-    """
-    Flatten the given event by pre-associating format fields with specific
-    objects and callable results in a L{dict} put into the C{"log_flattened"}
-    key in the event.
+# The number of format strings whose fields flattenEvent remembers.
+_FIELDS_CACHE_SIZE = 1024
+_fieldsByFormat = {}
 
-    @param event: A logging event.
-    @type event: L{dict}
+
+
+def _fieldsForFormat(format):
     """
-    if event.get("log_format", None) is None:
-        return
+    Work out what L{flattenEvent} does with each field of a format string.
 
-    if "log_flattened" in event:
-        fields = event["log_flattened"]
-    else:
-        fields = {}
+    @param format: A PEP-3101-style format string.
+    @type format: L{str}
+
+    @return: For each field, a 6-tuple of its flattened key, its structured
+        key, the key to look up in an event for its value or L{None} if
+        L{Formatter.get_field} is needed, its name without any trailing
+        C{"()"}, whether it names a callable to call, and whether it is
+        converted with L{repr}.
+    @rtype: L{tuple} of L{tuple}
+    """
+    try:
+        return _fieldsByFormat[format]
+    except KeyError:
+        pass
 
     keyFlattener = KeyFlattener()
+    fields = []
 
     for (literalText, fieldName, formatSpec, conversion) in (
-        aFormatter.parse(event["log_format"])
+        aFormatter.parse(format)
     ):
         if fieldName is None:
             continue
@@ -95,28 +104,68 @@ def flattenEvent(event):
         flattenedKey = keyFlattener.flatKey(fieldName, formatSpec, conversion)
         structuredKey = keyFlattener.flatKey(fieldName, formatSpec, "")
 
-        if flattenedKey in fields:
-            # We've already seen and handled this key
-            continue
-
         if fieldName.endswith(u"()"):
             fieldName = fieldName[:-2]
             callit = True
         else:
             callit = False
 
-        field = aFormatter.get_field(fieldName, (), event)
-        fieldValue = field[0]
+        if (fieldName and not fieldName.isdigit() and
+                "." not in fieldName and "[" not in fieldName):
+            key = fieldName
+        else:
+            key = None
+
+        fields.append((
+            flattenedKey, structuredKey, key, fieldName, callit,
+            conversion == "r"
+        ))
+
+    fields = tuple(fields)
+    if len(_fieldsByFormat) >= _FIELDS_CACHE_SIZE:
+        _fieldsByFormat.clear()
+    _fieldsByFormat[format] = fields
+    return fields
+
 
-        if conversion == "r":
-            conversionFunction = repr
-        else:  # Above: if conversion is not "r", it's "s"
-            conversionFunction = unicode
+
+def flattenEvent(event):
+    """
+    Flatten the given event by pre-associating format fields with specific
+    objects and callable results in a L{dict} put into the C{"log_flattened"}
+    key in the event.
+
+    @param event: A logging event.
+    @type event: L{dict}
+    """
+    format = event.get("log_format", None)
+    if format is None:
+        return
+
+    if "log_flattened" in event:
+        fields = event["log_flattened"]
+    else:
+        fields = {}
+
+    for (flattenedKey, structuredKey, key, fieldName, callit, isRepr) in (
+        _fieldsForFormat(format)
+    ):
+        if flattenedKey in fields:
+            # We've already seen and handled this key
+            continue
+
+        if key is not None:
+            fieldValue = event[key]
+        else:
+            fieldValue = aFormatter.get_field(fieldName, (), event)[0]
 
         if callit:
             fieldValue = fieldValue()
 
-        flattenedValue = conversionFunction(fieldValue)
+        if isRepr:
+            flattenedValue = repr(fieldValue)
+        else:
+            flattenedValue = unicode(fieldValue)
         fields[flattenedKey] = flattenedValue
         fields[structuredKey] = fieldValue
 
@@ -6,10 +6,13 @@
 Tools for saving and loading log events in a structured format.
 """
 
+import mmap
 import types
 
 from constantly import NamedConstant
-from json import dumps, loads
+from itertools import chain
+from json import JSONDecoder, JSONEncoder, loads
+from struct import Struct
 from uuid import UUID
 
 from ._flatten import flattenEvent
@@ -17,7 +20,7 @@ from ._file import FileLogObserver
 from ._levels import LogLevel
 from ._logger import Logger
 
-from twisted.python.compat import unicode, _PY3
+from twisted.python.compat import ioType, unicode, _PY3
 from twisted.python.failure import Failure
 
 log = Logger()
@@ -126,6 +129,20 @@ uuidToLoader = dict([
 
 
 
+_uuidStringToLoader = dict([
+    (str(uuid), loader) for (uuid, loader) in uuidToLoader.items()
+])
+
+
+
+# Log levels are in nearly every event, so they are saved ahead of time.
+_savedLevels = dict([
+    (level, dict(name=level.name, __class_uuid__=str(classInfo[0][1])))
+    for level in LogLevel.iterconstants()
+])
+
+
+
 def objectLoadHook(aDict):
     """
     Dictionary-to-object-translation hook for certain value types used within
@@ -140,7 +157,11 @@ def objectLoadHook(aDict):
     @rtype: L{object}
     """
     if "__class_uuid__" in aDict:
-        return uuidToLoader[UUID(aDict["__class_uuid__"])](aDict)
+        uuid = aDict["__class_uuid__"]
+        loader = _uuidStringToLoader.get(uuid)
+        if loader is None:
+            loader = uuidToLoader[UUID(uuid)]
+        return loader(aDict)
     return aDict
 
 
@@ -159,6 +180,12 @@ def objectSaveHook(pythonObject):
         supports, a specially-formatted dictionary; otherwise, a marker
         dictionary indicating that it could not be serialized.
     """
+    try:
+        saved = _savedLevels.get(pythonObject)
+    except TypeError:
+        saved = None
+    if saved is not None:
+        return dict(saved)
     for (predicate, uuid, saver, loader) in classInfo:
         if predicate(pythonObject):
             result = saver(pythonObject)
@@ -168,6 +195,25 @@ def objectSaveHook(pythonObject):
 
 
 
+if bytes is str:
+    _encoder = JSONEncoder(
+        default=objectSaveHook, encoding="charmap", skipkeys=True)
+else:
+    def _objectOrBytesSaveHook(unencodable):
+        """
+        Serialize an object not otherwise serializable by L{JSONEncoder}.
+
+        @param unencodable: An unencodable object.
+        @return: C{unencodable}, serialized
+        """
+        if isinstance(unencodable, bytes):
+            return unencodable.decode("charmap")
+        return objectSaveHook(unencodable)
+
+    _encoder = JSONEncoder(default=_objectOrBytesSaveHook, skipkeys=True)
+
+
+
 def eventAsJSON(event):
     """
     Encode an event as JSON, flattening it if necessary to preserve as much
@@ -184,24 +230,8 @@ def eventAsJSON(event):
         file.
     @rtype: L{unicode}
     """
-    if bytes is str:
-        kw = dict(default=objectSaveHook, encoding="charmap", skipkeys=True)
-    else:
-        def default(unencodable):
-            """
-            Serialize an object not otherwise serializable by L{dumps}.
-
-            @param unencodable: An unencodable object.
-            @return: C{unencodable}, serialized
-            """
-            if isinstance(unencodable, bytes):
-                return unencodable.decode("charmap")
-            return objectSaveHook(unencodable)
-
-        kw = dict(default=default, skipkeys=True)
-
     flattenEvent(event)
-    result = dumps(event, **kw)
+    result = _encoder.encode(event)
     if not isinstance(result, unicode):
         return unicode(result, "utf-8", "replace")
     return result
@@ -218,8 +248,13 @@ def eventFromJSON(eventText):
     @return: A reconstructed version of the log event.
     @rtype: L{dict}
     """
-    loaded = loads(eventText, object_hook=objectLoadHook)
-    return loaded
+    if isinstance(eventText, unicode):
+        return _decoder.decode(eventText)
+    return loads(eventText, object_hook=objectLoadHook)
+
+
+
+_decoder = JSONDecoder(object_hook=objectLoadHook)
 
 
 
@@ -254,11 +289,276 @@ def jsonFileLogObserver(outFile, recordSeparator=u"\x1e"):
 
 
 
-def eventsFromJSONLogFile(inFile, recordSeparator=None, bufferSize=4096):
+def _asUTF8(s):
+    """
+    Encode text read from a file as UTF-8, leaving bytes alone.
+
+    @param s: What was read.
+    @type s: L{bytes} or L{unicode}
+
+    @rtype: L{bytes}
+    """
+    if type(s) is bytes:
+        return s
+    else:
+        return s.encode("utf-8")
+
+
+
+def _mapFile(inFile):
+    """
+    Map a file into memory, if it is a regular file opened in binary mode.
+
+    @param inFile: A (readable) file-like object.
+
+    @return: A 2-tuple of the mapped file, or L{None} if it cannot be mapped,
+        and the current position in it.
+    @rtype: L{tuple} of L{mmap.mmap} and L{int}
+    """
+    if ioType(inFile) is not bytes:
+        return None, None
+    try:
+        start = inFile.tell()
+        data = mmap.mmap(inFile.fileno(), 0, access=mmap.ACCESS_READ)
+    except (AttributeError, EnvironmentError, ValueError):
+        # Not a file at all, or a pipe, or an empty file.
+        return None, None
+    return data, start
+
+
+
+def _recordsFromStream(inFile, first, separator, bufferSize):
+    """
+    Split what is read from a file into records.
+
+    @param inFile: A (readable) file-like object.
+
+    @param first: What has already been read from C{inFile}.
+    @type first: L{bytes}
+
+    @param separator: What separates records.
+    @type separator: L{bytes}
+
+    @param bufferSize: How much to read at once.
+    @type bufferSize: L{int}
+
+    @return: The records.
+    @rtype: iterable of L{bytes}
+    """
+    buffer = bytearray(first)
+    searchFrom = 0
+
+    while True:
+        newData = inFile.read(bufferSize)
+        if not newData:
+            break
+        buffer += _asUTF8(newData)
+
+        start = 0
+        while True:
+            end = buffer.find(separator, searchFrom)
+            if end == -1:
+                break
+            if end > start:
+                yield bytes(buffer[start:end])
+            start = searchFrom = end + len(separator)
+
+        del buffer[:start]
+        # Do not search what has been searched again, except for the start
+        # of a separator at the end.
+        searchFrom = max(0, len(buffer) - len(separator) + 1)
+
+    if buffer:
+        yield bytes(buffer)
+
+
+
+def _recordsFromMap(data, separator, start, end):
+    """
+    Split part of a mapped file into records.
+
+    @param data: The mapped file.
+    @type data: L{mmap.mmap}
+
+    @param separator: What separates records.
+    @type separator: L{bytes}
+
+    @param start: Where to start.
+    @type start: L{int}
+
+    @param end: Where to end, which should be the end of a record.
+    @type end: L{int}
+
+    @return: The records.
+    @rtype: iterable of L{bytes}
+    """
+    while start < end:
+        found = data.find(separator, start, end)
+        if found == -1:
+            found = end
+        if found > start:
+            yield data[start:found]
+        start = found + len(separator)
+
+
+
+_timeIndexEntry = Struct("!QQdd")
+
+
+
+def _readTimeIndex(indexFile):
+    """
+    Read a time index written by L{indexJSONLogFile}, and leave the file
+    positioned after its last whole entry.
+
+    @param indexFile: A (readable) file-like object, opened in binary mode.
+
+    @return: The entries of the index, each a 4-tuple of where a block of
+        records starts in the log file, its length, and the earliest and
+        latest C{"log_time"} of its events.
+    @rtype: L{list} of L{tuple}
+    """
+    indexFile.seek(0)
+    contents = indexFile.read()
+    size = _timeIndexEntry.size
+    entries = [
+        _timeIndexEntry.unpack(contents[offset:offset + size])
+        for offset in range(0, len(contents) - size + 1, size)
+    ]
+    indexFile.seek(len(entries) * size)
+    return entries
+
+
+
+def _detectSeparator(first, recordSeparator):
+    """
+    Work out what separates records in a JSON log file.
+
+    @param first: The first byte of the file.
+    @type first: L{bytes}
+
+    @param recordSeparator: The expected record separator, or L{None} to
+        detect it from C{first}.
+    @type recordSeparator: L{unicode} or L{bytes}
+
+    @return: The separator to split records on, and whether each record
+        should end with a newline.
+    @rtype: L{tuple} of L{bytes} and L{bool}
+    """
+    if recordSeparator is None:
+        if first == b"\x1e":
+            # This looks json-text-sequence compliant.
+            recordSeparator = first
+        else:
+            # Default to simpler newline-separated stream, which does not use
+            # a record separator.
+            recordSeparator = b""
+    else:
+        recordSeparator = _asUTF8(recordSeparator)
+
+    if recordSeparator == b"":
+        return b"\n", False
+    return recordSeparator, True
+
+
+
+def indexJSONLogFile(inFile, indexFile, recordSeparator=None,
+                     blockSize=2 ** 20):
+    """
+    Write a time index of a file previously saved with
+    L{jsonFileLogObserver}, which L{eventsFromJSONLogFile} can use to find the
+    events logged within a range of time without reading the whole file.
+
+    The index records the earliest and latest time of the events in each
+    block of about C{blockSize} bytes of the file, so events need not have
+    been written in order.  Calling this again with the same index file after
+    more events have been written to the log file indexes just those.
+
+    @param inFile: A (readable) file-like object, opened in binary mode.
+
+    @param indexFile: A (readable and writable) file-like object, opened in
+        binary mode, to write the index to.
+
+    @param recordSeparator: The expected record separator.
+        If L{None}, attempt to automatically detect the record separator from
+        one of C{u"\\x1e"} or C{u""}.
+    @type recordSeparator: L{unicode}
+
+    @param blockSize: The size of the blocks of the file to index.
+    @type blockSize: L{int}
+    """
+    entries = _readTimeIndex(indexFile)
+    indexFile.truncate()
+    if entries:
+        position = entries[-1][0] + entries[-1][1]
+    else:
+        position = 0
+
+    data, ignored = _mapFile(inFile)
+    mapped = data is not None
+    if not mapped:
+        inFile.seek(0)
+        data = _asUTF8(inFile.read())
+
+    try:
+        separator, separatorLeads = _detectSeparator(
+            data[0:1], recordSeparator)
+        blockStart = position
+        earliest, latest = float("inf"), float("-inf")
+
+        while True:
+            if separatorLeads:
+                end = data.find(separator, position + len(separator))
+                if (end == -1 and len(data) > position and
+                        data[-1:] == b"\n"):
+                    # Records end with the only newline in them, so this
+                    # one is complete.
+                    end = len(data)
+                boundary = end
+            else:
+                end = data.find(separator, position)
+                boundary = end + len(separator)
+            if end == -1:
+                # The last record may not have been completely written yet.
+                break
+
+            record = data[position:end]
+            if record.startswith(separator):
+                record = record[len(separator):]
+            try:
+                when = loads(record.decode("utf-8"))["log_time"]
+            except (ValueError, TypeError, KeyError):
+                when = None
+            if isinstance(when, (int, float)):
+                earliest = min(earliest, when)
+                latest = max(latest, when)
+            position = boundary
+
+            if position - blockStart >= blockSize:
+                indexFile.write(_timeIndexEntry.pack(
+                    blockStart, position - blockStart, earliest, latest))
+                blockStart = position
+                earliest, latest = float("inf"), float("-inf")
+
+        if position > blockStart:
+            indexFile.write(_timeIndexEntry.pack(
+                blockStart, position - blockStart, earliest, latest))
+        indexFile.flush()
+    finally:
+        if mapped:
+            data.close()
+
+
+
+def eventsFromJSONLogFile(inFile, recordSeparator=None, bufferSize=65536,
+                          timeIndex=None, since=None, until=None):
     """
     Load events from a file previously saved with L{jsonFileLogObserver}.
     Event records that are truncated or otherwise unreadable are ignored.
 
+    Regular files opened in binary mode are mapped into memory, rather than
+    read C{bufferSize} bytes at a time.
+
     @param inFile: A (readable) file-like object.  Data read from C{inFile}
         should be L{unicode} or UTF-8 L{bytes}.
     @type inFile: iterable of lines
@@ -272,18 +572,34 @@ def eventsFromJSONLogFile(inFile, recordSeparator=None, bufferSize=4096):
         C{inFile}.
     @type bufferSize: integer
 
+    @param timeIndex: If not L{None}, a (readable) file-like object, opened
+        in binary mode, with an index of C{inFile} written by
+        L{indexJSONLogFile}, which is used to skip the parts of C{inFile}
+        without events between C{since} and C{until}, if C{inFile} can be
+        mapped into memory.
+    @type timeIndex: L{io.IOBase}
+
+    @param since: If not L{None}, only events with a C{"log_time"} of at
+        least this are loaded.
+    @type since: L{float}
+
+    @param until: If not L{None}, only events with a C{"log_time"} of less
+        than this are loaded.
+    @type until: L{float}
+
     @return: Log events as read from C{inFile}.
     @rtype: iterable of L{dict}
     """
-    def asBytes(s):
-        if type(s) is bytes:
-            return s
-        else:
-            return s.encode("utf-8")
+    def eventFromRecord(record):
+        if checkTruncated and not record.endswith(b"\n"):
+            log.error(
+                u"Unable to read truncated JSON record: {record!r}",
+                record=bytes(record)
+            )
+            return None
 
-    def eventFromBytearray(record):
         try:
-            text = bytes(record).decode("utf-8")
+            text = record.decode("utf-8")
         except UnicodeDecodeError:
             log.error(
                 u"Unable to decode UTF-8 for JSON record: {record!r}",
@@ -300,56 +616,50 @@ def eventsFromJSONLogFile(inFile, recordSeparator=None, bufferSize=4096):
             )
             return None
 
-    if recordSeparator is None:
-        first = asBytes(inFile.read(1))
+    data, start = _mapFile(inFile)
 
-        if first == b"\x1e":
-            # This looks json-text-sequence compliant.
-            recordSeparator = first
+    if data is None:
+        if recordSeparator is None:
+            first = _asUTF8(inFile.read(1))
         else:
-            # Default to simpler newline-separated stream, which does not use
-            # a record separator.
-            recordSeparator = b""
-
+            first = b""
+        separator, checkTruncated = _detectSeparator(first, recordSeparator)
+        records = _recordsFromStream(inFile, first, separator, bufferSize)
     else:
-        recordSeparator = asBytes(recordSeparator)
-        first = b""
-
-    if recordSeparator == b"":
-        recordSeparator = b"\n"  # Split on newlines below
-
-        eventFromRecord = eventFromBytearray
-
-    else:
-        def eventFromRecord(record):
-            if record[-1] == ord("\n"):
-                return eventFromBytearray(record)
-            else:
-                log.error(
-                    u"Unable to read truncated JSON record: {record!r}",
-                    record=bytes(record)
-                )
-            return None
-
-    buffer = bytearray(first)
-
-    while True:
-        newData = inFile.read(bufferSize)
-
-        if not newData:
-            if len(buffer) > 0:
-                event = eventFromRecord(buffer)
-                if event is not None:
-                    yield event
-            break
-
-        buffer += asBytes(newData)
-        records = buffer.split(recordSeparator)
-
-        for record in records[:-1]:
-            if len(record) > 0:
-                event = eventFromRecord(record)
-                if event is not None:
-                    yield event
+        separator, checkTruncated = _detectSeparator(
+            data[start:start + 1], recordSeparator)
+        ranges = [(start, len(data))]
+        if timeIndex is not None and (since, until) != (None, None):
+            entries = _readTimeIndex(timeIndex)
+            # An index of some other file is no use.
+            if entries and entries[-1][0] + entries[-1][1] <= len(data):
+                ranges = [
+                    (max(offset, start), offset + length)
+                    for (offset, length, earliest, latest) in entries
+                    if (since is None or latest >= since) and
+                    (until is None or earliest < until)
+                ]
+                indexed = entries[-1][0] + entries[-1][1]
+                ranges.append((max(indexed, start), len(data)))
+        records = chain.from_iterable(
+            _recordsFromMap(data, separator, rangeStart, rangeEnd)
+            for (rangeStart, rangeEnd) in ranges
+        )
 
-        buffer = records[-1]
+    try:
+        for record in records:
+            event = eventFromRecord(record)
+            if event is None:
+                continue
+            if since is not None or until is not None:
+                when = event.get("log_time")
+                if (
+                    when is None or
+                    (since is not None and when < since) or
+                    (until is not None and when >= until)
+                ):
+                    continue
+            yield event
+    finally:
+        if data is not None:
+            data.close()
@@ -123,7 +123,9 @@ class Logger(object):
             non-deterministic behavior from observers that schedule work for
             later execution.
         """
-        if level not in LogLevel.iterconstants():
+        try:
+            priority = LogLevel._levelPriorities[level]
+        except (KeyError, TypeError):
             self.failure(
                 "Got invalid log level {invalidLevel!r} in {logger}.emit().",
                 Failure(InvalidLogLevelError(level)),
@@ -132,6 +134,12 @@ class Logger(object):
             )
             return
 
+        # Do not bother making an event no observer will do anything with.
+        gate = getattr(self.observer, "_minimumPriorityFor", None)
+        if (gate is not None and priority < gate(self.namespace) and
+                "log_trace" not in kwargs):
+            return
+
         event = kwargs
         event.update(
             log_logger=self, log_level=level, log_namespace=self.namespace,
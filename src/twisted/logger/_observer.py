@@ -9,6 +9,7 @@ Basic log observers.
 from zope.interface import Interface, implementer
 
 from twisted.python.failure import Failure
+from ._levels import LogLevel
 from ._logger import Logger
 
 
@@ -17,6 +18,51 @@ OBSERVER_DISABLED = (
     "Temporarily disabling observer {observer} due to exception: {log_failure}"
 )
 
+# The priority of events which nothing accepts: one above the highest level.
+_PRIORITY_NONE = len(LogLevel._levelPriorities)
+
+# Bumped whenever the events some observer accepts may have changed, to
+# invalidate the priorities cached by LogPublisher._minimumPriorityFor.
+_gateGeneration = 0
+
+
+
+def _invalidateGates():
+    """
+    Note that the events some observer accepts may have changed.
+    """
+    global _gateGeneration
+    _gateGeneration += 1
+
+
+
+def _observerMinimumPriority(observer, namespace):
+    """
+    Determine the lowest priority of the events from a namespace that an
+    observer does anything with, so that L{Logger} need not make events of
+    lower priority at all.
+
+    An observer declares this with a C{_minimumPriorityFor} method taking a
+    namespace; observers without one are assumed to accept every event.
+    Whenever what such a method returns changes, L{_invalidateGates} must be
+    called.
+
+    @param observer: An observer.
+    @type observer: L{ILogObserver}
+
+    @param namespace: A logging namespace.
+    @type namespace: L{str} (native string)
+
+    @return: A priority, as returned by L{LogLevel._priorityForLevel}, or
+        one above the highest if the observer accepts no events from
+        C{namespace}.
+    @rtype: L{int}
+    """
+    gate = getattr(observer, "_minimumPriorityFor", None)
+    if gate is None:
+        return 0
+    return gate(namespace)
+
 
 
 class ILogObserver(Interface):
@@ -79,6 +125,8 @@ class LogPublisher(object):
     def __init__(self, *observers):
         self._observers = list(observers)
         self.log = Logger(observer=self)
+        self._priorities = {}
+        self._prioritiesGeneration = _gateGeneration
 
 
     def addObserver(self, observer):
@@ -91,6 +139,7 @@ class LogPublisher(object):
             raise TypeError("Observer is not callable: {0!r}".format(observer))
         if observer not in self._observers:
             self._observers.append(observer)
+            _invalidateGates()
 
 
     def removeObserver(self, observer):
@@ -103,6 +152,34 @@ class LogPublisher(object):
             self._observers.remove(observer)
         except ValueError:
             pass
+        else:
+            _invalidateGates()
+
+
+    def _minimumPriorityFor(self, namespace):
+        """
+        Determine the lowest priority of the events from a namespace that any
+        of the contained observers does anything with.
+
+        @see: L{_observerMinimumPriority}
+        """
+        generation = _gateGeneration
+        if self._prioritiesGeneration != generation:
+            self._priorities = {}
+            self._prioritiesGeneration = generation
+        priorities = self._priorities
+        try:
+            return priorities[namespace]
+        except KeyError:
+            pass
+        priority = _PRIORITY_NONE
+        for observer in self._observers:
+            priority = min(
+                priority, _observerMinimumPriority(observer, namespace))
+        # Only keep it if nothing changed while it was worked out.
+        if _gateGeneration == generation:
+            priorities[namespace] = priority
+        return priority
 
 
     def __call__(self, event):
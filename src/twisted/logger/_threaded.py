@@ -0,0 +1,298 @@
+# -*- test-case-name: twisted.logger.test.test_threaded -*-
+# Copyright (c) Twisted Matrix Laboratories.
+# See LICENSE for details.
+
+"""
+Log observer that writes events from a dedicated thread.
+"""
+
+import threading
+from collections import deque
+from time import time
+
+from zope.interface import implementer
+
+from ._observer import ILogObserver, _observerMinimumPriority
+from ._levels import LogLevel
+
+
+_DEFAULT_BUFFER_MAXIMUM = 64 * 1024
+
+
+
+@implementer(ILogObserver)
+class ThreadedLogObserver(object):
+    """
+    L{ILogObserver} that queues events in memory and has another observer
+    write them from a dedicated thread, so that formatting them and waiting
+    for the disk does not hold up the thread logging them::
+
+        from twisted.logger import (
+            globalLogBeginner, jsonFileLogObserver, ThreadedLogObserver)
+        observer = ThreadedLogObserver(
+            jsonFileLogObserver(io.open("log.json", "a")), fsyncInterval=1)
+        globalLogBeginner.beginLoggingTo([observer])
+        reactor.addSystemEventTrigger("after", "shutdown", observer.stop)
+
+    If the wrapped observer has a C{writeEvents} method, as
+    L{FileLogObserver} does, it is called with batches of events, so that
+    they are written with a single write and flush; otherwise, it is called
+    with each event.
+
+    When C{bufferSize} events are waiting to be written, further events are
+    dropped, and counted in L{droppedEventCount}, or, if C{block} is true,
+    the logging thread waits for room.  After events have been dropped, an
+    event saying how many were is written in their place.
+
+    Events are written in another thread after they have been logged, so they
+    should not be changed after they have been logged.
+
+    @ivar droppedEventCount: The number of events dropped because the buffer
+        was full.
+    @type droppedEventCount: L{int}
+
+    @ivar writtenEventCount: The number of events given to the wrapped
+        observer.
+    @type writtenEventCount: L{int}
+
+    @ivar failedEventCount: The number of events lost because the wrapped
+        observer raised an exception writing them.
+    @type failedEventCount: L{int}
+    """
+
+    droppedEventCount = 0
+    writtenEventCount = 0
+    failedEventCount = 0
+
+    _clock = staticmethod(time)
+
+    def __init__(self, observer, bufferSize=_DEFAULT_BUFFER_MAXIMUM,
+                 block=False, batchSize=1024, fsyncInterval=None):
+        """
+        @param observer: The observer to write the events with.
+        @type observer: L{ILogObserver}
+
+        @param bufferSize: The maximum number of events waiting to be
+            written.
+        @type bufferSize: L{int}
+
+        @param block: Whether to wait for room when the buffer is full,
+            rather than drop events.
+        @type block: L{bool}
+
+        @param batchSize: The maximum number of events written at once.
+        @type batchSize: L{int}
+
+        @param fsyncInterval: If not L{None}, the number of seconds between
+            calls to the C{sync} method of C{observer}, which
+            L{FileLogObserver} has, while there are events written since the
+            last one.
+        @type fsyncInterval: L{float}
+        """
+        self._observer = observer
+        self._writeEvents = getattr(observer, "writeEvents", None)
+        self._bufferSize = bufferSize
+        self._block = block
+        self._batchSize = batchSize
+        self._fsyncInterval = fsyncInterval
+        self._queue = deque()
+        self._condition = threading.Condition()
+        self._thread = None
+        self._stopped = False
+        self._finished = False
+        # Sequence numbers of events queued and written, for flush.
+        self._queued = 0
+        self._written = 0
+        self._unreportedDrops = 0
+
+
+    @property
+    def pendingEventCount(self):
+        """
+        The number of events waiting to be written.
+        """
+        return len(self._queue)
+
+
+    def __call__(self, event):
+        """
+        Queue an event to be written.
+
+        @param event: An event.
+        @type event: L{dict}
+        """
+        with self._condition:
+            if self._stopped and (self._thread is None or self._finished):
+                # Write whatever is logged at the last moment in place.
+                self._write([event])
+                return
+            if len(self._queue) >= self._bufferSize:
+                if (not self._block or
+                        threading.current_thread() is self._thread):
+                    self.droppedEventCount += 1
+                    self._unreportedDrops += 1
+                    return
+                while (len(self._queue) >= self._bufferSize and
+                       not self._stopped):
+                    self._condition.wait()
+            if self._thread is None:
+                self._thread = threading.Thread(
+                    target=self._run, name="ThreadedLogObserver")
+                self._thread.daemon = True
+                self._thread.start()
+            self._queue.append(event)
+            self._queued += 1
+            self._condition.notify_all()
+
+
+    def _minimumPriorityFor(self, namespace):
+        """
+        Determine the lowest priority of the events from a namespace that the
+        wrapped observer does anything with.
+
+        @see: L{twisted.logger._observer._observerMinimumPriority}
+        """
+        return _observerMinimumPriority(self._observer, namespace)
+
+
+    def flush(self, timeout=None):
+        """
+        Wait for the events queued so far to be written.
+
+        @param timeout: The maximum number of seconds to wait, or L{None} to
+            wait as long as it takes.
+        @type timeout: L{float}
+
+        @return: Whether the events were written.
+        @rtype: L{bool}
+        """
+        with self._condition:
+            target = self._queued
+            if timeout is not None:
+                deadline = time() + timeout
+            while self._written < target:
+                if timeout is None:
+                    self._condition.wait()
+                else:
+                    remaining = deadline - time()
+                    if remaining <= 0:
+                        return False
+                    self._condition.wait(remaining)
+            return True
+
+
+    def stop(self):
+        """
+        Write the events queued so far and stop the writer thread.  Events
+        logged afterwards are written at once, in the thread logging them.
+        """
+        with self._condition:
+            thread = self._thread
+            self._stopped = True
+            self._condition.notify_all()
+        if thread is not None and thread is not threading.current_thread():
+            thread.join()
+
+
+    def _write(self, events):
+        """
+        Write events with the wrapped observer.
+
+        @param events: Events.
+        @type events: L{list} of L{dict}
+        """
+        try:
+            if self._writeEvents is not None:
+                self._writeEvents(events)
+            else:
+                for event in events:
+                    self._observer(event)
+        except Exception:
+            # There is nowhere better to report this: logging it would only
+            # bring it back here.
+            self.failedEventCount += len(events)
+        else:
+            self.writtenEventCount += len(events)
+
+
+    def _sync(self):
+        """
+        Have the wrapped observer write its events to disk.
+        """
+        sync = getattr(self._observer, "sync", None)
+        if sync is not None:
+            try:
+                sync()
+            except Exception:
+                pass
+
+
+    def _dropNotice(self, count):
+        """
+        Make an event saying that events were dropped.
+
+        @param count: How many.
+        @type count: L{int}
+
+        @return: The event.
+        @rtype: L{dict}
+        """
+        return dict(
+            log_format=u"{log_dropped} log events were dropped",
+            log_level=LogLevel.warn,
+            log_namespace=__name__,
+            log_source=None,
+            log_time=self._clock(),
+            log_dropped=count,
+        )
+
+
+    def _run(self):
+        """
+        Write the queued events in batches until stopped.
+        """
+        interval = self._fsyncInterval
+        lastSync = self._clock()
+        unsynced = False
+        while True:
+            with self._condition:
+                if self._stopped and not self._queue:
+                    self._finished = True
+                    self._condition.notify_all()
+                    break
+                while not self._queue and not self._stopped:
+                    if unsynced and interval is not None:
+                        timeout = lastSync + interval - self._clock()
+                        if timeout <= 0:
+                            break
+                        self._condition.wait(timeout)
+                    else:
+                        self._condition.wait()
+                batch = []
+                while self._queue and len(batch) < self._batchSize:
+                    batch.append(self._queue.popleft())
+                dropped = self._unreportedDrops
+                self._unreportedDrops = 0
+                # Make room for blocked loggers.
+                self._condition.notify_all()
+
+            written = len(batch)
+            if dropped:
+                batch.append(self._dropNotice(dropped))
+            if batch:
+                self._write(batch)
+                unsynced = True
+
+            with self._condition:
+                self._written += written
+                self._condition.notify_all()
+
+            if unsynced and interval is not None:
+                now = self._clock()
+                if now - lastSync >= interval:
+                    self._sync()
+                    lastSync = now
+                    unsynced = False
+
+        if unsynced:
+            self._sync()
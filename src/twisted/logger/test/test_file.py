@@ -5,6 +5,8 @@
 Test cases for L{twisted.logger._file}.
 """
 
+import io
+import os
 from io import StringIO
 
 from zope.interface.verify import verifyObject, BrokenMethodImplementation
@@ -93,6 +95,46 @@ class FileLogObserverTests(TestCase):
             self.assertEqual(fileHandle.flushes, 1)
 
 
+    def test_writeEvents(self):
+        """
+        L{FileLogObserver.writeEvents} writes the formatted events with a
+        single write and flush.
+        """
+        with StringIO() as fileHandle:
+            observer = FileLogObserver(
+                fileHandle, lambda e: u"{x}\n".format(**e) if e else None)
+            writes = []
+            fileHandle.write = writes.append
+            observer.writeEvents([dict(x=1), dict(), dict(x=2)])
+            self.assertEqual(writes, [u"1\n2\n"])
+
+
+    def test_sync(self):
+        """
+        L{FileLogObserver.sync} flushes the file and has it written to disk
+        with C{os.fsync}.
+        """
+        fsyncs = []
+        self.patch(os, "fsync", fsyncs.append)
+        with io.open(self.mktemp(), "w") as fileHandle:
+            observer = FileLogObserver(fileHandle, lambda e: unicode(e))
+            observer(dict(x=1))
+            observer.sync()
+            self.assertEqual(fsyncs, [fileHandle.fileno()])
+
+
+    def test_syncWithoutFileDescriptor(self):
+        """
+        L{FileLogObserver.sync} only flushes files which have no file
+        descriptor.
+        """
+        with DummyFile() as fileHandle:
+            FileLogObserver(fileHandle, lambda e: unicode(e)).sync()
+            self.assertEqual(fileHandle.flushes, 1)
+        with StringIO() as fileHandle:
+            FileLogObserver(fileHandle, lambda e: unicode(e)).sync()
+
+
 class TextFileLogObserverTests(TestCase):
     """
     Tests for L{textFileLogObserver}.
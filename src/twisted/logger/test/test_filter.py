@@ -13,6 +13,7 @@ from .._levels import InvalidLogLevelError
 from .._levels import LogLevel
 from .._observer import ILogObserver
 from .._observer import LogPublisher
+from .._observer import _PRIORITY_NONE
 from .._filter import FilteringLogObserver
 from .._filter import PredicateResult
 from .._filter import LogLevelFilterPredicate
@@ -272,6 +273,60 @@ class FilteringLogObserverTests(unittest.TestCase):
 
 
 
+class FilteringMinimumPriorityTests(unittest.TestCase):
+    """
+    Tests for L{FilteringLogObserver._minimumPriorityFor}.
+    """
+
+    def setUp(self):
+        self.predicate = LogLevelFilterPredicate(LogLevel.warn)
+        self.warn = LogLevel._priorityForLevel(LogLevel.warn)
+
+
+    def test_levelPredicate(self):
+        """
+        Events below the level of a L{LogLevelFilterPredicate} are not
+        forwarded.
+        """
+        observer = FilteringLogObserver(lambda e: None, [self.predicate])
+        self.assertEqual(observer._minimumPriorityFor("x"), self.warn)
+        self.predicate.setLogLevelForNamespace("x", LogLevel.error)
+        self.assertEqual(
+            observer._minimumPriorityFor("x"),
+            LogLevel._priorityForLevel(LogLevel.error))
+        self.assertEqual(observer._minimumPriorityFor(None), _PRIORITY_NONE)
+
+
+    def test_otherPredicateFirst(self):
+        """
+        Predicates after one which might accept anything do not count.
+        """
+        observer = FilteringLogObserver(
+            lambda e: None,
+            [lambda event: PredicateResult.yes, self.predicate])
+        self.assertEqual(observer._minimumPriorityFor("x"), 0)
+
+
+    def test_wrappedObserver(self):
+        """
+        Events which the wrapped observer does nothing with are not
+        forwarded.
+        """
+        observer = FilteringLogObserver(LogPublisher(), [self.predicate])
+        self.assertEqual(observer._minimumPriorityFor("x"), _PRIORITY_NONE)
+
+
+    def test_negativeObserver(self):
+        """
+        Events rejected by the predicates are forwarded to the negative
+        observer.
+        """
+        observer = FilteringLogObserver(
+            lambda e: None, [self.predicate], lambda e: None)
+        self.assertEqual(observer._minimumPriorityFor("x"), 0)
+
+
+
 class LogLevelFilterPredicateTests(unittest.TestCase):
     """
     Tests for L{LogLevelFilterPredicate}.
@@ -22,6 +22,7 @@ from .._format import formatEvent
 from .._flatten import (
     flattenEvent, extractField, KeyFlattener, aFormatter
 )
+from .. import _flatten
 
 
 
@@ -127,6 +128,33 @@ class FlatFormattingTests(unittest.TestCase):
         self.assertEqual(formatEvent(event1), "unpersistable: un-persistable")
 
 
+    def test_sameFormat(self):
+        """
+        Events with the same format are each flattened with their own values.
+        """
+        events = [
+            dict(log_format="{a} {b.real!r} {c()}", a=n, b=n * 2,
+                 c=lambda n=n: n * 3)
+            for n in range(3)
+        ]
+        for event in events:
+            flattenEvent(event)
+        self.assertEqual(
+            [formatEvent(event) for event in events],
+            ["0 0 0", "1 2 3", "2 4 6"])
+
+
+    def test_formatsCacheBounded(self):
+        """
+        No more than a fixed number of formats' fields are remembered.
+        """
+        self.patch(_flatten, "_FIELDS_CACHE_SIZE", 2)
+        self.patch(_flatten, "_fieldsByFormat", {})
+        for n in range(3):
+            flattenEvent({"log_format": "{x%d}" % (n,), "x%d" % (n,): n})
+        self.assertTrue(len(_flatten._fieldsByFormat) <= 2)
+
+
     def test_keyFlattening(self):
         """
         Test that L{KeyFlattener.flatKey} returns the expected keys for format
@@ -5,6 +5,7 @@
 Tests for L{twisted.logger._json}.
 """
 
+import io
 from io import StringIO, BytesIO
 
 from zope.interface.verify import verifyObject, BrokenMethodImplementation
@@ -22,7 +23,7 @@ from .._flatten import extractField
 from .._global import globalLogPublisher
 from .._json import (
     eventAsJSON, eventFromJSON, jsonFileLogObserver, eventsFromJSONLogFile,
-    log as jsonLog
+    indexJSONLogFile, log as jsonLog, _timeIndexEntry
 )
 from .._logger import Logger
 
@@ -565,3 +566,190 @@ class LogFileReaderTests(TestCase):
 
             self.assertEqual(tuple(events), (event,))
             self.assertEqual(len(self.errorEvents), 0)
+
+
+
+class MappedLogFileReaderTests(TestCase):
+    """
+    Tests for L{eventsFromJSONLogFile} reading regular files, which it maps
+    into memory, and for its use of an index written by L{indexJSONLogFile}.
+    """
+
+    def setUp(self):
+        self.errorEvents = []
+
+        def observer(event):
+            if (
+                event["log_namespace"] == jsonLog.namespace and
+                "record" in event
+            ):
+                self.errorEvents.append(event)
+
+        globalLogPublisher.addObserver(observer)
+        self.addCleanup(globalLogPublisher.removeObserver, observer)
+        self.path = self.mktemp()
+
+
+    def writeFile(self, data):
+        """
+        Write C{data} to the file, and open it for reading.
+        """
+        with io.open(self.path, "wb") as f:
+            f.write(data)
+        f = io.open(self.path, "rb")
+        self.addCleanup(f.close)
+        return f
+
+
+    def writeEvents(self, times, recordSeparator=u"\x1e"):
+        """
+        Write events logged at the given times to the file, with
+        L{jsonFileLogObserver}.
+        """
+        with io.open(self.path, "a", encoding="utf-8") as f:
+            observer = jsonFileLogObserver(f, recordSeparator)
+            for when in times:
+                observer(dict(log_time=when, n=when))
+
+
+    def index(self, **kwargs):
+        """
+        Index the file, to another file.
+
+        @return: The index, opened for reading.
+        """
+        indexPath = self.path + ".index"
+        with io.open(self.path, "rb") as inFile:
+            with io.open(indexPath, "a+b") as indexFile:
+                indexJSONLogFile(inFile, indexFile, **kwargs)
+        indexFile = io.open(indexPath, "rb")
+        self.addCleanup(indexFile.close)
+        return indexFile
+
+
+    def read(self, **kwargs):
+        """
+        Read the times of the events in the file.
+        """
+        with io.open(self.path, "rb") as f:
+            return [event["n"] for event in eventsFromJSONLogFile(f, **kwargs)]
+
+
+    def test_readRecordSeparator(self):
+        """
+        Records separated by C{u"\x1e"} are read from a regular file, and a
+        truncated record is logged.
+        """
+        f = self.writeFile(b'\x1e{"x": 1}\n\x1e{"y": 2}\n\x1e{"z": 3')
+        self.assertEqual(
+            list(eventsFromJSONLogFile(f)), [{u"x": 1}, {u"y": 2}])
+        self.assertEqual(len(self.errorEvents), 1)
+        self.assertEqual(self.errorEvents[0]["record"], b'{"z": 3')
+
+
+    def test_readNewlines(self):
+        """
+        Records separated by newlines are read from a regular file, starting
+        at its current position.
+        """
+        f = self.writeFile(b'{"x": 1}\n{"y": 2}\n{"z": 3}\n')
+        f.readline()
+        self.assertEqual(
+            list(eventsFromJSONLogFile(f)), [{u"y": 2}, {u"z": 3}])
+
+
+    def test_readEmpty(self):
+        """
+        An empty file has no events.
+        """
+        self.assertEqual(list(eventsFromJSONLogFile(self.writeFile(b""))), [])
+
+
+    def test_sinceUntil(self):
+        """
+        With C{since} and C{until}, only the events logged from C{since} up
+        to C{until} are read.
+        """
+        self.writeEvents([3, 1, 4, 1, 5, 9, 2, 6])
+        self.assertEqual(self.read(since=2, until=6), [3, 4, 5, 2])
+        self.assertEqual(self.read(since=5), [5, 9, 6])
+        self.assertEqual(self.read(until=2), [1, 1])
+
+
+    def test_index(self):
+        """
+        L{indexJSONLogFile} writes the earliest and latest time of the events
+        in each block of the file.
+        """
+        self.writeEvents([3, 1, 4, 1, 5, 9])
+        size = len(open(self.path, "rb").read()) // 6
+        entries = self.readIndex(self.index(blockSize=size * 2))
+        self.assertEqual(
+            entries,
+            [(0, size * 2, 1, 3), (size * 2, size * 2, 1, 4),
+             (size * 4, size * 2, 5, 9)])
+
+
+    def readIndex(self, indexFile):
+        """
+        Read the entries of an index.
+        """
+        data = indexFile.read()
+        return [
+            _timeIndexEntry.unpack(data[i:i + _timeIndexEntry.size])
+            for i in range(0, len(data), _timeIndexEntry.size)
+        ]
+
+
+    def test_indexIncomplete(self):
+        """
+        L{indexJSONLogFile} leaves a last record which may not have been
+        completely written out of the index, and indexes it and whatever
+        follows the next time.
+        """
+        self.writeEvents([1, 2], recordSeparator=u"")
+        with io.open(self.path, "ab") as f:
+            f.write(b'{"log_time": 3, "n"')
+        entries = self.readIndex(self.index())
+        self.assertEqual(len(entries), 1)
+        self.assertEqual(entries[0][2:], (1, 2))
+        with io.open(self.path, "ab") as f:
+            f.write(b': 3}\n')
+        self.writeEvents([4], recordSeparator=u"")
+        entries = self.readIndex(self.index())
+        self.assertEqual(len(entries), 2)
+        self.assertEqual(entries[1][0], entries[0][1])
+        self.assertEqual(entries[1][2:], (3, 4))
+
+
+    def test_readWithIndex(self):
+        """
+        With a C{timeIndex}, blocks of the file without events between
+        C{since} and C{until} are not read, while events written after the
+        file was indexed are.
+        """
+        self.writeEvents([1, 2])
+        with io.open(self.path, "ab") as f:
+            f.write(b'\x1eunreadable\n')
+        self.writeEvents([3, 4, 5, 6])
+        size = len(open(self.path, "rb").read()) // 7
+        indexFile = self.index(blockSize=size)
+        self.writeEvents([7, 4])
+
+        self.assertEqual(
+            self.read(timeIndex=indexFile, since=4, until=8), [4, 5, 6, 7, 4])
+        self.assertEqual(self.errorEvents, [])
+
+        self.assertEqual(self.read(since=4, until=8), [4, 5, 6, 7, 4])
+        self.assertEqual(len(self.errorEvents), 1)
+
+
+    def test_otherIndex(self):
+        """
+        An index of a longer file is ignored.
+        """
+        self.writeEvents([1, 2, 3])
+        indexFile = self.index()
+        self.writeFile(b"")
+        self.writeEvents([4])
+        self.assertEqual(self.read(timeIndex=indexFile, since=4), [4])
@@ -12,6 +12,8 @@ from .._levels import LogLevel
 from .._format import formatEvent
 from .._logger import Logger
 from .._global import globalLogPublisher
+from .._observer import LogPublisher
+from .._filter import FilteringLogObserver, LogLevelFilterPredicate
 
 
 
@@ -266,3 +268,74 @@ class LoggerTests(unittest.TestCase):
 
         log = TestLogger(observer=publisher)
         log.info("Hello.", log_trace=[])
+
+
+
+class CountingPredicate(LogLevelFilterPredicate):
+    """
+    L{LogLevelFilterPredicate} which counts the events it is called with.
+    """
+    calls = 0
+
+    def __call__(self, event):
+        self.calls += 1
+        return LogLevelFilterPredicate.__call__(self, event)
+
+
+
+class GatingTests(unittest.TestCase):
+    """
+    Tests for L{Logger} not making events which no observer will do anything
+    with.
+    """
+
+    def setUp(self):
+        self.events = []
+        self.predicate = CountingPredicate(LogLevel.info)
+        self.publisher = LogPublisher(
+            FilteringLogObserver(self.events.append, [self.predicate]))
+        self.log = Logger(namespace="a.b", observer=self.publisher)
+
+
+    def test_filtered(self):
+        """
+        Events below the level which the observers filter out are not made.
+        """
+        self.log.debug("debug")
+        self.log.info("info")
+        self.assertEqual([e["log_format"] for e in self.events], ["info"])
+        self.assertEqual(self.predicate.calls, 1)
+
+
+    def test_setLogLevel(self):
+        """
+        Changing the log level of a namespace lets events through again.
+        """
+        self.log.debug("first")
+        self.predicate.setLogLevelForNamespace("a", LogLevel.debug)
+        self.log.debug("second")
+        self.predicate.clearLogLevels()
+        self.log.debug("third")
+        self.assertEqual([e["log_format"] for e in self.events], ["second"])
+
+
+    def test_addObserver(self):
+        """
+        Adding an observer which takes all events to the publisher lets
+        events through again, and removing it stops them.
+        """
+        events = []
+        self.log.debug("first")
+        self.publisher.addObserver(events.append)
+        self.log.debug("second")
+        self.publisher.removeObserver(events.append)
+        self.log.debug("third")
+        self.assertEqual([e["log_format"] for e in events], ["second"])
+
+
+    def test_trace(self):
+        """
+        Events which are being traced are made regardless.
+        """
+        self.log.debug("debug", log_trace=[])
+        self.assertEqual(self.predicate.calls, 1)
@@ -12,6 +12,8 @@ from twisted.trial import unittest
 from .._logger import Logger
 from .._observer import ILogObserver
 from .._observer import LogPublisher
+from .._observer import _PRIORITY_NONE
+from .._levels import LogLevel
 
 
 
@@ -188,3 +190,26 @@ class LogPublisherTests(unittest.TestCase):
 
         self.assertEqual(traces[1], ((publisher, o1),))
         self.assertEqual(traces[2], ((publisher, o1), (publisher, o2)))
+
+
+    def test_minimumPriorityFor(self):
+        """
+        L{LogPublisher._minimumPriorityFor} is the lowest of those of the
+        observers; observers which do not say take everything, and an empty
+        publisher takes nothing.
+        """
+        publisher = LogPublisher()
+        self.assertEqual(publisher._minimumPriorityFor("x"), _PRIORITY_NONE)
+
+        class Gated(object):
+            priority = LogLevel._priorityForLevel(LogLevel.warn)
+            def __call__(self, event):
+                pass
+            def _minimumPriorityFor(self, namespace):
+                return self.priority
+
+        gated = Gated()
+        publisher.addObserver(gated)
+        self.assertEqual(publisher._minimumPriorityFor("x"), gated.priority)
+        publisher.addObserver(lambda event: None)
+        self.assertEqual(publisher._minimumPriorityFor("x"), 0)
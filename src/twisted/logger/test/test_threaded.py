@@ -0,0 +1,254 @@
+# Copyright (c) Twisted Matrix Laboratories.
+# See LICENSE for details.
+
+"""
+Test cases for L{twisted.logger._threaded}.
+"""
+
+import threading
+import time
+
+from zope.interface.verify import verifyObject, BrokenMethodImplementation
+
+from twisted.trial.unittest import TestCase
+
+from .._observer import ILogObserver, LogPublisher, _PRIORITY_NONE
+from .._levels import LogLevel
+from .._threaded import ThreadedLogObserver
+
+
+
+class RecordingObserver(object):
+    """
+    Observer which records the events it writes, and the threads it writes
+    them in, and which can be held up.
+
+    @ivar batches: The batches of events written.
+    @ivar threads: The threads they were written in.
+    @ivar proceed: A L{threading.Event} which must be set for events to be
+        written.
+    @ivar writing: A L{threading.Event} set when a batch is being written.
+    @ivar syncs: The number of times L{sync} was called.
+    """
+
+    def __init__(self):
+        self.batches = []
+        self.threads = []
+        self.proceed = threading.Event()
+        self.proceed.set()
+        self.writing = threading.Event()
+        self.syncs = 0
+
+
+    def writeEvents(self, events):
+        self.writing.set()
+        self.proceed.wait()
+        self.batches.append(list(events))
+        self.threads.append(threading.current_thread())
+
+
+    def sync(self):
+        self.syncs += 1
+
+
+    @property
+    def events(self):
+        return [event for batch in self.batches for event in batch]
+
+
+
+class ThreadedLogObserverTests(TestCase):
+    """
+    Tests for L{ThreadedLogObserver}.
+    """
+
+    def makeObserver(self, observer=None, **kwargs):
+        """
+        Make a L{ThreadedLogObserver} wrapping a L{RecordingObserver}, which
+        is stopped at the end of the test.
+        """
+        if observer is None:
+            observer = RecordingObserver()
+        threaded = ThreadedLogObserver(observer, **kwargs)
+        self.addCleanup(threaded.stop)
+        self.addCleanup(observer.proceed.set)
+        return observer, threaded
+
+
+    def waitFor(self, condition):
+        """
+        Wait for at most ten seconds for C{condition} to be true.
+        """
+        deadline = time.time() + 10
+        while not condition():
+            if time.time() > deadline:
+                self.fail("Timed out")
+            time.sleep(0.001)
+
+
+    def test_interface(self):
+        """
+        L{ThreadedLogObserver} is an L{ILogObserver}.
+        """
+        observer = ThreadedLogObserver(lambda event: None)
+        try:
+            verifyObject(ILogObserver, observer)
+        except BrokenMethodImplementation as e:
+            self.fail(e)
+
+
+    def test_writesInAnotherThread(self):
+        """
+        Events observed by L{ThreadedLogObserver} are written by the wrapped
+        observer in another thread, by the time L{ThreadedLogObserver.flush}
+        returns.
+        """
+        observer, threaded = self.makeObserver()
+        threaded(dict(x=1))
+        threaded(dict(x=2))
+        self.assertTrue(threaded.flush(10))
+        self.assertEqual(observer.events, [dict(x=1), dict(x=2)])
+        self.assertNotIn(threading.current_thread(), observer.threads)
+        self.assertEqual(threaded.writtenEventCount, 2)
+        self.assertEqual(threaded.pendingEventCount, 0)
+
+
+    def test_plainObserver(self):
+        """
+        An observer without a C{writeEvents} method is called with each
+        event.
+        """
+        events = []
+        threaded = ThreadedLogObserver(events.append)
+        self.addCleanup(threaded.stop)
+        threaded(dict(x=1))
+        threaded(dict(x=2))
+        threaded.flush(10)
+        self.assertEqual(events, [dict(x=1), dict(x=2)])
+
+
+    def test_batches(self):
+        """
+        Events queued while a batch is being written are written together in
+        the next batch, at most C{batchSize} at a time.
+        """
+        observer, threaded = self.makeObserver(batchSize=2)
+        observer.proceed.clear()
+        threaded(dict(x=0))
+        observer.writing.wait(10)
+        for i in range(1, 4):
+            threaded(dict(x=i))
+        self.assertEqual(threaded.pendingEventCount, 3)
+        observer.proceed.set()
+        threaded.flush(10)
+        self.assertEqual(
+            [[event["x"] for event in batch] for batch in observer.batches],
+            [[0], [1, 2], [3]])
+
+
+    def test_flushTimeout(self):
+        """
+        L{ThreadedLogObserver.flush} returns C{False} if the events were not
+        written within the given number of seconds.
+        """
+        observer, threaded = self.makeObserver()
+        observer.proceed.clear()
+        threaded(dict(x=1))
+        self.assertFalse(threaded.flush(0.01))
+
+
+    def test_drop(self):
+        """
+        When C{bufferSize} events are waiting to be written, further events
+        are dropped and counted, and an event saying how many were is written
+        after the others.
+        """
+        observer, threaded = self.makeObserver(bufferSize=2)
+        observer.proceed.clear()
+        threaded(dict(x=0))
+        observer.writing.wait(10)
+        for i in range(1, 6):
+            threaded(dict(x=i))
+        self.assertEqual(threaded.droppedEventCount, 3)
+        observer.proceed.set()
+        threaded.flush(10)
+        self.waitFor(lambda: len(observer.events) == 4)
+        events = observer.events
+        self.assertEqual([event.get("x") for event in events[:3]], [0, 1, 2])
+        self.assertEqual(events[3]["log_dropped"], 3)
+        self.assertEqual(events[3]["log_level"], LogLevel.warn)
+
+
+    def test_block(self):
+        """
+        When C{bufferSize} events are waiting to be written and C{block} is
+        true, the thread logging an event waits until there is room for it.
+        """
+        observer, threaded = self.makeObserver(bufferSize=1, block=True)
+        observer.proceed.clear()
+        threaded(dict(x=0))
+        observer.writing.wait(10)
+        threaded(dict(x=1))
+        logger = threading.Thread(target=threaded, args=(dict(x=2),))
+        logger.start()
+        time.sleep(0.01)
+        self.assertTrue(logger.is_alive())
+        observer.proceed.set()
+        logger.join(10)
+        threaded.flush(10)
+        self.assertEqual([event["x"] for event in observer.events], [0, 1, 2])
+        self.assertEqual(threaded.droppedEventCount, 0)
+
+
+    def test_fsyncInterval(self):
+        """
+        With C{fsyncInterval}, the wrapped observer's C{sync} method is
+        called after events have been written, at most once per that many
+        seconds.
+        """
+        observer, threaded = self.makeObserver(fsyncInterval=0.01)
+        threaded(dict(x=1))
+        self.waitFor(lambda: observer.syncs == 1)
+        time.sleep(0.05)
+        self.assertEqual(observer.syncs, 1)
+        threaded(dict(x=2))
+        self.waitFor(lambda: observer.syncs == 2)
+
+
+    def test_stop(self):
+        """
+        L{ThreadedLogObserver.stop} waits for the queued events to be written,
+        and the wrapped observer to sync them, and events observed afterwards
+        are written in place.
+        """
+        observer, threaded = self.makeObserver(fsyncInterval=3600)
+        threaded(dict(x=1))
+        threaded.stop()
+        self.assertEqual(observer.events, [dict(x=1)])
+        self.assertEqual(observer.syncs, 1)
+        threaded(dict(x=2))
+        self.assertEqual(observer.events, [dict(x=1), dict(x=2)])
+        self.assertIs(observer.threads[-1], threading.current_thread())
+
+
+    def test_failure(self):
+        """
+        Events which the wrapped observer fails to write are counted.
+        """
+        def fail(event):
+            raise RuntimeError()
+        threaded = ThreadedLogObserver(fail)
+        self.addCleanup(threaded.stop)
+        threaded(dict(x=1))
+        threaded.flush(10)
+        self.assertEqual(threaded.failedEventCount, 1)
+        self.assertEqual(threaded.writtenEventCount, 0)
+
+
+    def test_minimumPriorityFor(self):
+        """
+        L{ThreadedLogObserver._minimumPriorityFor} is that of the wrapped
+        observer.
+        """
+        threaded = ThreadedLogObserver(LogPublisher())
+        self.assertEqual(threaded._minimumPriorityFor("x"), _PRIORITY_NONE)
@@ -51,6 +51,10 @@ class Resolver(common.ResolverBase):
     @ivar _reactor: A provider of L{IReactorTCP}, L{IReactorUDP}, and
         L{IReactorTime} which will be used to set up network resources and
         track timeouts.
+
+    @ivar _tlsOptions: The L{IOpenSSLClientConnectionCreator} used to secure
+        connections to the name servers with TLS, or L{None} to query them
+        in the clear.
     """
     index = 0
     timeout = None
@@ -62,10 +66,12 @@ class Resolver(common.ResolverBase):
     connections = None
 
     resolv = None
+    _tlsOptions = None
     _lastResolvTime = None
     _resolvReadInterval = 60
 
-    def __init__(self, resolv=None, servers=None, timeout=(1, 3, 11, 45), reactor=None):
+    def __init__(self, resolv=None, servers=None, timeout=(1, 3, 11, 45),
+                 reactor=None, idleTimeout=None, tlsOptions=None):
         """
         Construct a resolver which will query domain name servers listed in
         the C{resolv.conf(5)}-format file given by C{resolv} as well as
@@ -91,7 +97,22 @@ class Resolver(common.ResolverBase):
         @param reactor: A provider of L{IReactorTime}, L{IReactorUDP}, and
             L{IReactorTCP} which will be used to establish connections, listen
             for DNS datagrams, and enforce timeouts.  If not provided, the
-            global reactor will be used.
+            global reactor will be used.  If C{tlsOptions} is given, it must
+            also provide L{IReactorSSL}.
+
+        @type idleTimeout: L{int} or L{float} or L{None}
+        @param idleTimeout: The number of seconds a TCP connection to a name
+            server is kept open while no queries are outstanding on it.  If
+            L{None}, connections are kept open until the server closes them.
+
+        @param tlsOptions: If not L{None}, an
+            L{IOpenSSLClientConnectionCreator
+            <twisted.internet.interfaces.IOpenSSLClientConnectionCreator>},
+            such as the result of
+            L{twisted.internet.ssl.optionsForClientTLS}, used to make every
+            query over a TLS connection (DNS over TLS, RFC 7858) instead of
+            over UDP.  The name servers are then usually listening on
+            L{dns.TLS_PORT}.
 
         @raise ValueError: Raised if no nameserver addresses can be found.
         """
@@ -113,7 +134,10 @@ class Resolver(common.ResolverBase):
         if not len(self.servers) and not resolv:
             raise ValueError("No nameservers specified")
 
-        self.factory = DNSClientFactory(self, timeout)
+        self._tlsOptions = tlsOptions
+
+        self.factory = DNSClientFactory(self, timeout, reactor=reactor,
+                                        idleTimeout=idleTimeout)
         self.factory.noisy = 0   # Be quiet by default
 
         self.connections = []
@@ -353,6 +377,11 @@ class Resolver(common.ResolverBase):
         """
         Make a number of DNS queries via TCP.
 
+        Queries share one persistent connection to a name server, with any
+        number of them outstanding at once.  While that connection is being
+        established, further queries wait for it rather than opening
+        connections of their own.
+
         @type queries: Any non-zero number of C{dns.Query} instances
         @param queries: The queries to make.
 
@@ -362,17 +391,37 @@ class Resolver(common.ResolverBase):
         @rtype: C{Deferred}
         """
         if not len(self.connections):
-            address = self.pickServer()
-            if address is None:
-                return defer.fail(IOError("No domain name servers available"))
-            host, port = address
-            self._reactor.connectTCP(host, port, self.factory)
+            if not self.pending:
+                address = self.pickServer()
+                if address is None:
+                    return defer.fail(
+                        IOError("No domain name servers available"))
+                host, port = address
+                self._connectTCP(host, port)
             self.pending.append((defer.Deferred(), queries, timeout))
             return self.pending[-1][0]
         else:
             return self.connections[0].query(queries, timeout)
 
 
+    def _connectTCP(self, host, port):
+        """
+        Start connecting C{self.factory} to a name server, using TLS if this
+        resolver was given C{tlsOptions}.
+
+        @param host: The address of the name server.
+        @type host: L{str}
+
+        @param port: The port number of the name server.
+        @type port: L{int}
+        """
+        if self._tlsOptions is None:
+            self._reactor.connectTCP(host, port, self.factory)
+        else:
+            self._reactor.connectSSL(
+                host, port, self.factory, self._tlsOptions)
+
+
     def filterAnswers(self, message):
         """
         Extract results from the given message.
@@ -395,7 +444,8 @@ class Resolver(common.ResolverBase):
 
     def _lookup(self, name, cls, type, timeout):
         """
-        Build a L{dns.Query} for the given parameters and dispatch it via UDP.
+        Build a L{dns.Query} for the given parameters and dispatch it via UDP,
+        or via TCP if this resolver uses TLS.
 
         If this query is already outstanding, it will not be re-issued.
         Instead, when the outstanding query receives a response, that response
@@ -413,7 +463,11 @@ class Resolver(common.ResolverBase):
         waiting = self._waiting.get(key)
         if waiting is None:
             self._waiting[key] = []
-            d = self.queryUDP([dns.Query(name, type, cls)], timeout)
+            if self._tlsOptions is None:
+                d = self.queryUDP([dns.Query(name, type, cls)], timeout)
+            else:
+                d = self.queryTCP([dns.Query(name, type, cls)],
+                                  sum(timeout or self.timeout))
             def cbResult(result):
                 for d in self._waiting.pop(key):
                     d.callback(result)
@@ -528,9 +582,22 @@ class ThreadedResolver(_ThreadedResolverImpl):
 
 
 class DNSClientFactory(protocol.ClientFactory):
-    def __init__(self, controller, timeout = 10):
+    """
+    Factory for L{dns.DNSProtocol} connections on behalf of a controller such
+    as L{Resolver}.
+
+    @ivar _reactor: The L{IReactorTime} provider given to the protocols this
+        factory builds, or L{None} to use the global reactor.
+
+    @ivar _idleTimeout: The C{idleTimeout} given to the protocols this
+        factory builds.
+    """
+    def __init__(self, controller, timeout=10, reactor=None,
+                 idleTimeout=None):
         self.controller = controller
         self.timeout = timeout
+        self._reactor = reactor
+        self._idleTimeout = idleTimeout
 
 
     def clientConnectionLost(self, connector, reason):
@@ -565,7 +632,8 @@ class DNSClientFactory(protocol.ClientFactory):
 
 
     def buildProtocol(self, addr):
-        p = dns.DNSProtocol(self.controller)
+        p = dns.DNSProtocol(self.controller, reactor=self._reactor)
+        p.idleTimeout = self._idleTimeout
         p.factory = self
         return p
 
@@ -40,7 +40,7 @@ __all__ = [
     'DNSDatagramProtocol', 'DNSMixin', 'DNSProtocol',
 
     'OK', 'OP_INVERSE', 'OP_NOTIFY', 'OP_QUERY', 'OP_STATUS', 'OP_UPDATE',
-    'PORT',
+    'PORT', 'TLS_PORT',
 
     'AuthoritativeDomainError', 'DNSQueryTimeoutError', 'DomainError',
     ]
@@ -116,6 +116,7 @@ def randomSource():
 
 
 PORT = 53
+TLS_PORT = 853
 
 (A, NS, MD, MF, CNAME, SOA, MB, MG, MR, NULL, WKS, PTR, HINFO, MINFO, MX, TXT,
  RP, AFSDB) = range(1, 19)
@@ -3140,9 +3141,23 @@ class DNSDatagramProtocol(DNSMixin, protocol.DatagramProtocol):
 class DNSProtocol(DNSMixin, protocol.Protocol):
     """
     DNS protocol over TCP.
+
+    Any number of queries may be outstanding on one connection at a time;
+    responses are matched to their queries by message ID, so they may arrive
+    in any order.
+
+    @ivar idleTimeout: The number of seconds to keep the connection open
+        while no queries are outstanding, or L{None} to keep it open until the
+        peer closes it.
+    @type idleTimeout: L{int} or L{float} or L{None}
+
+    @ivar _idleCall: The L{IDelayedCall} which will close the idle
+        connection, or L{None} if it is not scheduled.
     """
     length = None
     buffer = b''
+    idleTimeout = None
+    _idleCall = None
 
     def writeMessage(self, message):
         """
@@ -3159,14 +3174,57 @@ class DNSProtocol(DNSMixin, protocol.Protocol):
         """
         self.liveMessages = {}
         self.controller.connectionMade(self)
+        self._checkIdle()
 
 
     def connectionLost(self, reason):
         """
         Notify the controller that this protocol is no longer
-        connected.
+        connected, and fail any queries still waiting for a response.
         """
+        self._cancelIdle()
+        liveMessages = self.liveMessages or {}
+        self.liveMessages = {}
         self.controller.connectionLost(self)
+        for d, canceller in liveMessages.values():
+            canceller.cancel()
+            d.errback(reason)
+
+
+    def _checkIdle(self):
+        """
+        Schedule the connection to be closed after C{idleTimeout} seconds if
+        no queries are outstanding.
+        """
+        if (self.idleTimeout is not None and not self.liveMessages and
+                self._idleCall is None):
+            self._idleCall = self.callLater(self.idleTimeout, self._idle)
+
+
+    def _cancelIdle(self):
+        """
+        Cancel a pending idle disconnection, if there is one.
+        """
+        if self._idleCall is not None:
+            self._idleCall.cancel()
+            self._idleCall = None
+
+
+    def _idle(self):
+        """
+        The connection has been idle for C{idleTimeout} seconds: close it.
+        """
+        self._idleCall = None
+        self.transport.loseConnection()
+
+
+    def _clearFailed(self, deferred, id):
+        """
+        Clean the Deferred after a timeout, and start the idle timeout if it
+        was the last outstanding query.
+        """
+        DNSMixin._clearFailed(self, deferred, id)
+        self._checkIdle()
 
 
     def dataReceived(self, data):
@@ -3200,6 +3258,8 @@ class DNSProtocol(DNSMixin, protocol.Protocol):
             else:
                 break
 
+        self._checkIdle()
+
 
     def query(self, queries, timeout=60):
         """
@@ -3210,5 +3270,8 @@ class DNSProtocol(DNSMixin, protocol.Protocol):
 
         @rtype: C{Deferred}
         """
+        self._cancelIdle()
         id = self.pickID()
-        return self._query(queries, timeout, id, self.writeMessage)
+        d = self._query(queries, timeout, id, self.writeMessage)
+        self._checkIdle()
+        return d
@@ -0,0 +1 @@
+twisted.names.client.Resolver now sends concurrent TCP queries to a name server over one shared, pipelined connection, closes it after idleTimeout seconds without queries if idleTimeout is given, and makes every query over DNS over TLS (RFC 7858) if tlsOptions is given.
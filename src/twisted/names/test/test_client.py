@@ -8,6 +8,7 @@ Test cases for L{twisted.names.client}.
 from __future__ import division, absolute_import
 
 import errno
+import struct
 
 from zope.interface.verify import verifyClass, verifyObject
 
@@ -855,6 +856,103 @@ class ResolverTests(unittest.TestCase):
         self.assertEqual(len(prePending), 0)
 
 
+    def test_concurrentTCPQueriesShareConnection(self):
+        """
+        L{client.Resolver.queryTCP} makes only one connection attempt for
+        queries issued while a connection is being established, and sends
+        all of them over that connection once it is made.
+        """
+        reactor = proto_helpers.MemoryReactorClock()
+        resolver = client.Resolver(
+            servers=[('192.0.2.100', 53)],
+            reactor=reactor)
+
+        d1 = resolver.queryTCP([dns.Query(b'example.com')])
+        d2 = resolver.queryTCP([dns.Query(b'example.net')])
+        self.assertEqual(len(reactor.tcpClients), 1)
+
+        factory = reactor.tcpClients[0][2]
+        protocol = factory.buildProtocol(None)
+        protocol.makeConnection(proto_helpers.StringTransport())
+        self.assertEqual(len(protocol.liveMessages), 2)
+
+        for id in list(protocol.liveMessages):
+            response = dns.Message(id=id, answer=True)
+            data = response.toStr()
+            protocol.dataReceived(struct.pack('!H', len(data)) + data)
+
+        self.assertIsInstance(self.successResultOf(d1), dns.Message)
+        self.assertIsInstance(self.successResultOf(d2), dns.Message)
+
+        d3 = resolver.queryTCP([dns.Query(b'example.org')])
+        self.assertNoResult(d3)
+        self.assertEqual(len(reactor.tcpClients), 1)
+        self.assertEqual(len(protocol.liveMessages), 1)
+
+
+    def test_tcpIdleTimeout(self):
+        """
+        A TCP connection made by a L{client.Resolver} created with an
+        C{idleTimeout} is closed once no query has been outstanding on it for
+        that many seconds.
+        """
+        reactor = proto_helpers.MemoryReactorClock()
+        resolver = client.Resolver(
+            servers=[('192.0.2.100', 53)],
+            reactor=reactor, idleTimeout=30)
+
+        d = resolver.queryTCP([dns.Query(b'example.com')])
+        protocol = reactor.tcpClients[0][2].buildProtocol(None)
+        transport = proto_helpers.StringTransport()
+        protocol.makeConnection(transport)
+
+        reactor.advance(5)
+        self.assertFalse(transport.disconnecting)
+
+        [id] = protocol.liveMessages
+        data = dns.Message(id=id, answer=True).toStr()
+        protocol.dataReceived(struct.pack('!H', len(data)) + data)
+        self.successResultOf(d)
+
+        reactor.advance(29)
+        self.assertFalse(transport.disconnecting)
+        reactor.advance(1)
+        self.assertTrue(transport.disconnecting)
+
+
+    def test_queryOverTLS(self):
+        """
+        A L{client.Resolver} created with C{tlsOptions} connects to its name
+        servers with TLS using those options, and sends lookups over that
+        connection instead of over UDP.
+        """
+        reactor = proto_helpers.MemoryReactorClock()
+        options = object()
+        resolver = client.Resolver(
+            servers=[('192.0.2.100', dns.TLS_PORT)],
+            reactor=reactor, tlsOptions=options)
+
+        d = resolver.lookupAddress(b'example.com')
+        self.assertNoResult(d)
+        self.assertEqual(reactor.tcpClients, [])
+        [(host, port, factory, contextFactory, timeout,
+          bindAddress)] = reactor.sslClients
+        self.assertEqual((host, port), ('192.0.2.100', 853))
+        self.assertIs(contextFactory, options)
+
+        protocol = factory.buildProtocol(None)
+        protocol.makeConnection(proto_helpers.StringTransport())
+        [id] = protocol.liveMessages
+        response = dns.Message(id=id, answer=True)
+        response.answers = [
+            dns.RRHeader(b'example.com', payload=dns.Record_A('192.0.2.1'))]
+        data = response.toStr()
+        protocol.dataReceived(struct.pack('!H', len(data)) + data)
+
+        answers, authority, additional = self.successResultOf(d)
+        self.assertEqual(answers[0].payload.dottedQuad(), '192.0.2.1')
+
+
 
 class ClientTests(unittest.TestCase):
 
@@ -1405,6 +1405,47 @@ class DNSProtocolTests(unittest.TestCase):
         self.assertEqual(self.controller.connections, [])
 
 
+    def test_connectionLostFailsQueries(self):
+        """
+        When a L{dns.DNSProtocol} loses its connection, queries still waiting
+        for a response fail with the reason the connection was lost.
+        """
+        d = self.proto.query([dns.Query(b'foo')])
+        self.proto.connectionLost(
+            Failure(ConnectionDone("Fake Connection Done")))
+        self.failureResultOf(d, ConnectionDone)
+        self.assertEqual(self.proto.liveMessages, {})
+        self.assertEqual(self.clock.getDelayedCalls(), [])
+
+
+    def test_idleTimeout(self):
+        """
+        When L{dns.DNSProtocol.idleTimeout} is set, the connection is closed
+        after no query has been outstanding for that many seconds.
+        """
+        self.proto.idleTimeout = 10
+        d = self.proto.query([dns.Query(b'foo')])
+        self.clock.advance(10)
+        self.assertFalse(self.proto.transport.disconnecting)
+
+        m = dns.Message()
+        m.id = next(iter(self.proto.liveMessages.keys()))
+        s = m.toStr()
+        self.proto.dataReceived(struct.pack('!H', len(s)) + s)
+        self.successResultOf(d)
+
+        self.clock.advance(9)
+        self.assertFalse(self.proto.transport.disconnecting)
+        d = self.proto.query([dns.Query(b'bar')])
+        self.clock.advance(9)
+        self.assertFalse(self.proto.transport.disconnecting)
+        self.clock.advance(60)
+        self.failureResultOf(d, dns.DNSQueryTimeoutError)
+        self.assertFalse(self.proto.transport.disconnecting)
+        self.clock.advance(10)
+        self.assertTrue(self.proto.transport.disconnecting)
+
+
     def test_queryTimeout(self):
         """
         Test that query timeouts after some seconds.
@@ -0,0 +1 @@
+twisted.python.failure.Failure now builds its frames and stack only when they are first used, making Failures which are never formatted cheaper to create.
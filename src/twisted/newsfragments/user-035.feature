@@ -0,0 +1 @@
+twisted.internet.defer.ensureDeferred now runs coroutines with a dedicated task, making each await cheaper.
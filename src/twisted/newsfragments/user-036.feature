@@ -0,0 +1 @@
+twisted.internet.defer.parallel applies a function to the items of an iterable with at most a given number of calls in flight at once, taking items lazily and giving results in order or as they complete.
@@ -0,0 +1 @@
+twisted.python.threadpool.ThreadPool now takes a name, can adapt its size to the work it is given when adaptive is true, and reports statistics, and reactors now have getThreadPool, returning the default threadpool or a named one.
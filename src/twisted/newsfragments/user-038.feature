@@ -0,0 +1 @@
+Reactors now wake up once for a burst of callFromThread calls, rather than once per call.
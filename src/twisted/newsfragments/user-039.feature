@@ -0,0 +1 @@
+twisted.internet.processpool.ProcessPool runs functions in a pool of worker processes, returning Deferreds of their results.
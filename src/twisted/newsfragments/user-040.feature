@@ -0,0 +1 @@
+twisted.enterprise.adbapi.ConnectionPool now shares its connections between its threads, can check connections before use and time out waiting for one, caches prepared statements, and reports statistics.
@@ -0,0 +1 @@
+twisted.logger.ThreadedLogObserver wraps a log observer so that events are written from a dedicated thread, keeping slow observers off the reactor thread.
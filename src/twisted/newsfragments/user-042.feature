@@ -0,0 +1 @@
+twisted.logger.Logger now skips making log events which no observer will take, because of the log levels set on twisted.logger.LogLevelFilterPredicate.
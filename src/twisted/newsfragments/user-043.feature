@@ -0,0 +1 @@
+twisted.logger.jsonFileLogObserver and eventsFromJSONLogFile are now faster, and twisted.logger.indexJSONLogFile writes a time index which eventsFromJSONLogFile can use to read only the events between since and until.
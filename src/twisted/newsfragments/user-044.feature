@@ -0,0 +1 @@
+twisted.python.logfile.TimestampedLogFile rotates log files into files named by the time of rotation, and log files now have reopenOnSignal, reopening the file when a signal such as SIGHUP is received.
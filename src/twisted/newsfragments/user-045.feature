@@ -0,0 +1 @@
+twisted.spread.banana now decodes and encodes faster, decoding from offsets into one buffer and encoding into one list.
@@ -0,0 +1 @@
+twisted.spread.jelly now jellies and unjellies faster, dispatching on exact types and caching the decisions of SecurityOptions.
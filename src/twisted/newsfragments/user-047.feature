@@ -0,0 +1 @@
+twisted.spread.util.StreamSender and StreamReceiver stream bytes over Perspective Broker with flow control, writing them to a consumer at the other end.
@@ -0,0 +1 @@
+twisted.protocols.amp now parses and serializes AMP boxes faster.
@@ -0,0 +1 @@
+twisted.protocols.amp.Command now prepares its argument and response schemas once, when it is defined, making each call faster.
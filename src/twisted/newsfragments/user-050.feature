@@ -0,0 +1 @@
+twisted.protocols.amppool.AMPConnectionPool is a service which spreads AMP commands over several connections to an endpoint.
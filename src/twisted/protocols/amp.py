@@ -200,7 +200,7 @@ __metaclass__ = type
 import types, warnings
 
 from io import BytesIO
-from struct import pack
+from struct import pack, Struct
 import decimal, datetime
 from functools import partial
 from itertools import count
@@ -309,6 +309,15 @@ UNHANDLED_ERROR_CODE = b'UNHANDLED'
 MAX_KEY_LENGTH = 0xff
 MAX_VALUE_LENGTH = 0xffff
 
+_packLength = Struct("!H").pack
+_unpackLength = Struct("!H").unpack_from
+
+# The wire encoding of the keys which appear in almost every box, with their
+# length prefixes, so that serializing a box need not pack them again.
+_prefixedKeys = dict(
+    (key, _packLength(len(key)) + key)
+    for key in (ASK, ANSWER, COMMAND, ERROR, ERROR_CODE, ERROR_DESCRIPTION))
+
 
 
 class IArgumentType(Interface):
@@ -686,23 +695,26 @@ class AmpBox(dict):
         @return: a C{bytes} encoded according to the rules described in the
             module docstring.
         """
-        i = sorted(iteritems(self))
         L = []
         w = L.append
-        for k, v in i:
+        for k, v in sorted(iteritems(self)):
             if type(k) == unicode:
                 raise TypeError("Unicode key not allowed: %r" % k)
             if type(v) == unicode:
                 raise TypeError(
                     "Unicode value for key %r not allowed: %r" % (k, v))
-            if len(k) > MAX_KEY_LENGTH:
-                raise TooLong(True, True, k, None)
-            if len(v) > MAX_VALUE_LENGTH:
+            prefixedKey = _prefixedKeys.get(k)
+            if prefixedKey is None:
+                if len(k) > MAX_KEY_LENGTH:
+                    raise TooLong(True, True, k, None)
+                prefixedKey = _packLength(len(k)) + k
+            length = len(v)
+            if length > MAX_VALUE_LENGTH:
                 raise TooLong(False, True, v, k)
-            for kv in k, v:
-                w(pack("!H", len(kv)))
-                w(kv)
-        w(pack("!H", 0))
+            w(prefixedKey)
+            w(_packLength(length))
+            w(v)
+        w(b'\x00\x00')
         return b''.join(L)
 
 
@@ -1633,20 +1645,17 @@ class AmpList(Argument):
             "AmpList should be defined with a list of (name, argument) "
             "tuples where `name' is a byte string, got: %r" % (subargs, ))
         self.subargs = subargs
+        self._schema = _ArgumentSchema(subargs)
         Argument.__init__(self, optional)
 
 
     def fromStringProto(self, inString, proto):
-        boxes = parseString(inString)
-        values = [_stringsToObjects(box, self.subargs, proto)
-                  for box in boxes]
-        return values
+        toObjects = self._schema.toObjects
+        return [toObjects(box, proto) for box in parseString(inString)]
 
 
     def toStringProto(self, inObject, proto):
-        return b''.join([_objectsToStrings(
-                    objects, self.subargs, Box(), proto
-                    ).serialize() for objects in inObject])
+        return self._schema.serializeAll(inObject, proto)
 
 
 
@@ -1716,6 +1725,189 @@ class Descriptor(Integer):
 
 
 
+class _ArgumentSchema(object):
+    """
+    A list of (name, argument) pairs, as in L{Command.arguments}, prepared once
+    for converting between boxes of strings and dictionaries of Python objects.
+
+    If every argument converts its value with the L{Argument} implementations
+    of C{fromBox}, C{toBox} and C{retrieve}, each one is reduced to its wire
+    name, its Python name, whether it is optional and the functions which
+    convert its value, and a conversion is a single loop over those: names are
+    not converted again and neither input dictionary is copied.  Otherwise,
+    conversions are done by L{_stringsToObjects} and L{_objectsToStrings},
+    which give each argument a chance to read or write any keys it likes; so
+    are conversions of objects which are not in a C{dict}.
+
+    @ivar arglist: The list of (name, argument) pairs.
+
+    @ivar pythonNames: A C{frozenset} of the Python names, as given by
+        L{_wireNameToPythonIdentifier}, of all the arguments.
+
+    @ivar requiredNames: A C{list} of the Python names of the arguments which
+        are not optional, in order.
+
+    @ivar _fields: A C{list} of 7-tuples for converting each argument, or
+        L{None} if the arguments cannot be converted without L{Argument.fromBox}
+        and L{Argument.toBox}.  Each tuple holds the wire name, the Python name,
+        whether the argument is optional, the function converting a string to
+        an object, whether that function takes the protocol as well, the
+        function converting an object to a string and whether that function
+        takes the protocol as well.
+
+    @ivar _serializedFields: A C{list} like L{_fields}, but sorted by wire
+        name and with each wire name already length-prefixed for
+        L{serializeAll}, or L{None} if L{_fields} is L{None} or a name is too
+        long to be serialized.
+    """
+
+    def __init__(self, arglist):
+        self.arglist = arglist
+        self.pythonNames = frozenset(
+            _wireNameToPythonIdentifier(name) for name, _ in arglist)
+        self.requiredNames = [
+            _wireNameToPythonIdentifier(name)
+            for name, argument in arglist if not argument.optional]
+        fields = []
+        for name, argument in arglist:
+            cls = argument.__class__
+            if not (isinstance(argument, Argument) and
+                    cls.fromBox == Argument.fromBox and
+                    cls.toBox == Argument.toBox and
+                    cls.retrieve == Argument.retrieve):
+                fields = None
+                break
+            if cls.fromStringProto == Argument.fromStringProto:
+                fromString, fromStringProto = argument.fromString, False
+            else:
+                fromString, fromStringProto = argument.fromStringProto, True
+            if cls.toStringProto == Argument.toStringProto:
+                toString, toStringProto = argument.toString, False
+            else:
+                toString, toStringProto = argument.toStringProto, True
+            fields.append((name, _wireNameToPythonIdentifier(name),
+                           argument.optional, fromString, fromStringProto,
+                           toString, toStringProto))
+        self._fields = fields
+        self._serializedFields = None
+        if fields is not None and all(
+                len(field[0]) <= MAX_KEY_LENGTH for field in fields):
+            self._serializedFields = [
+                (name, _packLength(len(name)) + name, pythonName, optional,
+                 toString, toStringProto)
+                for (name, pythonName, optional, _, _, toString,
+                     toStringProto) in sorted(fields, key=lambda f: f[0])]
+
+
+    def toObjects(self, strings, proto):
+        """
+        Convert a box to a dictionary of Python objects, like
+        L{_stringsToObjects}.
+
+        @param strings: an AmpBox (or dict of strings)
+
+        @param proto: an L{AMP} instance.
+
+        @return: the converted dictionary mapping names to argument objects.
+        """
+        if self._fields is None:
+            return _stringsToObjects(strings, self.arglist, proto)
+        objects = {}
+        for (name, pythonName, optional, fromString, fromStringProto,
+             _, _) in self._fields:
+            if optional:
+                value = strings.get(name)
+                if value is None:
+                    objects[pythonName] = None
+                    continue
+            else:
+                value = strings[name]
+            if fromStringProto:
+                objects[pythonName] = fromString(value, proto)
+            else:
+                objects[pythonName] = fromString(value)
+        return objects
+
+
+    def toStrings(self, objects, strings, proto):
+        """
+        Convert a dictionary of Python objects to a box, like
+        L{_objectsToStrings}.
+
+        @param objects: a dict mapping names to python objects
+
+        @param strings: [OUT PARAMETER] An object providing the L{dict}
+        interface which will be populated with serialized data.
+
+        @param proto: an L{AMP} instance.
+
+        @return: C{strings}.
+        """
+        if self._fields is None or not isinstance(objects, dict):
+            return _objectsToStrings(objects, self.arglist, strings, proto)
+        for (name, pythonName, optional, _, _,
+             toString, toStringProto) in self._fields:
+            if optional:
+                value = objects.get(pythonName)
+                if value is None:
+                    continue
+            else:
+                value = objects[pythonName]
+            if toStringProto:
+                strings[name] = toString(value, proto)
+            else:
+                strings[name] = toString(value)
+        return strings
+
+
+    def serializeAll(self, objectsList, proto):
+        """
+        Convert each of a list of dictionaries of Python objects to a box and
+        serialize them all, like calling L{AmpBox.serialize} on the result of
+        L{toStrings} for each of them, but without building the boxes.
+
+        @param objectsList: a list of dicts mapping names to python objects
+
+        @param proto: an L{AMP} instance.
+
+        @return: a C{bytes} encoding all of the boxes.
+        """
+        if self._serializedFields is None:
+            return b''.join([self.toStrings(objects, Box(), proto).serialize()
+                             for objects in objectsList])
+        L = []
+        w = L.append
+        for objects in objectsList:
+            if not isinstance(objects, dict):
+                w(self.toStrings(objects, Box(), proto).serialize())
+                continue
+            for (name, prefixedName, pythonName, optional,
+                 toString, toStringProto) in self._serializedFields:
+                if optional:
+                    value = objects.get(pythonName)
+                    if value is None:
+                        continue
+                else:
+                    value = objects[pythonName]
+                if toStringProto:
+                    value = toString(value, proto)
+                else:
+                    value = toString(value)
+                if type(value) == unicode:
+                    raise TypeError(
+                        "Unicode value for key %r not allowed: %r"
+                        % (name, value))
+                length = len(value)
+                if length > MAX_VALUE_LENGTH:
+                    raise TooLong(False, True, value, name)
+                w(prefixedName)
+                w(_packLength(length))
+                w(value)
+            w(b'\x00\x00')
+        return b''.join(L)
+
+
+
 class Command:
     """
     Subclass me to specify an AMP Command.
@@ -1762,7 +1954,8 @@ class Command:
     class __metaclass__(type):
         """
         Metaclass hack to establish reverse-mappings for 'errors' and
-        'fatalErrors' as class vars.
+        'fatalErrors' as class vars, and to prepare the 'arguments' and
+        'response' schemas for use by L{_ArgumentSchema}.
         """
         def __new__(cls, name, bases, attrs):
             reverseErrors = attrs['reverseErrors'] = {}
@@ -1817,6 +2010,8 @@ class Command:
                         "Fatal error names must be byte strings, got: %r"
                         % (name, ))
 
+            newtype._argumentSchema = _ArgumentSchema(newtype.arguments)
+            newtype._responseSchema = _ArgumentSchema(newtype.response)
             return newtype
 
     arguments = []
@@ -1851,15 +2046,12 @@ class Command:
         @raise InvalidSignature: if you forgot any required arguments.
         """
         self.structured = kw
-        forgotten = []
-        for name, arg in self.arguments:
-            pythonName = _wireNameToPythonIdentifier(name)
-            if pythonName not in self.structured and not arg.optional:
-                forgotten.append(pythonName)
+        forgotten = [pythonName
+                     for pythonName in self._argumentSchema.requiredNames
+                     if pythonName not in kw]
         if forgotten:
             raise InvalidSignature("forgot %s for %s" % (
                 ', '.join(forgotten), self.commandName))
-        forgotten = []
 
 
     def makeResponse(cls, objects, proto):
@@ -1879,7 +2071,7 @@ class Command:
             responseType = cls.responseType()
         except:
             return fail()
-        return _objectsToStrings(objects, cls.response, responseType, proto)
+        return cls._responseSchema.toStrings(objects, responseType, proto)
     makeResponse = classmethod(makeResponse)
 
 
@@ -1896,16 +2088,13 @@ class Command:
 
         @return: An instance of this L{Command}'s C{commandType}.
         """
-        allowedNames = set()
-        for (argName, ignored) in cls.arguments:
-            allowedNames.add(_wireNameToPythonIdentifier(argName))
-
-        for intendedArg in objects:
-            if intendedArg not in allowedNames:
-                raise InvalidSignature(
-                    "%s is not a valid argument" % (intendedArg,))
-        return _objectsToStrings(objects, cls.arguments, cls.commandType(),
-                                 proto)
+        schema = cls._argumentSchema
+        if not schema.pythonNames.issuperset(objects):
+            for intendedArg in objects:
+                if intendedArg not in schema.pythonNames:
+                    raise InvalidSignature(
+                        "%s is not a valid argument" % (intendedArg,))
+        return schema.toStrings(objects, cls.commandType(), proto)
     makeArguments = classmethod(makeArguments)
 
 
@@ -1921,7 +2110,7 @@ class Command:
         @return: A mapping of response-argument names to the parsed
         forms.
         """
-        return _stringsToObjects(box, cls.response, protocol)
+        return cls._responseSchema.toObjects(box, protocol)
     parseResponse = classmethod(parseResponse)
 
 
@@ -1936,7 +2125,7 @@ class Command:
 
         @return: A mapping of argument names to the parsed forms.
         """
-        return _stringsToObjects(box, cls.arguments, protocol)
+        return cls._argumentSchema.toObjects(box, protocol)
     parseArguments = classmethod(parseArguments)
 
 
@@ -2308,6 +2497,11 @@ class BinaryBoxProtocol(StatefulStringProtocol, Int16StringReceiver,
         connection is being closed because a key length prefix which was longer
         than allowed by the protocol was received.
 
+    @ivar _parseInline: A flag which is true unless a subclass overrides
+        C{stringReceived} or one of the C{proto_*} methods, in which case
+        incoming data is parsed through them one string at a time rather than
+        by L{_parseBoxes}.
+
     @ivar boxReceiver: an L{IBoxReceiver} provider, whose
         L{IBoxReceiver.ampBoxReceived} method will be invoked for each
         L{AmpBox} that is received.
@@ -2329,6 +2523,11 @@ class BinaryBoxProtocol(StatefulStringProtocol, Int16StringReceiver,
     def __init__(self, boxReceiver):
         _DescriptorExchanger.__init__(self)
         self.boxReceiver = boxReceiver
+        cls = self.__class__
+        self._parseInline = all(
+            getattr(cls, name) == getattr(BinaryBoxProtocol, name)
+            for name in ('stringReceived', 'proto_init', 'proto_key',
+                         'proto_value'))
 
 
     def _switchTo(self, newProto, clientFactory=None):
@@ -2406,9 +2605,68 @@ class BinaryBoxProtocol(StatefulStringProtocol, Int16StringReceiver,
         if self.innerProtocol is not None:
             self.innerProtocol.dataReceived(data)
             return
+        if self._parseInline:
+            return self._parseBoxes(data)
         return Int16StringReceiver.dataReceived(self, data)
 
 
+    def _parseBoxes(self, data):
+        """
+        Parse keys, values and the ends of boxes out of C{data} and whatever
+        was left over from earlier calls, delivering each complete box to
+        L{boxReceiver}.
+
+        This does the work of L{Int16StringReceiver.dataReceived} and the
+        C{proto_*} methods together: length prefixes are read in place at
+        offsets into a single buffer and every key and value is sliced out of
+        it exactly once, rather than each string being copied out and
+        dispatched through C{stringReceived}.
+        """
+        if self._unprocessed:
+            data = self._unprocessed + data
+        self._unprocessed = data
+        end = len(data)
+        offset = 0
+        box = self._currentBox
+        key = self._currentKey
+        try:
+            while end - offset >= 2 and not self.paused:
+                length, = _unpackLength(data, offset)
+                if key is None and length > self._MAX_KEY_LENGTH:
+                    self._compatibilityOffset = offset
+                    self.lengthLimitExceeded(length)
+                    return
+                start = offset + 2
+                stop = start + length
+                if stop > end:
+                    break
+                offset = stop
+                if key is not None:
+                    box[key] = data[start:stop]
+                    key = None
+                    continue
+                if box is None:
+                    box = AmpBox()
+                if length:
+                    key = data[start:stop]
+                    continue
+                received, box = box, None
+                self._compatibilityOffset = offset
+                self.boxReceiver.ampBoxReceived(received)
+                # See Int16StringReceiver.dataReceived: _switchTo hands the
+                # rest of the buffer to another protocol by assigning recvd.
+                if 'recvd' in self.__dict__:
+                    data = self.__dict__.pop('recvd')
+                    self._unprocessed = data
+                    offset = 0
+                    end = len(data)
+        finally:
+            self._currentBox = box
+            self._currentKey = key
+            self._unprocessed = data[offset:]
+            self._compatibilityOffset = 0
+
+
     def connectionLost(self, reason):
         """
         The connection was lost; notify any nested protocol.
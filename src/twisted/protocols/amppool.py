@@ -0,0 +1,350 @@
+# -*- test-case-name: twisted.test.test_amppool -*-
+# Copyright (c) Twisted Matrix Laboratories.
+# See LICENSE for details.
+
+"""
+A pool of AMP connections to a single endpoint.
+
+This lives apart from L{twisted.protocols.amp} so that using AMP does not
+import the application layer.
+"""
+
+from __future__ import absolute_import, division
+
+from collections import deque
+
+from zope.interface import implementer
+
+from twisted.application.internet import ClientService
+from twisted.application.service import MultiService
+from twisted.internet.defer import (
+    CancelledError, Deferred, fail, maybeDeferred)
+from twisted.internet.error import ConnectionLost
+from twisted.protocols import amp
+from twisted.python import log
+from twisted.python.compat import iteritems
+
+__all__ = ['AMPConnectionPool']
+
+
+
+@implementer(amp.IBoxSender)
+class AMPConnectionPool(MultiService):
+    """
+    A pool of AMP connections to a single endpoint, which spreads the commands
+    sent with L{callRemote} across them.
+
+    Each connection is kept up by a
+    L{twisted.application.internet.ClientService}, and so is reconnected
+    whenever it is lost or fails.  Commands are sent on whichever connection
+    has the fewest commands outstanding, and no connection has more than
+    C{window} outstanding at once; commands which cannot be sent yet, because
+    every connection is full or none is connected, wait in order until one can
+    take them.  Commands are never sent again on another connection: those
+    outstanding on a connection which is lost fail just as they would with
+    L{amp.AMP.callRemote}.
+
+    Start the pool, as a service, to begin connecting.  Commands sent before
+    it is started wait for a connection, and those sent after it is stopped
+    fail at once.
+
+    @ivar size: The number of connections in the pool.
+    @type size: L{int}
+
+    @ivar window: The largest number of commands outstanding on one
+        connection.
+    @type window: L{int}
+
+    @ivar _connections: The connected protocols which are ready to be used, as
+        passed to C{prepareConnection} by L{ClientService}.
+    @type _connections: L{list}
+
+    @ivar _outstanding: A mapping from each protocol in C{_connections}, and
+        from each protocol which was removed from it with commands still
+        outstanding, to the number of commands outstanding on it.
+    @type _outstanding: L{dict}
+
+    @ivar _waiting: The commands waiting to be sent, each a 4-tuple of the
+        L{Deferred} returned for it, the name of the method of a protocol which
+        sends it and that method's positional and keyword arguments.
+    @type _waiting: L{collections.deque}
+
+    @ivar _dispatching: A flag which is true while L{_dispatch} is sending
+        commands, so that commands which finish synchronously do not start
+        sending again from inside it.
+
+    @ivar _stopped: A flag which is true once the pool has been stopped, until
+        it is started again.  Commands sent meanwhile fail at once.
+    """
+
+    _dispatching = False
+    _stopped = False
+
+    def __init__(self, endpoint, factory, size=4, window=64,
+                 retryPolicy=None, clock=None, prepareConnection=None):
+        """
+        @param endpoint: A L{stream client endpoint
+            <twisted.internet.interfaces.IStreamClientEndpoint>} provider to
+            connect to.
+
+        @param factory: A L{protocol factory
+            <twisted.internet.interfaces.IProtocolFactory>} which creates
+            L{amp.AMP} instances (or other protocols with C{callRemote},
+            C{callRemoteString} and C{sendBox} methods and a C{transport} which
+            is set to L{None} when the connection is lost).
+
+        @param size: The number of connections to make.
+        @type size: L{int}
+
+        @param window: The largest number of commands to have outstanding on
+            one connection.
+        @type window: L{int}
+
+        @param retryPolicy: See L{ClientService.__init__}.
+
+        @param clock: See L{ClientService.__init__}.
+
+        @param prepareConnection: See L{ClientService.__init__}.  A connection
+            is not used for commands until any L{Deferred} returned by this
+            has fired, so it may be used to warm connections up, for example
+            by authenticating them.
+        """
+        MultiService.__init__(self)
+        self.size = size
+        self.window = window
+        self._prepareConnection = prepareConnection
+        self._connections = []
+        self._outstanding = {}
+        self._waiting = deque()
+        for i in range(size):
+            ClientService(endpoint, factory, retryPolicy, clock,
+                          prepareConnection=self._connectionMade
+                          ).setServiceParent(self)
+
+
+    def _connectionMade(self, protocol):
+        """
+        A connection was made: prepare it and then start sending commands on
+        it.
+
+        @param protocol: The protocol of the new connection.
+
+        @return: A L{Deferred} which fires when the connection has been
+            prepared.
+        """
+        def prepared(ignored):
+            if not self.running:
+                return
+            self._outstanding[protocol] = 0
+            self._connections.append(protocol)
+            self._dispatch()
+
+        d = maybeDeferred(self._prepareConnection or (lambda protocol: None),
+                          protocol)
+        return d.addCallback(prepared)
+
+
+    def _leastBusy(self):
+        """
+        Find the connection with the fewest commands outstanding, forgetting
+        any connections which have been lost along the way.
+
+        @return: A protocol which has fewer than C{window} commands
+            outstanding, or L{None} if there is no such protocol.
+        """
+        leastBusy = None
+        fewest = self.window
+        for protocol in self._connections[:]:
+            if protocol.transport is None:
+                self._connections.remove(protocol)
+                if not self._outstanding[protocol]:
+                    del self._outstanding[protocol]
+                continue
+            outstanding = self._outstanding[protocol]
+            if outstanding < fewest:
+                leastBusy = protocol
+                fewest = outstanding
+        return leastBusy
+
+
+    def _dispatch(self):
+        """
+        Send as many waiting commands as the connections will take.
+        """
+        if self._dispatching:
+            return
+        self._dispatching = True
+        try:
+            while self._waiting:
+                protocol = self._leastBusy()
+                if protocol is None:
+                    break
+                d, method, args, kw = self._waiting.popleft()
+                self._sendOn(protocol, method, args, kw).addBoth(
+                    self._relay, d)
+        finally:
+            self._dispatching = False
+
+
+    def _sendOn(self, protocol, method, args, kw):
+        """
+        Send a command on C{protocol}, counting it as outstanding there until
+        it finishes.
+
+        @param protocol: The protocol to send the command on.
+
+        @param method: The name of the protocol method sending the command.
+
+        @param args: The positional arguments for C{method}.
+
+        @param kw: The keyword arguments for C{method}.
+
+        @return: A L{Deferred} which fires with the result of C{method}.
+        """
+        self._outstanding[protocol] += 1
+        result = maybeDeferred(getattr(protocol, method), *args, **kw)
+        return result.addBoth(self._finished, protocol)
+
+
+    def _finished(self, result, protocol):
+        """
+        A command sent on C{protocol} finished: stop counting it and send the
+        next waiting command.
+
+        @param result: The result of the command, which is returned.
+
+        @param protocol: The protocol the command was sent on.
+        """
+        self._outstanding[protocol] -= 1
+        if (not self._outstanding[protocol] and
+                protocol not in self._connections):
+            del self._outstanding[protocol]
+        self._dispatch()
+        return result
+
+
+    def _relay(self, result, d):
+        """
+        Pass the result of a command which had to wait on to the L{Deferred}
+        returned for it, unless that has been cancelled.
+
+        @param result: The result of the command.
+
+        @param d: The L{Deferred} returned for the command.
+        """
+        if not d.called:
+            d.callback(result)
+
+
+    def _send(self, method, args, kw):
+        """
+        Send a command on the least busy connection, or once there is one
+        which can take it.
+
+        @param method: The name of the protocol method sending the command.
+
+        @param args: The positional arguments for C{method}.
+
+        @param kw: The keyword arguments for C{method}.
+
+        @return: A L{Deferred} which fires with the result of C{method}, or
+            fails with L{CancelledError} if the pool has been stopped.
+        """
+        if self._stopped:
+            return fail(CancelledError())
+        if not self._waiting:
+            protocol = self._leastBusy()
+            if protocol is not None:
+                return self._sendOn(protocol, method, args, kw)
+
+        def cancel(d):
+            if entry in self._waiting:
+                self._waiting.remove(entry)
+
+        entry = (Deferred(cancel), method, args, kw)
+        self._waiting.append(entry)
+        self._dispatch()
+        return entry[0]
+
+
+    def callRemote(self, commandType, *a, **kw):
+        """
+        Send a command on one of the connections in the pool, like
+        L{amp.BoxDispatcher.callRemote}.
+
+        @return: A L{Deferred} which fires with the result of
+            L{amp.BoxDispatcher.callRemote} on the connection the command was
+            sent on.  When C{commandType}'s C{requiresAnswer} attribute is
+            L{False}, that is L{None}, once the command has been sent.  If the
+            L{Deferred} is cancelled before the command has been sent, it is
+            never sent.
+        """
+        return self._send('callRemote', (commandType,) + a, kw)
+
+
+    def callRemoteString(self, command, requiresAnswer=True, **kw):
+        """
+        Send a command on one of the connections in the pool, like
+        L{amp.BoxDispatcher.callRemoteString}.
+
+        @return: A L{Deferred} which fires with the result of
+            L{amp.BoxDispatcher.callRemoteString} on the connection the command
+            was sent on.
+        """
+        return self._send('callRemoteString', (command, requiresAnswer), kw)
+
+
+    def sendBox(self, box):
+        """
+        Send a box on the connection in the pool with the fewest commands
+        outstanding.  Unlike commands sent with L{callRemote}, boxes are not
+        counted against the window and do not wait for a connection.
+
+        @param box: an L{amp.AmpBox}.
+
+        @raise ConnectionLost: if no connection is ready.
+        """
+        fewest = None
+        for protocol in self._connections:
+            if protocol.transport is not None and (
+                    fewest is None or
+                    self._outstanding[protocol] < self._outstanding[fewest]):
+                fewest = protocol
+        if fewest is None:
+            raise ConnectionLost()
+        fewest.sendBox(box)
+
+
+    def unhandledError(self, failure):
+        """
+        Log an error which application code did not handle.
+
+        @param failure: a L{Failure} instance describing the error.
+        """
+        log.err(failure, "Unhandled error in AMPConnectionPool")
+
+
+    def startService(self):
+        """
+        Start the pool, connecting to its endpoint.
+        """
+        self._stopped = False
+        MultiService.startService(self)
+
+
+    def stopService(self):
+        """
+        Stop the pool: disconnect every connection and fail every command which
+        is still waiting to be sent, or which is sent until the pool is started
+        again, with L{CancelledError}.
+        """
+        self._stopped = True
+        del self._connections[:]
+        self._outstanding = dict(
+            (protocol, outstanding)
+            for protocol, outstanding in iteritems(self._outstanding)
+            if outstanding)
+        waiting, self._waiting = self._waiting, deque()
+        for d, method, args, kw in waiting:
+            d.errback(CancelledError())
+        return MultiService.stopService(self)
@@ -182,6 +182,52 @@ class _Code(object):
 
 
 
+def _tracebackLines(tb):
+    """
+    Record where each frame of a traceback was when the exception passed
+    through it.
+
+    @param tb: A traceback object, or L{None}.
+
+    @return: A L{list} of (funcName, fileName, lineNumber) tuples, outermost
+        frame first.
+    """
+    lines = []
+    while tb is not None:
+        code = tb.tb_frame.f_code
+        lines.append((code.co_name, code.co_filename, tb.tb_lineno))
+        tb = tb.tb_next
+    return lines
+
+
+
+class _Materialized(object):
+    """
+    A non-data descriptor for an attribute of L{Failure} which is expensive to
+    compute and often not needed at all.
+
+    It is only computed the first time it is looked up, and is then stored in
+    the instance dictionary, where it shadows this descriptor and can be
+    replaced, copied and pickled like any other attribute.
+    """
+
+    def __init__(self, compute):
+        """
+        @param compute: A one-argument callable taking the instance and
+            returning the value of the attribute named after it.
+        """
+        self._compute = compute
+        self.__doc__ = compute.__doc__
+
+
+    def __get__(self, oself, type=None):
+        if oself is None:
+            return self
+        value = oself.__dict__[self._compute.__name__] = self._compute(oself)
+        return value
+
+
+
 _inlineCallbacksExtraneous = []
 
 def _extraneous(f):
@@ -214,6 +260,11 @@ class Failure(BaseException):
     C{locals().items()}/C{globals().items()} for that frame, or an empty tuple
     if those details were not captured.
 
+    Unless C{captureVars} is set, neither list is built until it is first
+    used: a L{Failure} only records the raw traceback and the line each frame
+    of the stack was at, which is much cheaper for failures that are trapped
+    and discarded without ever being formatted.
+
     @ivar value: The exception instance responsible for this failure.
     @ivar type: The exception's class.
     @ivar stack: list of frames, innermost last, excluding C{Failure.__init__}.
@@ -221,7 +272,6 @@ class Failure(BaseException):
     """
 
     pickled = 0
-    stack = None
 
     # The opcode of "yield" in Python bytecode. We need this in
     # _findFailure in order to identify whether an exception was
@@ -315,9 +365,6 @@ class Failure(BaseException):
                 # Python 3
                 tb = self.value.__traceback__
 
-        frames = self.frames = []
-        stack = self.stack = []
-
         # Added 2003-06-23 by Chris Armstrong. Yes, I actually have a
         # use case where I need this traceback object, and I've made
         # sure that it'll be cleaned up.
@@ -345,6 +392,22 @@ class Failure(BaseException):
         #   catching means tracebacks generated here don't tend to show
         #   what called upon the PB object.
 
+        if not captureVars:
+            # The frames of the stack keep running after this, so the line
+            # each of them is at has to be recorded now; building the frames
+            # themselves is left to the first use of self.stack or
+            # self.frames.
+            stackLines = self._stackLines = []
+            while f:
+                code = f.f_code
+                stackLines.append((code.co_name, code.co_filename, f.f_lineno))
+                f = f.f_back
+            stackLines.reverse()
+            self.parents = self._parentsOf(self.type)
+            return
+
+        frames = self.frames = []
+        stack = self.stack = []
         while f:
             if captureVars:
                 localz = f.f_locals.copy()
@@ -391,11 +454,90 @@ class Failure(BaseException):
                 globalz,
                 ))
             tb = tb.tb_next
-        if inspect.isclass(self.type) and issubclass(self.type, Exception):
-            parentCs = getmro(self.type)
-            self.parents = list(map(reflect.qual, parentCs))
-        else:
-            self.parents = [self.type]
+        self.parents = self._parentsOf(self.type)
+
+
+    @classmethod
+    def withoutTraceback(cls, exc_value):
+        """
+        Create a L{Failure} for an exception without recording any traceback
+        or stack information at all, even if one is available.
+
+        This is meant for code which creates failures as part of its normal
+        flow of control, such as a cancelled L{Deferred
+        <twisted.internet.defer.Deferred>} or a closed connection, when
+        where it happened is not interesting.
+
+        @param exc_value: The exception.
+        @type exc_value: L{BaseException}
+
+        @return: A L{Failure} with no C{frames} and no C{stack}.
+        """
+        global count
+        count = count + 1
+        self = cls.__new__(cls)
+        self.count = count
+        self.type = exc_value.__class__
+        self.value = exc_value
+        self.captureVars = False
+        self.tb = None
+        self.frames = []
+        self.stack = []
+        self.parents = cls._parentsOf(self.type)
+        return self
+
+
+    @staticmethod
+    def _parentsOf(excType):
+        """
+        Compute C{parents}, the names of the classes L{Failure.check} matches
+        a failure of the given type against.
+
+        @param excType: The exception's class.
+
+        @return: A L{list} of fully qualified class names, or just
+            C{excType} if it is not an exception class.
+        """
+        if inspect.isclass(excType) and issubclass(excType, Exception):
+            return list(map(reflect.qual, getmro(excType)))
+        return [excType]
+
+
+    @_Materialized
+    def stack(self):
+        """
+        The frames of the stack above where this L{Failure} was created,
+        built from the lines recorded then.
+        """
+        return self._materialize(self.__dict__.get('_stackLines', ()))
+
+
+    @_Materialized
+    def frames(self):
+        """
+        The frames of the traceback, built from the traceback object or, once
+        this L{Failure} has been cleaned, from the lines recorded from it.
+        """
+        lines = self.__dict__.get('_frameLines')
+        if lines is None:
+            lines = _tracebackLines(self.__dict__.get('tb'))
+        return self._materialize(lines)
+
+
+    def _materialize(self, lines):
+        """
+        Build frames for C{stack} or C{frames} from recorded lines.
+
+        @param lines: (funcName, fileName, lineNumber) tuples.
+
+        @return: A L{list} of frames, in the same format as L{__getstate__}
+            gives them if this L{Failure} has been cleaned or pickled.
+        """
+        if self.pickled:
+            return [[name, filename, lineno, [], []]
+                    for name, filename, lineno in lines]
+        return [(name, filename, lineno, (), ())
+                for name, filename, lineno in lines]
 
 
     def _extrapolate(self, otherFailure):
@@ -584,9 +726,12 @@ class Failure(BaseException):
     def __getstate__(self):
         """Avoid pickling objects in the traceback.
         """
-        if self.pickled:
+        if self.pickled and not ('_stackLines' in self.__dict__ or
+                                 '_frameLines' in self.__dict__):
             return self.__dict__
         c = self.__dict__.copy()
+        c.pop('_stackLines', None)
+        c.pop('_frameLines', None)
 
         c['frames'] = [
             [
@@ -599,16 +744,13 @@ class Failure(BaseException):
         # Added 2003-06-23. See comment above in __init__
         c['tb'] = None
 
-        if self.stack is not None:
-            # XXX: This is a band-aid.  I can't figure out where these
-            # (failure.stack is None) instances are coming from.
-            c['stack'] = [
-                [
-                    v[0], v[1], v[2],
-                    _safeReprVars(v[3]),
-                    _safeReprVars(v[4]),
-                ] for v in self.stack
-            ]
+        c['stack'] = [
+            [
+                v[0], v[1], v[2],
+                _safeReprVars(v[3]),
+                _safeReprVars(v[4]),
+            ] for v in self.stack
+        ]
 
         c['pickled'] = 1
         return c
@@ -621,7 +763,16 @@ class Failure(BaseException):
         On Python 3, this will also set the C{__traceback__} attribute of the
         exception instance to L{None}.
         """
-        self.__dict__ = self.__getstate__()
+        if (self.pickled or self.captureVars or
+                'frames' in self.__dict__ or 'stack' in self.__dict__):
+            self.__dict__ = self.__getstate__()
+        else:
+            # There are no variables to turn into strings, so rather than
+            # building the frames now, just record the lines of the
+            # traceback before letting go of it.
+            self._frameLines = _tracebackLines(self.tb)
+            self.tb = None
+            self.pickled = 1
         if getattr(self.value, "__traceback__", None):
             # Python 3
             self.value.__traceback__ = None
@@ -10,11 +10,11 @@ A rotating, browsable log file.
 from __future__ import division, absolute_import
 
 # System Imports
-import os, glob, time, stat
+import os, glob, time, stat, re, gzip, io, shutil, signal, threading
 
 from twisted.python import threadable
 from twisted.python._oldstyle import _oldStyle
-from twisted.python.compat import unicode
+from twisted.python.compat import unicode, _PY3
 
 
 
@@ -26,6 +26,8 @@ class BaseLogFile:
 
     synchronized = ["write", "rotate"]
 
+    _reopenRequested = False
+
     def __init__(self, name, directory, defaultMode=None):
         """
         Create a log file.
@@ -98,6 +100,9 @@ class BaseLogFile:
         @param data: The data to write.  Text will be encoded as UTF-8.
         @type data: L{bytes} or L{unicode}
         """
+        if self._reopenRequested:
+            self._reopenRequested = False
+            self.reopen()
         if self.shouldRotate():
             self.flush()
             self.rotate()
@@ -136,6 +141,31 @@ class BaseLogFile:
         self._openFile()
 
 
+    def reopenOnSignal(self, signalNumber=None):
+        """
+        Reopen the log file before the next write after a signal arrives, as
+        sent by external log rotation tools such as logrotate once they have
+        moved the file.
+
+        The signal handler only notes that the file is to be reopened, so the
+        signal can arrive at any time.  Any handler previously installed for
+        the signal is still called.
+
+        @param signalNumber: The signal, by default C{SIGHUP}.
+        @type signalNumber: C{int}
+        """
+        if signalNumber is None:
+            signalNumber = signal.SIGHUP
+        previous = signal.getsignal(signalNumber)
+
+        def handler(signum, frame):
+            self._reopenRequested = True
+            if callable(previous):
+                previous(signum, frame)
+
+        signal.signal(signalNumber, handler)
+
+
     def getCurrentLog(self):
         """
         Return a LogReader for the current log file.
@@ -241,6 +271,196 @@ threadable.synchronize(LogFile)
 
 
 
+class TimestampedLogFile(LogFile):
+    """
+    A log file that is rotated when it grows larger than C{rotateLength}, by
+    renaming it with the time as a suffix, so that no other log file is
+    renamed.
+
+    Rotated log files are then compressed with gzip, and the oldest ones
+    removed to keep at most C{maxRotatedFiles} of them, taking at most
+    C{maxRotatedBytes}, in another thread.
+    """
+
+    # write is synchronized by LogFile.
+    synchronized = ["rotate"]
+
+    _identifier = re.compile(r"^\d{8}-\d{6}-\d{6}$")
+    _clock = staticmethod(time.time)
+
+    def __init__(self, name, directory, rotateLength=1000000, defaultMode=None,
+                 maxRotatedFiles=None, maxRotatedBytes=None, compress=True):
+        """
+        Create a log file rotating on length.
+
+        @param name: file name.
+        @type name: C{str}
+        @param directory: path of the log file.
+        @type directory: C{str}
+        @param rotateLength: size of the log file where it rotates. Default to
+            1M.
+        @type rotateLength: C{int}
+        @param defaultMode: mode used to create the file.
+        @type defaultMode: C{int}
+        @param maxRotatedFiles: if not None, max number of rotated log files
+            to keep; the oldest are removed.
+        @type maxRotatedFiles: C{int}
+        @param maxRotatedBytes: if not None, max total size of rotated log
+            files to keep; the oldest are removed.
+        @type maxRotatedBytes: C{int}
+        @param compress: whether to compress rotated log files with gzip.
+        @type compress: C{bool}
+        """
+        self.maxRotatedBytes = maxRotatedBytes
+        self.compress = compress
+        self._maintenanceLock = threading.Lock()
+        LogFile.__init__(self, name, directory, rotateLength, defaultMode,
+                         maxRotatedFiles)
+
+
+    def _runInBackground(self, f):
+        """
+        Call a function in a new thread.
+
+        @param f: The function.
+        """
+        thread = threading.Thread(target=f, name="TimestampedLogFile")
+        thread.daemon = True
+        thread.start()
+
+
+    def _suffix(self):
+        """
+        Make a suffix for the rotated log file from the time, in UTC.
+
+        @return: The suffix.
+        @rtype: C{str}
+        """
+        now = self._clock()
+        return "%s-%06d" % (time.strftime("%Y%m%d-%H%M%S", time.gmtime(now)),
+                            int(now % 1 * 1000000))
+
+
+    def rotate(self):
+        """
+        Rotate the file and create a new one, then compress rotated files and
+        remove old ones in another thread.
+
+        If it's not possible to open new logfile, this will fail silently,
+        and continue logging to old logfile.
+        """
+        if not (os.access(self.directory, os.W_OK) and
+                os.access(self.path, os.W_OK)):
+            return
+        newpath = "%s.%s" % (self.path, self._suffix())
+        if os.path.exists(newpath) or os.path.exists(newpath + ".gz"):
+            return
+        self._file.close()
+        os.rename(self.path, newpath)
+        self._openFile()
+        self._runInBackground(self.maintain)
+
+
+    def listLogs(self):
+        """
+        Return the sorted list of the old logs' identifiers, oldest first.
+        """
+        result = set()
+        for name in glob.glob("%s.*" % self.path):
+            identifier = name[len(self.path) + 1:]
+            if identifier.endswith(".gz"):
+                identifier = identifier[:-3]
+            if self._identifier.match(identifier):
+                result.add(identifier)
+        return sorted(result)
+
+
+    def _rotatedPath(self, identifier):
+        """
+        Find an old log file, compressed or not.
+
+        @param identifier: An identifier returned by L{listLogs}.
+
+        @return: The path of the log file.
+        """
+        filename = "%s.%s" % (self.path, identifier)
+        for path in (filename, filename + ".gz"):
+            if os.path.exists(path):
+                return path
+        raise ValueError("no such logfile exists")
+
+
+    def getLog(self, identifier):
+        """
+        Given an identifier returned by L{listLogs}, return a LogReader for an
+        old log file.
+        """
+        return LogReader(self._rotatedPath(identifier))
+
+
+    def maintain(self):
+        """
+        Compress rotated log files and remove the oldest ones beyond the
+        limits.  This is done in another thread after each rotation.
+        """
+        with self._maintenanceLock:
+            if self.compress:
+                for identifier in self.listLogs():
+                    path = "%s.%s" % (self.path, identifier)
+                    if os.path.exists(path):
+                        self._compress(path)
+            self._removeOldLogs()
+
+
+    def _compress(self, path):
+        """
+        Replace a file with a gzipped copy.
+
+        @param path: The path of the file.
+        """
+        temporary = path + ".gz.tmp"
+        try:
+            with open(path, "rb") as source:
+                with gzip.open(temporary, "wb") as compressed:
+                    shutil.copyfileobj(source, compressed)
+            os.rename(temporary, path + ".gz")
+            os.remove(path)
+        except EnvironmentError:
+            if os.path.exists(temporary):
+                os.remove(temporary)
+
+
+    def _removeOldLogs(self):
+        """
+        Remove the oldest rotated log files beyond C{maxRotatedFiles} and
+        C{maxRotatedBytes}.
+        """
+        logs = []
+        for identifier in self.listLogs():
+            try:
+                path = self._rotatedPath(identifier)
+                logs.append((path, os.path.getsize(path)))
+            except (ValueError, EnvironmentError):
+                pass
+        count = len(logs)
+        total = sum(size for (path, size) in logs)
+        for path, size in logs:
+            if ((self.maxRotatedFiles is None or
+                 count <= self.maxRotatedFiles) and
+                (self.maxRotatedBytes is None or
+                 total <= self.maxRotatedBytes)):
+                break
+            try:
+                os.remove(path)
+            except EnvironmentError:
+                pass
+            count -= 1
+            total -= size
+
+threadable.synchronize(TimestampedLogFile)
+
+
+
 class DailyLogFile(BaseLogFile):
     """A log file that is rotated daily (at or after midnight localtime)
     """
@@ -319,9 +539,14 @@ class LogReader:
         Open the log file for reading.
 
         The comments about binary-mode for L{BaseLogFile._openFile} also apply
-        here.
+        here.  Files whose names end with C{.gz} are decompressed.
         """
-        self._file = open(name, "r")
+        if name.endswith(".gz"):
+            self._file = gzip.open(name, "rb")
+            if _PY3:
+                self._file = io.TextIOWrapper(self._file)
+        else:
+            self._file = open(name, "r")
 
     def readLines(self, lines=10):
         """Read a list of lines from the log file.
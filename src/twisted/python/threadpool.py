@@ -12,8 +12,10 @@ instead of creating a thread pool directly.
 from __future__ import division, absolute_import
 
 import threading
+from collections import deque
+from time import time
 
-from twisted._threads import pool as _pool
+from twisted._threads import pool as _pool, AlreadyQuit
 from twisted.python import log, context
 from twisted.python.failure import Failure
 from twisted.python._oldstyle import _oldStyle
@@ -23,6 +25,71 @@ WorkerStop = object()
 
 
 
+class ThreadPoolStatistics(object):
+    """
+    Statistics about the work done by a L{ThreadPool}.
+
+    Only adaptive pools time the work items they run, so the count of work
+    items run and the times are always 0 for other pools.
+
+    @ivar name: The name of the pool.
+    @type name: native L{str} or L{None}
+
+    @ivar threadLimit: The number of threads the pool may currently run:
+        L{ThreadPool.max}, or a number between L{ThreadPool.min} and
+        L{ThreadPool.max} for an adaptive pool.
+    @type threadLimit: L{int}
+
+    @ivar idleWorkerCount: The number of idle threads.
+    @type idleWorkerCount: L{int}
+
+    @ivar busyWorkerCount: The number of busy threads.
+    @type busyWorkerCount: L{int}
+
+    @ivar backloggedWorkCount: The number of work items waiting for a thread;
+        the depth of the queue.
+    @type backloggedWorkCount: L{int}
+
+    @ivar completedWorkCount: The number of work items run so far.
+    @type completedWorkCount: L{int}
+
+    @ivar totalWaitTime: The total number of seconds work items have waited
+        for a thread.
+    @type totalWaitTime: L{float}
+
+    @ivar maxWaitTime: The longest a work item has waited for a thread.
+    @type maxWaitTime: L{float}
+
+    @ivar recentWaitTime: An exponentially weighted moving average of the time
+        work items have waited for a thread, giving recent items more weight.
+    @type recentWaitTime: L{float}
+
+    @ivar totalExecutionTime: The total number of seconds work items have
+        taken to run.
+    @type totalExecutionTime: L{float}
+
+    @ivar maxExecutionTime: The longest a work item has taken to run.
+    @type maxExecutionTime: L{float}
+    """
+
+    def __init__(self, name, threadLimit, idleWorkerCount, busyWorkerCount,
+                 backloggedWorkCount, completedWorkCount, totalWaitTime,
+                 maxWaitTime, recentWaitTime, totalExecutionTime,
+                 maxExecutionTime):
+        self.name = name
+        self.threadLimit = threadLimit
+        self.idleWorkerCount = idleWorkerCount
+        self.busyWorkerCount = busyWorkerCount
+        self.backloggedWorkCount = backloggedWorkCount
+        self.completedWorkCount = completedWorkCount
+        self.totalWaitTime = totalWaitTime
+        self.maxWaitTime = maxWaitTime
+        self.recentWaitTime = recentWaitTime
+        self.totalExecutionTime = totalExecutionTime
+        self.maxExecutionTime = maxExecutionTime
+
+
+
 @_oldStyle
 class ThreadPool:
     """
@@ -37,8 +104,44 @@ class ThreadPool:
     @ivar threads: List of workers currently running in this thread pool.
     @type threads: L{list}
 
+    @ivar adaptive: Whether the number of threads adapts to how long work
+        waits for a thread.  A normal pool starts a thread for work whenever
+        none is idle, up to L{ThreadPool.max}.  An adaptive pool runs at most
+        L{ThreadPool.min} threads (or one, if that is 0) to begin with, and
+        lets work wait for them unless it has to wait for longer than
+        L{ThreadPool.targetWaitTime}, when it allows one more thread, up to
+        L{ThreadPool.max}.  When no work has had to wait for that long for
+        L{ThreadPool.shrinkDelay} seconds, it allows one thread less, down to
+        L{ThreadPool.min}.
+    @type adaptive: L{bool}
+
+    @ivar targetWaitTime: How many seconds work may wait for a thread in an
+        adaptive pool before it allows another thread.
+    @type targetWaitTime: L{float}
+
+    @ivar shrinkDelay: How many seconds an adaptive pool waits after work has
+        last waited longer than L{ThreadPool.targetWaitTime} before it allows
+        one thread less.
+    @type shrinkDelay: L{float}
+
+    @ivar _limit: The number of threads an adaptive pool currently allows.
+
+    @ivar _lastSlow: When work last waited longer than
+        L{ThreadPool.targetWaitTime}, or the number of threads an adaptive
+        pool allows last changed.
+
+    @ivar _queued: When each work item given to an adaptive pool which has
+        not started yet was given to it, oldest first.
+    @type _queued: L{deque} of L{float}
+
+    @ivar _statsLock: A L{threading.Lock} protecting the statistics, which
+        are updated from the threads of the pool.
+
     @ivar _pool: A hook for testing.
     @type _pool: callable compatible with L{_pool}
+
+    @ivar _clock: A hook for testing: a 0-argument callable returning the
+        current time in seconds.
     """
     min = 5
     max = 20
@@ -46,12 +149,31 @@ class ThreadPool:
     started = False
     workers = 0
     name = None
+    adaptive = False
+    targetWaitTime = 0.01
+    shrinkDelay = 10.0
+
+    # How much weight the wait of each work item has in recentWaitTime.
+    _recentWeight = 0.1
+
+    _limit = 1
+    _lastSlow = 0.0
+    # Each pool gets a lock of its own in __init__; this one serves
+    # subclasses which do not call it.
+    _statsLock = threading.Lock()
+    _completedWorkCount = 0
+    _totalWaitTime = 0.0
+    _maxWaitTime = 0.0
+    _recentWaitTime = 0.0
+    _totalExecutionTime = 0.0
+    _maxExecutionTime = 0.0
 
     threadFactory = threading.Thread
     currentThread = staticmethod(threading.currentThread)
     _pool = staticmethod(_pool)
+    _clock = staticmethod(time)
 
-    def __init__(self, minthreads=5, maxthreads=20, name=None):
+    def __init__(self, minthreads=5, maxthreads=20, name=None, adaptive=False):
         """
         Create a new threadpool.
 
@@ -63,13 +185,21 @@ class ThreadPool:
 
         @param name: The name to give this threadpool; visible in log messages.
         @type name: native L{str}
+
+        @param adaptive: The initial value of L{ThreadPool.adaptive}.
+        @type adaptive: L{bool}
         """
         assert minthreads >= 0, 'minimum is negative'
         assert minthreads <= maxthreads, 'minimum is greater than maximum'
         self.min = minthreads
         self.max = maxthreads
         self.name = name
+        self.adaptive = adaptive
         self.threads = []
+        self._limit = self._initialLimit()
+        self._lastSlow = self._clock()
+        self._statsLock = threading.Lock()
+        self._queued = deque()
 
         def trackingThreadFactory(*a, **kw):
             thread = self.threadFactory(*a, name=self._generateName(), **kw)
@@ -79,11 +209,155 @@ class ThreadPool:
         def currentLimit():
             if not self.started:
                 return 0
+            if self.adaptive:
+                return self._limit
             return self.max
 
         self._team = self._pool(currentLimit, trackingThreadFactory)
 
 
+    def _initialLimit(self):
+        """
+        @return: The number of threads an adaptive pool allows when it starts,
+            or when its size is adjusted: L{ThreadPool.min}, but at least
+            one.
+        """
+        return max(self.min, min(1, self.max))
+
+
+    def statistics(self):
+        """
+        Gather statistics about the work done by this pool.
+
+        @return: The statistics.
+        @rtype: L{ThreadPoolStatistics}
+        """
+        team = self._team.statistics()
+        with self._statsLock:
+            return ThreadPoolStatistics(
+                self.name, self._limit if self.adaptive else self.max,
+                team.idleWorkerCount, team.busyWorkerCount,
+                team.backloggedWorkCount, self._completedWorkCount,
+                self._totalWaitTime, self._maxWaitTime, self._recentWaitTime,
+                self._totalExecutionTime, self._maxExecutionTime)
+
+
+    def _adjustLimit(self, waitTime, now):
+        """
+        Allow one more thread, up to L{ThreadPool.max}, if work has waited
+        longer than L{ThreadPool.targetWaitTime}, or one less, down to
+        L{ThreadPool.min}, if no work has for L{ThreadPool.shrinkDelay}
+        seconds.
+
+        This must be called with C{_statsLock} held, and the result passed to
+        L{ThreadPool._resize} once it is released.
+
+        @param waitTime: How long work has waited, in seconds.
+        @type waitTime: L{float}
+
+        @param now: The current time.
+        @type now: L{float}
+
+        @return: The change in the number of threads allowed: 1, 0 or -1.
+        @rtype: L{int}
+        """
+        if waitTime > self.targetWaitTime:
+            self._lastSlow = now
+            if self._limit < self.max:
+                self._limit += 1
+                return 1
+        elif (now - self._lastSlow > self.shrinkDelay and
+              self._limit > self._initialLimit()):
+            self._lastSlow = now
+            self._limit -= 1
+            return -1
+        return 0
+
+
+    def _resize(self, change):
+        """
+        Start or stop a thread after L{ThreadPool._adjustLimit} changed the
+        number of threads allowed.
+
+        @param change: The result of L{ThreadPool._adjustLimit}.
+        @type change: L{int}
+        """
+        try:
+            if change > 0:
+                self._team.grow(1)
+            elif change < 0:
+                self._team.shrink(1)
+        except AlreadyQuit:
+            pass
+
+
+    def _workQueued(self):
+        """
+        Note that a work item is being given to an adaptive pool and, if the
+        oldest work item waiting for a thread has waited longer than
+        L{ThreadPool.targetWaitTime}, allow one more thread.  When every
+        thread is busy with long work, no work starts to show how long it
+        waited, so this is where a starved pool grows.
+
+        @return: The current time.
+        @rtype: L{float}
+        """
+        now = self._clock()
+        change = 0
+        with self._statsLock:
+            if self._queued:
+                change = self._adjustLimit(now - self._queued[0], now)
+            self._queued.append(now)
+        self._resize(change)
+        return now
+
+
+    def _workStarted(self, queued):
+        """
+        Record how long a work item given to an adaptive pool waited for a
+        thread, and allow one more or one less thread if that is called for.
+
+        This is called in the thread about to run the work item.
+
+        @param queued: When the work item was given to the pool.
+        @type queued: L{float}
+
+        @return: The current time.
+        @rtype: L{float}
+        """
+        now = self._clock()
+        waitTime = now - queued
+        with self._statsLock:
+            if self._queued:
+                self._queued.popleft()
+            self._totalWaitTime += waitTime
+            if waitTime > self._maxWaitTime:
+                self._maxWaitTime = waitTime
+            self._recentWaitTime += (
+                (waitTime - self._recentWaitTime) * self._recentWeight)
+            change = self._adjustLimit(waitTime, now)
+        self._resize(change)
+        return now
+
+
+    def _workFinished(self, started):
+        """
+        Record how long a work item given to an adaptive pool took to run.
+
+        This is called in the thread which ran the work item.
+
+        @param started: When the work item started.
+        @type started: L{float}
+        """
+        executionTime = self._clock() - started
+        with self._statsLock:
+            self._completedWorkCount += 1
+            self._totalExecutionTime += executionTime
+            if executionTime > self._maxExecutionTime:
+                self._maxExecutionTime = executionTime
+
+
+
     @property
     def workers(self):
         """
@@ -188,13 +462,15 @@ class ThreadPool:
 
     def __setstate__(self, state):
         setattr(self, "__dict__", state)
-        ThreadPool.__init__(self, self.min, self.max)
+        ThreadPool.__init__(self, self.min, self.max, adaptive=self.adaptive)
 
 
     def __getstate__(self):
         state = {}
         state['min'] = self.min
         state['max'] = self.max
+        if self.adaptive:
+            state['adaptive'] = True
         return state
 
 
@@ -244,8 +520,13 @@ class ThreadPool:
         if self.joined:
             return
         ctx = context.theContextTracker.currentContext().contexts[-1]
+        measured = self.adaptive
+        if measured:
+            queued = self._workQueued()
 
         def inContext():
+            if measured:
+                started = self._workStarted(queued)
             try:
                 result = inContext.theWork()
                 ok = True
@@ -254,6 +535,8 @@ class ThreadPool:
                 ok = False
 
             inContext.theWork = None
+            if measured:
+                self._workFinished(started)
             if inContext.onResult is not None:
                 inContext.onResult(ok, result)
                 inContext.onResult = None
@@ -276,6 +559,8 @@ class ThreadPool:
         self.joined = True
         self.started = False
         self._team.quit()
+        with self._statsLock:
+            self._queued.clear()
         for thread in self.threads:
             thread.join()
 
@@ -299,12 +584,16 @@ class ThreadPool:
 
         self.min = minthreads
         self.max = maxthreads
+        with self._statsLock:
+            self._limit = self._initialLimit()
         if not self.started:
             return
 
         # Kill of some threads if we have too many.
         if self.workers > self.max:
             self._team.shrink(self.workers - self.max)
+        elif self.adaptive and self.workers > self._limit:
+            self._team.shrink(self.workers - self._limit)
         # Start some threads if we have too few.
         if self.workers < self.min:
             self._team.grow(self.min - self.workers)
@@ -14,13 +14,13 @@ for more details.
 
 from __future__ import absolute_import, division
 
-import copy, struct
+import copy, re, struct
 from io import BytesIO
 
 from twisted.internet import protocol
 from twisted.persisted import styles
 from twisted.python import log
-from twisted.python.compat import iterbytes, long, _bytesChr as chr
+from twisted.python.compat import iterbytes, long, _PY3, _bytesChr as chr
 from twisted.python.reflect import fullyQualifiedName
 
 class BananaError(Exception):
@@ -36,6 +36,26 @@ def int2b128(integer, stream):
         integer = integer >> 7
 
 
+def _int2b128(integer, buffer):
+    """
+    Append an integer to a buffer, represented as base 128, least significant
+    digit first.
+
+    @param integer: A non-negative integer.
+    @type integer: L{int} or L{long}
+
+    @param buffer: The buffer.
+    @type buffer: L{bytearray}
+    """
+    if integer == 0:
+        buffer.append(0)
+        return
+    while integer:
+        buffer.append(integer & 0x7f)
+        integer >>= 7
+
+
+
 def b1282int(st):
     """
     Convert an integer represented as a base 128 string into an L{int} or
@@ -70,6 +90,9 @@ VOCAB    = chr(0x87)
 
 HIGH_BIT_SET = chr(0x80)
 
+# Finds the type byte ending a prefix.
+_typeByte = re.compile(b"[\x80-\xff]")
+
 def setPrefixLimit(limit):
     """
     Set the limit on the prefix length for all Banana connections
@@ -90,6 +113,10 @@ setPrefixLimit(64)
 
 SIZE_LIMIT = 640 * 1024   # 640k is all you'll ever need :-)
 
+# Byte strings at least this long are sent as they are, rather than copied
+# into the buffer.
+_LARGE_STRING = 4096
+
 class Banana(protocol.Protocol, styles.Ephemeral):
     """
     L{Banana} implements the I{Banana} s-expression protocol, client and
@@ -175,79 +202,99 @@ class Banana(protocol.Protocol, styles.Ephemeral):
     buffer = b''
 
     def dataReceived(self, chunk):
-        buffer = self.buffer + chunk
+        """
+        Decode as many items as possible from what has been received,
+        keeping the rest for later.
+
+        Items are decoded from successive offsets into a single buffer, so
+        that decoding takes time proportional to the size of what is
+        received, however it is split up.
+        """
+        buffer = self.buffer
+        if buffer:
+            if not isinstance(buffer, bytearray):
+                buffer = bytearray(buffer)
+            buffer += chunk
+        elif _PY3:
+            buffer = chunk
+        else:
+            # Indexing a bytearray gives integers, as indexing bytes does on
+            # Python 3.
+            buffer = bytearray(chunk)
+        end = len(buffer)
+        # Where the item being decoded, if any, starts.
+        pos = 0
         listStack = self.listStack
         gotItem = self.gotItem
-        while buffer:
-            assert self.buffer != buffer, "This ain't right: %s %s" % (repr(self.buffer), repr(buffer))
-            self.buffer = buffer
-            pos = 0
-            for ch in iterbytes(buffer):
-                if ch >= HIGH_BIT_SET:
+        prefixLimit = self.prefixLimit
+        findTypeByte = _typeByte.search
+        try:
+            while pos < end:
+                match = findTypeByte(
+                    buffer, pos, min(end, pos + prefixLimit + 1))
+                if match is None:
+                    if end - pos > prefixLimit:
+                        raise BananaError(
+                            "Security precaution: more than %d bytes of "
+                            "prefix" % (prefixLimit,))
                     break
-                pos = pos + 1
-            else:
-                if pos > self.prefixLimit:
-                    raise BananaError("Security precaution: more than %d bytes of prefix" % (self.prefixLimit,))
-                return
-            num = buffer[:pos]
-            typebyte = buffer[pos:pos+1]
-            rest = buffer[pos+1:]
-            if len(num) > self.prefixLimit:
-                raise BananaError("Security precaution: longer than %d bytes worth of prefix" % (self.prefixLimit,))
-            if typebyte == LIST:
-                num = b1282int(num)
-                if num > SIZE_LIMIT:
-                    raise BananaError("Security precaution: List too long.")
-                listStack.append((num, []))
-                buffer = rest
-            elif typebyte == STRING:
-                num = b1282int(num)
-                if num > SIZE_LIMIT:
-                    raise BananaError("Security precaution: String too long.")
-                if len(rest) >= num:
-                    buffer = rest[num:]
-                    gotItem(rest[:num])
-                else:
-                    return
-            elif typebyte == INT:
-                buffer = rest
-                num = b1282int(num)
-                gotItem(num)
-            elif typebyte == LONGINT:
-                buffer = rest
-                num = b1282int(num)
-                gotItem(num)
-            elif typebyte == LONGNEG:
-                buffer = rest
-                num = b1282int(num)
-                gotItem(-num)
-            elif typebyte == NEG:
-                buffer = rest
-                num = -b1282int(num)
-                gotItem(num)
-            elif typebyte == VOCAB:
-                buffer = rest
-                num = b1282int(num)
-                item = self.incomingVocabulary[num]
-                if self.currentDialect == b'pb':
-                    # the sender issues VOCAB only for dialect pb
+                typePos = match.start()
+                typebyte = buffer[typePos]
+                # The prefix is a base 128 number, least significant digit
+                # first.
+                num = 0
+                for i in range(typePos - 1, pos - 1, -1):
+                    num = (num << 7) | buffer[i]
+                rest = typePos + 1
+
+                if typebyte == 0x80: # LIST
+                    if num > SIZE_LIMIT:
+                        raise BananaError(
+                            "Security precaution: List too long.")
+                    listStack.append((num, []))
+                    pos = rest
+                elif typebyte == 0x82: # STRING
+                    if num > SIZE_LIMIT:
+                        raise BananaError(
+                            "Security precaution: String too long.")
+                    if end - rest < num:
+                        break
+                    pos = rest + num
+                    gotItem(bytes(buffer[rest:pos]))
+                elif typebyte == 0x81 or typebyte == 0x85: # INT, LONGINT
+                    pos = rest
+                    gotItem(num)
+                elif typebyte == 0x83 or typebyte == 0x86: # NEG, LONGNEG
+                    pos = rest
+                    gotItem(-num)
+                elif typebyte == 0x87: # VOCAB
+                    item = self.incomingVocabulary[num]
+                    if self.currentDialect != b'pb':
+                        # the sender issues VOCAB only for dialect pb
+                        raise NotImplementedError(
+                            "Invalid item for pb protocol {0!r}".format(item))
+                    pos = rest
                     gotItem(item)
+                elif typebyte == 0x84: # FLOAT
+                    if end - rest < 8:
+                        break
+                    pos = rest + 8
+                    gotItem(struct.unpack("!d", bytes(buffer[rest:pos]))[0])
                 else:
                     raise NotImplementedError(
-                        "Invalid item for pb protocol {0!r}".format(item))
-            elif typebyte == FLOAT:
-                if len(rest) >= 8:
-                    buffer = rest[8:]
-                    gotItem(struct.unpack("!d", rest[:8])[0])
-                else:
-                    return
+                        "Invalid Type Byte %r" % (chr(typebyte),))
+                while listStack and (
+                        len(listStack[-1][1]) == listStack[-1][0]):
+                    item = listStack.pop()[1]
+                    gotItem(item)
+        finally:
+            if pos == end:
+                self.buffer = b''
+            elif buffer is chunk:
+                self.buffer = bytearray(buffer[pos:])
             else:
-                raise NotImplementedError(("Invalid Type Byte %r" % (typebyte,)))
-            while listStack and (len(listStack[-1][1]) == listStack[-1][0]):
-                item = listStack.pop()[1]
-                gotItem(item)
-        self.buffer = b''
+                del buffer[:pos]
+                self.buffer = buffer
 
 
     def expressionReceived(self, lst):
@@ -318,53 +365,93 @@ class Banana(protocol.Protocol, styles.Ephemeral):
 
         @return: L{None}
         """
-        encodeStream = BytesIO()
-        self._encode(obj, encodeStream.write)
-        value = encodeStream.getvalue()
-        self.transport.write(value)
+        buffer = bytearray()
+        parts = []
+        self._encodeInto(obj, buffer, parts)
+        if parts:
+            parts.append(bytes(buffer))
+            self.transport.writeSequence(parts)
+        else:
+            self.transport.write(bytes(buffer))
 
 
     def _encode(self, obj, write):
-        if isinstance(obj, (list, tuple)):
+        """
+        Encode an object.
+
+        @param obj: An object to encode.
+
+        @param write: A callable to call with the encoded representation.
+        """
+        buffer = bytearray()
+        parts = []
+        self._encodeInto(obj, buffer, parts)
+        parts.append(bytes(buffer))
+        write(b''.join(parts))
+
+
+    def _encodeInto(self, obj, buffer, parts):
+        """
+        Append the encoded representation of an object to a buffer.
+
+        @param obj: An object to encode.
+
+        @param buffer: The buffer.
+        @type buffer: L{bytearray}
+
+        @param parts: The encoded representation so far of the expression
+            being encoded, before what is in C{buffer}.  Large byte strings
+            are added to it rather than copied into C{buffer}.
+        @type parts: L{list} of L{bytes}
+
+        @raise BananaError: If the given object is not an instance of one of
+            the types supported by Banana.
+        """
+        if isinstance(obj, bytes):
+            # TODO: an API for extending banana...
+            if self.currentDialect == b"pb" and obj in self.outgoingSymbols:
+                symbolID = self.outgoingSymbols[obj]
+                _int2b128(symbolID, buffer)
+                buffer.append(0x87) # VOCAB
+            else:
+                if len(obj) > SIZE_LIMIT:
+                    raise BananaError(
+                        "byte string is too long to send (%d)" % (len(obj),))
+                _int2b128(len(obj), buffer)
+                buffer.append(0x82) # STRING
+                if len(obj) >= _LARGE_STRING:
+                    parts.append(bytes(buffer))
+                    parts.append(obj)
+                    del buffer[:]
+                else:
+                    buffer += obj
+        elif isinstance(obj, (list, tuple)):
             if len(obj) > SIZE_LIMIT:
                 raise BananaError(
                     "list/tuple is too long to send (%d)" % (len(obj),))
-            int2b128(len(obj), write)
-            write(LIST)
+            _int2b128(len(obj), buffer)
+            buffer.append(0x80) # LIST
             for elem in obj:
-                self._encode(elem, write)
+                self._encodeInto(elem, buffer, parts)
         elif isinstance(obj, (int, long)):
             if obj < self._smallestLongInt or obj > self._largestLongInt:
                 raise BananaError(
                     "int/long is too large to send (%d)" % (obj,))
             if obj < self._smallestInt:
-                int2b128(-obj, write)
-                write(LONGNEG)
+                _int2b128(-obj, buffer)
+                buffer.append(0x86) # LONGNEG
             elif obj < 0:
-                int2b128(-obj, write)
-                write(NEG)
+                _int2b128(-obj, buffer)
+                buffer.append(0x83) # NEG
             elif obj <= self._largestInt:
-                int2b128(obj, write)
-                write(INT)
+                _int2b128(obj, buffer)
+                buffer.append(0x81) # INT
             else:
-                int2b128(obj, write)
-                write(LONGINT)
+                _int2b128(obj, buffer)
+                buffer.append(0x85) # LONGINT
         elif isinstance(obj, float):
-            write(FLOAT)
-            write(struct.pack("!d", obj))
-        elif isinstance(obj, bytes):
-            # TODO: an API for extending banana...
-            if self.currentDialect == b"pb" and obj in self.outgoingSymbols:
-                symbolID = self.outgoingSymbols[obj]
-                int2b128(symbolID, write)
-                write(VOCAB)
-            else:
-                if len(obj) > SIZE_LIMIT:
-                    raise BananaError(
-                        "byte string is too long to send (%d)" % (len(obj),))
-                int2b128(len(obj), write)
-                write(STRING)
-                write(obj)
+            buffer.append(0x84) # FLOAT
+            buffer += struct.pack("!d", obj)
         else:
             raise BananaError("Banana cannot send {0} objects: {1!r}".format(
                 fullyQualifiedName(type(obj)), obj))
@@ -379,8 +466,7 @@ _i._selectDialect(b"none")
 def encode(lst):
     """Encode a list s-expression."""
     encodeStream = BytesIO()
-    _i.transport = encodeStream
-    _i.sendEncoded(lst)
+    _i._encode(lst, encodeStream.write)
     return encodeStream.getvalue()
 
 
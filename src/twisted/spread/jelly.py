@@ -66,6 +66,7 @@ import types
 import warnings
 import decimal
 from functools import reduce
+from itertools import chain
 import copy
 import datetime
 
@@ -144,6 +145,31 @@ unpersistable_atom = b"unpersistable"# u
 unjellyableRegistry = {}
 unjellyableFactoryRegistry = {}
 
+# Types which are jellied as they are.
+_identityTypes = (bytes, int, long, float)
+
+# The qualified names of the builtin types, as given to isTypeAllowed.
+_qualifiedTypeNames = dict(
+    (t, qual(t).encode('utf-8')) for t in
+    [bytes, int, long, float, unicode, bool, type(None), list, tuple, dict,
+     set, frozenset, types.MethodType, types.FunctionType, types.ModuleType,
+     datetime.datetime, datetime.time, datetime.date, datetime.timedelta,
+     decimal.Decimal, type])
+
+
+
+def _isFlat(sexp):
+    """
+    Determine whether none of the items of an s-expression are s-expressions,
+    so that they are all unjellied as they are.
+
+    @param sexp: The items.
+    @type sexp: iterable
+
+    @rtype: L{bool}
+    """
+    return list not in set(map(type, sexp))
+
 
 
 def _createBlank(cls):
@@ -396,6 +422,11 @@ class _Jellier:
         self._ref_id = 1
         self.persistentStore = persistentStore
         self.invoker = invoker
+        # Whether the taster allows objects of each type seen to be jellied.
+        self._typeAllowed = {}
+        # The types which are allowed and jellied as they are.
+        self._identityTypes = frozenset(
+            t for t in _identityTypes if self._isTypeAllowed(t))
 
 
     def _cook(self, object):
@@ -480,104 +511,237 @@ class _Jellier:
             return self.cooked[objId]
 
 
+    def _isTypeAllowed(self, objType):
+        """
+        Determine whether the taster allows objects of a type to be jellied,
+        asking it only the first time for each type.
+
+        @param objType: The type.
+        @type objType: L{type}
+
+        @rtype: L{bool}
+        """
+        try:
+            return self._typeAllowed[objType]
+        except KeyError:
+            name = _qualifiedTypeNames.get(objType)
+            if name is None:
+                name = qual(objType).encode('utf-8')
+            allowed = self._typeAllowed[objType] = bool(
+                self.taster.isTypeAllowed(name))
+            return allowed
+
+
     def jelly(self, obj):
-        if isinstance(obj, Jellyable):
+        objType = type(obj)
+        if objType in self._identityTypes:
+            return obj
+        handler = self._jellyDispatch.get(objType)
+        if handler is None and isinstance(obj, Jellyable):
             preRef = self._checkMutable(obj)
             if preRef:
                 return preRef
             return obj.jellyFor(self)
-        objType = type(obj)
-        if self.taster.isTypeAllowed(qual(objType).encode('utf-8')):
-            # "Immutable" Types
-            if ((objType is bytes) or
-                (objType is int) or
-                (objType is long) or
-                (objType is float)):
-                return obj
-            elif objType is types.MethodType:
-                aSelf = obj.__self__ if _PY3 else obj.im_self
-                aFunc = obj.__func__ if _PY3 else obj.im_func
-                aClass = aSelf.__class__ if _PY3 else obj.im_class
-                return [b"method", aFunc.__name__, self.jelly(aSelf),
-                        self.jelly(aClass)]
-            elif objType is unicode:
-                return [b'unicode', obj.encode('UTF-8')]
-            elif objType is type(None):
-                return [b'None']
-            elif objType is types.FunctionType:
-                return [b'function', obj.__module__ + '.' +
-                        (obj.__qualname__ if _PY3 else obj.__name__)]
-            elif objType is types.ModuleType:
-                return [b'module', obj.__name__]
-            elif objType is bool:
-                return [b'boolean', obj and b'true' or b'false']
-            elif objType is datetime.datetime:
-                if obj.tzinfo:
-                    raise NotImplementedError(
-                        "Currently can't jelly datetime objects with tzinfo")
-                return [b'datetime', ' '.join([unicode(x) for x in (
-                    obj.year, obj.month, obj.day, obj.hour,
-                    obj.minute, obj.second, obj.microsecond)]
-                ).encode('utf-8')]
-            elif objType is datetime.time:
-                if obj.tzinfo:
-                    raise NotImplementedError(
-                        "Currently can't jelly datetime objects with tzinfo")
-                return [b'time', '%s %s %s %s' % (obj.hour, obj.minute,
-                                                 obj.second, obj.microsecond)]
-            elif objType is datetime.date:
-                return [b'date', '%s %s %s' % (obj.year, obj.month, obj.day)]
-            elif objType is datetime.timedelta:
-                return [b'timedelta', '%s %s %s' % (obj.days, obj.seconds,
-                                                   obj.microseconds)]
-            elif issubclass(objType, (type, _OldStyleClass)):
-                return [b'class', qual(obj).encode('utf-8')]
-            elif objType is decimal.Decimal:
-                return self.jelly_decimal(obj)
-            else:
-                preRef = self._checkMutable(obj)
-                if preRef:
-                    return preRef
-                # "Mutable" Types
-                sxp = self.prepare(obj)
-                if objType is list:
-                    sxp.extend(self._jellyIterable(list_atom, obj))
-                elif objType is tuple:
-                    sxp.extend(self._jellyIterable(tuple_atom, obj))
-                elif objType in DictTypes:
-                    sxp.append(dictionary_atom)
-                    for key, val in obj.items():
-                        sxp.append([self.jelly(key), self.jelly(val)])
-                elif objType in _SetTypes:
-                    sxp.extend(self._jellyIterable(set_atom, obj))
-                elif objType in _ImmutableSetTypes:
-                    sxp.extend(self._jellyIterable(frozenset_atom, obj))
-                else:
-                    className = qual(obj.__class__).encode('utf-8')
-                    persistent = None
-                    if self.persistentStore:
-                        persistent = self.persistentStore(obj, self)
-                    if persistent is not None:
-                        sxp.append(persistent_atom)
-                        sxp.append(persistent)
-                    elif self.taster.isClassAllowed(obj.__class__):
-                        sxp.append(className)
-                        if hasattr(obj, "__getstate__"):
-                            state = obj.__getstate__()
-                        else:
-                            state = obj.__dict__
-                        sxp.append(self.jelly(state))
-                    else:
-                        self.unpersistable(
-                            "instance of class %s deemed insecure" %
-                            qual(obj.__class__), sxp)
-                return self.preserve(obj, sxp)
-        else:
+        if not self._isTypeAllowed(objType):
             if objType is _OldStyleInstance:
                 raise InsecureJelly("Class not allowed for instance: %s %s" %
                                     (obj.__class__, obj))
             raise InsecureJelly("Type not allowed for object: %s %s" %
                                 (objType, obj))
+        if handler is not None:
+            return handler(self, obj)
+        elif issubclass(objType, (type, _OldStyleClass)):
+            return self._jellyClass(obj)
+        return self._jellyInstance(obj)
+
+
+    def _jellyMethod(self, obj):
+        aSelf = obj.__self__ if _PY3 else obj.im_self
+        aFunc = obj.__func__ if _PY3 else obj.im_func
+        aClass = aSelf.__class__ if _PY3 else obj.im_class
+        return [b"method", aFunc.__name__, self.jelly(aSelf),
+                self.jelly(aClass)]
+
+
+    def _jellyIdentity(self, obj):
+        return obj
+
+
+    def _jellyUnicode(self, obj):
+        return [b'unicode', obj.encode('UTF-8')]
+
+
+    def _jellyNone(self, obj):
+        return [b'None']
+
+
+    def _jellyFunction(self, obj):
+        return [b'function', obj.__module__ + '.' +
+                (obj.__qualname__ if _PY3 else obj.__name__)]
+
+
+    def _jellyModule(self, obj):
+        return [b'module', obj.__name__]
+
+
+    def _jellyBoolean(self, obj):
+        return [b'boolean', obj and b'true' or b'false']
+
+
+    def _jellyDatetime(self, obj):
+        if obj.tzinfo:
+            raise NotImplementedError(
+                "Currently can't jelly datetime objects with tzinfo")
+        return [b'datetime', ' '.join([unicode(x) for x in (
+            obj.year, obj.month, obj.day, obj.hour,
+            obj.minute, obj.second, obj.microsecond)]
+        ).encode('utf-8')]
+
+
+    def _jellyTime(self, obj):
+        if obj.tzinfo:
+            raise NotImplementedError(
+                "Currently can't jelly datetime objects with tzinfo")
+        return [b'time', '%s %s %s %s' % (obj.hour, obj.minute,
+                                         obj.second, obj.microsecond)]
+
+
+    def _jellyDate(self, obj):
+        return [b'date', '%s %s %s' % (obj.year, obj.month, obj.day)]
+
+
+    def _jellyTimedelta(self, obj):
+        return [b'timedelta', '%s %s %s' % (obj.days, obj.seconds,
+                                           obj.microseconds)]
+
+
+    def _jellyClass(self, obj):
+        return [b'class', qual(obj).encode('utf-8')]
+
+
+    def _jellyDecimal(self, obj):
+        return self.jelly_decimal(obj)
+
+
+    def _preserveAcyclic(self, obj, sxp):
+        """
+        (internal) Mark the persistent list of an object which cannot refer
+        back to itself for later referral, without going through the
+        prepare/preserve cycle.
+        """
+        self.cooker[id(obj)] = obj
+        self.preserved[id(obj)] = sxp
+        return sxp
+
+
+    def _jellyContainer(self, atom, obj):
+        """
+        Jelly a list, tuple, set or frozenset.
+
+        If its items are all of types which are jellied as they are, they are
+        copied in one go, and it is not prepared for references to itself,
+        since there can be none.
+
+        @param atom: the identifier atom of the object.
+        @type atom: C{str}
+
+        @param obj: the container.
+        """
+        preRef = self._checkMutable(obj)
+        if preRef:
+            return preRef
+        if self._identityTypes.issuperset(map(type, obj)):
+            sxp = [atom]
+            sxp.extend(obj)
+            return self._preserveAcyclic(obj, sxp)
+        sxp = self.prepare(obj)
+        sxp.extend(self._jellyIterable(atom, obj))
+        return self.preserve(obj, sxp)
+
+
+    def _jellyList(self, obj):
+        return self._jellyContainer(list_atom, obj)
+
+
+    def _jellyTuple(self, obj):
+        return self._jellyContainer(tuple_atom, obj)
+
+
+    def _jellySet(self, obj):
+        return self._jellyContainer(set_atom, obj)
+
+
+    def _jellyFrozenset(self, obj):
+        return self._jellyContainer(frozenset_atom, obj)
+
+
+    def _jellyDictionary(self, obj):
+        preRef = self._checkMutable(obj)
+        if preRef:
+            return preRef
+        identityTypes = self._identityTypes
+        if (identityTypes.issuperset(map(type, obj)) and
+                identityTypes.issuperset(map(type, obj.values()))):
+            sxp = [dictionary_atom]
+            sxp.extend(map(list, obj.items()))
+            return self._preserveAcyclic(obj, sxp)
+        sxp = self.prepare(obj)
+        sxp.append(dictionary_atom)
+        for key, val in obj.items():
+            sxp.append([self.jelly(key), self.jelly(val)])
+        return self.preserve(obj, sxp)
+
+
+    def _jellyInstance(self, obj):
+        preRef = self._checkMutable(obj)
+        if preRef:
+            return preRef
+        sxp = self.prepare(obj)
+        className = qual(obj.__class__).encode('utf-8')
+        persistent = None
+        if self.persistentStore:
+            persistent = self.persistentStore(obj, self)
+        if persistent is not None:
+            sxp.append(persistent_atom)
+            sxp.append(persistent)
+        elif self.taster.isClassAllowed(obj.__class__):
+            sxp.append(className)
+            if hasattr(obj, "__getstate__"):
+                state = obj.__getstate__()
+            else:
+                state = obj.__dict__
+            sxp.append(self.jelly(state))
+        else:
+            self.unpersistable(
+                "instance of class %s deemed insecure" %
+                qual(obj.__class__), sxp)
+        return self.preserve(obj, sxp)
+
+    # The handlers for objects of exactly these types.  Objects of other types
+    # are jellied with _jellyClass, _jellyInstance or their jellyFor method.
+    _jellyDispatch = {
+        bytes: _jellyIdentity,
+        int: _jellyIdentity,
+        long: _jellyIdentity,
+        float: _jellyIdentity,
+        types.MethodType: _jellyMethod,
+        unicode: _jellyUnicode,
+        type(None): _jellyNone,
+        types.FunctionType: _jellyFunction,
+        types.ModuleType: _jellyModule,
+        bool: _jellyBoolean,
+        datetime.datetime: _jellyDatetime,
+        datetime.time: _jellyTime,
+        datetime.date: _jellyDate,
+        datetime.timedelta: _jellyTimedelta,
+        type: _jellyClass,
+        decimal.Decimal: _jellyDecimal,
+        list: _jellyList,
+        tuple: _jellyTuple,
+    }
+    _jellyDispatch.update(dict.fromkeys(DictTypes, _jellyDictionary))
+    _jellyDispatch.update(dict.fromkeys(_SetTypes, _jellySet))
+    _jellyDispatch.update(dict.fromkeys(_ImmutableSetTypes, _jellyFrozenset))
 
 
     def _jellyIterable(self, atom, obj):
@@ -638,6 +802,10 @@ class _Unjellier:
         self.references = {}
         self.postCallbacks = []
         self.invoker = invoker
+        # Whether the taster allows each type atom seen.
+        self._typeAllowed = {}
+        # The classes the taster allowed instances of, by type atom.
+        self._allowedClasses = {}
 
 
     def unjellyFull(self, obj):
@@ -665,7 +833,12 @@ class _Unjellier:
         if type(obj) is not list:
             return obj
         jelTypeBytes = obj[0]
-        if not self.taster.isTypeAllowed(jelTypeBytes):
+        try:
+            allowed = self._typeAllowed[jelTypeBytes]
+        except KeyError:
+            allowed = self._typeAllowed[jelTypeBytes] = (
+                self.taster.isTypeAllowed(jelTypeBytes))
+        if not allowed:
             raise InsecureJelly(jelTypeBytes)
         regClass = unjellyableRegistry.get(jelTypeBytes)
         if regClass is not None:
@@ -675,6 +848,13 @@ class _Unjellier:
         if regFactory is not None:
             return self._maybePostUnjelly(regFactory(self.unjelly(obj[1])))
 
+        thunk = self._unjellyDispatch.get(jelTypeBytes)
+        if thunk is not None:
+            return thunk(self, obj[1:])
+        clz = self._allowedClasses.get(jelTypeBytes)
+        if clz is not None:
+            return self._genericUnjelly(clz, obj[1])
+
         jelTypeText = nativeString(jelTypeBytes)
         thunk = getattr(self, '_unjelly_%s' % jelTypeText, None)
         if thunk is not None:
@@ -688,6 +868,7 @@ class _Unjellier:
             clz = namedObject(jelTypeText)
             if not self.taster.isClassAllowed(clz):
                 raise InsecureJelly("Class %s not allowed." % jelTypeText)
+            self._allowedClasses[jelTypeBytes] = clz
             return self._genericUnjelly(clz, obj[1])
 
 
@@ -791,10 +972,13 @@ class _Unjellier:
 
 
     def _unjelly_tuple(self, lst):
-        l = list(range(len(lst)))
+        if _isFlat(lst):
+            return tuple(lst)
+        l = list(lst)
         finished = 1
-        for elem in l:
-            if isinstance(self.unjellyInto(l, elem, lst[elem]), NotKnown):
+        for elem in range(len(l)):
+            if type(l[elem]) is list and isinstance(
+                    self.unjellyInto(l, elem, l[elem]), NotKnown):
                 finished = 0
         if finished:
             return tuple(l)
@@ -803,9 +987,11 @@ class _Unjellier:
 
 
     def _unjelly_list(self, lst):
-        l = list(range(len(lst)))
-        for elem in l:
-            self.unjellyInto(l, elem, lst[elem])
+        l = list(lst)
+        if not _isFlat(lst):
+            for elem in range(len(l)):
+                if type(l[elem]) is list:
+                    self.unjellyInto(l, elem, l[elem])
         return l
 
 
@@ -818,12 +1004,15 @@ class _Unjellier:
 
         @param containerType: the type of C{set} to use.
         """
-        l = list(range(len(lst)))
+        if _isFlat(lst):
+            return containerType(lst)
+        l = list(lst)
         finished = True
-        for elem in l:
-            data = self.unjellyInto(l, elem, lst[elem])
-            if isinstance(data, NotKnown):
-                finished = False
+        for elem in range(len(l)):
+            if type(l[elem]) is list:
+                data = self.unjellyInto(l, elem, l[elem])
+                if isinstance(data, NotKnown):
+                    finished = False
         if not finished:
             return _Container(l, containerType)
         else:
@@ -845,8 +1034,13 @@ class _Unjellier:
 
 
     def _unjelly_dictionary(self, lst):
+        if _isFlat(chain.from_iterable(lst)):
+            return dict(lst)
         d = {}
         for k, v in lst:
+            if type(k) is not list and type(v) is not list:
+                d[k] = v
+                continue
             kvd = _DictKeyAndValue(d)
             self.unjellyInto(kvd, 0, k)
             self.unjellyInto(kvd, 1, v)
@@ -947,6 +1141,32 @@ class _Unjellier:
             raise TypeError('instance method changed')
         return im
 
+    # The methods unjellying expressions with these type atoms.
+    _unjellyDispatch = {
+        None_atom: _unjelly_None,
+        b'unicode': _unjelly_unicode,
+        b'decimal': _unjelly_decimal,
+        b'boolean': _unjelly_boolean,
+        b'datetime': _unjelly_datetime,
+        b'date': _unjelly_date,
+        b'time': _unjelly_time,
+        b'timedelta': _unjelly_timedelta,
+        dereference_atom: _unjelly_dereference,
+        reference_atom: _unjelly_reference,
+        tuple_atom: _unjelly_tuple,
+        list_atom: _unjelly_list,
+        set_atom: _unjelly_set,
+        frozenset_atom: _unjelly_frozenset,
+        dictionary_atom: _unjelly_dictionary,
+        module_atom: _unjelly_module,
+        class_atom: _unjelly_class,
+        function_atom: _unjelly_function,
+        persistent_atom: _unjelly_persistent,
+        b'instance': _unjelly_instance,
+        unpersistable_atom: _unjelly_unpersistable,
+        b'method': _unjelly_method,
+    }
+
 
 
 #### Published Interface.
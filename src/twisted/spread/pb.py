@@ -459,6 +459,9 @@ class CopyableFailure(failure.Failure, Copyable):
         state['tb'] = None
         state['frames'] = []
         state['stack'] = []
+        # What Failure records to build frames and stack from later.
+        state.pop('_stackLines', None)
+        state.pop('_frameLines', None)
         state['value'] = str(self.value) # Exception instance
         if isinstance(self.type, bytes):
             state['type'] = self.type
@@ -306,6 +306,67 @@ class BananaTests(BananaTestBase):
         self.assertEqual(self.result, foo)
 
 
+    def test_chunks(self):
+        """
+        Expressions are decoded however the data is split into chunks,
+        including strings split across them.
+        """
+        foo = [[b"x" * 1000, i, -i, i * 0.5] for i in range(100)]
+        self.enc.sendEncoded(foo)
+        data = self.io.getvalue()
+        for size in (7, 999, 4096):
+            self.result = None
+            for i in range(0, len(data), size):
+                self.enc.dataReceived(data[i:i + size])
+            self.assertEqual(self.result, foo)
+            self.assertEqual(self.enc.buffer, b'')
+
+
+    def test_largeStrings(self):
+        """
+        Large byte strings are written as they are, with what comes before
+        and after them.
+        """
+        foo = [b"a", b"x" * banana._LARGE_STRING, 1,
+               [b"y" * banana.SIZE_LIMIT]]
+        self.enc.sendEncoded(foo)
+        self.assertEqual(self.io.getvalue(), self.encode(foo))
+        self.enc.dataReceived(self.io.getvalue())
+        self.assertEqual(self.result, foo)
+        self.assertEqual(banana.decode(banana.encode(foo)), foo)
+
+
+    def test_several(self):
+        """
+        Several expressions in one chunk are all decoded, and a partial one
+        after them is kept for the next.
+        """
+        results = []
+        self.enc.expressionReceived = results.append
+        self.enc.sendEncoded(b"hello")
+        self.enc.sendEncoded([1, 2])
+        self.enc.sendEncoded(3.5)
+        data = self.io.getvalue()
+        self.enc.dataReceived(data[:-3])
+        self.assertEqual(results, [b"hello", [1, 2]])
+        self.assertEqual(self.enc.buffer, data[-9:-3])
+        self.enc.dataReceived(data[-3:])
+        self.assertEqual(results, [b"hello", [1, 2], 3.5])
+
+
+    def test_bufferAfterError(self):
+        """
+        When decoding raises an exception, what was received from the
+        expression which caused it on is kept.
+        """
+        self.enc.sendEncoded(b"hello")
+        data = self.io.getvalue()
+        self.assertRaises(
+            NotImplementedError, self.enc.dataReceived, data + b'\x01\x88ab')
+        self.assertEqual(self.result, b"hello")
+        self.assertEqual(self.enc.buffer, b'\x01\x88ab')
+
+
     def feed(self, data):
         """
         Feed the data byte per byte to the receiver.
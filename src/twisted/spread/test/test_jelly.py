@@ -11,6 +11,7 @@ import datetime
 import decimal
 
 from twisted.python.compat import unicode
+from twisted.python.reflect import qual
 from twisted.spread import jelly, pb
 from twisted.trial import unittest
 from twisted.test.proto_helpers import StringTransport
@@ -688,3 +689,107 @@ class CircularReferenceTests(unittest.TestCase):
         res = jelly.unjelly(jelly.jelly(a))
         self.assertIsInstance(res.x, frozenset)
         self.assertEqual(list(res.x), [res])
+
+
+
+class CountingSecurityOptions(jelly.DummySecurityOptions):
+    """
+    Security options which allow everything except the given types, and
+    count the times they are asked about each.
+
+    @ivar asked: The number of times each type name was asked about.
+    @type asked: L{dict} of L{bytes} to L{int}
+    """
+
+    def __init__(self, *disallowed):
+        self.disallowed = disallowed
+        self.asked = {}
+
+
+    def isTypeAllowed(self, typeName):
+        self.asked[typeName] = self.asked.get(typeName, 0) + 1
+        return typeName not in self.disallowed
+
+
+
+class FlatContainerTests(unittest.TestCase):
+    """
+    Tests for jellying and unjellying containers whose items are all jellied
+    as they are.
+    """
+
+    def test_jelly(self):
+        """
+        Containers of byte strings, integers and floats are jellied as the
+        container's atom followed by the items.
+        """
+        self.assertEqual(
+            jelly.jelly([1, b"x", 2.5]), [b"list", 1, b"x", 2.5])
+        self.assertEqual(jelly.jelly((1, 2)), [b"tuple", 1, 2])
+        self.assertEqual(jelly.jelly(set([1])), [b"set", 1])
+        self.assertEqual(jelly.jelly(frozenset([1])), [b"frozenset", 1])
+        self.assertEqual(
+            jelly.jelly({b"a": 1}), [b"dictionary", [b"a", 1]])
+
+
+    def test_shared(self):
+        """
+        A container of byte strings, integers and floats which appears more
+        than once is referred back to, as any other is.
+        """
+        flat = [1, 2]
+        self.assertEqual(
+            jelly.jelly([flat, flat, {b"x": 1}]),
+            [b"list",
+             [b"reference", 1, [b"list", 1, 2]],
+             [b"dereference", 1],
+             [b"dictionary", [b"x", 1]]])
+        result = jelly.unjelly(jelly.jelly([flat, flat]))
+        self.assertEqual(result, [flat, flat])
+        self.assertIs(result[0], result[1])
+
+
+    def test_disallowedItems(self):
+        """
+        Items of the types which the taster does not allow are not jellied,
+        even in containers of otherwise allowed items.
+        """
+        taster = CountingSecurityOptions(qual(float).encode("utf-8"))
+        self.assertRaises(
+            jelly.InsecureJelly, jelly.jelly, [1, 2.5], taster)
+        self.assertRaises(
+            jelly.InsecureJelly, jelly.jelly, {b"x": 2.5}, taster)
+
+
+    def test_unjelly(self):
+        """
+        Expressions for containers of items which are not themselves
+        expressions are unjellied as copies of them.
+        """
+        sexp = [b"list", 1, b"x", 2.5]
+        result = jelly.unjelly(sexp)
+        self.assertEqual(result, [1, b"x", 2.5])
+        self.assertIsNot(result, sexp)
+        self.assertEqual(jelly.unjelly([b"tuple", 1, 2]), (1, 2))
+        self.assertEqual(jelly.unjelly([b"set", 1, 2]), set([1, 2]))
+        self.assertEqual(
+            jelly.unjelly([b"frozenset", 1]), frozenset([1]))
+        self.assertEqual(
+            jelly.unjelly([b"dictionary", [b"a", 1], [b"b", 2]]),
+            {b"a": 1, b"b": 2})
+
+
+    def test_typeDecisionsCached(self):
+        """
+        The taster is asked about each type once, when jellying or
+        unjellying.
+        """
+        obj = [{b"x": [1, 2.5, u"y"]} for i in range(10)]
+        taster = CountingSecurityOptions()
+        sexp = jelly.jelly(obj, taster)
+        self.assertEqual(set(taster.asked.values()), set([1]))
+        taster = CountingSecurityOptions()
+        self.assertEqual(jelly.unjelly(sexp, taster), obj)
+        self.assertEqual(
+            taster.asked,
+            {b"list": 1, b"dictionary": 1, b"unicode": 1})
@@ -20,17 +20,18 @@ from io import BytesIO as StringIO
 from zope.interface import implementer, Interface
 
 from twisted.trial import unittest
-from twisted.spread import pb, util, publish, jelly
+from twisted.spread import banana, pb, util, publish, jelly
 from twisted.internet import protocol, main, reactor, address
 from twisted.internet.error import ConnectionRefusedError
-from twisted.internet.defer import Deferred, gatherResults, succeed
+from twisted.internet.defer import (
+    CancelledError, Deferred, gatherResults, succeed)
 from twisted.protocols.policies import WrappingFactory
 from twisted.python import failure, log
 from twisted.python.compat import iterbytes, range, _PY3
 from twisted.cred.error import UnauthorizedLogin, UnhandledCredentials
 from twisted.cred import portal, checkers, credentials
 
-from twisted.test.proto_helpers import _FakeConnector
+from twisted.test.proto_helpers import _FakeConnector, StringTransport
 
 
 
@@ -1080,6 +1081,271 @@ class PagingTests(unittest.TestCase):
 
 
 
+class Streamer(pb.Referenceable):
+    """
+    Makes a L{util.StreamSender} to the L{util.StreamReceiver} it is given,
+    and sends C{bigString} with it, if asked to.
+
+    @ivar sender: The sender.
+    @ivar result: The L{Deferred} returned by L{util.StreamSender.sendBytes}.
+    """
+    sender = result = None
+
+    def __init__(self, send=True, **kw):
+        self.send = send
+        self.kw = kw
+
+
+    def remote_stream(self, receiver):
+        self.sender = util.StreamSender(receiver, **self.kw)
+        if self.send:
+            self.result = self.sender.sendBytes(bigString)
+
+
+
+class StreamingTests(unittest.TestCase):
+    """
+    Tests for L{util.StreamSender} and L{util.StreamReceiver}.
+    """
+
+    def stream(self, **kw):
+        """
+        Have a L{Streamer} in the server stream to a L{util.StreamReceiver}
+        in the client, writing to a L{StringTransport}.
+
+        @return: A 4-tuple of the L{Streamer}, the receiver, the consumer
+            and the L{IOPump}.
+        """
+        c, s, pump = connectedServerAndClient(test=self)
+        streamer = Streamer(**kw)
+        s.setNameForLocal("streamer", streamer)
+        consumer = StringTransport()
+        receiver = util.StreamReceiver(consumer)
+        c.remoteForName("streamer").callRemote("stream", receiver)
+        pump.pump()
+        return streamer, receiver, consumer, pump
+
+
+    def test_stream(self):
+        """
+        The bytes written to a L{util.StreamSender} are written to the
+        consumer of its L{util.StreamReceiver}, in chunks, and its
+        C{deferred} fires with their number when the stream is finished.
+        """
+        streamer, receiver, consumer, pump = self.stream(
+            chunkSize=30, window=100)
+        pump.pump()
+        self.assertIs(consumer.producer, receiver)
+        self.assertTrue(consumer.streaming)
+        pump.flush()
+        self.assertEqual(consumer.value(), bigString)
+        self.assertEqual(
+            self.successResultOf(receiver.deferred), len(bigString))
+        self.successResultOf(streamer.result)
+        self.assertIsNone(consumer.producer)
+
+
+    def test_window(self):
+        """
+        While a L{util.StreamReceiver} is paused, it writes nothing to its
+        consumer, and its sender sends no more than a window's worth of
+        bytes, and both carry on when it is resumed.
+        """
+        streamer, receiver, consumer, pump = self.stream(
+            chunkSize=30, window=100)
+        receiver.pauseProducing()
+        pump.flush()
+        self.assertEqual(consumer.value(), b"")
+        self.assertEqual(receiver.receivedBytes, 100)
+        self.assertEqual(streamer.sender.sentBytes, 100)
+        self.assertNoResult(receiver.deferred)
+        receiver.resumeProducing()
+        pump.flush()
+        self.assertEqual(consumer.value(), bigString)
+
+
+    def test_pushProducer(self):
+        """
+        A streaming producer registered with a L{util.StreamSender} is paused
+        when a window's worth of bytes has been sent and not yet written by
+        the receiver, and resumed when it has.
+        """
+        streamer, receiver, consumer, pump = self.stream(
+            send=False, window=50)
+        producer = StringTransport()
+        streamer.sender.registerProducer(producer, True)
+        streamer.sender.write(b"x" * 40)
+        self.assertEqual(producer.producerState, "producing")
+        streamer.sender.write(b"x" * 20)
+        self.assertEqual(producer.producerState, "paused")
+        pump.flush()
+        self.assertEqual(producer.producerState, "producing")
+        self.assertEqual(consumer.value(), b"x" * 60)
+        streamer.sender.finish()
+        pump.flush()
+        self.assertEqual(self.successResultOf(receiver.deferred), 60)
+
+
+    def test_pausedWhileWriting(self):
+        """
+        A L{util.StreamReceiver} whose consumer pauses it while it is being
+        written to keeps the rest of the chunks it has received until it is
+        resumed, and only then finishes the stream.
+        """
+        streamer, receiver, consumer, pump = self.stream(
+            send=False, chunkSize=10)
+        writes = []
+        def write(data):
+            writes.append(data)
+            receiver.pauseProducing()
+        consumer.write = write
+        streamer.sender.write(b"x" * 30)
+        streamer.sender.finish()
+        pump.flush()
+        self.assertEqual(writes, [b"x" * 10])
+        self.assertNoResult(receiver.deferred)
+        receiver.resumeProducing()
+        self.assertEqual(writes, [b"x" * 10] * 2)
+        receiver.resumeProducing()
+        receiver.resumeProducing()
+        self.assertEqual(writes, [b"x" * 10] * 3)
+        self.assertEqual(self.successResultOf(receiver.deferred), 30)
+
+
+    def test_writeWithoutProducer(self):
+        """
+        Bytes written to a L{util.StreamSender} with no producer registered
+        beyond the window are only sent once the receiver has written
+        earlier ones, and the stream is only finished after them.
+        """
+        streamer, receiver, consumer, pump = self.stream(
+            send=False, window=50)
+        receiver.pauseProducing()
+        streamer.sender.write(b"x" * 120)
+        finished = streamer.sender.finish()
+        pump.flush()
+        self.assertEqual(streamer.sender.sentBytes, 50)
+        self.assertEqual(receiver.receivedBytes, 50)
+        self.assertNoResult(finished)
+        receiver.resumeProducing()
+        pump.flush()
+        self.assertEqual(consumer.value(), b"x" * 120)
+        self.assertEqual(self.successResultOf(receiver.deferred), 120)
+        self.successResultOf(finished)
+
+
+    def test_stop(self):
+        """
+        When the consumer of a L{util.StreamReceiver} stops it, the producer
+        writing to the sender is stopped, and the receiver's C{deferred}
+        fails with L{CancelledError}.
+        """
+        streamer, receiver, consumer, pump = self.stream(
+            chunkSize=30, window=100)
+        receiver.pauseProducing()
+        pump.flush()
+        receiver.stopProducing()
+        pump.flush()
+        self.failureResultOf(receiver.deferred, CancelledError)
+        self.failureResultOf(streamer.result)
+        self.assertIsNone(consumer.producer)
+
+
+    def test_creditAfterStop(self):
+        """
+        Credit which arrives after the stream was stopped does not resume the
+        streaming producer the stop stopped.
+        """
+        streamer, receiver, consumer, pump = self.stream(
+            send=False, window=50)
+        producer = StringTransport()
+        streamer.sender.registerProducer(producer, True)
+        receiver.pauseProducing()
+        streamer.sender.write(b"x" * 60)
+        pump.flush()
+        self.assertEqual(producer.producerState, "paused")
+        receiver.stopProducing()
+        pump.flush()
+        self.failureResultOf(receiver.deferred, CancelledError)
+        self.assertEqual(producer.producerState, "stopped")
+        streamer.sender.remote_credit(60)
+        self.assertEqual(producer.producerState, "stopped")
+
+
+    def test_abort(self):
+        """
+        When a L{util.StreamSender} aborts the stream, the receiver's
+        C{deferred} fails with L{util.StreamAborted}.
+        """
+        streamer, receiver, consumer, pump = self.stream(send=False)
+        streamer.sender.write(b"x")
+        streamer.sender.abort(b"reason")
+        pump.flush()
+        f = self.failureResultOf(receiver.deferred, util.StreamAborted)
+        self.assertEqual(f.value.args, (b"reason",))
+        self.assertEqual(consumer.value(), b"x")
+
+
+    def test_connectionLost(self):
+        """
+        When the connection is lost, the producer writing to the sender is
+        stopped, and the receiver's C{deferred} fails with
+        L{pb.PBConnectionLost}.
+        """
+        streamer, receiver, consumer, pump = self.stream(
+            chunkSize=30, window=100)
+        receiver.pauseProducing()
+        pump.flush()
+        pump.client.connectionLost(failure.Failure(main.CONNECTION_DONE))
+        pump.server.connectionLost(failure.Failure(main.CONNECTION_DONE))
+        self.failureResultOf(receiver.deferred, pb.PBConnectionLost)
+        self.failureResultOf(streamer.result)
+
+
+    def test_finishAfterConnectionLost(self):
+        """
+        L{util.StreamSender.finish} and L{util.StreamSender.abort} return a
+        L{Deferred} which fails with L{pb.PBConnectionLost} once the
+        connection to the receiver is lost, rather than raising.
+        """
+        streamer, receiver, consumer, pump = self.stream(send=False)
+        pump.flush()
+        pump.client.connectionLost(failure.Failure(main.CONNECTION_DONE))
+        pump.server.connectionLost(failure.Failure(main.CONNECTION_DONE))
+        self.failureResultOf(
+            streamer.sender.finish(), pb.PBConnectionLost)
+        self.failureResultOf(
+            streamer.sender.abort(b"reason"), pb.PBConnectionLost)
+        self.failureResultOf(receiver.deferred, pb.PBConnectionLost)
+
+
+    def test_finishBeforeConnectionLost(self):
+        """
+        The L{Deferred} returned by L{util.StreamSender.finish} while bytes
+        are still waiting for the window fails with L{pb.PBConnectionLost}
+        if the connection to the receiver is lost before they are sent.
+        """
+        streamer, receiver, consumer, pump = self.stream(
+            send=False, window=50)
+        receiver.pauseProducing()
+        streamer.sender.write(b"x" * 60)
+        finished = streamer.sender.finish()
+        pump.flush()
+        pump.client.connectionLost(failure.Failure(main.CONNECTION_DONE))
+        pump.server.connectionLost(failure.Failure(main.CONNECTION_DONE))
+        self.failureResultOf(finished, pb.PBConnectionLost)
+        self.failureResultOf(receiver.deferred, pb.PBConnectionLost)
+
+
+    def test_chunkSize(self):
+        """
+        L{util.StreamSender} does not send chunks too large for Banana.
+        """
+        self.assertRaises(ValueError, util.StreamSender, None,
+                          chunkSize=banana.SIZE_LIMIT + 1)
+
+
+
 class DumbPublishable(publish.Publishable):
     def getStateToPublish(self):
         return {"yayIGotPublished": 1}
@@ -484,3 +484,21 @@ class FailureJellyingTests(unittest.TestCase):
         expectedOutput = ("Traceback from remote host -- "
                          "{}: some reason\n".format(exception))
         self.assertEqual(expectedOutput, output.getvalue())
+
+
+    def test_jellyFailureWithTraceback(self):
+        """
+        A L{CopyableFailure} created while handling an exception can be
+        jellied: the frames it would build its stack and traceback from are
+        not sent.
+        """
+        try:
+            1 / 0
+        except ZeroDivisionError:
+            original = pb.CopyableFailure()
+        state = original.getStateToCopy()
+        self.assertNotIn('_stackLines', state)
+        self.assertEqual((state['frames'], state['stack']), ([], []))
+        copied = jelly.unjelly(jelly.jelly(original, invoker=DummyInvoker()))
+        self.assertIs(
+            copied.check(ZeroDivisionError), ZeroDivisionError)
@@ -8,9 +8,12 @@
 Utility classes for spread.
 """
 
+from collections import deque
+from io import BytesIO
+
 from twisted.internet import defer
 from twisted.python.failure import Failure
-from twisted.spread import pb
+from twisted.spread import pb, banana
 from twisted.protocols import basic
 from twisted.internet import interfaces
 
@@ -213,3 +216,501 @@ def getAllPages(referenceable, methodName, *args, **kw):
     referenceable.callRemote(methodName, CallbackPageCollector(d.callback), *args, **kw)
     return d
 
+
+
+
+class StreamAborted(Exception):
+    """
+    The sender of a stream aborted it.
+    """
+
+
+
+@implementer(interfaces.IConsumer)
+class StreamSender(pb.Referenceable):
+    """
+    I write bytes to a L{StreamReceiver} in another process, which writes
+    them to a consumer there.
+
+    Bytes are sent in chunks of at most C{chunkSize} bytes, each in a message
+    which needs no answer, so that there is no round trip per chunk.  At most
+    C{window} bytes are sent before the receiver has written them: bytes
+    written to me beyond that wait until the receiver says how many it has
+    written, and meanwhile the producer registered with me, if any, is
+    paused.  If the receiver's consumer pauses it, it keeps what it receives
+    and stops saying so, so a slow consumer slows the producer down, and
+    neither side holds more than C{window} bytes, besides what is written to
+    me without a producer to pause.
+
+    @ivar receiver: The receiver.
+    @type receiver: L{pb.RemoteReference} to a L{StreamReceiver}
+
+    @ivar sentBytes: The number of bytes sent.
+    @type sentBytes: L{int}
+
+    @ivar producer: The producer registered with me, or L{None}.
+
+    @ivar _pending: The bytes written to me and not sent yet, because the
+        window is full; those of the first before C{_pendingOffset} have
+        been sent.
+    @type _pending: L{deque} of L{bytes}
+
+    @ivar _writtenBytes: The number of bytes written to me.
+
+    @ivar _finishing: A L{defer.Deferred} which L{finish} returned while
+        there were bytes still to send, or L{None}.
+
+    @ivar _stopReason: Why the stream was stopped, as an exception to fail
+        calls to L{finish} and L{abort} with, once C{_stopped} is set.
+    """
+    producer = None
+    streaming = None
+    _finishing = None
+    _stopReason = None
+
+    def __init__(self, receiver, chunkSize=2 ** 16, window=2 ** 20):
+        """
+        Open a stream to a receiver.
+
+        @param receiver: The receiver.
+        @type receiver: L{pb.RemoteReference} to a L{StreamReceiver}
+
+        @param chunkSize: The largest number of bytes to send in a message.
+        @type chunkSize: L{int}
+
+        @param window: The largest number of bytes to send before the
+            receiver has written them.
+        @type window: L{int}
+        """
+        if not 0 < chunkSize <= banana.SIZE_LIMIT:
+            raise ValueError(
+                "chunkSize must be between 1 and %d" % (banana.SIZE_LIMIT,))
+        self.receiver = receiver
+        self.chunkSize = chunkSize
+        self.window = window
+        self.sentBytes = 0
+        self._writtenBytes = 0
+        self._credit = window
+        self._pending = deque()
+        self._pendingOffset = 0
+        self._paused = False
+        self._pulling = False
+        self._stopped = False
+        receiver.notifyOnDisconnect(self._receiverLost)
+        receiver.callRemote("open", self, window, pbanswer=False)
+
+
+    def registerProducer(self, producer, streaming):
+        """
+        Register a producer to write the bytes to send to me.
+
+        @see: L{interfaces.IConsumer.registerProducer}
+        """
+        if self.producer is not None:
+            raise RuntimeError(
+                "Cannot register producer %s, because producer %s was never "
+                "unregistered." % (producer, self.producer))
+        self.producer = producer
+        self.streaming = streaming
+        if self._stopped:
+            producer.stopProducing()
+        elif streaming:
+            if self._pending or self._credit <= 0:
+                self._paused = True
+                producer.pauseProducing()
+        else:
+            self._pull()
+
+
+    def unregisterProducer(self):
+        """
+        Unregister the producer registered with me.
+        """
+        self.producer = None
+        self.streaming = None
+        self._paused = False
+
+
+    def write(self, data):
+        """
+        Send bytes to the receiver, in chunks, as soon as the window allows.
+        Bytes written after the stream was finished or stopped, or the
+        receiver was disconnected, are discarded.
+
+        @param data: The bytes.
+        @type data: L{bytes}
+        """
+        if self._stopped or self._finishing is not None or not data:
+            return
+        self._pending.append(data)
+        self._writtenBytes += len(data)
+        self._send()
+        if self.producer is None:
+            return
+        if self.streaming:
+            if self._pending and not self._paused:
+                self._paused = True
+                self.producer.pauseProducing()
+        else:
+            self._pull()
+
+
+    def _send(self):
+        """
+        Send as many of the bytes written to me as the window allows.
+        """
+        pending = self._pending
+        chunkSize = self.chunkSize
+        while pending and self._credit > 0:
+            data = pending[0]
+            start = self._pendingOffset
+            end = min(len(data), start + self._credit)
+            for i in range(start, end, chunkSize):
+                self.receiver.callRemote(
+                    "write", data[i:min(i + chunkSize, end)], pbanswer=False)
+            self.sentBytes += end - start
+            self._credit -= end - start
+            if end == len(data):
+                pending.popleft()
+                self._pendingOffset = 0
+            else:
+                self._pendingOffset = end
+
+
+    def _pull(self):
+        """
+        Have a non-streaming producer write bytes until the window is full.
+        """
+        if self._pulling:
+            return
+        self._pulling = True
+        try:
+            while (self.producer is not None and not self.streaming and
+                   not self._pending and self._credit > 0 and
+                   not self._stopped):
+                written = self._writtenBytes
+                self.producer.resumeProducing()
+                if self._writtenBytes == written:
+                    # It will write when it can.
+                    break
+        finally:
+            self._pulling = False
+
+
+    def finish(self):
+        """
+        Finish the stream, once the bytes written to me have been sent.
+
+        @return: A L{defer.Deferred} which fires when the receiver has been
+            sent everything written to me, or fails if the stream was
+            already finished or stopped, or is stopped first.
+        """
+        if self._stopped or self._finishing is not None:
+            return defer.fail(self._stopReason or RuntimeError(
+                "The stream is already finishing."))
+        self._finishing = defer.Deferred()
+        finishing = self._finishing
+        if not self._pending:
+            self._sendFinish()
+        return finishing
+
+
+    def _sendFinish(self):
+        """
+        Tell the receiver the stream is finished, now that everything
+        written to me has been sent.
+        """
+        finishing = self._finishing
+        self._stopped = True
+        self._stopReason = RuntimeError("The stream has been finished.")
+        self.receiver.dontNotifyOnDisconnect(self._receiverLost)
+        self.receiver.callRemote("finish").chainDeferred(finishing)
+
+
+    def abort(self, reason):
+        """
+        Abort the stream, so that the receiver's C{deferred} fails with
+        L{StreamAborted}, discarding the bytes not sent yet and stopping the
+        producer registered with me.
+
+        @param reason: Why.
+        @type reason: L{bytes}
+
+        @return: A L{defer.Deferred} which fires with L{None} once the
+            receiver has been told, or fails if the stream was already
+            finished or stopped.
+        """
+        if self._stopped:
+            return defer.fail(self._stopReason)
+        self.receiver.dontNotifyOnDisconnect(self._receiverLost)
+        self.receiver.callRemote("abort", reason, pbanswer=False)
+        self._stop(StreamAborted(reason))
+        return defer.succeed(None)
+
+
+    def sendFile(self, f):
+        """
+        Send the contents of a file to the receiver, and then finish the
+        stream.
+
+        @param f: The file, opened in binary mode.
+
+        @return: A L{defer.Deferred} which fires when the receiver has been
+            sent the contents of the file, or fails if the stream is stopped
+            first.
+        """
+        sender = basic.FileSender()
+        sender.CHUNK_SIZE = self.chunkSize
+        d = sender.beginFileTransfer(f, self)
+        d.addCallback(lambda lastSent: self.finish())
+        return d
+
+
+    def sendBytes(self, data):
+        """
+        Send bytes to the receiver, and then finish the stream.
+
+        @param data: The bytes.
+        @type data: L{bytes}
+
+        @return: See L{sendFile}.
+        """
+        return self.sendFile(BytesIO(data))
+
+
+    def remote_credit(self, count):
+        """
+        The receiver has written C{count} more bytes.
+        """
+        if self._stopped:
+            return
+        self._credit += count
+        self._send()
+        if self._pending:
+            return
+        if self._finishing is not None:
+            self._sendFinish()
+            return
+        if self.producer is None or self._credit <= 0:
+            return
+        if self.streaming:
+            if self._paused:
+                self._paused = False
+                self.producer.resumeProducing()
+        else:
+            self._pull()
+
+
+    def remote_stop(self):
+        """
+        The receiver's consumer does not want any more bytes.
+        """
+        if not self._stopped:
+            self.receiver.dontNotifyOnDisconnect(self._receiverLost)
+        self._stop(defer.CancelledError())
+
+
+    def _receiverLost(self, receiver):
+        """
+        The connection to the receiver was lost.
+        """
+        self._stop(pb.PBConnectionLost())
+
+
+    def _stop(self, reason):
+        """
+        Stop the producer, fail an unfinished L{finish}, and discard the
+        bytes not sent yet and anything written afterwards.
+
+        @param reason: Why, as an exception.
+        """
+        if self._stopped:
+            return
+        self._stopped = True
+        self._stopReason = reason
+        self._pending.clear()
+        self._pendingOffset = 0
+        if self.producer is not None:
+            self.producer.stopProducing()
+        finishing, self._finishing = self._finishing, None
+        if finishing is not None:
+            finishing.errback(reason)
+
+
+
+@implementer(interfaces.IPushProducer)
+class StreamReceiver(pb.Referenceable):
+    """
+    I receive bytes from a L{StreamSender} in another process, and write
+    them to a consumer, as a streaming producer.
+
+    Pass me to a remote method which makes a L{StreamSender} with the
+    reference to me it receives.
+
+    While my consumer has paused me, I keep the bytes I receive rather than
+    writing them, and stop telling the sender how many I have written, so I
+    keep no more than a window's worth.
+
+    @ivar consumer: The consumer.
+    @type consumer: L{interfaces.IConsumer}
+
+    @ivar deferred: A L{defer.Deferred} which fires with the number of bytes
+        received when the sender finishes the stream and they have all been
+        written.  It fails with L{StreamAborted} if the sender aborts it,
+        with L{pb.PBConnectionLost} if the connection to the sender is lost
+        first, and with L{defer.CancelledError} if the consumer stops me.
+
+    @ivar receivedBytes: The number of bytes received.
+    @type receivedBytes: L{int}
+
+    @ivar _buffer: The chunks received and not written yet.
+    @type _buffer: L{deque} of L{bytes}
+
+    @ivar _finishing: Whether the sender has finished the stream, which
+        ends once C{_buffer} has been written.
+    """
+
+    def __init__(self, consumer):
+        """
+        @param consumer: The consumer to write the bytes received to.
+        @type consumer: L{interfaces.IConsumer}
+        """
+        self.consumer = consumer
+        self.deferred = defer.Deferred()
+        self.receivedBytes = 0
+        self.sender = None
+        self._window = 0
+        self._unacknowledged = 0
+        self._buffer = deque()
+        self._paused = False
+        self._writing = False
+        self._finishing = False
+        self._done = False
+
+
+    def remote_open(self, sender, window):
+        """
+        A sender opened a stream to me.
+        """
+        self.sender = sender
+        self._window = window
+        sender.notifyOnDisconnect(self._senderLost)
+        self.consumer.registerProducer(self, True)
+
+
+    def remote_write(self, chunk):
+        """
+        The sender sent a chunk.
+        """
+        if self._done:
+            return
+        self.receivedBytes += len(chunk)
+        self._buffer.append(chunk)
+        self._write()
+
+
+    def _write(self):
+        """
+        Write the chunks received to the consumer until it pauses me, and
+        finish the stream if the sender has finished it and they have all
+        been written.
+        """
+        if self._writing:
+            return
+        self._writing = True
+        try:
+            while self._buffer and not self._paused and not self._done:
+                chunk = self._buffer.popleft()
+                self.consumer.write(chunk)
+                self._unacknowledged += len(chunk)
+                if self._unacknowledged * 2 >= self._window:
+                    self._acknowledge()
+        finally:
+            self._writing = False
+        if self._finishing and not self._buffer and self._end():
+            self.deferred.callback(self.receivedBytes)
+
+
+    def _acknowledge(self):
+        """
+        Tell the sender how many more bytes have been written, unless
+        paused.
+        """
+        if self._paused or self._done or not self._unacknowledged:
+            return
+        self.sender.callRemote(
+            "credit", self._unacknowledged, pbanswer=False)
+        self._unacknowledged = 0
+
+
+    def remote_finish(self):
+        """
+        The sender finished the stream.
+        """
+        self._finishing = True
+        self._write()
+
+
+    def remote_abort(self, reason):
+        """
+        The sender aborted the stream.
+        """
+        if self._end():
+            self.deferred.errback(StreamAborted(reason))
+
+
+    def _senderLost(self, sender):
+        """
+        The connection to the sender was lost.
+        """
+        if self._end(connected=False):
+            self.deferred.errback(pb.PBConnectionLost())
+
+
+    def _end(self, connected=True):
+        """
+        End the stream, unless it has already ended, discarding the chunks
+        not written yet.
+
+        @param connected: Whether the connection to the sender is still
+            there.
+        @type connected: L{bool}
+
+        @return: Whether it had not already ended.
+        @rtype: L{bool}
+        """
+        if self._done:
+            return False
+        self._done = True
+        self._buffer.clear()
+        if connected:
+            self.sender.dontNotifyOnDisconnect(self._senderLost)
+        self.consumer.unregisterProducer()
+        return True
+
+
+    def pauseProducing(self):
+        """
+        Stop writing to the consumer and telling the sender how many bytes
+        have been written, so that it stops once the window is full.
+        """
+        self._paused = True
+
+
+    def resumeProducing(self):
+        """
+        Write the chunks kept while paused, and tell the sender how many
+        bytes have been written again.
+        """
+        self._paused = False
+        self._write()
+        self._acknowledge()
+
+
+    def stopProducing(self):
+        """
+        Have the sender stop the stream.
+        """
+        if self._end():
+            self.sender.callRemote("stop", pbanswer=False)
+            self.deferred.errback(defer.CancelledError())
@@ -9,10 +9,15 @@ from twisted.trial import unittest
 
 import os
 import stat
+import threading
+import time
 
 from twisted.enterprise.adbapi import ConnectionPool, ConnectionLost
 from twisted.enterprise.adbapi import Connection, Transaction
+from twisted.enterprise.adbapi import CheckoutTimeout
 from twisted.internet import reactor, defer, interfaces
+from twisted.internet.task import Clock
+from twisted.python import threadable
 from twisted.python.failure import Failure
 from twisted.python.reflect import requireModule
 
@@ -741,6 +746,8 @@ class DummyConnectionPool(ConnectionPool):
         Don't forward init call.
         """
         self._reactor = reactor
+        self.threadID = threadable.getThreadID
+        self._initConnections()
 
 
 
@@ -885,3 +892,294 @@ class ConnectionPoolTests(unittest.TestCase):
         pool.close()
         # But not anymore.
         self.assertFalse(reactor.triggers)
+
+
+
+class CheckoutTests(unittest.TestCase):
+    """
+    Tests for checking connections of a L{ConnectionPool} in and out.
+    """
+
+    if requireModule('sqlite3') is None:
+        skip = "sqlite3 is not available"
+
+    def setUp(self):
+        self.now = 0.0
+        self.pool = self.makePool()
+
+
+    def makePool(self, **kw):
+        """
+        Make a L{ConnectionPool} of in-memory SQLite databases, which is
+        neither started nor stopped with the reactor.
+        """
+        kw.setdefault('cp_max', 2)
+        pool = ConnectionPool(
+            'sqlite3', ':memory:', check_same_thread=False,
+            cp_reactor=EventReactor(False), **kw)
+        pool._clock = lambda: self.now
+        self.addCleanup(pool.close)
+        return pool
+
+
+    def inThread(self, f, *args):
+        """
+        Call C{f} in another thread and wait for it to return.
+
+        @return: A 2-tuple of whether C{f} returned, and what it returned or
+            the exception it raised.
+        """
+        result = []
+        def run():
+            try:
+                result.append((True, f(*args)))
+            except Exception as e:
+                result.append((False, e))
+        thread = threading.Thread(target=run)
+        thread.start()
+        thread.join()
+        return result[0]
+
+
+    def test_sharedBetweenThreads(self):
+        """
+        A connection checked in by one thread is checked out again by the
+        next thread which needs one, rather than a new one being opened.
+        """
+        conn = self.pool.connect()
+        self.assertIs(self.pool.connect(), conn)
+        self.pool._checkin()
+        self.assertEqual(self.inThread(self.pool.connect), (True, conn))
+        statistics = self.pool.statistics()
+        self.assertEqual(statistics.openedCount, 1)
+        self.assertEqual(statistics.checkoutCount, 2)
+
+
+    def test_max(self):
+        """
+        When C{cp_max} connections are checked out, a thread waits for one
+        to be checked in, for at most C{cp_checkout_timeout} seconds, and
+        then L{ConnectionPool.connect} raises L{CheckoutTimeout}.
+        """
+        pool = self.makePool(cp_max=1, cp_checkout_timeout=0.01)
+        pool._clock = time.time
+        pool.connect()
+        succeeded, result = self.inThread(pool.connect)
+        self.assertFalse(succeeded)
+        self.assertIsInstance(result, CheckoutTimeout)
+        statistics = pool.statistics()
+        self.assertEqual(statistics.checkoutTimeoutCount, 1)
+        self.assertTrue(statistics.totalCheckoutWaitTime > 0)
+        self.assertEqual(statistics.openConnectionCount, 1)
+
+
+    def test_waitForCheckin(self):
+        """
+        A thread waiting for a connection gets the one checked in.
+        """
+        pool = self.makePool(cp_max=1)
+        conn = pool.connect()
+        result = []
+        thread = threading.Thread(target=lambda: result.append(pool.connect()))
+        thread.start()
+        while not pool.statistics().waitingCount:
+            time.sleep(0.001)
+        pool._checkin()
+        thread.join()
+        self.assertEqual(result, [conn])
+
+
+    def test_disconnect(self):
+        """
+        L{ConnectionPool.disconnect} closes the connection checked out by the
+        calling thread, making room for a new one.
+        """
+        conn = self.pool.connect()
+        self.pool.disconnect(conn)
+        self.assertEqual(self.pool.connections, {})
+        self.assertIsNot(self.pool.connect(), conn)
+        statistics = self.pool.statistics()
+        self.assertEqual(
+            (statistics.openedCount, statistics.closedCount), (2, 1))
+
+
+    def checkOutTwo(self, pool):
+        """
+        Check out two connections of C{pool} in two threads, and check them
+        in again.
+
+        @return: The connections.
+        """
+        def checkOut():
+            conn = pool.connect()
+            pool._checkin()
+            return conn
+        first = pool.connect()
+        second = self.inThread(checkOut)[1]
+        pool._checkin()
+        return first, second
+
+
+    def test_reapIdle(self):
+        """
+        Checking the idle connections closes those which have been idle for
+        longer than C{cp_max_idle} seconds, while there are more than
+        C{cp_min} connections.
+        """
+        pool = self.makePool(cp_min=1, cp_max_idle=10)
+        first, second = self.checkOutTwo(pool)
+        self.now = 5
+        pool._checkIdleConnections()
+        self.assertEqual(len(pool.connections), 2)
+        self.now = 11
+        pool._checkIdleConnections()
+        self.assertEqual(list(pool.connections.values()), [first])
+        self.assertEqual(pool.statistics().idleConnectionCount, 1)
+        self.assertIs(pool.connect(), first)
+
+
+    def test_validate(self):
+        """
+        Checking the idle connections closes those which fail validation with
+        C{cp_good_sql}.
+        """
+        first, second = self.checkOutTwo(self.pool)
+        first.close()
+        self.pool._checkIdleConnections()
+        self.assertEqual(list(self.pool.connections.values()), [second])
+        self.assertEqual(len(self.flushLoggedErrors()), 1)
+
+
+    def test_checkInterval(self):
+        """
+        A started L{ConnectionPool} with a C{cp_check_interval} checks its
+        idle connections that many seconds apart, until it is closed.
+        """
+        clock = Clock()
+        pool = ConnectionPool(
+            'sqlite3', ':memory:', check_same_thread=False,
+            cp_reactor=EventReactor(False), cp_check_interval=5)
+        checks = []
+        pool._checkConnections = lambda: checks.append(None)
+        pool._reactor.callLater = clock.callLater
+        pool._reactor.seconds = clock.seconds
+        pool.start()
+        clock.advance(5)
+        clock.advance(5)
+        self.assertEqual(len(checks), 2)
+        pool.close()
+        self.assertEqual(clock.getDelayedCalls(), [])
+
+
+
+class BatchAndStatementCacheTests(unittest.TestCase):
+    """
+    Tests for L{ConnectionPool.runQueryMany},
+    L{ConnectionPool.runOperationMany} and the statement cache.
+    """
+
+    if requireModule('sqlite3') is None:
+        skip = "sqlite3 is not available"
+    elif interfaces.IReactorThreads(reactor, None) is None:
+        skip = "ADB-API requires threads, no way to test without them"
+
+    def makePool(self, **kw):
+        """
+        Make and start a L{ConnectionPool} of one in-memory SQLite database,
+        with a table.
+        """
+        pool = ConnectionPool('sqlite3', ':memory:', check_same_thread=False,
+                              cp_min=1, cp_max=1, **kw)
+        pool.start()
+        self.addCleanup(pool.close)
+        return pool.runOperation(simple_table_schema).addCallback(
+            lambda ignored: pool)
+
+
+    @defer.inlineCallbacks
+    def test_runOperationMany(self):
+        """
+        L{ConnectionPool.runOperationMany} runs a statement with each set of
+        arguments.
+        """
+        pool = yield self.makePool()
+        yield pool.runOperationMany(
+            "insert into simple(x) values(?)", [(1,), (2,), (3,)])
+        rows = yield pool.runQuery("select x from simple order by x")
+        self.assertEqual([row[0] for row in rows], [1, 2, 3])
+
+
+    @defer.inlineCallbacks
+    def test_runQueryMany(self):
+        """
+        L{ConnectionPool.runQueryMany} runs a query with each set of arguments
+        and fires with the list of their results.
+        """
+        pool = yield self.makePool()
+        yield pool.runOperationMany(
+            "insert into simple(x) values(?)", [(1,), (2,), (3,)])
+        results = yield pool.runQueryMany(
+            "select x from simple where x > ? order by x", [(1,), (2,)])
+        self.assertEqual(
+            [[row[0] for row in rows] for rows in results], [[2, 3], [3]])
+
+
+    @defer.inlineCallbacks
+    def test_statementCache(self):
+        """
+        With C{cp_statement_cache}, statements run again are run with the
+        same cursor, up to that many statements per connection.
+        """
+        pool = yield self.makePool(cp_statement_cache=1)
+        for i in range(3):
+            yield pool.runOperation("insert into simple(x) values(?)", (i,))
+        rows = yield pool.runQuery("select count(*) from simple")
+        self.assertEqual(rows[0][0], 3)
+        statistics = pool.statistics()
+        # The first insert, the select, and the creation of the table.
+        self.assertEqual(statistics.statementCacheMisses, 3)
+        self.assertEqual(statistics.statementCacheHits, 2)
+
+
+    @defer.inlineCallbacks
+    def test_statementCacheCustomTransaction(self):
+        """
+        The statement cache is not used when C{transactionFactory} is not
+        L{Transaction}, so that statements run in its transactions.
+        """
+        executed = []
+
+        class RecordingTransaction(Transaction):
+            def execute(self, *args, **kw):
+                executed.append(args[0])
+                return self._cursor.execute(*args, **kw)
+
+        pool = ConnectionPool('sqlite3', ':memory:', check_same_thread=False,
+                              cp_min=1, cp_max=1, cp_statement_cache=5)
+        pool.transactionFactory = RecordingTransaction
+        pool.start()
+        self.addCleanup(pool.close)
+        yield pool.runOperation(simple_table_schema)
+        yield pool.runOperation("insert into simple(x) values(?)", (1,))
+        rows = yield pool.runQuery("select x from simple")
+        self.assertEqual(rows, [(1,)])
+        self.assertEqual(executed, [simple_table_schema,
+                                    "insert into simple(x) values(?)",
+                                    "select x from simple"])
+        self.assertEqual(pool.statistics().statementCacheMisses, 0)
+
+
+    @defer.inlineCallbacks
+    def test_statementCacheError(self):
+        """
+        A statement which fails is rolled back, and its cursor is not kept.
+        """
+        pool = yield self.makePool(cp_statement_cache=5)
+        yield self.assertFailure(
+            pool.runOperation("insert into nosuchtable(x) values(?)", (1,)),
+            Exception)
+        record = list(pool._records.values())[0]
+        self.assertNotIn(
+            "insert into nosuchtable(x) values(?)", record.statements)
+        rows = yield pool.runQuery("select count(*) from simple")
+        self.assertEqual(rows[0][0], 0)
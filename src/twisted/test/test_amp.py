@@ -15,7 +15,7 @@ from zope.interface import implementer
 from zope.interface.verify import verifyClass, verifyObject
 
 from twisted.python import filepath
-from twisted.python.compat import intToBytes
+from twisted.python.compat import intToBytes, nativeString
 from twisted.python.failure import Failure
 from twisted.protocols import amp
 from twisted.trial import unittest
@@ -398,6 +398,36 @@ class AmpBoxTests(unittest.TestCase):
         self.assertRaises(TypeError, a.serialize)
 
 
+    def test_serializeCommonKeys(self):
+        """
+        The keys which appear in most boxes are serialized, in sorted order
+        with the other keys, just like any other key.
+        """
+        a = amp.AmpBox({b'_command': b'Sum', b'_ask': b'1', b'a': b'',
+                        b'_error_code': b'X'})
+        self.assertEqual(
+            a.serialize(),
+            b'\x00\x04_ask\x00\x011'
+            b'\x00\x08_command\x00\x03Sum'
+            b'\x00\x0b_error_code\x00\x01X'
+            b'\x00\x01a\x00\x00'
+            b'\x00\x00')
+
+
+    def test_serializeTooLong(self):
+        """
+        L{amp.TooLong} is raised when trying to serialize a key longer than
+        255 bytes or a value longer than 65535 bytes.
+        """
+        error = self.assertRaises(
+            amp.TooLong, amp.AmpBox({b'k' * 256: b'v'}).serialize)
+        self.assertTrue(error.isKey)
+        error = self.assertRaises(
+            amp.TooLong, amp.AmpBox({b'k': b'v' * 65536}).serialize)
+        self.assertFalse(error.isKey)
+        self.assertEqual(error.keyName, b'k')
+
+
 
 class ParsingTests(unittest.TestCase):
 
@@ -984,6 +1014,59 @@ class BinaryProtocolTests(unittest.TestCase):
         self.assertTrue(transport.disconnecting)
 
 
+    def test_receiveBoxesByteByByte(self):
+        """
+        L{amp.BinaryBoxProtocol} delivers the same boxes however the data
+        for them is split up, including when it arrives a byte at a time.
+        """
+        boxes = [amp.AmpBox({b'_command': b'Sum', b'_ask': b'1',
+                             b'empty': b''}),
+                 amp.AmpBox(),
+                 amp.AmpBox(value=b'x' * 65535)]
+        data = b''.join(box.serialize() for box in boxes)
+        protocol = amp.BinaryBoxProtocol(self)
+        protocol.makeConnection(StringTransport())
+        for i in range(len(data)):
+            protocol.dataReceived(data[i:i + 1])
+        self.assertEqual(self.boxes, boxes)
+        del self.boxes[:]
+        protocol.dataReceived(data)
+        self.assertEqual(self.boxes, boxes)
+
+
+    def test_receivePaused(self):
+        """
+        Once L{amp.BinaryBoxProtocol} is paused, it delivers no more boxes
+        until it is resumed.
+        """
+        transport = StringTransport()
+        protocol = amp.BinaryBoxProtocol(self)
+        protocol.makeConnection(transport)
+        self.ampBoxReceived = lambda box: (self.boxes.append(box),
+                                           protocol.pauseProducing())
+        protocol.dataReceived(amp.AmpBox(a=b'1').serialize() +
+                              amp.AmpBox(b=b'2').serialize())
+        self.assertEqual(self.boxes, [amp.AmpBox(a=b'1')])
+        protocol.resumeProducing()
+        self.assertEqual(self.boxes, [amp.AmpBox(a=b'1'), amp.AmpBox(b=b'2')])
+
+
+    def test_overriddenStateMachine(self):
+        """
+        If a subclass of L{amp.BinaryBoxProtocol} overrides one of the
+        methods which parse the strings making up a box, received data is
+        parsed through that method.
+        """
+        class UppercaseValues(amp.BinaryBoxProtocol):
+            def proto_value(self, string):
+                return amp.BinaryBoxProtocol.proto_value(self, string.upper())
+
+        protocol = UppercaseValues(self)
+        protocol.makeConnection(StringTransport())
+        protocol.dataReceived(amp.AmpBox(hello=b'world').serialize())
+        self.assertEqual(self.boxes, [amp.AmpBox(hello=b'WORLD')])
+
+
     def test_excessiveKeyFailure(self):
         """
         If L{amp.BinaryBoxProtocol} disconnects because it received a key
@@ -2732,6 +2815,115 @@ class CommandTests(unittest.TestCase):
             "got: u?'foo'$")
 
 
+    def test_argumentNamesConverted(self):
+        """
+        L{Command.makeArguments} and L{Command.parseArguments} convert between
+        wire names and the Python identifiers given for them by
+        L{amp._wireNameToPythonIdentifier}, and omit optional arguments which
+        are missing or L{None}.
+        """
+        class NamesCommand(amp.Command):
+            arguments = [(b'from', amp.Integer()),
+                         (b'to-do', amp.Unicode(optional=True)),
+                         (b'extra', amp.Integer(optional=True))]
+
+        box = NamesCommand.makeArguments({'From': 1, 'to_do': None}, None)
+        self.assertEqual(box, amp.AmpBox({b'from': b'1'}))
+        self.assertEqual(NamesCommand.parseArguments(box, None),
+                         {'From': 1, 'to_do': None, 'extra': None})
+        box = NamesCommand.makeArguments({'From': 1, 'to_do': u'\N{SNOWMAN}'},
+                                         None)
+        self.assertEqual(
+            box, amp.AmpBox({b'from': b'1', b'to-do': b'\xe2\x98\x83'}))
+        self.assertEqual(NamesCommand.parseArguments(box, None),
+                         {'From': 1, 'to_do': u'\N{SNOWMAN}', 'extra': None})
+
+
+    def test_missingArgument(self):
+        """
+        L{Command.parseArguments} raises L{KeyError} if a box is missing a
+        required argument.
+        """
+        class Required(amp.Command):
+            arguments = [(b'a', amp.Integer())]
+
+        self.assertRaises(
+            KeyError, Required.parseArguments, amp.AmpBox(), None)
+        self.assertRaises(
+            KeyError, Hello.parseArguments, amp.AmpBox(), None)
+
+
+
+class AmpListTests(unittest.TestCase):
+    """
+    Tests for L{amp.AmpList}.
+    """
+    subargs = [(b'b', amp.Integer()),
+               (b'a', amp.Unicode(optional=True)),
+               (b'c', amp.String())]
+
+    def test_serialize(self):
+        """
+        L{amp.AmpList.toStringProto} serializes each dictionary as an
+        L{amp.AmpBox} holding its values converted by the corresponding
+        arguments.
+        """
+        objects = [{'a': u'x', 'b': 1, 'c': b'y'},
+                   {'a': None, 'b': 2, 'c': b''}]
+        data = amp.AmpList(self.subargs).toStringProto(objects, None)
+        self.assertEqual(
+            data,
+            amp.AmpBox({b'a': b'x', b'b': b'1', b'c': b'y'}).serialize() +
+            amp.AmpBox({b'b': b'2', b'c': b''}).serialize())
+        self.assertEqual(
+            amp.AmpList(self.subargs).fromStringProto(data, None),
+            objects)
+
+
+    def test_serializeUnicodeValueRaises(self):
+        """
+        L{amp.AmpList.toStringProto} raises L{TypeError} if an argument
+        converts a value to text rather than bytes.
+        """
+        subargs = [(b'a', amp.String())]
+        self.assertRaises(
+            TypeError, amp.AmpList(subargs).toStringProto, [{'a': u'x'}], None)
+
+
+    def test_serializeTooLong(self):
+        """
+        L{amp.AmpList.toStringProto} raises L{amp.TooLong} if an argument
+        converts a value to more than 65535 bytes.
+        """
+        subargs = [(b'a', amp.String())]
+        error = self.assertRaises(
+            amp.TooLong, amp.AmpList(subargs).toStringProto,
+            [{'a': b'x' * 65536}], None)
+        self.assertEqual(error.keyName, b'a')
+
+
+    def test_argumentFromBoxAndToBox(self):
+        """
+        An L{amp.AmpList} of arguments which override C{fromBox} and
+        C{toBox} converts each dictionary with those methods.
+        """
+        class Doubled(amp.Integer):
+            def toBox(self, name, strings, objects, proto):
+                value = objects.pop(nativeString(name))
+                strings[name] = strings[name + b'2'] = self.toString(value)
+
+            def fromBox(self, name, strings, objects, proto):
+                objects[nativeString(name)] = (
+                    self.fromString(strings.pop(name)),
+                    self.fromString(strings.pop(name + b'2')))
+
+        argument = amp.AmpList([(b'a', Doubled())])
+        data = argument.toStringProto([{'a': 1}], None)
+        self.assertEqual(
+            data, amp.AmpBox({b'a': b'1', b'a2': b'1'}).serialize())
+        self.assertEqual(argument.fromStringProto(data, None), [{'a': (1, 1)}])
+
+
 
 class ListOfTestsMixin:
     """
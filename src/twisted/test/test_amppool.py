@@ -0,0 +1,285 @@
+# Copyright (c) Twisted Matrix Laboratories.
+# See LICENSE for details.
+
+"""
+Tests for L{twisted.protocols.amppool}.
+"""
+
+from __future__ import absolute_import, division
+
+from zope.interface.verify import verifyObject
+
+from twisted.internet import defer, error, protocol, task
+from twisted.protocols import amp, amppool
+from twisted.python.compat import intToBytes
+from twisted.python.failure import Failure
+from twisted.test.proto_helpers import StringTransportWithDisconnection
+from twisted.test.test_amp import SimpleGreeting
+from twisted.trial import unittest
+
+
+
+class PoolEndpoint(object):
+    """
+    A client endpoint which connects protocols to
+    L{StringTransportWithDisconnection}s.
+
+    @ivar protocols: The protocols connected, in order.
+    """
+    def __init__(self):
+        self.protocols = []
+
+
+    def connect(self, factory):
+        client = factory.buildProtocol(None)
+        transport = StringTransportWithDisconnection()
+        transport.protocol = client
+        client.makeConnection(transport)
+        self.protocols.append(client)
+        return defer.succeed(client)
+
+
+
+class AMPConnectionPoolTests(unittest.TestCase):
+    """
+    Tests for L{amppool.AMPConnectionPool}.
+    """
+
+    def setUp(self):
+        self.clock = task.Clock()
+        self.endpoint = PoolEndpoint()
+
+
+    def makePool(self, start=True, **kw):
+        """
+        Make an L{amppool.AMPConnectionPool} connecting to C{self.endpoint}, and
+        stop it at the end of the test.
+        """
+        pool = amppool.AMPConnectionPool(
+            self.endpoint, protocol.Factory.forProtocol(amp.AMP),
+            retryPolicy=lambda attempt: 1.0, clock=self.clock, **kw)
+        if start:
+            pool.startService()
+        self.addCleanup(lambda: pool.running and pool.stopService())
+        return pool
+
+
+    def sent(self, client):
+        """
+        Return the boxes sent on a connection and forget them.
+        """
+        boxes = amp.parseString(client.transport.value())
+        client.transport.clear()
+        return boxes
+
+
+    def answer(self, client, box, cookie):
+        """
+        Answer a L{SimpleGreeting} box sent on a connection.
+        """
+        client.dataReceived(amp.AmpBox({
+            b'_answer': box[b'_ask'],
+            b'cookieplus': intToBytes(cookie)}).serialize())
+
+
+    def greet(self, pool, cookie):
+        """
+        Send a L{SimpleGreeting} on a pool and return a list which will hold
+        its result.
+        """
+        results = []
+        pool.callRemote(SimpleGreeting, greeting=u'hi', cookie=cookie
+                        ).addBoth(results.append)
+        return results
+
+
+    def test_interface(self):
+        """
+        L{amppool.AMPConnectionPool} provides L{amp.IBoxSender}.
+        """
+        self.assertTrue(verifyObject(amp.IBoxSender, self.makePool()))
+
+
+    def test_connections(self):
+        """
+        Once started, L{amppool.AMPConnectionPool} makes C{size} connections.
+        """
+        pool = self.makePool(start=False, size=3)
+        self.assertEqual(self.endpoint.protocols, [])
+        pool.startService()
+        self.assertEqual(len(self.endpoint.protocols), 3)
+
+
+    def test_leastOutstanding(self):
+        """
+        Each command is sent on the connection with the fewest commands
+        outstanding, and fires with the answer received on it.
+        """
+        pool = self.makePool(size=2)
+        first, second = self.endpoint.protocols
+        results = [self.greet(pool, i) for i in range(3)]
+        firstBoxes = self.sent(first)
+        secondBoxes = self.sent(second)
+        self.assertEqual([box[b'cookie'] for box in firstBoxes], [b'0', b'2'])
+        self.assertEqual([box[b'cookie'] for box in secondBoxes], [b'1'])
+
+        self.answer(first, firstBoxes[0], 1)
+        self.assertEqual(results, [[{'cookieplus': 1}], [], []])
+        self.greet(pool, 3)
+        self.greet(pool, 4)
+        self.assertEqual([box[b'cookie'] for box in self.sent(first)], [b'3'])
+        self.assertEqual([box[b'cookie'] for box in self.sent(second)],
+                         [b'4'])
+
+
+    def test_window(self):
+        """
+        No more than C{window} commands are outstanding on a connection; the
+        rest are sent, in order, as answers arrive.
+        """
+        pool = self.makePool(size=1, window=2)
+        [client] = self.endpoint.protocols
+        results = [self.greet(pool, i) for i in range(4)]
+        boxes = self.sent(client)
+        self.assertEqual([box[b'cookie'] for box in boxes], [b'0', b'1'])
+        self.answer(client, boxes[1], 2)
+        self.assertEqual(results, [[], [{'cookieplus': 2}], [], []])
+        boxes += self.sent(client)
+        self.assertEqual([box[b'cookie'] for box in boxes[2:]], [b'2'])
+        for box in boxes[::2]:
+            self.answer(client, box, 0)
+        self.assertEqual([box[b'cookie'] for box in self.sent(client)],
+                         [b'3'])
+
+
+    def test_noAnswer(self):
+        """
+        Commands which require no answer are not outstanding once they have
+        been sent, and the L{Deferred} for them fires with L{None}.
+        """
+        pool = self.makePool(size=1, window=1)
+        [client] = self.endpoint.protocols
+        results = []
+        for i in range(3):
+            pool.callRemoteString(b'noanswer', requiresAnswer=False,
+                                  n=intToBytes(i)).addCallback(results.append)
+        self.assertEqual(results, [None, None, None])
+        self.assertEqual([box[b'n'] for box in self.sent(client)],
+                         [b'0', b'1', b'2'])
+
+
+    def test_waitForConnection(self):
+        """
+        Commands sent before any connection is ready wait for one.
+        """
+        pool = self.makePool(start=False, size=1)
+        results = self.greet(pool, 1)
+        pool.startService()
+        [client] = self.endpoint.protocols
+        [box] = self.sent(client)
+        self.answer(client, box, 2)
+        self.assertEqual(results, [{'cookieplus': 2}])
+
+
+    def test_prepareConnection(self):
+        """
+        A connection is not used until the L{Deferred} returned by
+        C{prepareConnection} for it fires.
+        """
+        prepared = []
+
+        def prepareConnection(client):
+            prepared.append(defer.Deferred())
+            return prepared[-1]
+
+        pool = self.makePool(size=1, prepareConnection=prepareConnection)
+        [client] = self.endpoint.protocols
+        self.greet(pool, 1)
+        self.assertEqual(self.sent(client), [])
+        prepared[0].callback(None)
+        self.assertEqual(len(self.sent(client)), 1)
+
+
+    def test_reconnect(self):
+        """
+        When a connection is lost, the commands outstanding on it fail, and
+        later commands are sent on the connection which replaces it.
+        """
+        pool = self.makePool(size=1)
+        [client] = self.endpoint.protocols
+        results = self.greet(pool, 1)
+        client.connectionLost(Failure(error.ConnectionDone()))
+        results[0].trap(error.ConnectionDone)
+        results = self.greet(pool, 2)
+        self.clock.advance(1.0)
+        [client, replacement] = self.endpoint.protocols
+        [box] = self.sent(replacement)
+        self.answer(replacement, box, 3)
+        self.assertEqual(results, [{'cookieplus': 3}])
+
+
+    def test_cancelWaiting(self):
+        """
+        Cancelling the L{Deferred} for a command which is waiting to be sent
+        means it is never sent.
+        """
+        pool = self.makePool(size=1, window=1)
+        [client] = self.endpoint.protocols
+        self.greet(pool, 0)
+        d = pool.callRemote(SimpleGreeting, greeting=u'hi', cookie=1)
+        d.cancel()
+        self.failureResultOf(d, defer.CancelledError)
+        self.greet(pool, 2)
+        [box] = self.sent(client)
+        self.answer(client, box, 0)
+        self.assertEqual([box[b'cookie'] for box in self.sent(client)],
+                         [b'2'])
+
+
+    def test_stopService(self):
+        """
+        Commands still waiting to be sent when the pool is stopped fail with
+        L{defer.CancelledError}.
+        """
+        pool = self.makePool(start=False)
+        results = self.greet(pool, 1)
+        pool.stopService()
+        results[0].trap(defer.CancelledError)
+
+
+    def test_sendAfterStop(self):
+        """
+        Commands sent after the pool is stopped fail at once with
+        L{defer.CancelledError}, and are neither sent nor kept waiting.  Once
+        the pool is started again, commands are sent.
+        """
+        pool = self.makePool(size=1)
+        [client] = self.endpoint.protocols
+        transport = client.transport
+        pool.stopService()
+        self.failureResultOf(
+            pool.callRemote(SimpleGreeting, greeting=u'hi', cookie=1),
+            defer.CancelledError)
+        self.failureResultOf(
+            pool.callRemoteString(b'noanswer', requiresAnswer=False),
+            defer.CancelledError)
+        self.assertEqual(len(pool._waiting), 0)
+        self.assertEqual(transport.value(), b'')
+        pool.startService()
+        self.greet(pool, 2)
+        [box] = self.sent(self.endpoint.protocols[-1])
+        self.assertEqual(box[b'cookie'], b'2')
+
+
+    def test_sendBox(self):
+        """
+        L{amppool.AMPConnectionPool.sendBox} sends a box on a connection, or
+        raises L{error.ConnectionLost} if there is none.
+        """
+        pool = self.makePool(start=False, size=1)
+        box = amp.AmpBox(hello=b'world')
+        self.assertRaises(error.ConnectionLost, pool.sendBox, box)
+        pool.startService()
+        [client] = self.endpoint.protocols
+        pool.sendBox(box)
+        self.assertEqual(self.sent(client), [box])
@@ -12,12 +12,14 @@ import gc
 import functools
 import traceback
 import re
+import itertools
 
 from asyncio import new_event_loop, Future, CancelledError
 
 from twisted.python import failure, log
 from twisted.trial import unittest
 from twisted.internet import defer, reactor
+from twisted.internet import task
 from twisted.internet.task import Clock
 
 
@@ -1188,6 +1190,81 @@ class DeferredTests(unittest.SynchronousTestCase, ImmediateFailureMixin):
             "\nExpected match: %r\nGot: %r" % (pattern, warning['message']))
 
 
+    def test_attributes(self):
+        """
+        Attributes other than those of every L{Deferred} can be set on a
+        L{Deferred}, and it can be weakly referenced.
+        """
+        import weakref
+        d = defer.Deferred()
+        d.extra = 1
+        self.assertEqual(d.extra, 1)
+        self.assertIs(weakref.ref(d)(), d)
+
+
+    def test_addCallbackWhileRunningOnlyCallback(self):
+        """
+        A callback added by the only callback of a fired L{Deferred}, while it
+        runs, is run once it returns.
+        """
+        d = defer.succeed(1)
+        called = []
+        def first(result):
+            d.addCallback(second)
+            called.append(('first', result))
+            return result + 1
+        def second(result):
+            called.append(('second', result))
+        d.addCallback(first)
+        self.assertEqual(called, [('first', 1), ('second', 2)])
+        self.assertIsNone(self.successResultOf(d))
+
+
+    def test_pauseInOnlyCallback(self):
+        """
+        If the only callback of a fired L{Deferred} pauses it and adds another
+        callback, that callback is still run straight away, as callbacks
+        following one which pauses its L{Deferred} are.
+        """
+        d = defer.succeed(1)
+        called = []
+        def first(result):
+            d.pause()
+            d.addCallback(called.append)
+            return result + 1
+        d.addCallback(first)
+        self.assertEqual(called, [2])
+        d.unpause()
+
+
+    def test_onlyCallbackReturnsDeferred(self):
+        """
+        If the only callback of a fired L{Deferred} returns a L{Deferred}
+        without a result, the first L{Deferred} waits for it.
+        """
+        inner = defer.Deferred()
+        d = defer.succeed(1).addCallback(lambda result: inner)
+        self.assertIs(d._chainedTo, inner)
+        self.assertNoResult(d)
+        inner.callback(2)
+        self.assertIsNone(d._chainedTo)
+        self.assertEqual(self.successResultOf(d), 2)
+        self.assertIsNone(inner.result)
+
+
+    def test_onlyCallbackReturnsFiredDeferred(self):
+        """
+        If the only callback of a fired L{Deferred} returns a L{Deferred} with
+        a failure, the first L{Deferred} takes the failure and the second one
+        no longer reports it as unhandled.
+        """
+        inner = defer.fail(ZeroDivisionError())
+        d = defer.succeed(1).addCallback(lambda result: inner)
+        self.failureResultOf(d, ZeroDivisionError)
+        self.assertIsNone(inner.result)
+        self.assertIsNone(inner._debugInfo.failResult)
+
+
     def test_circularChainException(self):
         """
         If the deprecation warning for circular deferred callbacks is
@@ -2944,6 +3021,182 @@ class EnsureDeferredTests(unittest.TestCase):
 
 
 
+class ParallelTests(unittest.SynchronousTestCase):
+    """
+    Tests for L{defer.parallel}.
+    """
+
+    def setUp(self):
+        self.clock = Clock()
+        self.cooperator = task.Cooperator(
+            scheduler=lambda f: self.clock.callLater(0, f))
+        self.started = []
+
+
+    def pending(self, item):
+        """
+        Start working on an item, with a result which is not ready yet.
+        """
+        d = defer.Deferred()
+        self.started.append((item, d))
+        return d
+
+
+    def parallel(self, iterable, limit, fn, ordered=True):
+        """
+        Start a L{defer.parallel} map using a L{task.Cooperator} driven by
+        C{self.clock}, and run it as far as it can go.
+        """
+        results = defer.parallel(
+            iterable, limit, fn, ordered, cooperator=self.cooperator)
+        self.clock.advance(0)
+        return results
+
+
+    def test_ordered(self):
+        """
+        At most C{limit} items are worked on at once, and by default results
+        are retrieved in the order of their items.
+        """
+        results = self.parallel(range(5), 3, self.pending)
+        self.assertEqual([item for item, d in self.started], [0, 1, 2])
+        first, second = results.get(), results.get()
+        self.started[1][1].callback('b')
+        self.assertNoResult(first)
+        self.started[0][1].callback('a')
+        self.assertEqual(self.successResultOf(first), 'a')
+        self.assertEqual(self.successResultOf(second), 'b')
+        self.clock.advance(0)
+        self.assertEqual([item for item, d in self.started], [0, 1, 2, 3, 4])
+
+
+    def test_unordered(self):
+        """
+        If C{ordered} is C{False}, results are retrieved in the order they are
+        ready in.
+        """
+        results = self.parallel(range(3), 3, self.pending, ordered=False)
+        self.started[2][1].callback('c')
+        self.started[0][1].callback('a')
+        self.assertEqual(self.successResultOf(results.get()), 'c')
+        self.assertEqual(self.successResultOf(results.get()), 'a')
+        self.assertNoResult(results.get())
+
+
+    def test_lazy(self):
+        """
+        Items which have not been retrieved count towards the limit, so items
+        are only taken from the iterable as results are retrieved.
+        """
+        taken = []
+        def items():
+            for i in itertools.count():
+                taken.append(i)
+                yield i
+        results = self.parallel(items(), 2, lambda item: item * 2)
+        self.assertEqual(taken, [0, 1])
+        self.assertEqual(self.successResultOf(results.get()), 0)
+        self.clock.advance(0)
+        self.assertEqual(taken, [0, 1, 2])
+        self.assertEqual(self.successResultOf(results.get()), 2)
+        self.assertEqual(self.successResultOf(results.get()), 4)
+
+
+    def test_failure(self):
+        """
+        If the function fails for an item, retrieving its result fails, and
+        the other items are not affected.
+        """
+        def fn(item):
+            if item == 1:
+                raise ZeroDivisionError()
+            return item
+        results = self.parallel(range(3), 3, fn)
+        self.assertEqual(self.successResultOf(results.get()), 0)
+        self.failureResultOf(results.get(), ZeroDivisionError)
+        self.assertEqual(self.successResultOf(results.get()), 2)
+
+
+    def test_exhausted(self):
+        """
+        Once every result has been retrieved, L{defer.ParallelResults.get}
+        fails with L{defer.ParallelExhausted}, including when it was called
+        before the last item was taken from the iterable.
+        """
+        results = self.parallel(range(1), 1, self.pending)
+        first, second = results.get(), results.get()
+        self.started[0][1].callback('a')
+        self.assertEqual(self.successResultOf(first), 'a')
+        self.assertNoResult(second)
+        self.clock.advance(0)
+        self.failureResultOf(second, defer.ParallelExhausted)
+        self.failureResultOf(results.get(), defer.ParallelExhausted)
+
+
+    def test_iterableFailure(self):
+        """
+        If taking an item from the iterable fails, retrieving a result fails
+        with that failure once the results of the items before it have been
+        retrieved, and then with L{defer.ParallelExhausted}.
+        """
+        def items():
+            yield 1
+            raise ZeroDivisionError()
+        results = self.parallel(items(), 2, self.pending)
+        failed = results.get().addCallback(lambda ignored: results.get())
+        self.assertNoResult(failed)
+        self.started[0][1].callback('a')
+        self.failureResultOf(failed, ZeroDivisionError)
+        self.failureResultOf(results.get(), defer.ParallelExhausted)
+
+
+    def test_cancel(self):
+        """
+        L{defer.ParallelResults.cancel} cancels the items being worked on,
+        stops taking items from the iterable, and makes retrieving results
+        fail with L{defer.CancelledError}.
+        """
+        cancelled = []
+        def fn(item):
+            self.started.append(item)
+            return defer.Deferred(lambda d: cancelled.append(item))
+        results = self.parallel(range(5), 2, fn)
+        waiting = results.get()
+        results.cancel()
+        self.assertEqual(cancelled, [0, 1])
+        self.failureResultOf(waiting, defer.CancelledError)
+        self.clock.advance(0)
+        self.assertEqual(self.started, [0, 1])
+        self.failureResultOf(results.get(), defer.CancelledError)
+
+
+    def test_cancelGet(self):
+        """
+        Cancelling a L{Deferred} returned by L{defer.ParallelResults.get}
+        leaves its result to the next one.
+        """
+        results = self.parallel(range(1), 1, self.pending)
+        cancelled = results.get()
+        cancelled.cancel()
+        self.failureResultOf(cancelled, defer.CancelledError)
+        waiting = results.get()
+        self.started[0][1].callback('a')
+        self.assertEqual(self.successResultOf(waiting), 'a')
+
+
+    def test_globalCooperator(self):
+        """
+        Without a cooperator, L{defer.parallel} uses the global one.
+        """
+        cooperated = []
+        self.patch(task, "cooperate",
+                   lambda iterator: cooperated.append(iterator) or
+                   self.cooperator.cooperate(iterator))
+        defer.parallel(range(1), 1, self.pending)
+        self.assertEqual(len(cooperated), 1)
+
+
+
 class TimeoutErrorTests(unittest.TestCase, ImmediateFailureMixin):
     """
     L{twisted.internet.defer} timeout code.
@@ -566,6 +566,149 @@ class FailureTests(SynchronousTestCase):
 
 
 
+class LazyFramesTests(SynchronousTestCase):
+    """
+    Tests for the C{frames} and C{stack} of a L{failure.Failure} created
+    without C{captureVars}, which are only built when first used.
+    """
+
+    def test_framesBuiltOnFirstUse(self):
+        """
+        C{frames} is not built when the L{failure.Failure} is created, and
+        when it is, it is the same as the one built eagerly with
+        C{captureVars=True}, without the variables.
+        """
+        try:
+            1/0
+        except ZeroDivisionError:
+            lazy = failure.Failure()
+            eager = failure.Failure(captureVars=True)
+        self.assertNotIn('frames', lazy.__dict__)
+        self.assertNotIn('stack', lazy.__dict__)
+        self.assertEqual(
+            lazy.frames, [(n, f, l, (), ()) for n, f, l, _, _ in eager.frames])
+        self.assertEqual(
+            lazy.stack, [(n, f, l, (), ()) for n, f, l, _, _ in eager.stack])
+        self.assertIn('frames', lazy.__dict__)
+
+
+    def test_stackLinesRecordedOnCreation(self):
+        """
+        The line numbers in C{stack} are those the frames were at when the
+        L{failure.Failure} was created, even though they have moved on since.
+        """
+        f = getDivisionFailure()
+        line = sys._getframe().f_lineno - 1
+        code = self.test_stackLinesRecordedOnCreation.__code__
+        self.assertEqual(
+            f.stack[-1][:3],
+            (code.co_name, code.co_filename, line))
+
+
+    def test_framesAssignable(self):
+        """
+        C{frames} can be replaced without ever being built, and the value
+        assigned replaces the frames which would have been built from the
+        traceback once the L{failure.Failure} lets go of it.
+        """
+        f = getDivisionFailure()
+        f.frames = []
+        self.assertEqual(f.frames, [])
+        f.cleanFailure()
+        self.assertEqual(f.frames, [])
+        self.assertIsNone(f.getTracebackObject())
+        self.assertIn("(failure with no frames)", f.getBriefTraceback())
+
+
+    def test_cleanFailure(self):
+        """
+        L{failure.Failure.cleanFailure} lets go of the traceback without
+        building C{frames}, which is then built in the same format
+        L{failure.Failure.__getstate__} uses.
+        """
+        f = getDivisionFailure()
+        expectedFrames = [[n, fn, l, [], []] for n, fn, l, _, _ in f.frames]
+        expectedStack = [[n, fn, l, [], []] for n, fn, l, _, _ in f.stack]
+        f = getDivisionFailure()
+        f.cleanFailure()
+        self.assertIsNone(f.tb)
+        self.assertTrue(f.pickled)
+        self.assertNotIn('frames', f.__dict__)
+        self.assertEqual(f.frames, expectedFrames)
+        # The last frame of the stack is the line of this method calling
+        # getDivisionFailure, which is different for each failure.
+        self.assertEqual(f.stack[:-1], expectedStack[:-1])
+        self.assertEqual(len(f.stack), len(expectedStack))
+
+
+    def test_getStateBuildsFrames(self):
+        """
+        L{failure.Failure.__getstate__} of a L{failure.Failure} with a
+        traceback or one cleaned without building its frames contains
+        C{frames} and C{stack} but not what they were built from.
+        """
+        f = getDivisionFailure()
+        frames = [[n, fn, l, [], []] for n, fn, l, _, _ in f.frames]
+        for cleanFailure in [False, True]:
+            f = getDivisionFailure()
+            if cleanFailure:
+                f.cleanFailure()
+            state = f.__getstate__()
+            self.assertEqual(state['frames'], frames)
+            self.assertEqual(len(state['stack']), len(f.stack))
+            self.assertIsNone(state['tb'])
+            self.assertEqual(
+                [key for key in state if key.startswith('_')], [])
+
+
+
+class WithoutTracebackTests(SynchronousTestCase):
+    """
+    Tests for L{failure.Failure.withoutTraceback}.
+    """
+
+    def test_noTraceback(self):
+        """
+        A L{failure.Failure} created by
+        L{failure.Failure.withoutTraceback} has no traceback, frames or
+        stack, even when created while the exception is being handled.
+        """
+        try:
+            1/0
+        except ZeroDivisionError as e:
+            f = failure.Failure.withoutTraceback(e)
+        self.assertIs(f.type, ZeroDivisionError)
+        self.assertIsNone(f.tb)
+        self.assertEqual((f.frames, f.stack), ([], []))
+        self.assertIsNone(f.getTracebackObject())
+        self.assertEqual(
+            f.getTraceback(),
+            'Traceback (most recent call last):\nFailure: %s: '
+            'division by zero\n' % (reflect.qual(ZeroDivisionError),))
+
+
+    def test_check(self):
+        """
+        A L{failure.Failure} created by
+        L{failure.Failure.withoutTraceback} can be checked and trapped.
+        """
+        f = failure.Failure.withoutTraceback(ZeroDivisionError())
+        self.assertIs(f.check(ArithmeticError), ArithmeticError)
+        self.assertIs(f.trap(ZeroDivisionError), ZeroDivisionError)
+        self.assertRaises(ZeroDivisionError, f.trap, KeyError)
+
+
+    def test_count(self):
+        """
+        Every L{failure.Failure} created by
+        L{failure.Failure.withoutTraceback} gets a new C{count}.
+        """
+        first = failure.Failure.withoutTraceback(ValueError())
+        second = failure.Failure.withoutTraceback(ValueError())
+        self.assertEqual(second.count, first.count + 1)
+
+
+
 class BrokenStr(Exception):
     """
     An exception class the instances of which cannot be presented as strings via
@@ -5,7 +5,9 @@ from __future__ import division, absolute_import
 
 import contextlib
 import errno
+import gzip
 import os
+import signal
 import stat
 import time
 
@@ -362,6 +364,217 @@ class LogFileTests(unittest.TestCase):
 
 
 
+class ReopenOnSignalTests(unittest.TestCase):
+    """
+    Tests for L{logfile.BaseLogFile.reopenOnSignal}.
+    """
+    if getattr(signal, "SIGHUP", None) is None:
+        skip = "SIGHUP is not available"
+    elif runtime.platform.isWindows():
+        skip = "Can't test reopen on Windows"
+
+    def test_reopenOnSignal(self):
+        """
+        After C{SIGHUP} arrives, the log file is reopened before the next
+        write, and the previous handler is called.
+        """
+        received = []
+        self.addCleanup(signal.signal, signal.SIGHUP,
+                        signal.getsignal(signal.SIGHUP))
+        signal.signal(signal.SIGHUP, lambda *args: received.append(args[0]))
+
+        directory = self.mktemp()
+        os.makedirs(directory)
+        path = os.path.join(directory, "test.log")
+        with contextlib.closing(logfile.LogFile("test.log", directory)) as log:
+            log.reopenOnSignal()
+            log.write("hello1")
+            os.rename(path, path + ".moved")
+            os.kill(os.getpid(), signal.SIGHUP)
+            log.write("hello2")
+
+        self.assertEqual(received, [signal.SIGHUP])
+        with open(path) as f:
+            self.assertEqual(f.read(), "hello2")
+        with open(path + ".moved") as f:
+            self.assertEqual(f.read(), "hello1")
+
+
+
+class RiggedTimestampedLogFile(logfile.TimestampedLogFile):
+    """
+    L{logfile.TimestampedLogFile} with a fake clock, which does its
+    maintenance straight away.
+    """
+    now = 1000000000.0
+
+    def _clock(self):
+        self.now += 1
+        return self.now
+
+
+    def _runInBackground(self, f):
+        f()
+
+
+
+class TimestampedLogFileTests(unittest.TestCase):
+    """
+    Tests for L{logfile.TimestampedLogFile}.
+    """
+    def setUp(self):
+        self.dir = self.mktemp()
+        os.makedirs(self.dir)
+        self.name = "test.log"
+        self.path = os.path.join(self.dir, self.name)
+
+
+    def makeLog(self, **kwargs):
+        """
+        Make a L{RiggedTimestampedLogFile} which is closed at the end of the
+        test.
+        """
+        log = RiggedTimestampedLogFile(self.name, self.dir, **kwargs)
+        self.addCleanup(log.close)
+        return log
+
+
+    def read(self, log, identifier):
+        """
+        Read an old log file.
+        """
+        reader = log.getLog(identifier)
+        try:
+            return "".join(reader.readLines(100))
+        finally:
+            reader.close()
+
+
+    def test_rotation(self):
+        """
+        Rotating renames the log file with the time as a suffix, and
+        compresses it.
+        """
+        log = self.makeLog(rotateLength=10)
+        log.write("123456789")
+        log.write("abcdefghij")
+        log.write("x")
+        log.flush()
+        self.assertEqual(
+            log.listLogs(), ["20010909-014641-000000"])
+        self.assertEqual(
+            sorted(os.listdir(self.dir)),
+            ["test.log", "test.log.20010909-014641-000000.gz"])
+        self.assertEqual(
+            self.read(log, "20010909-014641-000000"), "123456789abcdefghij")
+        with open(self.path) as f:
+            self.assertEqual(f.read(), "x")
+
+
+    def test_renamesOnlyCurrent(self):
+        """
+        Rotating leaves the other rotated log files alone.
+        """
+        log = self.makeLog(rotateLength=1, compress=False)
+        for data in "abc":
+            log.write(data)
+        log.write("d")
+        logs = log.listLogs()
+        self.assertEqual(len(logs), 3)
+        self.assertEqual(
+            [self.read(log, identifier) for identifier in logs],
+            ["a", "b", "c"])
+        with open("%s.%s" % (self.path, logs[0])) as f:
+            self.assertEqual(f.read(), "a")
+
+
+    def test_maxRotatedFiles(self):
+        """
+        Only the newest C{maxRotatedFiles} rotated log files are kept.
+        """
+        log = self.makeLog(rotateLength=1, maxRotatedFiles=2)
+        for data in "abcd":
+            log.write(data)
+        log.write("e")
+        self.assertEqual(
+            [self.read(log, identifier) for identifier in log.listLogs()],
+            ["c", "d"])
+
+
+    def test_maxRotatedBytes(self):
+        """
+        Only the newest rotated log files taking at most C{maxRotatedBytes}
+        are kept.
+        """
+        log = self.makeLog(rotateLength=100, maxRotatedBytes=250,
+                           compress=False)
+        for data in "abcd":
+            log.write(data * 100)
+        log.write("e")
+        self.assertEqual(
+            [self.read(log, identifier)[0] for identifier in log.listLogs()],
+            ["c", "d"])
+
+
+    def test_compressFailure(self):
+        """
+        A rotated log file which cannot be compressed is kept as it is.
+        """
+        log = self.makeLog(rotateLength=1)
+        def fail(*args):
+            raise IOError(errno.ENOSPC, "No space left on device")
+        self.patch(gzip, "open", fail)
+        log.write("a")
+        log.write("b")
+        identifier, = log.listLogs()
+        with open("%s.%s" % (self.path, identifier)) as f:
+            self.assertEqual(f.read(), "a")
+
+
+    def test_maintain(self):
+        """
+        L{logfile.TimestampedLogFile.maintain} compresses rotated log files
+        left uncompressed, and removes the oldest beyond the limits.
+        """
+        for identifier in ["20200101-000000-000000",
+                           "20200102-000000-000000",
+                           "20200103-000000-000000"]:
+            with open("%s.%s" % (self.path, identifier), "w") as f:
+                f.write(identifier)
+        with open(self.path + ".other", "w") as f:
+            f.write("other")
+        log = self.makeLog(maxRotatedFiles=2)
+        log.maintain()
+        self.assertEqual(sorted(os.listdir(self.dir)), [
+            "test.log", "test.log.20200102-000000-000000.gz",
+            "test.log.20200103-000000-000000.gz", "test.log.other"])
+        self.assertEqual(self.read(log, "20200103-000000-000000"),
+                         "20200103-000000-000000")
+
+
+    def test_getLogMissing(self):
+        """
+        L{logfile.TimestampedLogFile.getLog} raises L{ValueError} for an
+        unknown identifier.
+        """
+        log = self.makeLog()
+        self.assertRaises(ValueError, log.getLog, "20200101-000000-000000")
+
+
+    def test_background(self):
+        """
+        L{logfile.TimestampedLogFile} does its maintenance in another thread.
+        """
+        log = logfile.TimestampedLogFile(self.name, self.dir, rotateLength=1)
+        self.addCleanup(log.close)
+        threads = []
+        log._runInBackground = threads.append
+        log.write("a")
+        log.write("b")
+        self.assertEqual(threads, [log.maintain])
+
+
+
 class RiggedDailyLogFile(logfile.DailyLogFile):
     _clock = 0.0
 
@@ -732,3 +732,197 @@ class MemoryBackedTests(unittest.SynchronousTestCase):
         helper.threadpool.start()
         helper.performAllCoordination()
         self.assertEqual(len(helper.workers), helper.threadpool.max)
+
+
+
+class AdaptiveTests(unittest.SynchronousTestCase):
+    """
+    Tests for adaptive threadpools and for L{threadpool.ThreadPool.statistics},
+    using L{PoolHelper} and a fake clock.
+    """
+
+    def setUp(self):
+        self.now = 0.0
+        self.helper = PoolHelper(self, 0, 3, 'adaptive', adaptive=True)
+        self.pool = self.helper.threadpool
+        self.pool._clock = lambda: self.now
+        self.pool.start()
+        self.addCleanup(self.pool.stop)
+
+
+    def runWorkers(self):
+        """
+        Run all the work given to the workers of the pool so far, and all the
+        coordination that leads to.
+        """
+        self.helper.performAllCoordination()
+        while any([perform() for worker, perform in self.helper.workers]):
+            self.helper.performAllCoordination()
+
+
+    def test_startsWithOneThread(self):
+        """
+        An adaptive threadpool with a minimum of 0 threads lets work wait for
+        a single thread rather than starting one for each work item.
+        """
+        for i in range(3):
+            self.pool.callInThread(lambda: None)
+        self.helper.performAllCoordination()
+        self.assertEqual(len(self.helper.workers), 1)
+        statistics = self.pool.statistics()
+        self.assertEqual(statistics.threadLimit, 1)
+        self.assertEqual(statistics.busyWorkerCount, 1)
+        self.assertEqual(statistics.backloggedWorkCount, 2)
+
+
+    def test_growsWhenWorkWaits(self):
+        """
+        When work waits for a thread for longer than
+        L{threadpool.ThreadPool.targetWaitTime}, an adaptive threadpool allows
+        another thread, up to L{threadpool.ThreadPool.max}.
+        """
+        for i in range(6):
+            self.pool.callInThread(lambda: None)
+        self.now += 1
+        self.runWorkers()
+        self.assertEqual(len(self.helper.workers), 3)
+        self.assertEqual(self.pool.statistics().threadLimit, 3)
+
+
+    def test_growsWhenThreadsAreStuck(self):
+        """
+        When every thread is busy and the oldest work waiting for one has
+        waited for longer than L{threadpool.ThreadPool.targetWaitTime} when
+        more work is given to an adaptive threadpool, it allows another
+        thread, even though no work has started to show how long it waited.
+        """
+        self.pool.callInThread(lambda: None)
+        self.pool.callInThread(lambda: None)
+        self.helper.performAllCoordination()
+        self.assertEqual(len(self.helper.workers), 1)
+        self.now += 1
+        self.pool.callInThread(lambda: None)
+        self.helper.performAllCoordination()
+        self.assertEqual(len(self.helper.workers), 2)
+        self.assertEqual(self.pool.statistics().threadLimit, 2)
+
+
+    def test_doesNotGrowWhenWorkIsQuick(self):
+        """
+        An adaptive threadpool does not allow another thread when work does
+        not wait for long.
+        """
+        for i in range(6):
+            self.pool.callInThread(lambda: None)
+        self.now += self.pool.targetWaitTime / 2
+        self.runWorkers()
+        self.assertEqual(len(self.helper.workers), 1)
+        self.assertEqual(self.pool.statistics().threadLimit, 1)
+
+
+    def test_shrinksWhenWorkStopsWaiting(self):
+        """
+        When no work has waited for longer than
+        L{threadpool.ThreadPool.targetWaitTime} for
+        L{threadpool.ThreadPool.shrinkDelay} seconds, an adaptive threadpool
+        allows one thread less, down to L{threadpool.ThreadPool.min}.
+        """
+        for i in range(6):
+            self.pool.callInThread(lambda: None)
+        self.now += 1
+        self.runWorkers()
+        self.assertEqual(self.pool.statistics().threadLimit, 3)
+
+        self.now += self.pool.shrinkDelay + 1
+        self.pool.callInThread(lambda: None)
+        self.runWorkers()
+        statistics = self.pool.statistics()
+        self.assertEqual(statistics.threadLimit, 2)
+        self.assertEqual(
+            statistics.idleWorkerCount + statistics.busyWorkerCount, 2)
+
+        self.now += self.pool.shrinkDelay + 1
+        self.pool.callInThread(lambda: None)
+        self.runWorkers()
+        self.now += self.pool.shrinkDelay + 1
+        self.pool.callInThread(lambda: None)
+        self.runWorkers()
+        self.assertEqual(self.pool.statistics().threadLimit, 1)
+
+
+    def test_adjustPoolsize(self):
+        """
+        L{threadpool.ThreadPool.adjustPoolsize} resets the number of threads
+        an adaptive threadpool allows to its new minimum.
+        """
+        for i in range(6):
+            self.pool.callInThread(lambda: None)
+        self.now += 1
+        self.runWorkers()
+        self.pool.adjustPoolsize(2, 5)
+        self.runWorkers()
+        statistics = self.pool.statistics()
+        self.assertEqual(statistics.threadLimit, 2)
+        self.assertEqual(
+            statistics.idleWorkerCount + statistics.busyWorkerCount, 2)
+
+
+    def test_statistics(self):
+        """
+        L{threadpool.ThreadPool.statistics} reports how many work items have
+        been run, how long they waited for a thread and how long they took.
+        """
+        def work():
+            self.now += 2
+
+        self.pool.callInThread(work)
+        self.pool.callInThread(work)
+        self.now += 1
+        self.runWorkers()
+        statistics = self.pool.statistics()
+        self.assertEqual(statistics.name, 'adaptive')
+        self.assertEqual(statistics.completedWorkCount, 2)
+        # The second item waited for the first, if it had no thread of its
+        # own.
+        self.assertIn(statistics.totalWaitTime, (2.0, 4.0))
+        self.assertEqual(statistics.maxWaitTime, statistics.totalWaitTime - 1)
+        self.assertTrue(0 < statistics.recentWaitTime < 3)
+        self.assertEqual(statistics.totalExecutionTime, 4.0)
+        self.assertEqual(statistics.maxExecutionTime, 2.0)
+        self.assertEqual(
+            statistics.idleWorkerCount, len(self.helper.workers))
+        self.assertEqual(statistics.busyWorkerCount, 0)
+        self.assertEqual(statistics.backloggedWorkCount, 0)
+
+
+    def test_statisticsNotAdaptive(self):
+        """
+        The thread limit reported for a threadpool which is not adaptive is
+        its maximum, and it does not time the work it runs.
+        """
+        helper = PoolHelper(self, 2, 7)
+        pool = helper.threadpool
+        pool._clock = lambda: self.fail("The clock was read.")
+        pool.start()
+        self.addCleanup(pool.stop)
+        pool.callInThread(lambda: None)
+        helper.performAllCoordination()
+        for worker, perform in helper.workers:
+            perform()
+        statistics = pool.statistics()
+        self.assertEqual(statistics.threadLimit, 7)
+        self.assertEqual(statistics.completedWorkCount, 0)
+        self.assertEqual(statistics.totalExecutionTime, 0.0)
+
+
+    def test_persistence(self):
+        """
+        Pickling and unpickling an adaptive threadpool preserves
+        L{threadpool.ThreadPool.adaptive}.
+        """
+        copy = pickle.loads(pickle.dumps(threadpool.ThreadPool(
+            1, 4, adaptive=True)))
+        self.assertTrue(copy.adaptive)
+        self.assertEqual((copy.min, copy.max), (1, 4))
+        copy = pickle.loads(pickle.dumps(threadpool.ThreadPool(1, 4)))
+        self.assertFalse(copy.adaptive)
@@ -6,7 +6,7 @@ from __future__ import division, absolute_import
 
 from zope.interface import implementer
 
-from twisted.web.iweb import IRenderable
+from twisted.web.iweb import IRenderable, _IPrecompiledTemplateLoader
 from twisted.web.error import MissingRenderMethod, UnexposedMethodError
 from twisted.web.error import MissingTemplateLoader
 
@@ -182,4 +182,6 @@ class Element(object):
         loader = self.loader
         if loader is None:
             raise MissingTemplateLoader(self)
+        if _IPrecompiledTemplateLoader.providedBy(loader):
+            return loader.loadPrecompiled()
         return loader.load()
@@ -27,6 +27,10 @@ from twisted.web._stan import Tag, slot, voidElements, Comment, CDATA, CharRef
 from twisted.web.error import UnfilledSlot, UnsupportedType, FlattenerError
 from twisted.web.iweb import IRenderable
 
+# The amount of output the flattener accumulates before passing it on to its
+# C{write} callable.
+BUFFER_SIZE = 2 ** 16
+
 
 
 def escapeForContent(data):
@@ -229,6 +233,9 @@ def _flattenElement(request, root, write, slotData, renderFactory,
         write(b'-->')
     elif isinstance(root, Tag):
         slotData.append(root.slotData)
+        if root._compiled is not None:
+            write(root._compiled)
+            return
         if root.render is not None:
             rendererName = root.render
             rootClone = root.clone(False)
@@ -339,40 +346,176 @@ def _flattenTree(request, root, write):
                 stack.append(element)
 
 
-def _writeFlattenedData(state, write, result):
+class _BufferedWriter(object):
+    """
+    Accumulate the output of the flattener, so that a few large writes rather
+    than many tiny ones are made.
+
+    @ivar _write: The callable to which output is eventually passed.
+
+    @ivar _bufferSize: The amount of output to accumulate before passing it on.
+
+    @ivar _buffer: The output not yet passed on.
+    @type _buffer: L{list} of L{bytes}
+
+    @ivar _size: The total length of C{_buffer}.
+    """
+
+    def __init__(self, write, bufferSize):
+        self._write = write
+        self._bufferSize = bufferSize
+        self._buffer = []
+        self._size = 0
+
+
+    def write(self, data):
+        """
+        Buffer some output, passing the buffer on if it has grown large enough.
+
+        @type data: L{bytes}
+        """
+        self._buffer.append(data)
+        self._size += len(data)
+        if self._size >= self._bufferSize:
+            self.flush()
+
+
+    def flush(self):
+        """
+        Pass on all the buffered output, if any.
+        """
+        if self._buffer:
+            data = b''.join(self._buffer)
+            self._buffer = []
+            self._size = 0
+            self._write(data)
+
+
+
+def _writeFlattenedData(state, flush, result):
     """
-    Take strings from an iterator and pass them to a writer function.
+    Iterate the output of the flattener, waiting on the L{Deferred}s it
+    produces.
 
-    @param state: An iterator of L{str} and L{Deferred}.  L{str} instances will
-        be passed to C{write}.  L{Deferred} instances will be waited on before
-        resuming iteration of C{state}.
+    @param state: An iterator of L{Deferred}s; see L{_flattenTree}.  Iteration
+        is resumed once each L{Deferred} fires.
 
-    @param write: A callable which will be invoked with each L{str}
-        produced by iterating C{state}.
+    @param flush: A callable invoked with no arguments to pass on buffered
+        output before waiting on a L{Deferred} and once C{state} is exhausted
+        or fails.
 
     @param result: A L{Deferred} which will be called back when C{state} has
-        been completely flattened into C{write} or which will be errbacked if
-        an exception in a generator passed to C{state} or an errback from a
-        L{Deferred} from state occurs.
+        been completely flattened or which will be errbacked if an exception
+        in a generator passed to C{state} or an errback from a L{Deferred} from
+        state occurs.
 
     @return: L{None}
     """
     while True:
         try:
             element = next(state)
+            flush()
         except StopIteration:
-            result.callback(None)
+            try:
+                flush()
+            except:
+                result.errback()
+            else:
+                result.callback(None)
         except:
+            try:
+                flush()
+            except:
+                pass
             result.errback()
         else:
             def cby(original):
-                _writeFlattenedData(state, write, result)
+                _writeFlattenedData(state, flush, result)
                 return original
             element.addCallbacks(cby, result.errback)
         break
 
 
 
+def _compile(root):
+    """
+    Flatten a tree without any L{slot}s, renderers, L{Deferred}s or other
+    dynamic content.
+
+    @return: The flattened tree.
+    @rtype: L{bytes}
+    """
+    output = []
+    for element in _flattenTree(None, root, output.append):
+        raise UnsupportedType(element)
+    return b''.join(output)
+
+
+
+def _findStatic(root, found):
+    """
+    Find the largest subtrees of C{root} which are L{Tag}s made only of
+    markup and text, so always flatten to the same bytes.
+
+    @param root: A loaded template, or part of one.
+
+    @param found: A L{list} to which such L{Tag}s are appended.
+
+    @return: Whether C{root} itself always flattens to the same bytes.
+    @rtype: L{bool}
+    """
+    if isinstance(root, (bytes, unicode, CDATA, Comment, CharRef)):
+        return True
+    if isinstance(root, (list, tuple)):
+        children = []
+        static = True
+        for element in root:
+            if not _findStatic(element, children):
+                static = False
+        found.extend(children)
+        return static
+    if isinstance(root, Tag):
+        children = []
+        static = _findStatic(root.children, children)
+        for value in root.attributes.values():
+            if not _findStatic(value, children):
+                static = False
+        if static and root.render is None:
+            found.append(root)
+            return True
+        found.extend(children)
+    return False
+
+
+
+def _precompile(document):
+    """
+    Flatten the static parts of a loaded template once, ahead of time, so that
+    only its L{slot}s, renderers and other dynamic content are walked each time
+    it is flattened.
+
+    The flattened markup is kept by each of the largest L{Tag}s with no dynamic
+    content in C{document}, and written out as is when they are flattened, so
+    C{document} must not be changed afterwards; pass a copy of any document
+    which its owner may still change.
+
+    @param document: The loaded template.
+    @type document: L{list}
+
+    @return: C{document}
+    """
+    found = []
+    _findStatic(document, found)
+    for tag in found:
+        try:
+            tag._compiled = _compile(tag)
+        except FlattenerError:
+            # Leave it to be reported when the template is rendered.
+            pass
+    return document
+
+
+
 def flatten(request, root, write):
     """
     Incrementally write out a string representation of C{root} using C{write}.
@@ -381,6 +524,9 @@ def flatten(request, root, write):
     simpler objects which will themselves be decomposed and so on until strings
     or objects which can easily be converted to strings are encountered.
 
+    Output is accumulated and passed to C{write} once L{BUFFER_SIZE} bytes are
+    available, before waiting for a L{Deferred} to fire, and at the end.
+
     @param request: A request object which will be passed to the C{render}
         method of any L{IRenderable} provider which is encountered.
 
@@ -397,8 +543,9 @@ def flatten(request, root, write):
         unexpected exception occurs.
     """
     result = Deferred()
-    state = _flattenTree(request, root, write)
-    _writeFlattenedData(state, write, result)
+    writer = _BufferedWriter(write, BUFFER_SIZE)
+    state = _flattenTree(request, root, writer.write)
+    _writeFlattenedData(state, writer.flush, result)
     return result
 
 
@@ -0,0 +1,796 @@
+# -*- test-case-name: twisted.web.test.test_http2client -*-
+# Copyright (c) Twisted Matrix Laboratories.
+# See LICENSE for details.
+
+"""
+HTTP2 Client Implementation
+
+This is the client-side counterpart of L{twisted.web._http2}: an
+L{H2ClientProtocol} sends each request as its own stream, so that many
+requests can be outstanding at once over a single connection.  It is used by
+L{twisted.web.client.HTTPConnectionPool} for HTTPS connections which
+negotiate C{h2} using ALPN.
+
+This API is currently considered private because it's in early draft form. When
+it has stabilised, it'll be made public.
+"""
+
+from __future__ import absolute_import, division
+
+from collections import deque
+
+from zope.interface import implementer
+
+import h2.config
+import h2.connection
+import h2.errors
+import h2.events
+import h2.exceptions
+import h2.settings
+
+from twisted.internet.defer import Deferred, fail, succeed
+from twisted.internet.error import ConnectionAborted, ConnectionLost
+from twisted.internet.interfaces import IConsumer, IPushProducer
+from twisted.internet.protocol import Protocol
+from twisted.logger import Logger
+from twisted.python.compat import intToBytes
+from twisted.python.failure import Failure
+from twisted.web.http import RESPONSES
+from twisted.web.http_headers import Headers
+from twisted.web.iweb import UNKNOWN_LENGTH
+from twisted.web._newclient import (
+    BadHeaders, RequestGenerationFailed, RequestNotSent, Response,
+    ResponseFailed, ResponseNeverReceived)
+
+
+# This API is currently considered private.
+__all__ = []
+
+
+
+# Headers which are specific to an HTTP/1.1 connection and must not be sent
+# over HTTP/2; see RFC 7540, section 8.1.2.2.  The Host header becomes the
+# :authority pseudo-header instead.
+_CONNECTION_HEADERS = frozenset([
+    b'connection', b'host', b'keep-alive', b'proxy-connection', b'te',
+    b'transfer-encoding', b'upgrade',
+])
+
+
+
+def _requestHeaders(request, scheme):
+    """
+    Convert the headers of a request to an HTTP/2 header block.
+
+    @param request: The request to convert.
+    @type request: L{twisted.web._newclient.Request}
+
+    @param scheme: The value of the C{:scheme} pseudo-header.
+    @type scheme: L{bytes}
+
+    @raise BadHeaders: If the request does not have exactly one I{Host}
+        header.
+
+    @return: The header block, pseudo-headers first.
+    @rtype: L{list} of L{tuple} of two L{bytes}
+    """
+    hosts = request.headers.getRawHeaders(b'host', ())
+    if len(hosts) != 1:
+        raise BadHeaders(u"Exactly one Host header required")
+    headers = [
+        (b':method', request.method),
+        (b':scheme', scheme),
+        (b':authority', hosts[0]),
+        (b':path', request.uri),
+    ]
+    for name, values in request.headers.getAllRawHeaders():
+        name = name.lower()
+        if name in _CONNECTION_HEADERS:
+            continue
+        headers.extend((name, value) for value in values)
+    if request.bodyProducer is not None:
+        length = request.bodyProducer.length
+        if length is not UNKNOWN_LENGTH:
+            headers.append((b'content-length', intToBytes(length)))
+    return headers
+
+
+
+@implementer(IConsumer, IPushProducer)
+class _H2ClientStream(object):
+    """
+    A single request and its response, exchanged over one stream of an
+    L{H2ClientProtocol}.
+
+    The stream is the L{IConsumer} to which the request body producer writes.
+    Data is only sent as the HTTP/2 flow control windows allow; the rest is
+    buffered, and the body producer is paused until the server opens the
+    windows again.
+
+    The stream is also the transport of the L{Response}, for which it is an
+    L{IPushProducer}.  While it is paused, received body data is buffered and
+    not acknowledged, so the server stops sending once the flow control
+    window for the stream is used up.
+
+    @ivar streamID: The ID of the stream.
+    @type streamID: L{int}
+
+    @ivar request: The request being sent.
+    @type request: L{twisted.web._newclient.Request}
+
+    @ivar finished: A L{Deferred} which fires with the L{Response}, or fails
+        if none is received.
+
+    @ivar response: The L{Response}, once its headers have been received.
+
+    @ivar _protocol: The connection the stream belongs to.
+    @type _protocol: L{H2ClientProtocol}
+
+    @ivar _outbound: Request body data which could not be sent yet.
+    @type _outbound: L{collections.deque} of L{bytes}
+
+    @ivar _sending: Whether request body data may still be sent.
+
+    @ivar _endAfterOutbound: Whether to end the stream once C{_outbound} has
+        been sent, because the body producer has finished.
+
+    @ivar _producerPaused: Whether the body producer has been paused because
+        of flow control.
+
+    @ivar _paused: Whether the response body consumer has paused the stream.
+
+    @ivar _inbound: Pairs of response body data received while paused and
+        the amount of flow control window it used.
+    @type _inbound: L{collections.deque}
+
+    @ivar _ended: Whether the response body has ended, or failed.
+
+    @ivar _endReason: L{None} if the response body is complete, or the
+        L{Failure} it failed with, once C{_ended} is set.
+    """
+    _sending = False
+    _endAfterOutbound = False
+    _producerPaused = False
+    _paused = False
+    _ended = False
+    _endReason = None
+    response = None
+
+    def __init__(self, protocol, streamID, request):
+        self._protocol = protocol
+        self.streamID = streamID
+        self.request = request
+        self.finished = Deferred(lambda d: self._cancel())
+        self._outbound = deque()
+        self._inbound = deque()
+
+
+    # Sending the request body.
+
+    def _startBody(self):
+        """
+        Start producing the request body.
+        """
+        self._sending = True
+        d = self.request.bodyProducer.startProducing(self)
+        d.addCallbacks(self._bodyProduced, self._bodyFailed)
+
+
+    def _bodyProduced(self, ignored):
+        """
+        End the stream once the request body has been sent.
+        """
+        if not self._sending:
+            return
+        if self._outbound:
+            self._endAfterOutbound = True
+        else:
+            self._sending = False
+            self._protocol._endStream(self.streamID)
+
+
+    def _bodyFailed(self, reason):
+        """
+        Reset the stream if the request body could not be produced.
+        """
+        if not self._sending:
+            return
+        self._sending = False
+        self._protocol._resetStream(self.streamID)
+        self._protocol._streamDone(self)
+        if not self.finished.called:
+            self.finished.errback(RequestGenerationFailed([reason]))
+        elif not self._ended:
+            self._bodyEnded(Failure(ResponseFailed([reason])))
+
+
+    def write(self, data):
+        """
+        Send some request body data, buffering what the flow control windows
+        do not allow to be sent yet.
+
+        @param data: The data to send.
+        @type data: L{bytes}
+        """
+        if not self._sending or not data:
+            return
+        self._outbound.append(data)
+        self._sendOutbound()
+
+
+    def registerProducer(self, producer, streaming):
+        """
+        Do nothing: the body producer of the request is paused and resumed
+        directly.
+        """
+
+
+    def unregisterProducer(self):
+        """
+        Do nothing: see L{registerProducer}.
+        """
+
+
+    def _sendOutbound(self):
+        """
+        Send as much buffered request body data as the flow control windows
+        allow, pausing or resuming the body producer accordingly.
+        """
+        if not self._sending:
+            return
+        conn = self._protocol._conn
+        while self._outbound:
+            window = min(conn.local_flow_control_window(self.streamID),
+                         conn.max_outbound_frame_size)
+            if window <= 0:
+                break
+            data = self._outbound.popleft()
+            if len(data) > window:
+                self._outbound.appendleft(data[window:])
+                data = data[:window]
+            conn.send_data(self.streamID, data)
+
+        if not self._outbound:
+            if self._endAfterOutbound:
+                self._sending = False
+                conn.end_stream(self.streamID)
+            elif self._producerPaused:
+                self._producerPaused = False
+                self.request.bodyProducer.resumeProducing()
+        elif not self._producerPaused and not self._endAfterOutbound:
+            self._producerPaused = True
+            self.request.bodyProducer.pauseProducing()
+        self._protocol._flush()
+
+
+    def _stopSending(self):
+        """
+        Stop sending the request body, stopping the body producer if it is
+        still producing.
+        """
+        if self._sending:
+            self._sending = False
+            self._outbound.clear()
+            if not self._endAfterOutbound:
+                self.request.bodyProducer.stopProducing()
+
+
+    # Receiving the response.
+
+    def _responseReceived(self, response):
+        """
+        Deliver the response, holding back its body until a protocol is
+        given to L{Response.deliverBody}.
+        """
+        self.response = response
+        self.pauseProducing()
+        self.finished.callback(response)
+
+
+    def _dataReceived(self, data, flowControlledLength):
+        """
+        Deliver response body data, or buffer it while paused.
+
+        @param data: The data received.
+        @type data: L{bytes}
+
+        @param flowControlledLength: The amount of the flow control window
+            used by C{data}, to be acknowledged once it has been delivered.
+        @type flowControlledLength: L{int}
+        """
+        if self._paused or self._inbound:
+            self._inbound.append((data, flowControlledLength))
+        else:
+            self.response._bodyDataReceived(data)
+            self._protocol._acknowledge(flowControlledLength, self.streamID)
+
+
+    def _bodyEnded(self, reason=None):
+        """
+        Finish the response body once any buffered data has been delivered.
+
+        @param reason: L{None} if the body is complete, or a L{Failure}.
+        """
+        self._ended = True
+        self._endReason = reason
+        if not self._paused and not self._inbound:
+            self._deliverEnd()
+
+
+    def _deliverEnd(self):
+        """
+        Tell the L{Response} its body has finished.
+        """
+        response, self.response = self.response, None
+        if response is not None:
+            response._bodyDataFinished(self._endReason)
+
+
+    def _failed(self, reason):
+        """
+        Fail the request or its response because the stream was reset or
+        the connection lost.
+
+        @param reason: The cause.
+        @type reason: L{Failure}
+        """
+        self._stopSending()
+        if not self.finished.called:
+            self.finished.errback(ResponseNeverReceived([reason]))
+        elif not self._ended:
+            self._bodyEnded(Failure(ResponseFailed([reason])))
+
+
+    def _cancel(self):
+        """
+        Reset the stream if the request is cancelled before the response
+        arrives.
+        """
+        if self._protocol._streams.get(self.streamID) is self:
+            self._protocol._resetStream(self.streamID)
+            self._protocol._streamDone(self)
+        self._stopSending()
+
+
+    # IPushProducer, for the response body consumer.
+
+    def pauseProducing(self):
+        """
+        Stop delivering response body data.
+        """
+        self._paused = True
+
+
+    def resumeProducing(self):
+        """
+        Deliver any buffered response body data, acknowledging it so the
+        server can send more.
+        """
+        self._paused = False
+        while self._inbound and not self._paused:
+            data, flowControlledLength = self._inbound.popleft()
+            self.response._bodyDataReceived(data)
+            self._protocol._acknowledge(flowControlledLength, self.streamID)
+        if not self._paused and self._ended and not self._inbound:
+            self._deliverEnd()
+
+
+    def stopProducing(self):
+        """
+        Give up on the response body, resetting the stream but leaving the
+        connection open for other requests.
+        """
+        if self._protocol._streams.get(self.streamID) is self:
+            self._protocol._resetStream(self.streamID)
+            self._protocol._streamDone(self)
+        self._stopSending()
+        if not self._ended or self._inbound:
+            self._ended = True
+            self._endReason = Failure(ResponseFailed([
+                Failure(ConnectionAborted(
+                    "Response body delivery was stopped"))]))
+        self._inbound.clear()
+        self._paused = False
+        self._deliverEnd()
+
+    abortConnection = stopProducing
+
+
+
+class H2ClientProtocol(Protocol):
+    """
+    An HTTP/2 client connection, sending each request on its own stream.
+
+    L{H2ClientProtocol} offers the parts of the interface of
+    L{twisted.web._newclient.HTTP11ClientProtocol} which
+    L{twisted.web.client.HTTPConnectionPool} relies on, except that more
+    requests may be sent while earlier ones are outstanding, for as long as
+    L{_canPipeline} allows.
+
+    @ivar scheme: The value of the C{:scheme} pseudo-header of requests.
+    @type scheme: L{bytes}
+
+    @ivar _conn: The HTTP/2 connection state machine.
+    @type _conn: L{h2.connection.H2Connection}
+
+    @ivar _streams: Map stream IDs to the L{_H2ClientStream} of each request
+        whose response has not been fully received.
+
+    @ivar _quiescentCallback: Called with this protocol whenever no request
+        is outstanding, so that the connection can be reused.
+
+    @ivar _connectionLostCallback: Called with this protocol when the
+        connection is lost.
+
+    @ivar _goingAway: Whether the connection is being closed, because the
+        server sent I{GOAWAY} or L{abort} was called; no more streams are
+        opened once this is set.
+
+    @ivar _lost: Whether the connection has been lost.
+
+    @ivar _abortDeferreds: L{Deferred}s returned by L{abort}, fired once the
+        connection is lost.
+    """
+    scheme = b'https'
+
+    _goingAway = False
+    _lost = False
+    _log = Logger()
+
+    def __init__(self, quiescentCallback=lambda c: None,
+                 connectionLostCallback=lambda c: None):
+        config = h2.config.H2Configuration(
+            client_side=True, header_encoding=None
+        )
+        self._conn = h2.connection.H2Connection(config=config)
+        self._streams = {}
+        self._quiescentCallback = quiescentCallback
+        self._connectionLostCallback = connectionLostCallback
+        self._abortDeferreds = []
+
+
+    @property
+    def state(self):
+        """
+        The state of the connection, named after the states of
+        L{twisted.web._newclient.HTTP11ClientProtocol}: C{'QUIESCENT'} if no
+        request is outstanding and more can be sent.
+        """
+        if self._lost:
+            return 'CONNECTION_LOST'
+        if self._goingAway:
+            return 'ABORTING'
+        if self._streams:
+            return 'TRANSMITTING'
+        return 'QUIESCENT'
+
+
+    def connectionMade(self):
+        """
+        Send the connection preamble, with server push disabled.
+        """
+        self._conn.initiate_connection()
+        self._conn.update_settings(
+            {h2.settings.SettingCodes.ENABLE_PUSH: 0})
+        self._flush()
+
+
+    def _flush(self):
+        """
+        Write any data the state machine has to send to the transport.
+        """
+        data = self._conn.data_to_send()
+        if data and not self._lost:
+            self.transport.write(data)
+
+
+    def _canPipeline(self, request=None):
+        """
+        Whether another request can be sent right away, without waiting for
+        the outstanding ones.  Any request may be multiplexed, whatever its
+        method or body.
+
+        @param request: Ignored; accepted for compatibility with
+            L{HTTP11ClientProtocol._canPipeline}.
+
+        @rtype: L{bool}
+        """
+        return (
+            not self._lost and not self._goingAway and
+            self._conn.open_outbound_streams <
+            self._conn.remote_settings.max_concurrent_streams)
+
+
+    def _queuedRequests(self):
+        """
+        @return: The number of requests outstanding on this connection.
+        @rtype: L{int}
+        """
+        return len(self._streams)
+
+
+    def request(self, request):
+        """
+        Send a request on a new stream.
+
+        @param request: The request to send.
+        @type request: L{twisted.web._newclient.Request}
+
+        @return: A L{Deferred} which fires with a L{Response}, or fails with
+            L{RequestNotSent} if the connection cannot take more streams,
+            L{RequestGenerationFailed} if the request could not be sent, or
+            L{ResponseNeverReceived} if the stream was reset or the
+            connection lost first.  Cancelling it resets the stream.
+        """
+        if not self._canPipeline():
+            return fail(RequestNotSent())
+        streamID = self._conn.get_next_available_stream_id()
+        try:
+            self._conn.send_headers(
+                streamID, _requestHeaders(request, self.scheme),
+                end_stream=request.bodyProducer is None)
+        except:
+            return fail(RequestGenerationFailed([Failure()]))
+
+        stream = _H2ClientStream(self, streamID, request)
+        self._streams[streamID] = stream
+        self._flush()
+        if request.bodyProducer is not None:
+            stream._startBody()
+        return stream.finished
+
+
+    def dataReceived(self, data):
+        """
+        Process the events caused by data received from the server.
+
+        @param data: The data received.
+        @type data: L{bytes}
+        """
+        try:
+            events = self._conn.receive_data(data)
+        except h2.exceptions.ProtocolError:
+            reason = Failure()
+            self._flush()
+            self._goingAway = True
+            self.transport.loseConnection()
+            self._failStreams(list(self._streams), reason)
+            return
+
+        for event in events:
+            if isinstance(event, h2.events.ResponseReceived):
+                self._responseReceived(event)
+            elif isinstance(event, h2.events.DataReceived):
+                self._responseDataReceived(event)
+            elif isinstance(event, h2.events.StreamEnded):
+                self._responseEnded(event)
+            elif isinstance(event, h2.events.StreamReset):
+                self._streamReset(event)
+            elif isinstance(event, (h2.events.WindowUpdated,
+                                    h2.events.RemoteSettingsChanged)):
+                self._windowUpdated(event)
+            elif isinstance(event, h2.events.ConnectionTerminated):
+                self._connectionTerminated(event)
+
+        self._flush()
+
+
+    def _responseReceived(self, event):
+        """
+        Deliver the L{Response} whose headers have been received.
+
+        @param event: The event for the headers.
+        @type event: L{h2.events.ResponseReceived}
+        """
+        stream = self._streams.get(event.stream_id)
+        if stream is None:
+            return
+        code = None
+        headers = Headers()
+        for name, value in event.headers:
+            if name == b':status':
+                code = int(value)
+            elif not name.startswith(b':'):
+                headers.addRawHeader(name, value)
+
+        response = Response._construct(
+            (b'HTTP', 2, 0), code, RESPONSES.get(code, b''), headers, stream,
+            stream.request)
+        if (stream.request.method == b'HEAD' or code in (204, 304) or
+                event.stream_ended is not None):
+            response.length = 0
+        else:
+            contentLength = headers.getRawHeaders(b'content-length')
+            if contentLength is not None and contentLength[0].isdigit():
+                response.length = int(contentLength[0])
+        stream._responseReceived(response)
+
+
+    def _responseDataReceived(self, event):
+        """
+        Deliver response body data to its stream.
+
+        @param event: The event for the data.
+        @type event: L{h2.events.DataReceived}
+        """
+        stream = self._streams.get(event.stream_id)
+        if stream is None:
+            self._acknowledge(event.flow_controlled_length, event.stream_id)
+            return
+        stream._dataReceived(event.data, event.flow_controlled_length)
+
+
+    def _responseEnded(self, event):
+        """
+        Finish a response whose stream has ended.
+
+        @param event: The event for the end of the stream.
+        @type event: L{h2.events.StreamEnded}
+        """
+        stream = self._streams.get(event.stream_id)
+        if stream is None:
+            return
+        self._streamDone(stream)
+        if not stream.finished.called:
+            # The stream ended without a final response.
+            stream._failed(Failure(ConnectionLost(
+                "Stream ended without a response")))
+        else:
+            stream._stopSending()
+            stream._bodyEnded()
+
+
+    def _streamReset(self, event):
+        """
+        Fail the request or response of a stream reset by the server.
+
+        @param event: The event for the reset.
+        @type event: L{h2.events.StreamReset}
+        """
+        stream = self._streams.get(event.stream_id)
+        if stream is None:
+            return
+        self._streamDone(stream)
+        stream._failed(Failure(ConnectionLost(
+            "Stream reset with error code %s" % (event.error_code,))))
+
+
+    def _windowUpdated(self, event):
+        """
+        Send buffered request body data the flow control windows now allow.
+
+        @param event: The event which may have opened a window.
+        @type event: L{h2.events.WindowUpdated} or
+            L{h2.events.RemoteSettingsChanged}
+        """
+        streamID = getattr(event, 'stream_id', 0)
+        if streamID:
+            streams = [self._streams[streamID]] if (
+                streamID in self._streams) else []
+        else:
+            streams = list(self._streams.values())
+        for stream in streams:
+            stream._sendOutbound()
+
+
+    def _connectionTerminated(self, event):
+        """
+        Close the connection once the server sent I{GOAWAY}.
+
+        The state machine does not accept any more frames afterwards, so even
+        the streams the server said it would process fail, with
+        L{ResponseNeverReceived}, allowing idempotent requests to be retried
+        on another connection.
+
+        @param event: The event for the I{GOAWAY} frame.
+        @type event: L{h2.events.ConnectionTerminated}
+        """
+        self._goingAway = True
+        self.transport.loseConnection()
+        self._failStreams(
+            list(self._streams),
+            Failure(ConnectionLost(
+                "Remote peer sent GOAWAY with error code %s" % (
+                    event.error_code,))))
+
+
+    def _failStreams(self, streamIDs, reason):
+        """
+        Fail the requests or responses of some streams.
+
+        @param streamIDs: The IDs of the streams.
+
+        @param reason: The cause.
+        @type reason: L{Failure}
+        """
+        for streamID in streamIDs:
+            stream = self._streams.pop(streamID, None)
+            if stream is not None:
+                stream._failed(reason)
+
+
+    def _streamDone(self, stream):
+        """
+        Forget about a stream which will receive no more data.  If it was
+        the last one, tell the pool the connection is idle, or close the
+        connection if the request was not persistent.
+
+        @param stream: The stream.
+        @type stream: L{_H2ClientStream}
+        """
+        if self._streams.get(stream.streamID) is stream:
+            del self._streams[stream.streamID]
+        if self._streams or self._lost:
+            return
+        if not self._goingAway and not stream.request.persistent:
+            self._goingAway = True
+            self._conn.close_connection()
+            self._flush()
+        if self._goingAway:
+            self.transport.loseConnection()
+        else:
+            self._quiescentCallback(self)
+
+
+    def _endStream(self, streamID):
+        """
+        End the request body of a stream.
+        """
+        self._conn.end_stream(streamID)
+        self._flush()
+
+
+    def _resetStream(self, streamID):
+        """
+        Reset a stream, if it is still open.
+        """
+        try:
+            self._conn.reset_stream(
+                streamID, error_code=h2.errors.ErrorCodes.CANCEL)
+        except h2.exceptions.StreamClosedError:
+            return
+        self._flush()
+
+
+    def _acknowledge(self, flowControlledLength, streamID):
+        """
+        Tell the server received response body data has been consumed, so it
+        may send more.
+        """
+        if self._lost:
+            return
+        self._conn.acknowledge_received_data(flowControlledLength, streamID)
+        self._flush()
+
+
+    def abort(self):
+        """
+        Close the connection, sending I{GOAWAY} and failing any outstanding
+        requests.
+
+        @return: A L{Deferred} which fires when the connection is lost.
+        """
+        if self._lost:
+            return succeed(None)
+        if not self._goingAway:
+            self._goingAway = True
+            self._conn.close_connection()
+            self._flush()
+        self.transport.abortConnection()
+        d = Deferred()
+        self._abortDeferreds.append(d)
+        return d
+
+
+    def connectionLost(self, reason):
+        """
+        Fail the requests and responses still outstanding.
+
+        @param reason: See L{IProtocol.connectionLost}.
+        """
+        self._lost = True
+        self._failStreams(list(self._streams), reason)
+        self._connectionLostCallback(self)
+        abortDeferreds, self._abortDeferreds = self._abortDeferreds, []
+        for d in abortDeferreds:
+            d.callback(None)
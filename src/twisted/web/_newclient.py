@@ -30,6 +30,7 @@ from __future__ import division, absolute_import
 __metaclass__ = type
 
 import re
+from collections import deque
 
 from zope.interface import implementer
 
@@ -1503,6 +1504,23 @@ class HTTP11ClientProtocol(Protocol):
 
     @ivar _abortDeferreds: A list of C{Deferred} instances that will fire when
         the connection is lost.
+
+    @ivar _connectionLostCallback: A one-argument callable called with this
+        protocol after its connection has been lost.
+
+    @ivar _pipelineDepth: The largest number of requests which may be
+        outstanding on this connection at once.  If greater than one, further
+        requests without a body and with an idempotent method may be sent
+        while waiting for the response to the current request.
+    @type _pipelineDepth: L{int}
+
+    @ivar _pipelined: A C{deque} of two-tuples of the L{Request}s sent after
+        the current one and the L{Deferred}s which will fire with their
+        L{Response}s, in the order the responses are expected.
+
+    @ivar _pipelinedData: Bytes received after the end of a response which
+        belong to the response to the next pipelined request, not yet given
+        to its parser.
     """
     _state = 'QUIESCENT'
     _parser = None
@@ -1510,11 +1528,16 @@ class HTTP11ClientProtocol(Protocol):
     _currentRequest = None
     _transportProxy = None
     _responseDeferred = None
+    _pipelinedData = b''
     _log = Logger()
 
 
-    def __init__(self, quiescentCallback=lambda c: None):
+    def __init__(self, quiescentCallback=lambda c: None,
+                 connectionLostCallback=lambda c: None, pipelineDepth=1):
         self._quiescentCallback = quiescentCallback
+        self._connectionLostCallback = connectionLostCallback
+        self._pipelineDepth = pipelineDepth
+        self._pipelined = deque()
         self._abortDeferreds = []
 
 
@@ -1543,6 +1566,8 @@ class HTTP11ClientProtocol(Protocol):
             any more requests using this L{HTTP11ClientProtocol}.
         """
         if self._state != 'QUIESCENT':
+            if self._canPipeline(request):
+                return self._pipelineRequest(request)
             return fail(RequestNotSent())
 
         self._state = 'TRANSMITTING'
@@ -1592,6 +1617,102 @@ class HTTP11ClientProtocol(Protocol):
         return self._finishedRequest
 
 
+    def _canPipeline(self, request=None):
+        """
+        Determine whether a request may be sent now, before the response to
+        the current request has been received.
+
+        Only requests without a body, using an idempotent method, and on a
+        persistent connection are pipelined, and only behind a request which
+        has been completely sent.
+
+        @param request: The request to be sent, or L{None} to only ask whether
+            there is room in the pipeline.
+        @type request: L{Request} or L{None}
+
+        @rtype: L{bool}
+        """
+        if (self._state != 'WAITING' or
+                len(self._pipelined) + 1 >= self._pipelineDepth or
+                not self._currentRequest.persistent):
+            return False
+        if request is None:
+            return True
+        return (request.persistent and request.bodyProducer is None and
+                request.method in (b"GET", b"HEAD", b"OPTIONS", b"DELETE",
+                                   b"TRACE"))
+
+
+    def _queuedRequests(self):
+        """
+        @return: The number of requests pipelined behind the current one.
+        @rtype: L{int}
+        """
+        return len(self._pipelined)
+
+
+    def _pipelineRequest(self, request):
+        """
+        Send C{request} while waiting for the responses to earlier requests.
+
+        @param request: A request for which L{_canPipeline} is true.
+        @type request: L{Request}
+
+        @return: A L{Deferred} like the one returned by L{request}.
+        """
+        try:
+            request.writeTo(self.transport)
+        except:
+            return fail(RequestGenerationFailed([Failure()]))
+
+        def cancelRequest(ign):
+            # The request has been sent already, so the only way to take it
+            # back is to give up on the connection.
+            if self._finishedRequest is finished:
+                self.transport.abortConnection()
+                self._disconnectParser(Failure(CancelledError()))
+            else:
+                self._pipelined.remove((request, finished))
+                self.transport.abortConnection()
+        finished = Deferred(cancelRequest)
+        self._pipelined.append((request, finished))
+        return finished
+
+
+    def _nextPipelined(self, rest):
+        """
+        Start waiting for the response to the oldest pipelined request.
+
+        @param rest: The bytes received after the end of the previous
+            response, which are the start of this one.
+        @type rest: L{bytes}
+        """
+        request, finished = self._pipelined.popleft()
+        self._state = 'WAITING'
+        self._currentRequest = request
+        self._finishedRequest = finished
+        self._transportProxy = TransportProxyProducer(self.transport)
+        self._parser = HTTPClientParser(request, self._finishResponse)
+        self._parser.makeConnection(self._transportProxy)
+        self._responseDeferred = self._parser._responseDeferred
+        self._responseDeferred.chainDeferred(self._finishedRequest)
+        # The previous response may not have been completely delivered yet;
+        # dataReceived gives these bytes to the new parser once it has been.
+        self._pipelinedData = rest
+
+
+    def _failPipelined(self, reason):
+        """
+        Fail all pipelined requests still waiting for a response to start.
+
+        @param reason: Why no response will be received.
+        @type reason: L{Failure}
+        """
+        pipelined, self._pipelined = self._pipelined, deque()
+        for request, finished in pipelined:
+            finished.errback(Failure(ResponseNeverReceived([reason])))
+
+
     def _finishResponse(self, rest):
         """
         Called by an L{HTTPClientParser} to indicate that it has parsed a
@@ -1605,9 +1726,8 @@ class HTTP11ClientProtocol(Protocol):
 
 
     def _finishResponse_WAITING(self, rest):
-        # Currently the rest parameter is ignored. Don't forget to use it if
-        # we ever add support for pipelining. And maybe check what trailers
-        # mean.
+        # The rest parameter is only used if there are pipelined requests. And
+        # maybe check what trailers mean.
         if self._state == 'WAITING':
             self._state = 'QUIESCENT'
         else:
@@ -1630,6 +1750,12 @@ class HTTP11ClientProtocol(Protocol):
         if ((b'close' in connHeaders) or self._state != "QUIESCENT" or
             not self._currentRequest.persistent):
             self._giveUp(Failure(reason))
+        elif self._pipelined:
+            # The connection is not quiescent: move on to the response to the
+            # next request.
+            self.transport.resumeProducing()
+            self._disconnectParser(reason)
+            self._nextPipelined(rest)
         else:
             # Just in case we had paused the transport, resume it before
             # considering it quiescent again.
@@ -1691,6 +1817,9 @@ class HTTP11ClientProtocol(Protocol):
         """
         try:
             self._parser.dataReceived(bytes)
+            while self._pipelinedData and self._parser is not None:
+                data, self._pipelinedData = self._pipelinedData, b''
+                self._parser.dataReceived(data)
         except:
             self._giveUp(Failure())
 
@@ -1698,9 +1827,19 @@ class HTTP11ClientProtocol(Protocol):
     def connectionLost(self, reason):
         """
         The underlying transport went away.  If appropriate, notify the parser
-        object.
+        object, fail any pipelined requests, then call the connection lost
+        callback.
+        """
+        self._connectionLost(reason)
+        self._failPipelined(reason)
+        self._connectionLostCallback(self)
+
+
+    def _connectionLost(self, reason):
+        """
+        Handle the loss of the connection according to the current state.
         """
-    connectionLost = makeStatefulDispatcher('connectionLost', connectionLost)
+    _connectionLost = makeStatefulDispatcher('connectionLost', _connectionLost)
 
 
     def _connectionLost_QUIESCENT(self, reason):
@@ -117,9 +117,15 @@ class Tag(object):
         mapping slot names to renderable values.  The values in this dict might
         be anything that can be present as the child of a L{Tag}; strings,
         lists, L{Tag}s, generators, etc.
+
+    @ivar _compiled: The flattened form of this tag, if it is part of a
+        template precompiled for rendering and has no dynamic content, or
+        L{None}.
+    @type _compiled: L{bytes} or L{None}
     """
 
     slotData = None
+    _compiled = None
     filename = None
     lineNumber = None
     columnNumber = None
@@ -185,6 +191,7 @@ class Tag(object):
         instance, rather than the DOM 'render' attribute in the attributes
         dictionary.
         """
+        self._compiled = None
         self.children.extend(children)
 
         for k, v in iteritems(kw):
@@ -255,6 +262,7 @@ class Tag(object):
         """
         Clear any existing children from this tag.
         """
+        self._compiled = None
         self.children = []
         return self
 
@@ -25,6 +25,11 @@ except ImportError:
 import zlib
 from functools import wraps
 
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
 from zope.interface import implementer
 
 from twisted.python.compat import _PY3, networkString
@@ -39,6 +44,9 @@ from twisted.web import http
 from twisted.internet import defer, protocol, task
 from twisted.internet.abstract import isIPv6Address
 from twisted.internet.interfaces import IProtocol, IOpenSSLContextFactory
+from twisted.internet.interfaces import IPushProducer
+from twisted.internet.interfaces import (
+    IHandshakeListener, IStreamClientEndpoint)
 from twisted.internet.endpoints import HostnameEndpoint, wrapClientTLS
 from twisted.python.util import InsensitiveDict
 from twisted.python.components import proxyForInterface
@@ -836,6 +844,11 @@ from twisted.web._newclient import (
     _WrapperException,
     )
 
+try:
+    from twisted.web._http2client import H2ClientProtocol
+except ImportError:
+    H2ClientProtocol = None
+
 
 
 try:
@@ -925,9 +938,19 @@ class WebClientContextFactory(object):
 class BrowserLikePolicyForHTTPS(object):
     """
     SSL connection creator for web clients.
+
+    @ivar acceptableProtocols: The protocols offered to servers using ALPN,
+        most preferred first, or L{None} to not negotiate a protocol.  If
+        C{b'h2'} is among them, L{Agent} speaks HTTP/2 to servers which
+        choose it; it is left out if the C{h2} library is not installed.
+    @type acceptableProtocols: L{list} of L{bytes} or L{None}
     """
-    def __init__(self, trustRoot=None):
+    def __init__(self, trustRoot=None, acceptableProtocols=None):
         self._trustRoot = trustRoot
+        if acceptableProtocols is not None and H2ClientProtocol is None:
+            acceptableProtocols = [
+                name for name in acceptableProtocols if name != b'h2'] or None
+        self.acceptableProtocols = acceptableProtocols
 
 
     @_requireSSL
@@ -952,7 +975,8 @@ class BrowserLikePolicyForHTTPS(object):
             <twisted.internet.interfaces.IOpenSSLClientConnectionCreator>}
         """
         return optionsForClientTLS(hostname.decode("ascii"),
-                                   trustRoot=self._trustRoot)
+                                   trustRoot=self._trustRoot,
+                                   acceptableProtocols=self.acceptableProtocols)
 
 
 
@@ -1231,11 +1255,20 @@ class _HTTP11ClientFactory(protocol.Factory):
     @ivar _metadata: Metadata about the low-level connection details,
         used to make the repr more useful.
 
+    @ivar _connectionLostCallback: The connection lost callback to be passed
+        to protocol instances, used to tell the connection pool they are gone.
+
+    @ivar _pipelineDepth: The pipeline depth to be passed to protocol
+        instances.
+
     @since: 11.1
     """
-    def __init__(self, quiescentCallback, metadata):
+    def __init__(self, quiescentCallback, metadata,
+                 connectionLostCallback=lambda c: None, pipelineDepth=1):
         self._quiescentCallback = quiescentCallback
         self._metadata = metadata
+        self._connectionLostCallback = connectionLostCallback
+        self._pipelineDepth = pipelineDepth
 
 
     def __repr__(self):
@@ -1244,7 +1277,115 @@ class _HTTP11ClientFactory(protocol.Factory):
             self._metadata)
 
     def buildProtocol(self, addr):
-        return HTTP11ClientProtocol(self._quiescentCallback)
+        return HTTP11ClientProtocol(self._quiescentCallback,
+                                    self._connectionLostCallback,
+                                    self._pipelineDepth)
+
+
+    def _buildHTTP2Protocol(self, addr):
+        """
+        Build a protocol for a connection which negotiated HTTP/2.
+
+        @return: An L{H2ClientProtocol}.
+        """
+        return H2ClientProtocol(self._quiescentCallback,
+                                self._connectionLostCallback)
+
+
+
+@implementer(IHandshakeListener)
+class _HTTP2NegotiatingProtocol(protocol.Protocol):
+    """
+    A protocol which waits for the TLS handshake of a new connection, then
+    hands the connection over to an L{H2ClientProtocol} if the server chose
+    C{h2} using ALPN, or to an L{HTTP11ClientProtocol} otherwise.
+
+    @ivar negotiated: A L{Deferred} which fires with the chosen protocol once
+        the handshake completes.  Cancelling it closes the connection.
+
+    @ivar _factory: The L{_HTTP11ClientFactory} used to build the chosen
+        protocol.
+
+    @ivar _addr: The address of the connection.
+
+    @ivar _protocol: The chosen protocol, or L{None} before the handshake
+        completes.
+    """
+    _protocol = None
+
+    def __init__(self, factory, addr):
+        self._factory = factory
+        self._addr = addr
+        self.negotiated = defer.Deferred(
+            lambda d: self.transport.abortConnection())
+
+
+    def handshakeCompleted(self):
+        """
+        Choose the protocol for the connection.
+        """
+        if self._protocol is not None:
+            return
+        if self.transport.negotiatedProtocol == b'h2':
+            self._protocol = self._factory._buildHTTP2Protocol(self._addr)
+        else:
+            self._protocol = self._factory.buildProtocol(self._addr)
+        self._protocol.makeConnection(self.transport)
+        self.negotiated.callback(self._protocol)
+
+
+    def dataReceived(self, data):
+        self._protocol.dataReceived(data)
+
+
+    def connectionLost(self, reason):
+        if self._protocol is not None:
+            self._protocol.connectionLost(reason)
+        elif not self.negotiated.called:
+            self.negotiated.errback(reason)
+
+
+
+class _HTTP2NegotiatingFactory(protocol.Factory):
+    """
+    A factory for L{_HTTP2NegotiatingProtocol}s.
+
+    @ivar _factory: The L{_HTTP11ClientFactory} the protocols use.
+    """
+
+    def __init__(self, factory):
+        self._factory = factory
+
+
+    def buildProtocol(self, addr):
+        return _HTTP2NegotiatingProtocol(self._factory, addr)
+
+
+
+@implementer(IStreamClientEndpoint)
+class _HTTP2NegotiatingEndpoint(object):
+    """
+    An endpoint, wrapping a TLS endpoint which offers C{h2} using ALPN, whose
+    connections speak HTTP/2 or HTTP/1.1 as the server chooses.
+
+    @ivar _endpoint: The wrapped endpoint.
+    """
+
+    def __init__(self, endpoint):
+        self._endpoint = endpoint
+
+
+    def connect(self, protocolFactory):
+        """
+        Connect, and wait for the protocol to be chosen.
+
+        @param protocolFactory: An L{_HTTP11ClientFactory}.
+
+        @return: A L{Deferred} which fires with an L{H2ClientProtocol} or an
+            L{HTTP11ClientProtocol} once the TLS handshake completes.
+        """
+        d = self._endpoint.connect(_HTTP2NegotiatingFactory(protocolFactory))
+        return d.addCallback(lambda protocol: protocol.negotiated)
 
 
 
@@ -1313,6 +1454,130 @@ class _RetryingHTTP11ClientProtocol(object):
 
 
 
+class _PipeliningHTTP11ClientProtocol(_RetryingHTTP11ClientProtocol):
+    """
+    A wrapper for an L{HTTP11ClientProtocol} which is waiting for a response,
+    used to pipeline one more request over it.
+
+    If the connection cannot take the request after all (for example because
+    the request has a body), the request is sent over another connection
+    instead.  If the connection is lost before the response arrives, the
+    request is retried once like L{_RetryingHTTP11ClientProtocol} does.
+
+    @ivar _retry: Whether to retry requests which failed in a retryable
+        manner.
+    """
+
+    def __init__(self, clientProtocol, newConnection, retry):
+        _RetryingHTTP11ClientProtocol.__init__(
+            self, clientProtocol, newConnection)
+        self._retry = retry
+
+
+    def request(self, request):
+        """
+        Pipeline a request, falling back to another connection if it cannot
+        be pipelined, and retry once if it fails in a retryable manner.
+
+        @param request: A L{Request} instance that will be requested using the
+            wrapped protocol.
+        """
+        if self._clientProtocol._canPipeline(request):
+            d = self._clientProtocol.request(request)
+        else:
+            d = defer.fail(RequestNotSent())
+
+        def failed(reason):
+            if reason.check(RequestNotSent) or (
+                    self._retry and self._shouldRetry(
+                        request.method, reason.value, request.bodyProducer)):
+                return self._newConnection().addCallback(
+                    lambda connection: connection.request(request))
+            else:
+                return reason
+        d.addErrback(failed)
+        return d
+
+
+
+class _PoolStatistics(object):
+    """
+    Statistics about the connections of an L{HTTPConnectionPool}.
+
+    @ivar activeConnections: The number of connections in use by a request,
+        including those still being established.
+    @type activeConnections: L{int}
+
+    @ivar idleConnections: The number of cached persistent connections.
+    @type idleConnections: L{int}
+
+    @ivar waitingRequests: The number of requests queued because
+        C{maxConnectionsPerHost} connections were already active.
+    @type waitingRequests: L{int}
+
+    @ivar newConnections: The number of connections the pool has opened.
+    @type newConnections: L{int}
+
+    @ivar reusedConnections: The number of times a persistent connection was
+        used for another request.
+    @type reusedConnections: L{int}
+
+    @ivar pipelinedConnections: The number of times a connection still
+        waiting for a response was used to pipeline another request, or to
+        multiplex it over HTTP/2.
+    @type pipelinedConnections: L{int}
+    """
+
+    def __init__(self, activeConnections, idleConnections, waitingRequests,
+                 newConnections, reusedConnections, pipelinedConnections=0):
+        self.activeConnections = activeConnections
+        self.idleConnections = idleConnections
+        self.waitingRequests = waitingRequests
+        self.newConnections = newConnections
+        self.reusedConnections = reusedConnections
+        self.pipelinedConnections = pipelinedConnections
+
+
+    @property
+    def reuseRate(self):
+        """
+        The fraction of connections handed out which were reused persistent
+        connections rather than new ones, or C{0.0} if none were handed out.
+
+        @rtype: L{float}
+        """
+        total = self.newConnections + self.reusedConnections
+        if not total:
+            return 0.0
+        return float(self.reusedConnections) / total
+
+
+
+class _WaitingRequest(object):
+    """
+    A request for a connection queued by L{HTTPConnectionPool.getConnection}.
+
+    @ivar deferred: The L{Deferred} returned to the caller of
+        C{getConnection}.
+
+    @ivar endpoint: The endpoint to use if a new connection is opened for
+        this request.
+
+    @ivar timeoutCall: The L{IDelayedCall} which fails C{deferred} if it is
+        still waiting, or L{None}.
+
+    @ivar connecting: Once this request has left the queue, the L{Deferred}
+        for the connection which will be given to it.
+    """
+    timeoutCall = None
+    connecting = None
+
+    def __init__(self, deferred, endpoint):
+        self.deferred = deferred
+        self.endpoint = endpoint
+
+
+
 class HTTPConnectionPool(object):
     """
     A pool of persistent HTTP connections.
@@ -1320,6 +1585,11 @@ class HTTPConnectionPool(object):
     Features:
      - Cached connections will eventually time out.
      - Limits on maximum number of persistent connections.
+     - Optional limits on the number of active connections, with excess
+       requests queued until a connection is available.
+     - Optional HTTP/1.1 pipelining.
+     - Multiplexing of concurrent requests over one HTTP/2 connection, when
+       the server chooses HTTP/2 (see L{BrowserLikePolicyForHTTPS}).
 
     Connections are stored using keys, which should be chosen such that any
     connections stored under a given key can be used interchangeably.
@@ -1335,13 +1605,38 @@ class HTTPConnectionPool(object):
         connections for a C{host:port} destination.
     @type maxPersistentPerHost: C{int}
 
+    @ivar maxConnectionsPerHost: The maximum number of connections for a
+        C{host:port} destination which may be in use by requests at once, or
+        L{None} for no limit.  Requests for a connection beyond this limit
+        wait, in order, for one to be returned to the pool or closed.
+        Automatic retries of failed requests may briefly exceed this limit.
+    @type maxConnectionsPerHost: C{int} or L{None}
+
     @ivar cachedConnectionTimeout: Number of seconds a cached persistent
         connection will stay open before disconnecting.
 
+    @ivar pipelineDepth: The largest number of requests which may be
+        outstanding on one connection.  If greater than one (it is one by
+        default), a request for a connection when none is cached is given a
+        connection which is waiting for a response, in preference to opening
+        a new one; if the request has no body and an idempotent method it is
+        pipelined behind the requests already sent, and otherwise it is sent
+        over another connection.  Connections which negotiated HTTP/2 are
+        always shared between concurrent requests, up to the number of
+        streams the server allows.
+    @type pipelineDepth: C{int}
+
+    @ivar waitingRequestTimeout: Number of seconds a request may wait for a
+        connection because of C{maxConnectionsPerHost} before it fails with
+        L{defer.TimeoutError}, or L{None} to wait indefinitely.
+
     @ivar retryAutomatically: C{boolean} indicating whether idempotent
         requests should be retried once if no response was received.
 
-    @ivar _factory: The factory used to connect to the proxy.
+    @ivar _factory: The factory used to connect to the proxy.  It is called
+        with a quiescent callback and some metadata, and for
+        L{_HTTP11ClientFactory} and its subclasses also with the
+        C{connectionLostCallback} and C{pipelineDepth} keyword arguments.
 
     @ivar _connections: Map (scheme, host, port) to lists of
         L{HTTP11ClientProtocol} instances.
@@ -1349,12 +1644,38 @@ class HTTPConnectionPool(object):
     @ivar _timeouts: Map L{HTTP11ClientProtocol} instances to a
         C{IDelayedCall} instance of their timeout.
 
+    @ivar _active: Map keys to non-empty dicts of the L{HTTP11ClientProtocol}
+        instances handed out for requests and not yet returned to the pool,
+        keyed by their C{id}.
+
+    @ivar _connecting: Map keys to the number of connection attempts in
+        progress, if there are any.
+
+    @ivar _waiting: Map keys to C{deque}s of L{_WaitingRequest} instances.
+
+    @ivar _newCount: The number of connections opened so far.
+
+    @ivar _reusedCount: The number of cached connections handed out so far.
+
+    @ivar _pipelinedCount: The number of connections handed out to pipeline
+        requests so far.
+
+    @ivar _http2Keys: The keys whose most recent new connection negotiated
+        HTTP/2.
+
+    @ivar _awaitingConnection: Map keys known to speak HTTP/2 to lists of
+        L{Deferred}s for requests waiting to share a connection still being
+        established, rather than opening one each.
+
     @since: 12.1
     """
 
     _factory = _HTTP11ClientFactory
     maxPersistentPerHost = 2
+    maxConnectionsPerHost = None
     cachedConnectionTimeout = 240
+    pipelineDepth = 1
+    waitingRequestTimeout = None
     retryAutomatically = True
     _log = Logger()
 
@@ -1363,6 +1684,14 @@ class HTTPConnectionPool(object):
         self.persistent = persistent
         self._connections = {}
         self._timeouts = {}
+        self._active = {}
+        self._connecting = {}
+        self._waiting = {}
+        self._newCount = 0
+        self._reusedCount = 0
+        self._pipelinedCount = 0
+        self._http2Keys = set()
+        self._awaitingConnection = {}
 
 
     def getConnection(self, key, endpoint):
@@ -1377,6 +1706,14 @@ class HTTPConnectionPool(object):
         Afterwards, if the connection is still open, it will automatically be
         added to the pool.
 
+        If pipelining is enabled with C{pipelineDepth} or the connection
+        speaks HTTP/2, and no connection is cached, a connection already in
+        use may be supplied instead.
+
+        If C{maxConnectionsPerHost} connections for C{key} are already in use,
+        the request for a connection waits until one of them is returned to
+        the pool or closed.
+
         @param key: A unique key identifying connections that can be used
             interchangeably.
 
@@ -1386,6 +1723,89 @@ class HTTPConnectionPool(object):
         @return: A C{Deferred} that will fire with a L{HTTP11ClientProtocol}
            (or a wrapper) that can be used to send a single HTTP request.
         """
+        return self._requestConnection(key, endpoint, True)
+
+
+    def _requestConnection(self, key, endpoint, pipeline):
+        """
+        Implement L{getConnection}.
+
+        @param pipeline: If C{False}, never supply a connection which is
+            already in use.
+        """
+        if key not in self._waiting:
+            if pipeline and not self._connections.get(key):
+                connection = self._pipelineConnection(key, endpoint)
+                if connection is not None:
+                    return defer.succeed(connection)
+                if key in self._http2Keys and self._connecting.get(key):
+                    return self._awaitConnection(key, endpoint)
+            if self._hasCapacity(key):
+                return self._getConnection(key, endpoint)
+
+        waiter = _WaitingRequest(
+            defer.Deferred(lambda d: self._cancelWaiting(key, waiter)),
+            endpoint)
+        self._waiting.setdefault(key, collections.deque()).append(waiter)
+        if self.waitingRequestTimeout is not None:
+            waiter.timeoutCall = self._reactor.callLater(
+                self.waitingRequestTimeout, self._timeoutWaiting, key, waiter)
+        return waiter.deferred
+
+
+    def _pipelineConnection(self, key, endpoint):
+        """
+        Find the connection for C{key} which is waiting for a response and has
+        the fewest requests pipelined on it, if C{pipelineDepth} allows
+        pipelining or C{key} speaks HTTP/2.
+
+        @return: The connection, wrapped to send requests which cannot be
+            pipelined over another connection, or L{None}.
+        """
+        if self.pipelineDepth <= 1 and key not in self._http2Keys:
+            return None
+        candidates = [
+            connection for connection in self._active.get(key, {}).values()
+            if connection._canPipeline()]
+        if not candidates:
+            return None
+        connection = min(
+            candidates, key=lambda connection: connection._queuedRequests())
+        self._pipelinedCount += 1
+        newConnection = lambda: self._requestConnection(key, endpoint, False)
+        return _PipeliningHTTP11ClientProtocol(
+            connection, newConnection, self.retryAutomatically)
+
+
+    def _awaitConnection(self, key, endpoint):
+        """
+        Wait for a connection for C{key} being established, to share it if it
+        negotiates HTTP/2.
+
+        @return: A L{Deferred} like the one returned by L{getConnection}.
+        """
+        awaiting = self._awaitingConnection.setdefault(key, [])
+        def cancel(d):
+            awaiting.remove(d)
+        d = defer.Deferred(cancel)
+        awaiting.append(d)
+        return d
+
+
+    def _serveAwaiting(self, key, endpoint):
+        """
+        Get connections for the requests which waited for a connection for
+        C{key} to be established.
+        """
+        for d in self._awaitingConnection.pop(key, []):
+            self._requestConnection(key, endpoint, True).chainDeferred(d)
+
+
+    def _getConnection(self, key, endpoint):
+        """
+        Hand out a cached connection for C{key} if there is one, or open a new
+        one, without regard to C{maxConnectionsPerHost}.
+        """
         # Try to get cached version:
         connections = self._connections.get(key)
         while connections:
@@ -1394,15 +1814,27 @@ class HTTPConnectionPool(object):
             self._timeouts[connection].cancel()
             del self._timeouts[connection]
             if connection.state == "QUIESCENT":
-                if self.retryAutomatically:
-                    newConnection = lambda: self._newConnection(key, endpoint)
-                    connection = _RetryingHTTP11ClientProtocol(
-                        connection, newConnection)
-                return defer.succeed(connection)
+                return defer.succeed(self._checkOut(key, endpoint, connection))
 
         return self._newConnection(key, endpoint)
 
 
+    def _checkOut(self, key, endpoint, connection):
+        """
+        Mark a cached connection as in use, wrapping it to retry failed
+        requests if C{retryAutomatically} is set.
+
+        @return: The connection or its wrapper.
+        """
+        self._reusedCount += 1
+        self._active.setdefault(key, {})[id(connection)] = connection
+        if self.retryAutomatically:
+            newConnection = lambda: self._newConnection(key, endpoint)
+            connection = _RetryingHTTP11ClientProtocol(
+                connection, newConnection)
+        return connection
+
+
     def _newConnection(self, key, endpoint):
         """
         Create a new connection.
@@ -1411,8 +1843,39 @@ class HTTPConnectionPool(object):
         """
         def quiescentCallback(protocol):
             self._putConnection(key, protocol)
-        factory = self._factory(quiescentCallback, repr(endpoint))
-        return endpoint.connect(factory)
+        def connectionLostCallback(protocol):
+            self._connectionLost(key, protocol)
+        if (isinstance(self._factory, type) and
+                issubclass(self._factory, _HTTP11ClientFactory)):
+            factory = self._factory(
+                quiescentCallback, repr(endpoint),
+                connectionLostCallback=connectionLostCallback,
+                pipelineDepth=self.pipelineDepth)
+        else:
+            # For compatibility, a substituted factory is called with only the
+            # two arguments it has always been given.  Its connections are not
+            # pipelined, and do not tell the pool when they are lost.
+            factory = self._factory(quiescentCallback, repr(endpoint))
+
+        self._newCount += 1
+        self._connecting[key] = self._connecting.get(key, 0) + 1
+        def connected(protocol):
+            self._connectAttemptEnded(key)
+            self._active.setdefault(key, {})[id(protocol)] = protocol
+            if H2ClientProtocol is not None and isinstance(
+                    protocol, H2ClientProtocol):
+                self._http2Keys.add(key)
+            else:
+                self._http2Keys.discard(key)
+            self._serveAwaiting(key, endpoint)
+            return protocol
+        def connectFailed(reason):
+            self._connectAttemptEnded(key)
+            self._serveWaiting(key)
+            self._serveAwaiting(key, endpoint)
+            return reason
+        return endpoint.connect(factory).addCallbacks(
+            connected, connectFailed)
 
 
     def _removeConnection(self, key, connection):
@@ -1428,7 +1891,11 @@ class HTTPConnectionPool(object):
         """
         Return a persistent connection to the pool. This will be called by
         L{HTTP11ClientProtocol} when the connection becomes quiescent.
+
+        If a request is waiting for a connection to C{key}, it is given the
+        connection once the response which just finished has been delivered.
         """
+        self._checkIn(key, connection)
         if connection.state != "QUIESCENT":
             # Log with traceback for debugging purposes:
             try:
@@ -1437,6 +1904,7 @@ class HTTPConnectionPool(object):
             except:
                 self._log.failure(
                     "BUG: Non-quiescent protocol added to connection pool.")
+            self._serveWaiting(key)
             return
         connections = self._connections.setdefault(key, [])
         if len(connections) == self.maxPersistentPerHost:
@@ -1449,6 +1917,148 @@ class HTTPConnectionPool(object):
                                       self._removeConnection,
                                       key, connection)
         self._timeouts[connection] = cid
+        if key in self._waiting:
+            self._reactor.callLater(0, self._serveWaiting, key)
+
+
+    def _connectionLost(self, key, connection):
+        """
+        Forget about a connection which has been closed, freeing its place for
+        a waiting request if it was in use.  This will be called by
+        L{HTTP11ClientProtocol} when its connection is lost.
+        """
+        if self._checkIn(key, connection):
+            self._serveWaiting(key)
+        elif connection in self._connections.get(key, ()):
+            self._connections[key].remove(connection)
+            self._timeouts.pop(connection).cancel()
+
+
+    def _connectAttemptEnded(self, key):
+        """
+        Count one fewer connection attempt for C{key} in progress, forgetting
+        C{key} once there are none.
+        """
+        connecting = self._connecting[key] - 1
+        if connecting:
+            self._connecting[key] = connecting
+        else:
+            del self._connecting[key]
+
+
+    def _checkIn(self, key, connection):
+        """
+        Stop counting C{connection} as in use, forgetting C{key} once none of
+        its connections are.
+
+        @return: C{True} if C{connection} was in use.
+        """
+        active = self._active.get(key)
+        if active is None or active.pop(id(connection), None) is None:
+            return False
+        if not active:
+            del self._active[key]
+        return True
+
+
+    def _activeCount(self, key):
+        """
+        @return: The number of connections for C{key} in use or being
+            established.
+        """
+        return len(self._active.get(key, ())) + self._connecting.get(key, 0)
+
+
+    def _hasCapacity(self, key):
+        """
+        @return: C{True} if another connection for C{key} may be handed out
+            without exceeding C{maxConnectionsPerHost}.
+        """
+        return (self.maxConnectionsPerHost is None or
+                self._activeCount(key) < self.maxConnectionsPerHost)
+
+
+    def _dequeue(self, key):
+        """
+        Remove the oldest request waiting for a connection to C{key} from the
+        queue.
+
+        @rtype: L{_WaitingRequest}
+        """
+        waiting = self._waiting[key]
+        waiter = waiting.popleft()
+        if not waiting:
+            del self._waiting[key]
+        if waiter.timeoutCall is not None:
+            waiter.timeoutCall.cancel()
+            waiter.timeoutCall = None
+        return waiter
+
+
+    def _serveWaiting(self, key):
+        """
+        Start getting connections for requests waiting for C{key}, as far as
+        C{maxConnectionsPerHost} allows.
+        """
+        while self._waiting.get(key) and self._hasCapacity(key):
+            waiter = self._dequeue(key)
+            waiter.connecting = self._getConnection(key, waiter.endpoint)
+            waiter.connecting.chainDeferred(waiter.deferred)
+
+
+    def _cancelWaiting(self, key, waiter):
+        """
+        Cancel a request for a connection: remove it from the queue, or cancel
+        the connection attempt made for it.
+        """
+        if waiter.connecting is not None:
+            waiter.connecting.cancel()
+            return
+        self._waiting[key].remove(waiter)
+        if not self._waiting[key]:
+            del self._waiting[key]
+        if waiter.timeoutCall is not None:
+            waiter.timeoutCall.cancel()
+            waiter.timeoutCall = None
+
+
+    def _timeoutWaiting(self, key, waiter):
+        """
+        Fail a request which has waited C{waitingRequestTimeout} seconds for a
+        connection.
+        """
+        waiter.timeoutCall = None
+        self._waiting[key].remove(waiter)
+        if not self._waiting[key]:
+            del self._waiting[key]
+        waiter.deferred.errback(defer.TimeoutError(
+            "No connection to %r became available within %s seconds" % (
+                key, self.waitingRequestTimeout)))
+
+
+    def statistics(self, key=None):
+        """
+        Report on the connections of this pool, for monitoring.
+
+        @param key: If not L{None}, only report on connections stored using
+            this key.  The counts of new and reused connections always cover
+            the whole pool.
+
+        @rtype: L{_PoolStatistics}
+        """
+        if key is None:
+            keys = set(self._active) | set(self._connecting) | set(
+                self._connections) | set(self._waiting)
+        else:
+            keys = [key]
+        return _PoolStatistics(
+            activeConnections=sum(self._activeCount(k) for k in keys),
+            idleConnections=sum(
+                len(self._connections.get(k, ())) for k in keys),
+            waitingRequests=sum(len(self._waiting.get(k, ())) for k in keys),
+            newConnections=self._newCount,
+            reusedConnections=self._reusedCount,
+            pipelinedConnections=self._pipelinedCount)
 
 
     def closeCachedConnections(self):
@@ -1459,10 +2069,11 @@ class HTTPConnectionPool(object):
             closed.
         """
         results = []
-        for protocols in itervalues(self._connections):
+        connections = self._connections
+        self._connections = {}
+        for protocols in itervalues(connections):
             for p in protocols:
                 results.append(p.abort())
-        self._connections = {}
         for dc in itervalues(self._timeouts):
             dc.cancel()
         self._timeouts = {}
@@ -1597,7 +2208,12 @@ class _StandardEndpointFactory(object):
         elif uri.scheme == b'https':
             connectionCreator = self._policyForHTTPS.creatorForNetloc(uri.host,
                                                                       uri.port)
-            return wrapClientTLS(connectionCreator, endpoint)
+            endpoint = wrapClientTLS(connectionCreator, endpoint)
+            acceptableProtocols = getattr(
+                self._policyForHTTPS, 'acceptableProtocols', None) or ()
+            if H2ClientProtocol is not None and b'h2' in acceptableProtocols:
+                endpoint = _HTTP2NegotiatingEndpoint(endpoint)
+            return endpoint
         else:
             raise SchemeNotSupported("Unsupported scheme: %r" % (uri.scheme,))
 
@@ -1982,52 +2598,386 @@ class GzipDecoder(proxyForInterface(IResponse)):
 
 
 
-class _GzipProtocol(proxyForInterface(IProtocol)):
+class DeflateDecoder(proxyForInterface(IResponse)):
     """
-    A L{Protocol} implementation which wraps another one, transparently
-    decompressing received data.
+    A wrapper for a L{Response} instance which handles a body with the
+    I{deflate} content encoding.
+
+    @ivar original: The original L{Response} object.
+    """
+
+    def __init__(self, response):
+        self.original = response
+        self.length = UNKNOWN_LENGTH
+
+
+    def deliverBody(self, protocol):
+        """
+        Override C{deliverBody} to wrap the given C{protocol} with
+        L{_DeflateProtocol}.
+        """
+        self.original.deliverBody(_DeflateProtocol(protocol, self.original))
+
+
+
+class BrotliDecoder(proxyForInterface(IResponse)):
+    """
+    A wrapper for a L{Response} instance which handles a body with the I{br}
+    content encoding.  This requires the C{brotli} package; L{BrotliDecoder},
+    and a L{ContentDecoderAgent} given it, raise L{ImportError} if it is not
+    installed.
+
+    @ivar original: The original L{Response} object.
+    """
+
+    def __init__(self, response):
+        if brotli is None:
+            raise ImportError("Brotli decoding requires the brotli package.")
+        self.original = response
+        self.length = UNKNOWN_LENGTH
+
+
+    def deliverBody(self, protocol):
+        """
+        Override C{deliverBody} to wrap the given C{protocol} with
+        L{_BrotliProtocol}.
+        """
+        self.original.deliverBody(_BrotliProtocol(protocol, self.original))
+
+
+
+@implementer(IPushProducer)
+class _DecoderTransport(object):
+    """
+    The transport given to a protocol wrapped by a L{_DecoderProtocol}.
+
+    Pausing it stops the decoding of data already received as well as the
+    underlying transport.  Other attributes are those of the underlying
+    transport.
+
+    @ivar _transport: The underlying transport.
+
+    @ivar _decoder: The L{_DecoderProtocol}.
+    """
+
+    def __init__(self, transport, decoder):
+        self._transport = transport
+        self._decoder = decoder
+
+
+    def pauseProducing(self):
+        self._decoder._pause()
+
+
+    def resumeProducing(self):
+        self._decoder._resume()
+
+
+    def stopProducing(self):
+        self._transport.stopProducing()
+
+
+    def __getattr__(self, name):
+        return getattr(self._transport, name)
 
-    @ivar _zlibDecompress: A zlib decompress object used to decompress the data
-        stream.
+
+
+class _DecoderProtocol(proxyForInterface(IProtocol)):
+    """
+    A base for L{Protocol} implementations which wrap another one,
+    transparently decoding received data.
+
+    Decoded data is delivered in chunks of at most C{_chunkSize} bytes.  If
+    the wrapped protocol pauses its transport, decoding stops, keeping the
+    data not yet decoded, and the underlying transport is paused too, so a
+    small compressed body cannot be inflated into an unbounded burst of data.
+
+    Subclasses implement C{_decode} and C{_flush}.
 
     @ivar _response: A reference to the original response, in case of errors.
 
-    @since: 11.1
+    @ivar _transport: The underlying transport.
+
+    @ivar _paused: Whether the wrapped protocol paused its transport.
+
+    @ivar _held: Data received while paused, not yet given to C{_decode}.
+
+    @ivar _lostReason: The reason the connection was lost, while decoded
+        data is still to be delivered; L{None} until then.
+
+    @ivar _finished: Whether the wrapped protocol has been told the
+        connection was lost.
     """
+    _chunkSize = 2 ** 16
+    _transport = None
+    _paused = False
+    _held = b''
+    _lostReason = None
+    _finished = False
 
     def __init__(self, protocol, response):
         self.original = protocol
         self._response = response
-        self._zlibDecompress = zlib.decompressobj(16 + zlib.MAX_WBITS)
 
 
-    def dataReceived(self, data):
+    def makeConnection(self, transport):
         """
-        Decompress C{data} with the zlib decompressor, forwarding the raw data
-        to the original protocol.
+        Connect the wrapped protocol to a L{_DecoderTransport}.
         """
-        try:
-            rawData = self._zlibDecompress.decompress(data)
-        except zlib.error:
-            raise ResponseFailed([Failure()], self._response)
-        if rawData:
+        self._transport = transport
+        self.original.makeConnection(_DecoderTransport(transport, self))
+
+
+    def _decode(self, data, maxLength):
+        """
+        Decode some data.
+
+        @param data: The encoded data received since the last call.
+        @type data: L{bytes}
+
+        @param maxLength: The most decoded data to return.
+        @type maxLength: L{int}
+
+        @return: Decoded data, or C{b''} if no more can be decoded until
+            more data is received.
+        @rtype: L{bytes}
+        """
+        raise NotImplementedError()
+
+
+    def _flush(self):
+        """
+        Decode what is left once all the data has been received.
+
+        @rtype: L{bytes}
+        """
+        raise NotImplementedError()
+
+
+    def _deliver(self, data):
+        """
+        Decode C{data} and as much data already received as possible,
+        delivering it to the wrapped protocol until it pauses its transport.
+        """
+        if self._held:
+            data = self._held + data
+            self._held = b''
+        while not self._paused:
+            try:
+                rawData = self._decode(data, self._chunkSize)
+            except Exception:
+                raise ResponseFailed([Failure()], self._response)
+            data = b''
+            if not rawData:
+                break
             self.original.dataReceived(rawData)
+        self._held = data
+        if not self._paused and self._lostReason is not None:
+            self._finish()
+
+
+    def dataReceived(self, data):
+        """
+        Decode C{data}, forwarding the raw data to the original protocol.
+        """
+        self._deliver(data)
 
 
     def connectionLost(self, reason):
         """
-        Forward the connection lost event, flushing remaining data from the
-        decompressor if any.
+        Forward the connection lost event, once all decoded data has been
+        delivered.
+        """
+        self._lostReason = reason
+        self._deliver(b'')
+
+
+    def _finish(self):
+        """
+        Deliver the data left in the decoder and tell the wrapped protocol the
+        connection was lost.
         """
+        if self._finished:
+            return
+        self._finished = True
+        reason = self._lostReason
         try:
-            rawData = self._zlibDecompress.flush()
-        except zlib.error:
+            rawData = self._flush()
+        except Exception:
             raise ResponseFailed([reason, Failure()], self._response)
         if rawData:
             self.original.dataReceived(rawData)
         self.original.connectionLost(reason)
 
 
+    def _pause(self):
+        """
+        Stop decoding and pause the underlying transport.
+        """
+        self._paused = True
+        self._transport.pauseProducing()
+
+
+    def _resume(self):
+        """
+        Decode the data kept while paused, then resume the underlying
+        transport unless the wrapped protocol paused it again.
+        """
+        self._paused = False
+        try:
+            self._deliver(b'')
+        except ResponseFailed as e:
+            self._transport.stopProducing()
+            if not self._finished:
+                self._finished = True
+                self.original.connectionLost(Failure(e))
+            return
+        if not self._paused:
+            self._transport.resumeProducing()
+
+
+
+class _GzipProtocol(_DecoderProtocol):
+    """
+    A L{Protocol} implementation which wraps another one, transparently
+    decompressing received data.
+
+    @ivar _zlibDecompress: A zlib decompress object used to decompress the data
+        stream.
+
+    @ivar _pending: Compressed data left over by the last call to
+        C{_decode}.
+
+    @ivar _more: Whether the last call to C{_decode} returned as much data
+        as it could, so that the decompressor may hold more.
+
+    @since: 11.1
+    """
+    _pending = b''
+    _more = False
+
+    def __init__(self, protocol, response):
+        _DecoderProtocol.__init__(self, protocol, response)
+        self._zlibDecompress = zlib.decompressobj(16 + zlib.MAX_WBITS)
+
+
+    def _decode(self, data, maxLength):
+        """
+        Decompress C{data} with the zlib decompressor, keeping the compressed
+        data left over once C{maxLength} bytes have been produced.
+        """
+        if self._pending:
+            data = self._pending + data
+        if not data and not self._more:
+            return b''
+        rawData = self._zlibDecompress.decompress(data, maxLength)
+        self._pending = self._zlibDecompress.unconsumed_tail
+        self._more = len(rawData) == maxLength
+        return rawData
+
+
+    def _flush(self):
+        """
+        Flush remaining data from the decompressor.
+        """
+        return self._zlibDecompress.flush()
+
+
+
+class _DeflateProtocol(_GzipProtocol):
+    """
+    A L{Protocol} implementation which wraps another one, transparently
+    decompressing data received with the I{deflate} content encoding.
+
+    This is meant to be zlib data, but some servers send raw deflate data
+    instead, so that is accepted too.
+
+    @ivar _started: Whether any data has been decompressed successfully.
+    """
+    _started = False
+
+    def __init__(self, protocol, response):
+        _DecoderProtocol.__init__(self, protocol, response)
+        self._zlibDecompress = zlib.decompressobj()
+
+
+    def _decode(self, data, maxLength):
+        """
+        Decompress C{data}, switching to raw deflate if it does not start
+        with a zlib header.
+        """
+        if self._started:
+            return _GzipProtocol._decode(self, data, maxLength)
+        try:
+            rawData = _GzipProtocol._decode(self, data, maxLength)
+        except zlib.error:
+            self._zlibDecompress = zlib.decompressobj(-zlib.MAX_WBITS)
+            rawData = _GzipProtocol._decode(self, data, maxLength)
+        self._started = bool(rawData or self._pending or data)
+        return rawData
+
+
+
+class _BrotliProtocol(_DecoderProtocol):
+    """
+    A L{Protocol} implementation which wraps another one, transparently
+    decompressing data received with the I{br} content encoding.
+
+    The brotli decompressor cannot limit how much data it produces, so
+    compressed data is given to it C{_inputSize} bytes at a time.
+
+    @ivar _decompressor: The brotli decompressor.
+
+    @ivar _pending: Compressed data, of which that from C{_pendingOffset} on
+        has not been given to the decompressor yet.
+
+    @ivar _output: Decompressed data, of which that from C{_outputOffset} on
+        has not been delivered yet.
+    """
+    _inputSize = 2 ** 10
+    _pending = b''
+    _pendingOffset = 0
+    _output = b''
+    _outputOffset = 0
+
+    def __init__(self, protocol, response):
+        if brotli is None:
+            raise ImportError("Brotli decoding requires the brotli package.")
+        _DecoderProtocol.__init__(self, protocol, response)
+        self._decompressor = brotli.Decompressor()
+
+
+    def _decode(self, data, maxLength):
+        """
+        Decompress C{data}, a slice at a time.
+
+        Offsets into C{_pending} and C{_output} track what is left, so each
+        byte is copied a bounded number of times however much is buffered.
+        """
+        if data:
+            self._pending = self._pending[self._pendingOffset:] + data
+            self._pendingOffset = 0
+        while (self._outputOffset >= len(self._output) and
+               self._pendingOffset < len(self._pending)):
+            start = self._pendingOffset
+            self._pendingOffset = start + self._inputSize
+            self._output = self._decompressor.process(
+                self._pending[start:self._pendingOffset])
+            self._outputOffset = 0
+        start = self._outputOffset
+        self._outputOffset = start + maxLength
+        return self._output[start:self._outputOffset]
+
+
+    def _flush(self):
+        """
+        Check the compressed data was complete.
+        """
+        if not self._decompressor.is_finished():
+            raise brotli.error("Truncated brotli data")
+        return b''
+
+
 
 @implementer(IAgent)
 class ContentDecoderAgent(object):
@@ -2041,7 +2991,12 @@ class ContentDecoderAgent(object):
     For example::
 
         agent = ContentDecoderAgent(Agent(reactor),
-                                    [(b'gzip', GzipDecoder)])
+                                    [(b'gzip', GzipDecoder),
+                                     (b'deflate', DeflateDecoder)])
+
+    The decoders provided decode the body as it arrives, without buffering
+    it, and stop decoding while the protocol given to C{deliverBody} has
+    paused its transport.
 
     @param agent: The agent to wrap
     @type agent: L{IAgent}
@@ -2053,12 +3008,21 @@ class ContentDecoderAgent(object):
         be unique.not be duplicated.
     @type decoders: sequence of (L{bytes}, L{callable}) tuples
 
+    @raise ImportError: If L{BrotliDecoder} is one of the C{decoders} but the
+        C{brotli} package is not installed.
+
     @since: 11.1
 
-    @see: L{GzipDecoder}
+    @see: L{GzipDecoder}, L{DeflateDecoder}, L{BrotliDecoder}
     """
 
     def __init__(self, agent, decoders):
+        if brotli is None:
+            for name, decoder in decoders:
+                if isinstance(decoder, type) and issubclass(
+                        decoder, BrotliDecoder):
+                    raise ImportError(
+                        "Brotli decoding requires the brotli package.")
         self._agent = agent
         self._decoders = dict(decoders)
         self._supported = b','.join([decoder[0] for decoder in decoders])
@@ -2326,8 +3290,10 @@ __all__ = [
     'Agent',
     'BrowserLikePolicyForHTTPS',
     'BrowserLikeRedirectAgent',
+    'BrotliDecoder',
     'ContentDecoderAgent',
     'CookieAgent',
+    'DeflateDecoder',
     'downloadPage',
     'getPage',
     'GzipDecoder',
@@ -557,6 +557,25 @@ class ITemplateLoader(Interface):
 
 
 
+class _IPrecompiledTemplateLoader(ITemplateLoader):
+    """
+    A template loader which can also supply a copy of its template with the
+    static parts flattened ahead of time, for L{twisted.web.template.Element}
+    to render instead of the template returned by C{load}.
+    """
+
+    def loadPrecompiled():
+        """
+        Load the template to render.
+
+        @return: The template returned by C{load}, or a copy of it with its
+            static parts flattened.  The copy is shared by every render and
+            must not be changed.
+        @rtype: a L{list} of Stan objects.
+        """
+
+
+
 class IResponse(Interface):
     """
     An object representing an HTTP response received from an HTTP server.
@@ -836,6 +855,6 @@ UNKNOWN_LENGTH = u"twisted.web.iweb.UNKNOWN_LENGTH"
 __all__ = [
     "IUsernameDigestHash", "ICredentialFactory", "IRequest",
     "IBodyProducer", "IRenderable", "IResponse", "_IRequestEncoder",
-    "_IRequestEncoderFactory", "IClientRequest",
+    "_IRequestEncoderFactory", "IClientRequest", "_IPrecompiledTemplateLoader",
 
     "UNKNOWN_LENGTH"]
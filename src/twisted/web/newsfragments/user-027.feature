@@ -0,0 +1 @@
+twisted.web.client.HTTPConnectionPool now has maxConnectionsPerHost, queueing requests once that many connections to a host are in use, waitingRequestTimeout, and a statistics method reporting active, idle and waiting counts and connection reuse.
@@ -0,0 +1 @@
+twisted.web.client.HTTPConnectionPool now pipelines up to pipelineDepth HTTP/1.1 requests over each persistent connection when pipelineDepth is set above its default of 1, retrying a request once, as for unpipelined ones, if the connection is lost before its response arrives.
@@ -0,0 +1 @@
+twisted.web.client.Agent now speaks HTTP/2 to servers which negotiate it through ALPN, when h2 is installed and the acceptableProtocols of twisted.web.client.BrowserLikePolicyForHTTPS include b'h2', sending concurrent requests to the same server over one connection.
@@ -0,0 +1 @@
+twisted.web.client.ContentDecoderAgent now decodes response bodies as they arrive, honouring pauseProducing, and twisted.web.client.DeflateDecoder and twisted.web.client.BrotliDecoder decode deflate and, when brotli is installed, br content encodings.
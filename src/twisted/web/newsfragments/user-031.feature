@@ -0,0 +1 @@
+twisted.web.template.flatten and renderElement now buffer output into fewer, larger writes, and twisted.web.template.XMLString and XMLFile precompile the static markup of their templates, making rendering faster.
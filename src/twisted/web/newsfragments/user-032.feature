@@ -0,0 +1 @@
+twisted.web.template.XMLFile now parses each file only once, sharing the result between loaders of the same unchanged file.
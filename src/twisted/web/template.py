@@ -29,6 +29,7 @@ __all__ = [
 import warnings
 
 from collections import OrderedDict
+from time import time
 
 from zope.interface import implementer
 
@@ -37,7 +38,7 @@ from xml.sax import make_parser, handler
 from twisted.python.compat import NativeStringIO, items
 from twisted.python.filepath import FilePath
 from twisted.web._stan import Tag, slot, Comment, CDATA, CharRef
-from twisted.web.iweb import ITemplateLoader
+from twisted.web.iweb import ITemplateLoader, _IPrecompiledTemplateLoader
 from twisted.logger import Logger
 
 TEMPLATE_NAMESPACE = 'http://twistedmatrix.com/ns/twisted.web.template/0.1'
@@ -380,13 +381,19 @@ class TagLoader(object):
 
 
 
-@implementer(ITemplateLoader)
+@implementer(_IPrecompiledTemplateLoader)
 class XMLString(object):
     """
     An L{ITemplateLoader} that loads and parses XML from a string.
 
     @ivar _loadedTemplate: The loaded document.
     @type _loadedTemplate: a C{list} of Stan objects.
+
+    @ivar _precompiledTemplate: A copy of C{_loadedTemplate} with its static
+        parts flattened, which is what is rendered.  It is shared by every
+        render, so renderers must not change the tags they are given beyond
+        their own copy.
+    @type _precompiledTemplate: a C{list} of Stan objects.
     """
 
     def __init__(self, s):
@@ -400,6 +407,8 @@ class XMLString(object):
             s = s.decode('utf8')
 
         self._loadedTemplate = _flatsaxParse(NativeStringIO(s))
+        self._precompiledTemplate = _precompile(
+            _copyTemplate(self._loadedTemplate))
 
 
     def load(self):
@@ -412,18 +421,104 @@ class XMLString(object):
         return self._loadedTemplate
 
 
+    def loadPrecompiled(self):
+        """
+        Return the document to render.
 
-@implementer(ITemplateLoader)
+        @return: the loaded document with its static parts flattened, unless
+            L{load} is overridden to return some other document.
+        @rtype: a C{list} of Stan objects.
+        """
+        document = self.load()
+        if document is self._loadedTemplate:
+            return self._precompiledTemplate
+        return document
+
+
+
+# Templates loaded by XMLFile from a FilePath, keyed by path, as two-tuples of
+# the modification time of the file when it was parsed and the document.  The
+# least recently loaded are discarded once there are more than
+# _templateCacheSize of them.  The documents are only ever copied, never
+# rendered or handed out.
+_templateCache = OrderedDict()
+_templateCacheSize = 128
+
+
+
+def _copyTemplate(root):
+    """
+    Copy a loaded template.
+
+    @param root: A loaded template, or part of one.
+
+    @return: A copy of C{root}, with its own L{Tag}s and L{slot}s.
+    """
+    if isinstance(root, list):
+        return [_copyTemplate(element) for element in root]
+    if isinstance(root, Tag):
+        copy = Tag(
+            root.tagName,
+            attributes=OrderedDict(
+                (key, _copyTemplate(value))
+                for (key, value) in items(root.attributes)),
+            children=_copyTemplate(root.children),
+            render=root.render,
+            filename=root.filename,
+            lineNumber=root.lineNumber,
+            columnNumber=root.columnNumber)
+        if root.slotData is not None:
+            copy.slotData = dict(root.slotData)
+        return copy
+    if isinstance(root, slot):
+        copy = slot(
+            root.name, default=root.default, filename=root.filename,
+            lineNumber=root.lineNumber, columnNumber=root.columnNumber)
+        copy.children = _copyTemplate(root.children)
+        return copy
+    return root
+
+
+
+@implementer(_IPrecompiledTemplateLoader)
 class XMLFile(object):
     """
     An L{ITemplateLoader} that loads and parses XML from a file.
 
+    Templates loaded from a L{FilePath} are parsed once per file and shared by
+    all the L{XMLFile}s loading that file, each getting its own copies of the
+    document, both as loaded and precompiled, so that nothing one of them
+    renders can change what another renders.  They are parsed again when the modification time of the file
+    changes, which is checked at most once every C{_checkInterval} seconds, or
+    when L{XMLFile.reload} is called.
+
     @ivar _loadedTemplate: The loaded document, or L{None}, if not loaded.
     @type _loadedTemplate: a C{list} of Stan objects, or L{None}.
 
+    @ivar _precompiledTemplate: A copy of C{_loadedTemplate} with its static
+        parts flattened, which is what is rendered, or L{None}, if not loaded.
+        It is shared by every render of this L{XMLFile}, so renderers must not
+        change the tags they are given beyond their own copy.
+    @type _precompiledTemplate: a C{list} of Stan objects, or L{None}.
+
+    @ivar _loadedTime: The modification time of the file when
+        C{_loadedTemplate} was parsed, if it was loaded from a L{FilePath}.
+
+    @ivar _checkedTime: When the modification time of the file was last
+        checked, according to C{_seconds}.
+
+    @ivar _checkInterval: How long C{_loadedTemplate} is returned for before
+        the modification time of the file is checked again, in seconds.
+
+    @ivar _seconds: A callable returning the current time in seconds.
+
     @ivar _path: The L{FilePath}, file object, or filename that is being
         loaded from.
     """
+    _loadedTime = None
+    _checkedTime = None
+    _checkInterval = 1
+    _seconds = staticmethod(time)
 
     def __init__(self, path):
         """
@@ -438,6 +533,7 @@ class XMLFile(object):
                 "since Twisted 12.1.  Pass a FilePath instead.",
                 category=DeprecationWarning, stacklevel=2)
         self._loadedTemplate = None
+        self._precompiledTemplate = None
         self._path = path
 
 
@@ -455,6 +551,20 @@ class XMLFile(object):
                 return _flatsaxParse(f)
 
 
+    def _modificationTime(self):
+        """
+        Get the current modification time of the file being loaded from.
+
+        @return: The modification time, or L{None} if the file cannot be
+            examined.
+        @rtype: L{float} or L{None}
+        """
+        self._path.restat(False)
+        if not self._path.exists():
+            return None
+        return self._path.getModificationTime()
+
+
     def __repr__(self):
         return '<XMLFile of %r>' % (self._path,)
 
@@ -466,11 +576,62 @@ class XMLFile(object):
         @return: the loaded document.
         @rtype: a C{list} of Stan objects.
         """
-        if self._loadedTemplate is None:
-            self._loadedTemplate = self._loadDoc()
+        if not isinstance(self._path, FilePath):
+            if self._loadedTemplate is None:
+                self._loadedTemplate = self._loadDoc()
+                self._precompiledTemplate = _precompile(
+                    _copyTemplate(self._loadedTemplate))
+            return self._loadedTemplate
+
+        now = self._seconds()
+        if self._loadedTemplate is not None:
+            if 0 <= now - self._checkedTime < self._checkInterval:
+                return self._loadedTemplate
+        self._checkedTime = now
+        modified = self._modificationTime()
+        if self._loadedTemplate is not None and (
+                modified is None or modified == self._loadedTime):
+            return self._loadedTemplate
+        cached = _templateCache.pop(self._path.path, None)
+        if cached is None or cached[0] != modified:
+            cached = (modified, self._loadDoc())
+        _templateCache[self._path.path] = cached
+        while len(_templateCache) > _templateCacheSize:
+            _templateCache.popitem(last=False)
+        self._loadedTime, document = cached
+        self._loadedTemplate = _copyTemplate(document)
+        self._precompiledTemplate = _precompile(_copyTemplate(document))
         return self._loadedTemplate
 
 
+    def loadPrecompiled(self):
+        """
+        Return the document to render, first loading it if necessary.
+
+        @return: the loaded document with its static parts flattened, unless
+            L{load} is overridden to return some other document.
+        @rtype: a C{list} of Stan objects.
+        """
+        document = self.load()
+        if document is self._loadedTemplate:
+            return self._precompiledTemplate
+        return document
+
+
+    def reload(self):
+        """
+        Parse the file again, even if its modification time has not changed,
+        replacing the template shared with other L{XMLFile}s loading it.
+
+        @return: the loaded document.
+        @rtype: a C{list} of Stan objects.
+        """
+        self._loadedTemplate = None
+        if isinstance(self._path, FilePath):
+            _templateCache.pop(self._path.path, None)
+        return self.load()
+
+
 
 # Last updated October 2011, using W3Schools as a reference. Link:
 # http://www.w3schools.com/html5/html5_reference.asp
@@ -571,5 +732,5 @@ def renderElement(request, element,
 
 
 from twisted.web._element import Element, renderer
-from twisted.web._flatten import flatten, flattenString
+from twisted.web._flatten import flatten, flattenString, _precompile
 import twisted.web.util
@@ -51,6 +51,7 @@ from twisted.internet.endpoints import HostnameEndpoint
 from twisted.test.proto_helpers import AccumulatingProtocol
 from twisted.test.iosim import IOPump, FakeTransport
 from twisted.test.test_sslverify import certificatesForAuthorityAndServer
+from twisted.test.test_sslverify import skipALPN
 from twisted.web.test.injectionhelpers import (
     MethodInjectionTestsMixin,
     URIInjectionTestsMixin,
@@ -81,6 +82,19 @@ else:
             self.called = True
             self.context = context
 
+try:
+    from twisted.web._http2client import H2ClientProtocol
+
+    # These third-party imports are guaranteed to be present if HTTP/2 support
+    # is compiled in.
+    import h2.config
+    import h2.connection
+    import h2.events
+except ImportError:
+    skipH2 = "HTTP/2 support not enabled"
+else:
+    skipH2 = None
+
 
 
 class StubHTTPProtocol(Protocol):
@@ -485,6 +499,30 @@ class HTTPConnectionPoolTests(TestCase, FakeReactorAndConnectMixin):
         return d.addCallback(gotConnection)
 
 
+    def test_newConnectionFactoryArguments(self):
+        """
+        L{HTTPConnectionPool} creates the factory for a new connection with
+        its C{pipelineDepth} and a callback telling it of the connection's
+        loss, when the factory is an L{_HTTP11ClientFactory}.
+        """
+        factories = []
+
+        class RecordingFactory(_HTTP11ClientFactory):
+            def __init__(self, *args, **kwargs):
+                _HTTP11ClientFactory.__init__(self, *args, **kwargs)
+                factories.append(self)
+
+        self.pool._factory = RecordingFactory
+        self.pool.pipelineDepth = 3
+        protocol = self.successResultOf(
+            self.pool.getConnection(12245, DummyEndpoint()))
+        [factory] = factories
+        self.assertEqual(factory._pipelineDepth, 3)
+        self.assertIn(protocol, self.pool._active[12245].values())
+        protocol.connectionLost(Failure(ConnectionDone()))
+        self.assertNotIn(12245, self.pool._active)
+
+
     def test_putStartsTimeout(self):
         """
         If a connection is put back to the pool, a 240-sec timeout is started.
@@ -775,6 +813,470 @@ class HTTPConnectionPoolTests(TestCase, FakeReactorAndConnectMixin):
 
 
 
+class HTTPConnectionPoolLimitTests(TestCase, FakeReactorAndConnectMixin):
+    """
+    Tests for L{HTTPConnectionPool.maxConnectionsPerHost} and
+    L{HTTPConnectionPool.statistics}.
+    """
+    def setUp(self):
+        self.fakeReactor = self.createReactor()
+        self.pool = HTTPConnectionPool(self.fakeReactor)
+        self.pool.retryAutomatically = False
+        self.pool.maxConnectionsPerHost = 1
+        self.key = ("http", b"example.com", 80)
+
+
+    def finishRequest(self, protocol):
+        """
+        Make C{protocol} quiescent and return it to the pool, as
+        L{HTTP11ClientProtocol} does once a response has been received.
+        """
+        protocol._state = "QUIESCENT"
+        protocol._quiescentCallback(protocol)
+
+
+    def test_noLimitByDefault(self):
+        """
+        L{HTTPConnectionPool.maxConnectionsPerHost} is L{None} by default, so
+        any number of connections may be in use at once.
+        """
+        pool = HTTPConnectionPool(self.fakeReactor)
+        self.assertIsNone(pool.maxConnectionsPerHost)
+        for i in range(5):
+            self.successResultOf(pool.getConnection(self.key, DummyEndpoint()))
+        self.assertEqual(pool.statistics().activeConnections, 5)
+
+
+    def test_waitForFreedConnection(self):
+        """
+        When C{maxConnectionsPerHost} connections are in use, further
+        requests for a connection wait until one is returned to the pool, and
+        are then given that connection.
+        """
+        first = self.successResultOf(
+            self.pool.getConnection(self.key, DummyEndpoint()))
+        d = self.pool.getConnection(self.key, BadEndpoint())
+        self.assertNoResult(d)
+
+        self.finishRequest(first)
+        self.assertNoResult(d)
+        self.fakeReactor.advance(0)
+        self.assertIs(self.successResultOf(d), first)
+        self.assertEqual(self.pool._connections[self.key], [])
+
+
+    def test_waitingIsFirstInFirstOut(self):
+        """
+        Requests waiting for a connection are given one in the order they
+        asked for it, before any request made after the connection was freed.
+        """
+        first = self.successResultOf(
+            self.pool.getConnection(self.key, DummyEndpoint()))
+        results = []
+        for i in range(2):
+            self.pool.getConnection(self.key, DummyEndpoint()).addCallback(
+                lambda connection, i=i: results.append((i, connection)))
+
+        self.finishRequest(first)
+        later = self.pool.getConnection(self.key, DummyEndpoint())
+        self.fakeReactor.advance(0)
+        self.assertEqual(results, [(0, first)])
+        self.assertNoResult(later)
+
+        self.finishRequest(first)
+        self.fakeReactor.advance(0)
+        self.assertEqual(results, [(0, first), (1, first)])
+
+
+    def test_connectionLostServesWaiting(self):
+        """
+        When a connection in use is lost, a new connection is opened for the
+        oldest waiting request.
+        """
+        first = self.successResultOf(
+            self.pool.getConnection(self.key, DummyEndpoint()))
+        d = self.pool.getConnection(self.key, DummyEndpoint())
+        self.assertNoResult(d)
+
+        first.connectionLost(Failure(ConnectionDone()))
+        second = self.successResultOf(d)
+        self.assertIsInstance(second, HTTP11ClientProtocol)
+        self.assertIsNot(second, first)
+        self.assertEqual(self.pool.statistics().activeConnections, 1)
+
+
+    def test_connectionFailedServesWaiting(self):
+        """
+        When a connection attempt fails, the oldest waiting request gets to
+        try in its place.
+        """
+        attempt = Deferred()
+
+        class Endpoint(object):
+            def connect(self, factory):
+                return attempt
+
+        d1 = self.pool.getConnection(self.key, Endpoint())
+        d2 = self.pool.getConnection(self.key, DummyEndpoint())
+        self.assertNoResult(d2)
+
+        attempt.errback(ConnectionRefusedError())
+        self.failureResultOf(d1, ConnectionRefusedError)
+        self.assertIsInstance(self.successResultOf(d2), HTTP11ClientProtocol)
+
+
+    def test_waitingRequestTimeout(self):
+        """
+        A request which has waited C{waitingRequestTimeout} seconds for a
+        connection fails with L{defer.TimeoutError} and leaves the queue.
+        """
+        self.pool.waitingRequestTimeout = 5
+        self.successResultOf(
+            self.pool.getConnection(self.key, DummyEndpoint()))
+        d = self.pool.getConnection(self.key, BadEndpoint())
+
+        self.fakeReactor.advance(4)
+        self.assertNoResult(d)
+        self.fakeReactor.advance(1)
+        self.failureResultOf(d, defer.TimeoutError)
+        self.assertEqual(self.pool.statistics().waitingRequests, 0)
+
+
+    def test_cancelWaiting(self):
+        """
+        Cancelling a request waiting for a connection removes it from the
+        queue and cancels its timeout.
+        """
+        self.pool.waitingRequestTimeout = 5
+        first = self.successResultOf(
+            self.pool.getConnection(self.key, DummyEndpoint()))
+        d = self.pool.getConnection(self.key, BadEndpoint())
+
+        d.cancel()
+        self.failureResultOf(d, CancelledError)
+        self.assertEqual(self.pool.statistics().waitingRequests, 0)
+
+        self.finishRequest(first)
+        self.assertEqual(self.pool._connections[self.key], [first])
+        self.assertEqual(len(self.fakeReactor.getDelayedCalls()), 1)
+
+
+    def test_idleConnectionLost(self):
+        """
+        A cached connection which is lost is removed from the pool and its
+        timeout is cancelled.
+        """
+        protocol = self.successResultOf(
+            self.pool.getConnection(self.key, DummyEndpoint()))
+        self.finishRequest(protocol)
+        self.assertEqual(self.pool._connections[self.key], [protocol])
+
+        protocol.connectionLost(Failure(ConnectionDone()))
+        self.assertEqual(self.pool._connections[self.key], [])
+        self.assertEqual(self.pool._timeouts, {})
+        self.assertEqual(self.fakeReactor.getDelayedCalls(), [])
+
+
+    def test_forgetKeys(self):
+        """
+        L{HTTPConnectionPool} forgets a key once none of its connections are
+        in use or being established.
+        """
+        attempt = Deferred()
+
+        class Endpoint(object):
+            def connect(self, factory):
+                return attempt
+
+        d = self.pool.getConnection(self.key, Endpoint())
+        self.assertEqual(self.pool._connecting, {self.key: 1})
+        attempt.errback(ConnectionRefusedError())
+        self.failureResultOf(d, ConnectionRefusedError)
+        self.assertEqual(self.pool._connecting, {})
+
+        first = self.successResultOf(
+            self.pool.getConnection(self.key, DummyEndpoint()))
+        self.assertEqual(list(self.pool._active), [self.key])
+        self.finishRequest(first)
+        self.assertEqual((self.pool._active, self.pool._connecting), ({}, {}))
+
+        second = self.successResultOf(
+            self.pool.getConnection(self.key, DummyEndpoint()))
+        second.connectionLost(Failure(ConnectionDone()))
+        self.assertEqual((self.pool._active, self.pool._connecting), ({}, {}))
+
+
+    def test_statistics(self):
+        """
+        L{HTTPConnectionPool.statistics} reports active, idle and waiting
+        counts, overall or for one key, and how often connections were
+        reused.
+        """
+        self.pool.maxConnectionsPerHost = 2
+        otherKey = ("http", b"example.net", 80)
+        first = self.successResultOf(
+            self.pool.getConnection(self.key, DummyEndpoint()))
+        self.successResultOf(
+            self.pool.getConnection(self.key, DummyEndpoint()))
+        self.pool.getConnection(self.key, DummyEndpoint())
+        other = self.successResultOf(
+            self.pool.getConnection(otherKey, DummyEndpoint()))
+        self.finishRequest(other)
+
+        stats = self.pool.statistics()
+        self.assertEqual(
+            (stats.activeConnections, stats.idleConnections,
+             stats.waitingRequests, stats.newConnections,
+             stats.reusedConnections),
+            (2, 1, 1, 3, 0))
+        self.assertEqual(stats.reuseRate, 0.0)
+
+        stats = self.pool.statistics(otherKey)
+        self.assertEqual(
+            (stats.activeConnections, stats.idleConnections,
+             stats.waitingRequests),
+            (0, 1, 0))
+
+        self.finishRequest(first)
+        self.fakeReactor.advance(0)
+        stats = self.pool.statistics(self.key)
+        self.assertEqual(
+            (stats.activeConnections, stats.idleConnections,
+             stats.waitingRequests, stats.reusedConnections),
+            (2, 0, 0, 1))
+        self.assertEqual(stats.reuseRate, 0.25)
+
+
+
+class HTTPConnectionPoolPipeliningTests(TestCase, FakeReactorAndConnectMixin):
+    """
+    Tests for L{HTTPConnectionPool.pipelineDepth}.
+    """
+    def setUp(self):
+        self.fakeReactor = self.createReactor()
+        self.pool = HTTPConnectionPool(self.fakeReactor)
+        self.pool.pipelineDepth = 2
+        self.key = ("http", b"example.com", 80)
+
+
+    def request(self, connection, method=b'GET', bodyProducer=None):
+        """
+        Make a persistent request using C{connection}.
+        """
+        return connection.request(
+            Request(method, b'/', Headers({b'host': [b'example.com']}),
+                    bodyProducer, persistent=True))
+
+
+    def test_pipelinedConnectionPreferred(self):
+        """
+        When no connection is cached, a request for a connection is given one
+        which is waiting for a response rather than a new one.
+        """
+        first = self.successResultOf(
+            self.pool.getConnection(self.key, DummyEndpoint()))
+        self.request(first)
+
+        second = self.successResultOf(
+            self.pool.getConnection(self.key, BadEndpoint()))
+        self.assertNoResult(self.request(second))
+        self.assertEqual(len(first._pipelined), 1)
+        self.assertEqual(self.pool.statistics().pipelinedConnections, 1)
+        self.assertEqual(self.pool.statistics().activeConnections, 1)
+
+
+    def test_unpipelinableRequestUsesAnotherConnection(self):
+        """
+        A request which cannot be pipelined is sent over another connection,
+        even when given a connection waiting for a response.
+        """
+        first = self.successResultOf(
+            self.pool.getConnection(self.key, DummyEndpoint()))
+        self.request(first)
+        second = self.successResultOf(
+            self.pool.getConnection(self.key, DummyEndpoint()))
+
+        self.assertNoResult(self.request(second, method=b'POST'))
+        self.assertEqual(len(first._pipelined), 0)
+        self.assertEqual(self.pool.statistics().activeConnections, 2)
+
+
+    def test_pipelineFull(self):
+        """
+        Once every connection waiting for a response has C{pipelineDepth}
+        requests outstanding, a new connection is opened.
+        """
+        first = self.successResultOf(
+            self.pool.getConnection(self.key, DummyEndpoint()))
+        self.request(first)
+        self.request(self.successResultOf(
+            self.pool.getConnection(self.key, BadEndpoint())))
+
+        third = self.successResultOf(
+            self.pool.getConnection(self.key, DummyEndpoint()))
+        self.assertIsInstance(third, HTTP11ClientProtocol)
+        self.assertIsNot(third, first)
+
+
+    def test_retryPipelinedOnConnectionLost(self):
+        """
+        A pipelined idempotent request whose connection is lost before its
+        response arrives is retried once over another connection.
+        """
+        first = self.successResultOf(
+            self.pool.getConnection(self.key, DummyEndpoint()))
+        firstResult = self.request(first)
+        wrapper = self.successResultOf(
+            self.pool.getConnection(self.key, DummyEndpoint()))
+        result = self.request(wrapper)
+
+        first.connectionLost(Failure(ConnectionDone()))
+        self.failureResultOf(firstResult, ResponseNeverReceived)
+        self.assertNoResult(result)
+        [retried] = self.pool._active[self.key].values()
+        self.assertIsNot(retried, first)
+
+        retried.dataReceived(
+            b"HTTP/1.1 200 OK\r\n"
+            b"Content-Length: 0\r\n"
+            b"\r\n")
+        self.assertEqual(self.successResultOf(result).code, 200)
+
+
+
+class HTTP2Endpoint(object):
+    """
+    An endpoint whose connections negotiate HTTP/2, using a fake transport.
+
+    @ivar pending: If C{True}, L{connect} returns a L{Deferred} which is only
+        fired by L{finishConnecting}.
+
+    @ivar protocols: The protocols connected, in order.
+    """
+
+    def __init__(self, pending=False):
+        self.pending = pending
+        self.protocols = []
+
+
+    def connect(self, factory):
+        protocol = factory._buildHTTP2Protocol(None)
+        protocol.makeConnection(StringTransport())
+        self.protocols.append(protocol)
+        if self.pending:
+            self._connecting = Deferred()
+            return self._connecting
+        return succeed(protocol)
+
+
+    def finishConnecting(self):
+        """
+        Fire the L{Deferred} returned by the last call to L{connect}.
+        """
+        self._connecting.callback(self.protocols[-1])
+
+
+
+class HTTPConnectionPoolHTTP2Tests(TestCase, FakeReactorAndConnectMixin):
+    """
+    Tests for L{HTTPConnectionPool} with connections which negotiated HTTP/2.
+    """
+    skip = skipH2
+
+    def setUp(self):
+        self.fakeReactor = self.createReactor()
+        self.pool = HTTPConnectionPool(self.fakeReactor)
+        self.key = ("https", b"example.com", 443)
+
+
+    def request(self, connection):
+        """
+        Make a persistent request using C{connection}.
+        """
+        return connection.request(
+            Request(b'GET', b'/', Headers({b'host': [b'example.com']}),
+                    None, persistent=True))
+
+
+    def test_concurrentRequestsShareConnection(self):
+        """
+        A request for a connection while an HTTP/2 connection is in use is
+        given that connection, to multiplex another stream over it, even
+        though C{pipelineDepth} is one.
+        """
+        first = self.successResultOf(
+            self.pool.getConnection(self.key, HTTP2Endpoint()))
+        self.assertIsInstance(first, H2ClientProtocol)
+        self.request(first)
+
+        second = self.successResultOf(
+            self.pool.getConnection(self.key, BadEndpoint()))
+        self.assertNoResult(self.request(second))
+        self.assertEqual(first._queuedRequests(), 2)
+        statistics = self.pool.statistics()
+        self.assertEqual(statistics.activeConnections, 1)
+        self.assertEqual(statistics.pipelinedConnections, 1)
+
+
+    def test_quiescentConnectionCached(self):
+        """
+        An HTTP/2 connection with no outstanding requests is returned to the
+        pool, and reused for the next request.
+        """
+        connection = self.successResultOf(
+            self.pool.getConnection(self.key, HTTP2Endpoint()))
+        d = self.request(connection)
+        d.cancel()
+        self.failureResultOf(d, CancelledError)
+        self.assertEqual(self.pool._connections[self.key], [connection])
+
+        reused = self.successResultOf(
+            self.pool.getConnection(self.key, BadEndpoint()))
+        self.assertIs(reused._clientProtocol, connection)
+        self.assertEqual(self.pool.statistics().reusedConnections, 1)
+
+
+    def test_awaitConnectionInProgress(self):
+        """
+        Once a key is known to speak HTTP/2, requests for a connection while
+        one is being established wait to share it rather than opening their
+        own.
+        """
+        self.successResultOf(
+            self.pool.getConnection(self.key, HTTP2Endpoint())
+        ).connectionLost(Failure(ConnectionDone()))
+
+        endpoint = HTTP2Endpoint(pending=True)
+        first = self.pool.getConnection(self.key, endpoint)
+        second = self.pool.getConnection(self.key, BadEndpoint())
+        self.assertNoResult(first)
+        self.assertNoResult(second)
+
+        endpoint.finishConnecting()
+        connection = self.successResultOf(first)
+        wrapper = self.successResultOf(second)
+        self.assertIs(wrapper._clientProtocol, connection)
+        self.assertEqual(self.pool.statistics().newConnections, 2)
+
+
+    def test_cancelAwaitingConnection(self):
+        """
+        Cancelling a request waiting for a connection being established
+        stops it waiting.
+        """
+        self.successResultOf(
+            self.pool.getConnection(self.key, HTTP2Endpoint())
+        ).connectionLost(Failure(ConnectionDone()))
+        endpoint = HTTP2Endpoint(pending=True)
+        self.pool.getConnection(self.key, endpoint)
+        d = self.pool.getConnection(self.key, BadEndpoint())
+        d.cancel()
+        self.failureResultOf(d, CancelledError)
+        endpoint.finishConnecting()
+        self.assertEqual(self.pool._awaitingConnection, {})
+
+
+
 class AgentTestsMixin(object):
     """
     Tests for any L{IAgent} implementation.
@@ -1599,6 +2101,160 @@ class AgentHTTPSTests(TestCase, FakeReactorAndConnectMixin,
 
 
 
+class HTTP2Responder(Protocol):
+    """
+    A minimal HTTP/2 server, which responds to each request with its path.
+
+    @ivar requests: The header blocks of the requests received.
+    """
+
+    def connectionMade(self):
+        self.requests = []
+        self.conn = h2.connection.H2Connection(h2.config.H2Configuration(
+            client_side=False, header_encoding=None))
+        self.conn.initiate_connection()
+        self.transport.write(self.conn.data_to_send())
+
+
+    def dataReceived(self, data):
+        for event in self.conn.receive_data(data):
+            if isinstance(event, h2.events.RequestReceived):
+                headers = dict(event.headers)
+                self.requests.append(headers)
+                self.conn.send_headers(event.stream_id, [(b':status', b'200')])
+                self.conn.send_data(
+                    event.stream_id, headers[b':path'], end_stream=True)
+        self.transport.write(self.conn.data_to_send())
+
+
+
+class AgentHTTP2Tests(TestCase, FakeReactorAndConnectMixin):
+    """
+    Tests for L{Agent} speaking HTTP/2 to servers which choose it using ALPN.
+    """
+    if skipWhenNoSSL:
+        skip = skipWhenNoSSL
+    elif skipALPN:
+        skip = skipALPN
+    elif skipH2:
+        skip = skipH2
+
+
+    def test_endpointNegotiatesProtocol(self):
+        """
+        If the HTTPS policy offers C{h2}, the endpoint for an I{https} URI
+        chooses the protocol for each connection once the TLS handshake
+        completes.
+        """
+        from twisted.internet.endpoints import _WrapperEndpoint
+        policy = BrowserLikePolicyForHTTPS(
+            acceptableProtocols=[b'h2', b'http/1.1'])
+        endpoint = client.Agent(self.createReactor(), policy)._getEndpoint(
+            URI.fromBytes(b'https://example.com/'))
+        self.assertIsInstance(endpoint, client._HTTP2NegotiatingEndpoint)
+        self.assertIsInstance(endpoint._endpoint, _WrapperEndpoint)
+
+
+    def negotiate(self, negotiatedProtocol):
+        """
+        Complete the handshake of a L{client._HTTP2NegotiatingProtocol} which
+        negotiated C{negotiatedProtocol}.
+
+        @return: The protocol chosen.
+        """
+        factory = client._HTTP11ClientFactory(lambda p: None, "metadata")
+        protocol = client._HTTP2NegotiatingFactory(factory).buildProtocol(None)
+        transport = StringTransport()
+        transport.negotiatedProtocol = negotiatedProtocol
+        protocol.makeConnection(transport)
+        self.assertNoResult(protocol.negotiated)
+        protocol.handshakeCompleted()
+        chosen = self.successResultOf(protocol.negotiated)
+        self.assertIs(chosen.transport, transport)
+        return chosen
+
+
+    def test_negotiatedHTTP2(self):
+        """
+        A connection which negotiated C{h2} is handed over to an
+        L{H2ClientProtocol}.
+        """
+        self.assertIsInstance(self.negotiate(b'h2'), H2ClientProtocol)
+
+
+    def test_negotiatedHTTP11(self):
+        """
+        A connection which negotiated another protocol, or none, is handed
+        over to an L{HTTP11ClientProtocol}.
+        """
+        self.assertIsInstance(self.negotiate(b'http/1.1'), HTTP11ClientProtocol)
+        self.assertIsInstance(self.negotiate(None), HTTP11ClientProtocol)
+
+
+    def test_handshakeFailed(self):
+        """
+        If the connection is lost before the handshake completes, the
+        L{Deferred} for the chosen protocol fails.
+        """
+        factory = client._HTTP11ClientFactory(lambda p: None, "metadata")
+        protocol = client._HTTP2NegotiatingFactory(factory).buildProtocol(None)
+        protocol.makeConnection(StringTransport())
+        protocol.connectionLost(Failure(ConnectionLost()))
+        self.failureResultOf(protocol.negotiated, ConnectionLost)
+
+
+    def test_integration(self):
+        """
+        L{Agent} negotiates HTTP/2 with a server which chooses it, and sends
+        later requests over the same connection.
+        """
+        authority, server = certificatesForAuthorityAndServer(u'example.com')
+        reactor = self.createReactor()
+        policy = BrowserLikePolicyForHTTPS(
+            trustRoot=authority, acceptableProtocols=[b'h2', b'http/1.1'])
+        agent = client.Agent(reactor, policy, pool=HTTPConnectionPool(reactor))
+
+        deferred = agent.request(b"GET", b"https://example.com/first")
+        host, port, factory, timeout, bind = reactor.tcpClients[0]
+        peerAddress = IPv4Address('TCP', host, port)
+        clientProtocol = factory.buildProtocol(peerAddress)
+        clientTransport = FakeTransport(clientProtocol, False,
+                                        peerAddress=peerAddress)
+        clientProtocol.makeConnection(clientTransport)
+        serverOptions = ssl.CertificateOptions(
+            privateKey=server.privateKey.original,
+            certificate=server.original,
+            acceptableProtocols=[b'h2'])
+        responders = []
+        serverFactory = TLSMemoryBIOFactory(
+            serverOptions, False, Factory.forProtocol(
+                lambda: responders.append(HTTP2Responder()) or responders[-1]))
+        serverProtocol = serverFactory.buildProtocol(None)
+        serverTransport = FakeTransport(serverProtocol, True)
+        serverProtocol.makeConnection(serverTransport)
+        pump = IOPump(clientProtocol, serverProtocol,
+                      clientTransport, serverTransport, False)
+        pump.flush()
+
+        response = self.successResultOf(deferred)
+        self.assertEqual(response.version, (b'HTTP', 2, 0))
+        self.assertEqual(self.successResultOf(client.readBody(response)),
+                         b'/first')
+        pump.flush()
+
+        deferred = agent.request(b"GET", b"https://example.com/second")
+        pump.flush()
+        response = self.successResultOf(deferred)
+        self.assertEqual(self.successResultOf(client.readBody(response)),
+                         b'/second')
+        self.assertEqual(len(reactor.tcpClients), 1)
+        [responder] = responders
+        self.assertEqual(
+            [request[b':authority'] for request in responder.requests],
+            [b'example.com', b'example.com'])
+
+
+
 class WebClientContextFactoryTests(TestCase):
     """
     Tests for the context factory wrapper for web clients
@@ -2439,10 +3095,12 @@ class ContentDecoderAgentWithGzipTests(TestCase,
         """
         class decompressobj(object):
 
+            unconsumed_tail = b''
+
             def __init__(self, wbits):
                 pass
 
-            def decompress(self, data):
+            def decompress(self, data, maxLength=0):
                 return b'x'
 
             def flush(self):
@@ -2484,10 +3142,12 @@ class ContentDecoderAgentWithGzipTests(TestCase,
         """
         class decompressobj(object):
 
+            unconsumed_tail = b''
+
             def __init__(self, wbits):
                 pass
 
-            def decompress(self, data):
+            def decompress(self, data, maxLength=0):
                 return b'x'
 
             def flush(self):
@@ -2529,6 +3189,244 @@ class ContentDecoderAgentWithGzipTests(TestCase,
 
 
 
+class PausingProtocol(Protocol):
+    """
+    A protocol which records the data it receives and pauses its transport
+    after each chunk while C{pause} is set.
+
+    @ivar received: The chunks of data received.
+
+    @ivar lost: The reason the connection was lost, once it has been.
+    """
+    pause = False
+    lost = None
+
+    def __init__(self):
+        self.received = []
+
+
+    def dataReceived(self, data):
+        self.received.append(data)
+        if self.pause:
+            self.transport.pauseProducing()
+
+
+    def connectionLost(self, reason):
+        self.lost = reason
+
+
+
+class StreamingDecoderTests(TestCase):
+    """
+    Tests for the decoding of bodies as they are received by L{GzipDecoder},
+    L{DeflateDecoder} and L{BrotliDecoder}.
+    """
+
+    def deliver(self, decoder, encoded, protocol=None):
+        """
+        Wrap a L{Response} with C{decoder}, deliver its body to C{protocol}
+        and receive C{encoded} and the end of the body.
+
+        @return: A two-tuple of the protocol and the response transport.
+        """
+        if protocol is None:
+            protocol = PausingProtocol()
+        transport = StringTransport()
+        response = Response((b'HTTP', 1, 1), 200, b'OK',
+                            http_headers.Headers(), transport)
+        decoder(response).deliverBody(protocol)
+        response._bodyDataReceived(encoded)
+        response._bodyDataFinished()
+        return protocol, transport
+
+
+    def gzip(self, data):
+        """
+        Compress C{data} with gzip.
+        """
+        compressor = zlib.compressobj(9, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+        return compressor.compress(data) + compressor.flush()
+
+
+    def test_boundedChunks(self):
+        """
+        The decompressed data is delivered in chunks no larger than the
+        decoder chunk size, however small the compressed data is.
+        """
+        data = b'x' * (2 ** 20)
+        protocol, transport = self.deliver(
+            client.GzipDecoder, self.gzip(data))
+        self.assertEqual(b''.join(protocol.received), data)
+        self.assertEqual(
+            max(len(chunk) for chunk in protocol.received),
+            client._DecoderProtocol._chunkSize)
+        protocol.lost.trap(ResponseDone)
+
+
+    def test_pause(self):
+        """
+        When the protocol pauses its transport, decoding stops and the
+        response transport is paused; resuming it decodes the remaining data
+        and then delivers the end of the body.
+        """
+        data = b'x' * (2 ** 18)
+        protocol = PausingProtocol()
+        protocol.pause = True
+        protocol, transport = self.deliver(
+            client.GzipDecoder, self.gzip(data), protocol)
+        self.assertEqual(len(protocol.received), 1)
+        self.assertEqual(transport.producerState, 'paused')
+        self.assertIsNone(protocol.lost)
+
+        protocol.transport.resumeProducing()
+        self.assertEqual(len(protocol.received), 2)
+        self.assertEqual(transport.producerState, 'paused')
+
+        protocol.pause = False
+        protocol.transport.resumeProducing()
+        self.assertEqual(b''.join(protocol.received), data)
+        self.assertEqual(transport.producerState, 'producing')
+        protocol.lost.trap(ResponseDone)
+
+
+    def test_pausedBeforeData(self):
+        """
+        Data received while the protocol has its transport paused is kept
+        until it is resumed.
+        """
+        data = b'hello world'
+        protocol = PausingProtocol()
+        transport = StringTransport()
+        response = Response((b'HTTP', 1, 1), 200, b'OK',
+                            http_headers.Headers(), transport)
+        client.GzipDecoder(response).deliverBody(protocol)
+        protocol.transport.pauseProducing()
+        response._bodyDataReceived(self.gzip(data))
+        response._bodyDataFinished()
+        self.assertEqual(protocol.received, [])
+        self.assertIsNone(protocol.lost)
+
+        protocol.transport.resumeProducing()
+        self.assertEqual(protocol.received, [data])
+        protocol.lost.trap(ResponseDone)
+
+
+    def test_errorWhileResuming(self):
+        """
+        If decoding fails after the protocol resumes its transport, the
+        response transport is stopped and the protocol's connection is lost
+        with a L{ResponseFailed}.
+        """
+        data = b'x' * (2 ** 18)
+        encoded = self.gzip(data)
+        protocol = PausingProtocol()
+        protocol.pause = True
+        transport = StringTransport()
+        response = Response((b'HTTP', 1, 1), 200, b'OK',
+                            http_headers.Headers(), transport)
+        client.GzipDecoder(response).deliverBody(protocol)
+        response._bodyDataReceived(encoded[:-8])
+        protocol.transport.pauseProducing()
+        protocol.pause = False
+        response._bodyDataReceived(b'garbage!' * 4)
+        protocol.transport.resumeProducing()
+
+        self.assertEqual(transport.producerState, 'stopped')
+        protocol.lost.trap(client.ResponseFailed)
+        protocol.lost.value.reasons[0].trap(zlib.error)
+
+
+    def test_deflate(self):
+        """
+        L{DeflateDecoder} decodes zlib-wrapped deflate data.
+        """
+        data = b'hello deflate' * 1000
+        protocol, transport = self.deliver(
+            client.DeflateDecoder, zlib.compress(data))
+        self.assertEqual(b''.join(protocol.received), data)
+        protocol.lost.trap(ResponseDone)
+
+
+    def test_rawDeflate(self):
+        """
+        L{DeflateDecoder} also decodes raw deflate data, as sent by some
+        servers.
+        """
+        data = b'hello deflate' * 1000
+        compressor = zlib.compressobj(9, zlib.DEFLATED, -zlib.MAX_WBITS)
+        protocol, transport = self.deliver(
+            client.DeflateDecoder, compressor.compress(data) +
+            compressor.flush())
+        self.assertEqual(b''.join(protocol.received), data)
+        protocol.lost.trap(ResponseDone)
+
+
+    def test_brotli(self):
+        """
+        L{BrotliDecoder} decodes brotli data in bounded chunks.
+        """
+        data = b'hello brotli' * 100000
+        protocol, transport = self.deliver(
+            client.BrotliDecoder, client.brotli.compress(data))
+        self.assertEqual(b''.join(protocol.received), data)
+        self.assertTrue(all(len(chunk) <= client._DecoderProtocol._chunkSize
+                            for chunk in protocol.received))
+        protocol.lost.trap(ResponseDone)
+
+    if client.brotli is None:
+        test_brotli.skip = "brotli is not installed."
+
+
+    def test_brotliPaused(self):
+        """
+        L{BrotliDecoder} keeps the data received while the protocol has paused
+        its transport, and decodes it a chunk at a time as the protocol
+        resumes it.
+        """
+        data = b'hello brotli' * 100000
+        encoded = client.brotli.compress(data)
+        protocol = PausingProtocol()
+        protocol.pause = True
+        transport = StringTransport()
+        response = Response((b'HTTP', 1, 1), 200, b'OK',
+                            http_headers.Headers(), transport)
+        client.BrotliDecoder(response).deliverBody(protocol)
+        for i in range(0, len(encoded), 100):
+            response._bodyDataReceived(encoded[i:i + 100])
+        response._bodyDataFinished()
+        self.assertEqual(len(protocol.received), 1)
+        while protocol.lost is None:
+            protocol.transport.resumeProducing()
+        self.assertEqual(b''.join(protocol.received), data)
+        self.assertTrue(all(len(chunk) <= client._DecoderProtocol._chunkSize
+                            for chunk in protocol.received))
+        protocol.lost.trap(ResponseDone)
+
+    if client.brotli is None:
+        test_brotliPaused.skip = "brotli is not installed."
+
+
+    def test_brotliUnavailable(self):
+        """
+        L{ContentDecoderAgent} raises L{ImportError} when it is given
+        L{BrotliDecoder} if the C{brotli} package is not installed, rather than
+        advertising an encoding it cannot decode.  L{BrotliDecoder} itself
+        raises L{ImportError} too.
+        """
+        self.patch(client, 'brotli', None)
+        agent = client.Agent(MemoryReactorClock())
+        self.assertRaises(ImportError, client.ContentDecoderAgent, agent,
+                          [(b'gzip', client.GzipDecoder),
+                           (b'br', client.BrotliDecoder)])
+        client.ContentDecoderAgent(agent, [(b'gzip', client.GzipDecoder)])
+        response = Response((b'HTTP', 1, 1), 200, b'OK',
+                            http_headers.Headers(), StringTransport())
+        self.assertRaises(ImportError, client.BrotliDecoder, response)
+        self.assertRaises(ImportError, client._BrotliProtocol,
+                          PausingProtocol(), response)
+
+
+
 class ProxyAgentTests(TestCase, FakeReactorAndConnectMixin, AgentTestsMixin):
     """
     Tests for L{client.ProxyAgent}.
@@ -20,13 +20,16 @@ from twisted.python.compat import _PY35PLUS
 from twisted.trial.unittest import TestCase
 from twisted.test.testutils import XMLAssertionMixin
 
-from twisted.internet.defer import passthru, succeed, gatherResults
+from twisted.internet.defer import (
+    Deferred, passthru, succeed, gatherResults)
 
 from twisted.web.iweb import IRenderable
 from twisted.web.error import UnfilledSlot, UnsupportedType, FlattenerError
 
 from twisted.web.template import tags, Tag, Comment, CDATA, CharRef, slot
 from twisted.web.template import Element, renderer, TagLoader, flattenString
+from twisted.web.template import flatten
+from twisted.web import _flatten
 
 from twisted.web.test._util import FlattenTestCase
 
@@ -451,6 +454,61 @@ class SerializationTests(FlattenTestCase, XMLAssertionMixin):
 HERE = (lambda: None).__code__.co_filename
 
 
+class BufferingTests(TestCase):
+    """
+    Tests for the buffering of the output of L{flatten}.
+    """
+    def test_coalesced(self):
+        """
+        The output of a synchronous flattening is passed to C{write} in one
+        piece if it is smaller than L{_flatten.BUFFER_SIZE}.
+        """
+        written = []
+        d = flatten(None, tags.ul([tags.li(str(i)) for i in range(100)]),
+                    written.append)
+        self.successResultOf(d)
+        self.assertEqual(len(written), 1)
+        self.assertTrue(written[0].startswith(b'<ul><li>0</li>'))
+
+
+    def test_bufferSize(self):
+        """
+        Output is passed to C{write} whenever L{_flatten.BUFFER_SIZE} bytes
+        have accumulated.
+        """
+        self.patch(_flatten, 'BUFFER_SIZE', 10)
+        written = []
+        d = flatten(None, [u'abcd'] * 7, written.append)
+        self.successResultOf(d)
+        self.assertEqual(written, [b'abcd' * 3, b'abcd' * 3, b'abcd'])
+
+
+    def test_flushBeforeDeferred(self):
+        """
+        Buffered output is passed to C{write} before waiting for a
+        L{Deferred}, and the rest once it fires.
+        """
+        written = []
+        waiting = Deferred()
+        d = flatten(None, [u'before', waiting, u'after'], written.append)
+        self.assertEqual(written, [b'before'])
+        self.assertNoResult(d)
+        waiting.callback(u' during ')
+        self.successResultOf(d)
+        self.assertEqual(written, [b'before', b' during after'])
+
+
+    def test_flushOnError(self):
+        """
+        Output buffered before an error is passed to C{write} before the
+        L{Deferred} returned by L{flatten} fails.
+        """
+        written = []
+        d = flatten(None, [u'before', object()], written.append)
+        self.assertEqual(written, [b'before'])
+        self.failureResultOf(d, FlattenerError)
+
+
 class FlattenerErrorTests(TestCase):
     """
     Tests for L{FlattenerError}.
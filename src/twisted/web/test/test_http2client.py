@@ -0,0 +1,520 @@
+# Copyright (c) Twisted Matrix Laboratories.
+# See LICENSE for details.
+
+"""
+Tests for L{twisted.web._http2client}.
+"""
+
+from __future__ import absolute_import, division
+
+from twisted.internet.defer import CancelledError, Deferred, succeed
+from twisted.internet.error import ConnectionDone
+from twisted.internet.protocol import Protocol
+from twisted.internet.testing import StringTransport
+from twisted.python.failure import Failure
+from twisted.trial.unittest import TestCase
+from twisted.web.http_headers import Headers
+from twisted.web.iweb import UNKNOWN_LENGTH
+from twisted.web._newclient import (
+    Request, RequestNotSent, ResponseDone, ResponseFailed,
+    ResponseNeverReceived)
+
+skipH2 = None
+
+try:
+    from twisted.web._http2client import H2ClientProtocol
+
+    # These third-party imports are guaranteed to be present if HTTP/2 support
+    # is compiled in. We do not use them in the main code: only in the tests.
+    import h2.config
+    import h2.connection
+    import h2.errors
+    import h2.events
+    import h2.settings
+except ImportError:
+    skipH2 = "HTTP/2 support not enabled"
+
+
+
+class FakeH2Server(object):
+    """
+    The server end of an HTTP/2 connection to an L{H2ClientProtocol}, driven
+    by the tests.
+
+    @ivar conn: The server-side HTTP/2 state machine.
+    @type conn: L{h2.connection.H2Connection}
+    """
+
+    def __init__(self, transport, protocol, settings=None):
+        self.transport = transport
+        self.protocol = protocol
+        config = h2.config.H2Configuration(
+            client_side=False, header_encoding=None)
+        self.conn = h2.connection.H2Connection(config=config)
+        self.conn.initiate_connection()
+        if settings:
+            self.conn.update_settings(settings)
+
+
+    def receive(self):
+        """
+        Process what the client has written.
+
+        @return: The events for it, other than those about settings.
+        @rtype: L{list}
+        """
+        data = self.transport.value()
+        self.transport.clear()
+        return [
+            event for event in self.conn.receive_data(data)
+            if not isinstance(event, (h2.events.RemoteSettingsChanged,
+                                      h2.events.SettingsAcknowledged))]
+
+
+    def send(self):
+        """
+        Deliver what the server has to send to the client.
+        """
+        self.protocol.dataReceived(self.conn.data_to_send())
+
+
+    def respond(self, streamID, body=b'', code=b'200', headers=(),
+                endStream=True):
+        """
+        Send a response.
+        """
+        self.conn.send_headers(
+            streamID, [(b':status', code)] + list(headers),
+            end_stream=not body and endStream)
+        if body:
+            self.conn.send_data(streamID, body, end_stream=endStream)
+        self.send()
+
+
+
+class AccumulatingProtocol(Protocol):
+    """
+    Collect a response body.
+
+    @ivar data: The body data received.
+    @ivar reason: The reason passed to C{connectionLost}, or L{None}.
+    """
+    reason = None
+
+    def __init__(self):
+        self.data = []
+
+
+    def dataReceived(self, data):
+        self.data.append(data)
+
+
+    def connectionLost(self, reason):
+        self.reason = reason
+
+
+
+class StringBodyProducer(object):
+    """
+    A body producer writing a string in chunks, one per C{resumeProducing}
+    call after the first, recording whether it is paused.
+
+    @ivar chunks: The chunks still to be written.
+    @ivar paused: Whether the producer is paused.
+    @ivar stopped: Whether C{stopProducing} was called.
+    @ivar finished: The L{Deferred} returned from C{startProducing}.
+    """
+    paused = False
+    stopped = False
+
+    def __init__(self, chunks):
+        self.chunks = list(chunks)
+        self.length = sum(len(chunk) for chunk in chunks)
+
+
+    def startProducing(self, consumer):
+        self.consumer = consumer
+        self.finished = Deferred()
+        self._produce()
+        return self.finished
+
+
+    def _produce(self):
+        while self.chunks and not self.paused:
+            self.consumer.write(self.chunks.pop(0))
+        if not self.chunks and not self.finished.called:
+            self.finished.callback(None)
+
+
+    def pauseProducing(self):
+        self.paused = True
+
+
+    def resumeProducing(self):
+        self.paused = False
+        self._produce()
+
+
+    def stopProducing(self):
+        self.stopped = True
+
+
+
+class H2ClientProtocolTests(TestCase):
+    """
+    Tests for L{H2ClientProtocol}.
+    """
+    skip = skipH2
+
+    def setUp(self):
+        self.quiescent = []
+        self.lost = []
+        self.transport = StringTransport()
+        self.protocol = H2ClientProtocol(
+            self.quiescent.append, self.lost.append)
+        self.protocol.makeConnection(self.transport)
+
+
+    def connect(self, settings=None):
+        """
+        Complete the connection preamble with a fake server.
+
+        @return: The server.
+        @rtype: L{FakeH2Server}
+        """
+        server = FakeH2Server(self.transport, self.protocol, settings)
+        server.receive()
+        server.send()
+        server.receive()
+        return server
+
+
+    def request(self, uri=b'/', method=b'GET', bodyProducer=None,
+                persistent=True):
+        """
+        Send a request.
+
+        @return: The L{Deferred} for the response.
+        """
+        headers = Headers({b'host': [b'example.com'],
+                           b'connection': [b'close']})
+        return self.protocol.request(
+            Request(method, uri, headers, bodyProducer, persistent))
+
+
+    def test_preamble(self):
+        """
+        When the connection is made, L{H2ClientProtocol} sends the HTTP/2
+        connection preface.
+        """
+        self.assertTrue(self.transport.value().startswith(
+            b'PRI * HTTP/2.0\r\n\r\nSM\r\n\r\n'))
+        self.assertEqual(self.protocol.state, 'QUIESCENT')
+
+
+    def test_request(self):
+        """
+        L{H2ClientProtocol.request} sends the request as a stream, with the
+        request line and I{Host} header as pseudo-headers and without
+        connection-specific headers, and fires its L{Deferred} with the
+        response, whose body is delivered to C{deliverBody}.
+        """
+        server = self.connect()
+        d = self.request(b'/foo?bar')
+        self.assertEqual(self.protocol.state, 'TRANSMITTING')
+        [received, ended] = server.receive()
+        self.assertIsInstance(received, h2.events.RequestReceived)
+        self.assertIsInstance(ended, h2.events.StreamEnded)
+        self.assertEqual(received.headers, [
+            (b':method', b'GET'), (b':scheme', b'https'),
+            (b':authority', b'example.com'), (b':path', b'/foo?bar')])
+
+        server.respond(received.stream_id, b'hello',
+                       headers=[(b'content-length', b'5'),
+                                (b'x-foo', b'bar')])
+        response = self.successResultOf(d)
+        self.assertEqual(response.version, (b'HTTP', 2, 0))
+        self.assertEqual(response.code, 200)
+        self.assertEqual(response.phrase, b'OK')
+        self.assertEqual(response.length, 5)
+        self.assertEqual(response.headers.getRawHeaders(b'x-foo'), [b'bar'])
+
+        body = AccumulatingProtocol()
+        response.deliverBody(body)
+        self.assertEqual(body.data, [b'hello'])
+        body.reason.trap(ResponseDone)
+        self.assertEqual(self.quiescent, [self.protocol])
+        self.assertEqual(self.protocol.state, 'QUIESCENT')
+
+
+    def test_nonPersistent(self):
+        """
+        Once the last outstanding request is complete, the connection is
+        closed rather than reused if that request was not persistent.
+        """
+        server = self.connect()
+        d = self.request(persistent=False)
+        server.receive()
+        server.respond(1)
+        self.successResultOf(d)
+        [terminated] = server.receive()
+        self.assertIsInstance(terminated, h2.events.ConnectionTerminated)
+        self.assertTrue(self.transport.disconnecting)
+        self.assertEqual(self.quiescent, [])
+
+
+    def test_headResponseLength(self):
+        """
+        The length of the response to a I{HEAD} request is zero.
+        """
+        server = self.connect()
+        d = self.request(method=b'HEAD')
+        [received, ended] = server.receive()
+        server.respond(received.stream_id,
+                       headers=[(b'content-length', b'10')])
+        self.assertEqual(self.successResultOf(d).length, 0)
+
+
+    def test_multiplexing(self):
+        """
+        Several requests may be outstanding at once, each on its own stream,
+        and their responses are delivered as they arrive, in any order.
+        """
+        server = self.connect()
+        first = self.request(b'/first')
+        self.assertTrue(self.protocol._canPipeline())
+        second = self.request(b'/second')
+        self.assertEqual(self.protocol._queuedRequests(), 2)
+        streamIDs = [event.stream_id for event in server.receive()
+                     if isinstance(event, h2.events.RequestReceived)]
+        self.assertEqual(streamIDs, [1, 3])
+
+        server.respond(3, b'second')
+        self.assertNoResult(first)
+        self.assertEqual(self.successResultOf(second).code, 200)
+        self.assertEqual(self.quiescent, [])
+        server.respond(1, b'first', code=b'404')
+        self.assertEqual(self.successResultOf(first).code, 404)
+        self.assertEqual(self.quiescent, [self.protocol])
+
+
+    def test_maxConcurrentStreams(self):
+        """
+        No more requests than the server's I{SETTINGS_MAX_CONCURRENT_STREAMS}
+        are sent at once; requests beyond it fail with L{RequestNotSent}.
+        """
+        self.connect({h2.settings.SettingCodes.MAX_CONCURRENT_STREAMS: 1})
+        self.request()
+        self.assertFalse(self.protocol._canPipeline())
+        self.failureResultOf(self.request(), RequestNotSent)
+
+
+    def test_requestBodyFlowControl(self):
+        """
+        The request body is sent as the flow control window allows, pausing
+        the body producer while the window is exhausted and resuming it once
+        the server opens the window again.
+        """
+        server = self.connect(
+            {h2.settings.SettingCodes.INITIAL_WINDOW_SIZE: 10})
+        producer = StringBodyProducer([b'x' * 8, b'y' * 8, b'z' * 8])
+        self.request(method=b'POST', bodyProducer=producer)
+        events = server.receive()
+        self.assertEqual(events[0].headers[-1], (b'content-length', b'24'))
+        self.assertEqual(b''.join(event.data for event in events
+                                  if isinstance(event, h2.events.DataReceived)),
+                         b'x' * 8 + b'y' * 2)
+        self.assertTrue(producer.paused)
+
+        server.conn.increment_flow_control_window(100)
+        server.conn.increment_flow_control_window(100, stream_id=1)
+        server.send()
+        self.assertFalse(producer.paused)
+        events = server.receive()
+        self.assertEqual(b''.join(event.data for event in events
+                                  if isinstance(event, h2.events.DataReceived)),
+                         b'y' * 6 + b'z' * 8)
+        self.assertIsInstance(events[-1], h2.events.StreamEnded)
+
+
+    def test_responseBodyBackpressure(self):
+        """
+        Response body data received while the response is paused is buffered,
+        and only acknowledged to the server, opening the flow control window
+        again, once it has been delivered.
+        """
+        server = self.connect()
+        d = self.request()
+        server.receive()
+        server.respond(1, endStream=False)
+        response = self.successResultOf(d)
+        chunks = [b'a' * 16000, b'b' * 16000, b'c' * 16000]
+        for chunk in chunks:
+            server.conn.send_data(1, chunk)
+        server.send()
+        self.assertEqual(server.receive(), [])
+        self.assertEqual(server.conn.local_flow_control_window(1),
+                         65535 - 48000)
+
+        body = AccumulatingProtocol()
+        response.deliverBody(body)
+        self.assertEqual(body.data, chunks)
+        self.assertTrue(server.receive())
+        self.assertEqual(server.conn.local_flow_control_window(1), 65535)
+
+        body.transport.pauseProducing()
+        server.conn.send_data(1, b'd', end_stream=True)
+        server.send()
+        self.assertEqual(body.data, chunks)
+        self.assertIsNone(body.reason)
+        body.transport.resumeProducing()
+        self.assertEqual(body.data, chunks + [b'd'])
+        body.reason.trap(ResponseDone)
+
+
+    def test_responseLength(self):
+        """
+        The length of a response without a I{Content-Length} header is
+        unknown.
+        """
+        server = self.connect()
+        d = self.request()
+        server.receive()
+        server.respond(1, b'abc')
+        self.assertEqual(self.successResultOf(d).length, UNKNOWN_LENGTH)
+
+
+    def test_streamReset(self):
+        """
+        If the server resets a stream before responding, the request fails
+        with L{ResponseNeverReceived}, leaving other streams alone.
+        """
+        server = self.connect()
+        first = self.request()
+        second = self.request()
+        server.receive()
+        server.conn.reset_stream(1, h2.errors.ErrorCodes.REFUSED_STREAM)
+        server.send()
+        self.failureResultOf(first, ResponseNeverReceived)
+        self.assertNoResult(second)
+        self.assertEqual(self.protocol._queuedRequests(), 1)
+
+
+    def test_streamResetDuringBody(self):
+        """
+        If the server resets a stream after responding, the response body
+        fails with L{ResponseFailed}.
+        """
+        server = self.connect()
+        d = self.request()
+        server.receive()
+        server.respond(1, b'abc', endStream=False)
+        body = AccumulatingProtocol()
+        self.successResultOf(d).deliverBody(body)
+        server.conn.reset_stream(1)
+        server.send()
+        self.assertEqual(body.data, [b'abc'])
+        body.reason.trap(ResponseFailed)
+        self.assertEqual(self.quiescent, [self.protocol])
+
+
+    def test_goAway(self):
+        """
+        When the server sends I{GOAWAY}, outstanding requests fail with
+        L{ResponseNeverReceived} so they can be retried, no more requests
+        are sent, and the connection is closed.
+        """
+        server = self.connect()
+        first = self.request()
+        second = self.request()
+        server.receive()
+        server.conn.close_connection(last_stream_id=1)
+        server.send()
+        self.failureResultOf(first, ResponseNeverReceived)
+        self.failureResultOf(second, ResponseNeverReceived)
+        self.assertFalse(self.protocol._canPipeline())
+        self.failureResultOf(self.request(), RequestNotSent)
+        self.assertTrue(self.transport.disconnecting)
+        self.assertEqual(self.quiescent, [])
+
+
+    def test_cancel(self):
+        """
+        Cancelling the L{Deferred} for a response resets its stream.
+        """
+        server = self.connect()
+        d = self.request()
+        server.receive()
+        d.cancel()
+        self.failureResultOf(d, CancelledError)
+        [reset] = server.receive()
+        self.assertIsInstance(reset, h2.events.StreamReset)
+        self.assertEqual(reset.error_code, h2.errors.ErrorCodes.CANCEL)
+        self.assertEqual(self.protocol.state, 'QUIESCENT')
+
+
+    def test_stopProducing(self):
+        """
+        Stopping the transport of a response body resets its stream and
+        fails the body with L{ResponseFailed}, without closing the
+        connection.
+        """
+        server = self.connect()
+        d = self.request()
+        server.receive()
+        server.respond(1, b'abc', endStream=False)
+        body = AccumulatingProtocol()
+        self.successResultOf(d).deliverBody(body)
+        body.transport.stopProducing()
+        body.reason.trap(ResponseFailed)
+        [reset] = server.receive()
+        self.assertIsInstance(reset, h2.events.StreamReset)
+        self.assertFalse(self.transport.disconnecting)
+        self.assertEqual(self.quiescent, [self.protocol])
+
+
+    def test_connectionLost(self):
+        """
+        When the connection is lost, outstanding requests fail with
+        L{ResponseNeverReceived} and the connection lost callback is called.
+        """
+        self.connect()
+        producer = StringBodyProducer([])
+        producer.startProducing = lambda consumer: Deferred()
+        d = self.request(method=b'POST', bodyProducer=producer)
+        self.protocol.connectionLost(Failure(ConnectionDone()))
+        self.failureResultOf(d, ResponseNeverReceived)
+        self.assertTrue(producer.stopped)
+        self.assertEqual(self.lost, [self.protocol])
+        self.assertEqual(self.protocol.state, 'CONNECTION_LOST')
+        self.failureResultOf(self.request(), RequestNotSent)
+
+
+    def test_abort(self):
+        """
+        L{H2ClientProtocol.abort} sends I{GOAWAY}, aborts the transport, and
+        returns a L{Deferred} which fires once the connection is lost.
+        """
+        server = self.connect()
+        d = self.protocol.abort()
+        [terminated] = server.receive()
+        self.assertIsInstance(terminated, h2.events.ConnectionTerminated)
+        self.assertTrue(self.transport.disconnecting)
+        self.assertNoResult(d)
+        self.protocol.connectionLost(Failure(ConnectionDone()))
+        self.assertIsNone(self.successResultOf(d))
+        self.assertIsNone(self.successResultOf(self.protocol.abort()))
+
+
+    def test_bodyProducerFailure(self):
+        """
+        If the request body producer fails, the stream is reset and the
+        request fails.
+        """
+        server = self.connect()
+        producer = StringBodyProducer([])
+        producer.startProducing = lambda consumer: succeed(None).addCallback(
+            lambda ignored: 1 // 0)
+        d = self.request(method=b'POST', bodyProducer=producer)
+        self.failureResultOf(d).value.reasons[0].trap(ZeroDivisionError)
+        self.assertIsInstance(server.receive()[-1], h2.events.StreamReset)
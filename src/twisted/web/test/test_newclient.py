@@ -1868,6 +1868,28 @@ class HTTP11ClientProtocolTests(TestCase):
         self.assertTrue(transport.disconnecting)
 
 
+    def test_connectionLostCallback(self):
+        """
+        The C{connectionLostCallback} passed to L{HTTP11ClientProtocol} is
+        called with the protocol after the connection is lost and any
+        outstanding request has been failed.
+        """
+        lost = []
+        protocol = HTTP11ClientProtocol(
+            connectionLostCallback=lambda p: lost.append(
+                (p, p.state, self.failureResultOf(requestDeferred))))
+        protocol.makeConnection(StringTransport())
+        requestDeferred = protocol.request(
+            Request(b'GET', b'/', _boringHeaders, None))
+        self.assertEqual(lost, [])
+
+        protocol.connectionLost(Failure(ConnectionDone()))
+        [(p, state, f)] = lost
+        self.assertIs(p, protocol)
+        self.assertEqual(state, 'CONNECTION_LOST')
+        f.trap(ResponseNeverReceived)
+
+
     def test_cancelBeforeResponse(self):
         """
         The L{Deferred} returned by L{HTTP11ClientProtocol.request} will fire
@@ -1954,6 +1976,183 @@ class HTTP11ClientProtocolTests(TestCase):
 
 
 @implementer(IBodyProducer)
+class HTTP11ClientProtocolPipeliningTests(TestCase):
+    """
+    Tests for pipelining requests with L{HTTP11ClientProtocol}.
+    """
+    def setUp(self):
+        """
+        Create an L{HTTP11ClientProtocol} which pipelines up to three requests
+        and is connected to a fake transport.
+        """
+        self.quiescent = []
+        self.transport = StringTransport()
+        self.protocol = HTTP11ClientProtocol(
+            self.quiescent.append, pipelineDepth=3)
+        self.protocol.makeConnection(self.transport)
+
+
+    def request(self, path, method=b'GET', bodyProducer=None):
+        """
+        Make a persistent request for C{path}.
+
+        @return: The L{Deferred} returned by L{HTTP11ClientProtocol.request}.
+        """
+        return self.protocol.request(
+            Request(method, path, _boringHeaders, bodyProducer,
+                    persistent=True))
+
+
+    def test_notPipelinedByDefault(self):
+        """
+        By default L{HTTP11ClientProtocol} does not send a request while
+        another is outstanding.
+        """
+        protocol = HTTP11ClientProtocol()
+        protocol.makeConnection(StringTransport())
+        protocol.request(
+            Request(b'GET', b'/a', _boringHeaders, None, persistent=True))
+        self.failureResultOf(
+            protocol.request(Request(b'GET', b'/b', _boringHeaders, None,
+                                     persistent=True)),
+            RequestNotSent)
+
+
+    def test_requestsSentImmediately(self):
+        """
+        Requests made while waiting for a response are written to the
+        transport immediately, up to the pipeline depth.
+        """
+        self.request(b'/a')
+        self.request(b'/b')
+        self.request(b'/c')
+        sent = self.transport.value()
+        self.assertEqual(
+            [line.split(b' ')[1] for line in sent.split(b'\r\n')
+             if line.startswith(b'GET ')],
+            [b'/a', b'/b', b'/c'])
+        self.failureResultOf(self.request(b'/d'), RequestNotSent)
+
+
+    def test_onlyIdempotentWithoutBody(self):
+        """
+        Requests with a body or a non-idempotent method are not pipelined.
+        """
+        self.request(b'/a')
+        self.failureResultOf(self.request(b'/b', method=b'POST'),
+                             RequestNotSent)
+        self.failureResultOf(
+            self.request(b'/c', bodyProducer=StringProducer(3)),
+            RequestNotSent)
+        self.failureResultOf(
+            self.protocol.request(Request(b'GET', b'/d', _boringHeaders, None,
+                                          persistent=False)),
+            RequestNotSent)
+
+
+    def test_responsesMatchedInOrder(self):
+        """
+        Responses are matched to pipelined requests in the order the requests
+        were sent, even when several arrive in one chunk, and the protocol is
+        quiescent once all of them have been received.
+        """
+        results = []
+        for path in [b'/a', b'/b', b'/c']:
+            self.request(path).addCallback(
+                lambda response, path=path: results.append(
+                    (path, response.code)))
+        self.protocol.dataReceived(
+            b"HTTP/1.1 200 OK\r\n"
+            b"Content-Length: 0\r\n"
+            b"\r\n"
+            b"HTTP/1.1 201 Created\r\n"
+            b"Content-Length: 0\r\n"
+            b"\r\n"
+            b"HTTP/1.1 202 Accepted\r\n")
+        self.assertEqual(results, [(b'/a', 200), (b'/b', 201)])
+        self.assertEqual(self.quiescent, [])
+        self.protocol.dataReceived(
+            b"Content-Length: 0\r\n"
+            b"\r\n")
+        self.assertEqual(results, [(b'/a', 200), (b'/b', 201), (b'/c', 202)])
+        self.assertEqual(self.quiescent, [self.protocol])
+        self.assertEqual(self.protocol.state, 'QUIESCENT')
+
+
+    def test_responseBodies(self):
+        """
+        The body of each response is delivered to the response for the
+        matching request.
+        """
+        responses = []
+        self.request(b'/a').addCallback(responses.append)
+        self.request(b'/b').addCallback(responses.append)
+        self.protocol.dataReceived(
+            b"HTTP/1.1 200 OK\r\n"
+            b"Content-Length: 3\r\n"
+            b"\r\n"
+            b"foo"
+            b"HTTP/1.1 200 OK\r\n"
+            b"Transfer-Encoding: chunked\r\n"
+            b"\r\n"
+            b"3\r\nbar\r\n0\r\n\r\n")
+        bodies = []
+        for response in responses:
+            protocol = AccumulatingProtocol()
+            response.deliverBody(protocol)
+            protocol.closedReason.trap(ResponseDone)
+            bodies.append(protocol.data)
+        self.assertEqual(bodies, [b'foo', b'bar'])
+        self.assertEqual(self.quiescent, [self.protocol])
+
+
+    def test_connectionLostFailsPipelined(self):
+        """
+        When the connection is lost, pipelined requests whose responses have
+        not started fail with L{ResponseNeverReceived}, so they may be
+        retried.
+        """
+        first = self.request(b'/a')
+        second = self.request(b'/b')
+        self.protocol.connectionLost(Failure(ConnectionDone()))
+        self.failureResultOf(first, ResponseNeverReceived)
+        self.failureResultOf(second, ResponseNeverReceived)
+
+
+    def test_closeFailsPipelined(self):
+        """
+        If the response to a request closes the connection, pipelined requests
+        fail with L{ResponseNeverReceived} once the connection is lost.
+        """
+        first = self.request(b'/a')
+        second = self.request(b'/b')
+        self.protocol.dataReceived(
+            b"HTTP/1.1 200 OK\r\n"
+            b"Connection: close\r\n"
+            b"Content-Length: 0\r\n"
+            b"\r\n")
+        self.assertEqual(self.successResultOf(first).code, 200)
+        self.assertTrue(self.transport.disconnecting)
+        self.assertNoResult(second)
+        self.protocol.connectionLost(Failure(ConnectionDone()))
+        self.failureResultOf(second, ResponseNeverReceived)
+
+
+    def test_cancelPipelined(self):
+        """
+        Cancelling a pipelined request aborts the connection, since it has
+        already been sent.
+        """
+        first = self.request(b'/a')
+        second = self.request(b'/b')
+        second.cancel()
+        self.failureResultOf(second, CancelledError)
+        self.assertTrue(self.transport.disconnected)
+        self.protocol.connectionLost(Failure(ConnectionDone()))
+        self.failureResultOf(first, ResponseNeverReceived)
+
+
+
 class StringProducer:
     """
     L{StringProducer} is a dummy body producer.
@@ -7,21 +7,30 @@ Tests for L{twisted.web.template}
 
 from __future__ import division, absolute_import
 
+import os
+
+from collections import OrderedDict
+
+from zope.interface import implementer
 from zope.interface.verify import verifyObject
 
 from twisted.internet.defer import succeed, gatherResults
+from twisted.internet.task import Clock
 from twisted.python.filepath import FilePath
 from twisted.trial.unittest import TestCase
 from twisted.trial.util import suppress as SUPPRESS
 from twisted.web.template import (
-    Element, TagLoader, renderer, tags, XMLFile, XMLString)
-from twisted.web.iweb import ITemplateLoader
+    Element, TagLoader, renderer, tags, Tag, XMLFile, XMLString,
+    flattenString)
+from twisted.web.iweb import ITemplateLoader, _IPrecompiledTemplateLoader
 
 from twisted.web.error import (FlattenerError, MissingTemplateLoader,
     MissingRenderMethod)
 
-from twisted.web.template import renderElement
+from twisted.web import template
+from twisted.web.template import renderElement, _flatsaxParse
 from twisted.web._element import UnexposedMethodError
+from twisted.web._flatten import _precompile
 from twisted.web.test._util import FlattenTestCase
 from twisted.web.test.test_web import DummyRequest
 from twisted.web.server import NOT_DONE_YET
@@ -288,6 +297,186 @@ class XMLFileWithFilePathTests(TestCase, XMLLoaderTestsMixin):
 
 
 
+class XMLFileCacheTests(TestCase):
+    """
+    Tests for the sharing of templates parsed by L{XMLFile} from a
+    L{FilePath}.
+    """
+    template = (
+        '<div xmlns:t="http://twistedmatrix.com/ns/twisted.web.template/0.1">'
+        '<p>static</p><span t:render="dynamic"><t:slot name="x" /></span>'
+        '</div>')
+
+    def setUp(self):
+        self.patch(template, '_templateCache', OrderedDict())
+        self.clock = Clock()
+        self.patch(XMLFile, '_seconds', staticmethod(self.clock.seconds))
+        self.parsed = []
+        def parse(fl):
+            self.parsed.append(fl)
+            return _flatsaxParse(fl)
+        self.patch(template, '_flatsaxParse', parse)
+        self.path = FilePath(self.mktemp())
+        self.setTemplate(self.template, 1000)
+
+
+    def setTemplate(self, content, mtime):
+        """
+        Write C{content} to C{self.path} and set its modification time to
+        C{mtime}.
+        """
+        self.path.setContent(content.encode('utf-8'))
+        os.utime(self.path.path, (mtime, mtime))
+
+
+    def test_shared(self):
+        """
+        L{XMLFile}s loading the same file parse it once, each getting its own
+        copy of the document.
+        """
+        loader1 = XMLFile(self.path)
+        loader2 = XMLFile(FilePath(self.path.path))
+        div1, = loader1.load()
+        div2, = loader2.load()
+        self.assertEqual(len(self.parsed), 1)
+        self.assertIsNot(div1, div2)
+        self.assertIsNot(div1.children[0], div2.children[0])
+        self.assertEqual(div2.children[0].children, [u'static'])
+        self.assertIsNot(loader1.loadPrecompiled(), loader2.loadPrecompiled())
+        self.assertIsNot(div1.children[1], div2.children[1])
+        self.assertIsNot(div1.children[1].children[0],
+                         div2.children[1].children[0])
+        self.assertEqual(div2.children[1].render, 'dynamic')
+        self.assertEqual(div2.children[1].children[0].name, 'x')
+
+
+    def test_renderIsolated(self):
+        """
+        Rendering an L{Element} whose renderer changes the tags it is given
+        does not change the output of an L{Element} whose L{XMLFile} loads the
+        same file.
+        """
+        self.setTemplate(
+            '<div xmlns:t="%s"><span t:render="dynamic"><b>bold</b></span>'
+            '</div>' % (template.TEMPLATE_NAMESPACE,), 1000)
+
+        class Changing(Element):
+            @renderer
+            def dynamic(self, request, tag):
+                tag.children[0](u' changed')
+                return tag
+
+        class Plain(Element):
+            @renderer
+            def dynamic(self, request, tag):
+                return tag
+
+        changing = Changing(XMLFile(self.path))
+        plain = Plain(XMLFile(self.path))
+        expected = b'<div><span><b>bold</b></span></div>'
+        self.assertEqual(
+            self.successResultOf(flattenString(None, plain)), expected)
+        self.assertEqual(
+            self.successResultOf(flattenString(None, changing)),
+            b'<div><span><b>bold changed</b></span></div>')
+        self.assertEqual(
+            self.successResultOf(flattenString(None, plain)), expected)
+        self.assertEqual(len(self.parsed), 1)
+
+
+    def test_loadTwice(self):
+        """
+        L{XMLFile.load} returns the same document while the file is not
+        modified.
+        """
+        loader = XMLFile(self.path)
+        self.assertIs(loader.load(), loader.load())
+        self.assertEqual(len(self.parsed), 1)
+
+
+    def test_modified(self):
+        """
+        L{XMLFile.load} parses the file again once its modification time
+        changes.
+        """
+        loader = XMLFile(self.path)
+        loader.load()
+        self.setTemplate('<p>changed</p>', 2000)
+        self.clock.advance(XMLFile._checkInterval)
+        tag, = loader.load()
+        self.assertEqual(tag.children, [u'changed'])
+        tag, = XMLFile(self.path).load()
+        self.assertEqual(tag.children, [u'changed'])
+        self.assertEqual(len(self.parsed), 2)
+
+
+    def test_reload(self):
+        """
+        L{XMLFile.reload} parses the file again even though its modification
+        time has not changed.
+        """
+        loader = XMLFile(self.path)
+        loader.load()
+        self.setTemplate('<p>changed</p>', 1000)
+        tag, = loader.load()
+        self.assertEqual(tag.tagName, 'div')
+        tag, = loader.reload()
+        self.assertEqual(tag.children, [u'changed'])
+        self.assertIs(loader.load()[0], tag)
+        self.assertEqual(len(self.parsed), 2)
+
+
+    def test_removed(self):
+        """
+        If the file is removed once it has been loaded, L{XMLFile.load} keeps
+        returning the loaded document.
+        """
+        loader = XMLFile(self.path)
+        document = loader.load()
+        self.path.remove()
+        self.clock.advance(XMLFile._checkInterval)
+        self.assertIs(loader.load(), document)
+
+
+    def test_checkInterval(self):
+        """
+        L{XMLFile.load} checks the modification time of the file at most once
+        every C{_checkInterval} seconds.
+        """
+        checks = []
+        loader = XMLFile(self.path)
+        modificationTime = loader._modificationTime
+        def check():
+            checks.append(self.clock.seconds())
+            return modificationTime()
+        loader._modificationTime = check
+        document = loader.load()
+        self.setTemplate('<p>changed</p>', 2000)
+        self.clock.advance(XMLFile._checkInterval / 2)
+        self.assertIs(loader.load(), document)
+        self.assertEqual(checks, [0])
+        self.clock.advance(XMLFile._checkInterval / 2)
+        tag, = loader.load()
+        self.assertEqual(tag.children, [u'changed'])
+        self.assertEqual(checks, [0, XMLFile._checkInterval])
+
+
+    def test_cacheSize(self):
+        """
+        Only the C{_templateCacheSize} most recently loaded templates are kept.
+        """
+        self.patch(template, '_templateCacheSize', 2)
+        paths = [self.path, FilePath(self.mktemp()), FilePath(self.mktemp())]
+        for path in paths[1:]:
+            path.setContent(b'<p />')
+        for path in paths + [paths[1]]:
+            XMLFile(path).load()
+        self.assertEqual(list(template._templateCache),
+                         [paths[2].path, paths[1].path])
+        self.assertEqual(len(self.parsed), 3)
+
+
+
 class XMLFileWithFileTests(TestCase, XMLLoaderTestsMixin):
     """
     Tests for L{twisted.web.template.XMLFile}'s deprecated file object support.
@@ -635,6 +824,179 @@ class TagLoaderTests(FlattenTestCase):
 
 
 
+class PrecompiledTemplateTests(FlattenTestCase):
+    """
+    Tests for the flattening of the static parts of templates when they are
+    loaded.
+    """
+    template = (
+        '<div xmlns:t="http://twistedmatrix.com/ns/twisted.web.template/0.1">'
+        '<p class="a&amp;b">x &amp; y<br /></p>'
+        '<span t:render="dynamic"><b>bold</b><t:slot name="value" /></span>'
+        '<!-- comment --></div>')
+
+    def test_staticTags(self):
+        """
+        The largest L{Tag}s without renderers or slots in a precompiled
+        template keep their flattened form, other L{Tag}s do not.
+        """
+        div, = _precompile(XMLString(self.template).load())
+        p, span, comment = div.children
+        self.assertIsNone(div._compiled)
+        self.assertEqual(p._compiled, b'<p class="a&amp;b">x &amp; y<br /></p>')
+        self.assertIsNone(p.children[-1]._compiled)
+        self.assertIsNone(span._compiled)
+        self.assertEqual(span.children[0]._compiled, b'<b>bold</b>')
+
+
+    def test_copy(self):
+        """
+        L{XMLString} precompiles a copy of the document it loads, leaving the
+        document returned by C{load} unchanged.
+        """
+        loader = XMLString(self.template)
+        div, = loader.load()
+        precompiled, = loader.loadPrecompiled()
+        self.assertIsNot(precompiled, div)
+        self.assertIsNot(precompiled.children[0], div.children[0])
+        self.assertIsNone(div.children[0]._compiled)
+        self.assertIsNone(div.children[1].children[0]._compiled)
+        self.assertIsNotNone(precompiled.children[0]._compiled)
+
+
+    def test_flatten(self):
+        """
+        A template with precompiled parts flattens as it would without them.
+        """
+        class Dynamic(Element):
+            @renderer
+            def dynamic(self, request, tag):
+                return tag.fillSlots(value=u'<value>')
+
+        expected = (
+            b'<div><p class="a&amp;b">x &amp; y<br /></p>'
+            b'<span><b>bold</b>&lt;value&gt;</span><!-- comment --></div>')
+        self.assertFlattensImmediately(
+            Dynamic(XMLString(self.template)), expected)
+        loaded = XMLString(self.template).load()
+        self.assertFlattensImmediately(
+            Dynamic(TagLoader(loaded[0].clone())), expected)
+        self.assertFlattensImmediately(
+            Dynamic(TagLoader(_precompile(loaded)[0])), expected)
+
+
+    def test_precompiledLoaders(self):
+        """
+        L{XMLString} and L{XMLFile} provide L{_IPrecompiledTemplateLoader};
+        L{TagLoader}, which loads a tag its caller may keep changing, does not.
+        """
+        self.assertTrue(verifyObject(_IPrecompiledTemplateLoader,
+                                     XMLString(self.template)))
+        path = FilePath(self.mktemp())
+        path.setContent(self.template.encode('utf8'))
+        self.assertTrue(verifyObject(_IPrecompiledTemplateLoader,
+                                     XMLFile(path)))
+        self.assertFalse(
+            _IPrecompiledTemplateLoader.providedBy(TagLoader(tags.p())))
+
+
+    def test_renderPrecompiled(self):
+        """
+        An L{Element} renders what the C{loadPrecompiled} method of an
+        L{_IPrecompiledTemplateLoader} provider returns, rather than what its
+        C{load} method returns.
+        """
+        @implementer(_IPrecompiledTemplateLoader)
+        class Loader(object):
+            def load(self):
+                return [tags.i(u'loaded')]
+
+            def loadPrecompiled(self):
+                return [tags.b(u'precompiled')]
+
+        self.assertFlattensImmediately(
+            Element(Loader()), b'<b>precompiled</b>')
+
+
+    def test_overriddenLoad(self):
+        """
+        An L{Element} renders the document returned by the C{load} method of a
+        subclass of L{XMLString} which overrides it.
+        """
+        class Loader(XMLString):
+            def load(self):
+                return [tags.i(u'overridden')]
+
+        self.assertFlattensImmediately(
+            Element(Loader(self.template)), b'<i>overridden</i>')
+
+
+    def test_attributeValue(self):
+        """
+        A precompiled L{Tag} used as the value of an attribute is quoted.
+        """
+        tag, = _precompile([tags.a(tags.span(render='dynamic'),
+                                   title=tags.b(u'"<&>"'))])
+        self.assertIsNotNone(tag.attributes['title']._compiled)
+
+        class Dynamic(Element):
+            @renderer
+            def dynamic(self, request, tag):
+                return u'x'
+
+        self.assertFlattensImmediately(
+            Dynamic(TagLoader(tag)),
+            b'<a title="&lt;b&gt;&quot;&amp;lt;&amp;amp;&amp;gt;&quot;'
+            b'&lt;/b&gt;">x</a>')
+
+
+    def test_changed(self):
+        """
+        Adding children to a precompiled L{Tag}, or clearing them, discards
+        its flattened form.
+        """
+        tag, = _precompile([tags.p(u'before')])
+        loader = TagLoader(tag)
+        tag(u' after')
+        self.assertIsNone(tag._compiled)
+        self.assertFlattensImmediately(Element(loader), b'<p>before after</p>')
+        tag, = _precompile([tag])
+        loader = TagLoader(tag)
+        tag.clear()
+        self.assertIsNone(tag._compiled)
+        self.assertFlattensImmediately(Element(loader), b'<p></p>')
+
+
+    def test_tagLoaderChanged(self):
+        """
+        L{TagLoader} does not precompile the L{Tag} it is given, so changes
+        made to any part of it after the L{TagLoader} is created are rendered.
+        """
+        inner = tags.p(u'x')
+        root = tags.div(inner)
+        loader = TagLoader(root)
+        self.assertFlattensImmediately(Element(loader), b'<div><p>x</p></div>')
+        inner(u'y')
+        self.assertFlattensImmediately(
+            Element(loader), b'<div><p>xy</p></div>')
+        root.children.append(tags.br())
+        self.assertFlattensImmediately(
+            Element(loader), b'<div><p>xy</p><br /></div>')
+        self.assertIsNone(root._compiled)
+        self.assertIsNone(inner._compiled)
+
+
+    def test_unflattenable(self):
+        """
+        A static L{Tag} which cannot be flattened is left to fail when the
+        template is rendered.
+        """
+        tag, = _precompile([tags.p(Tag(u'\N{SNOWMAN}'))])
+        self.assertIsNone(tag._compiled)
+        self.assertFlatteningRaises(Element(TagLoader(tag)), UnicodeEncodeError)
+
+
+
 class TestElement(Element):
     """
     An L{Element} that can be rendered successfully.